@@ -5,6 +5,7 @@ from ai.models import (
     AIRequest,
     AIResponseLog,
     AIUsageQuota,
+    ClassBrief,
     LearnerContextSnapshot,
     TeacherFocusArea,
 )
@@ -28,9 +29,11 @@ class AIRequestAdmin(admin.ModelAdmin):
         "resolved_model",
         "status",
         "cost_estimate",
+        "estimated_input_tokens",
+        "cached_input_tokens",
         "created_at",
     )
-    list_filter = ("origin_app", "persona", "status", "resolved_model")
+    list_filter = ("origin_app", "persona", "status", "resolved_model", "prompt_prefix_hash")
     search_fields = ("raw_query", "optimized_prompt", "user__username")
     readonly_fields = ("created_at", "completed_at", "optimizer_trace", "meta_context")
 
@@ -71,3 +74,10 @@ class TeacherFocusAreaAdmin(admin.ModelAdmin):
     list_filter = ("priority", "active")
     search_fields = ("teacher__username", "focus_text")
     readonly_fields = ("created_at",)
+
+
+@admin.register(ClassBrief)
+class ClassBriefAdmin(admin.ModelAdmin):
+    list_display = ("class_context", "generated_at", "data_changed_at", "narrative_model")
+    search_fields = ("class_context__name", "brief_text", "narrative")
+    readonly_fields = ("generated_at", "data_changed_at", "summary")
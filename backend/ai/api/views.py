@@ -11,9 +11,12 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from ai.exceptions import AIServiceError, QuotaExceededError, RateLimitError, UnsafeContentError
-from ai.models import AIInteractionSession, AIRequest
+from ai.constants import IDEMPOTENCY_KEY_MAX_LENGTH
+from ai.exceptions import AIServiceError, ContextTooLargeError, QuotaExceededError, RateLimitError, UnsafeContentError
+from ai.models import AIInteractionSession, AIRequest, ClassBrief
 from ai.services import AIRequestOrchestrator
+from ai.services.briefs import ClassBriefService
+from ai.services.optimizer_cache import OptimizerCache
 from core.permissions import IsAuthenticatedAndActive
 
 logger = logging.getLogger(__name__)
@@ -52,6 +55,10 @@ class AssistantAPIView(APIView):
 
         persona = _resolve_persona(request.user)
 
+        idempotency_key = (request.headers.get('Idempotency-Key') or '').strip()
+        if len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return Response({'error': _('Idempotency-Key demasiado longa.'), 'code': 'invalid_idempotency_key'}, status=status.HTTP_400_BAD_REQUEST)
+
         session: Optional[AIInteractionSession] = None
         session_id = payload.get('session_id')
         if session_id:
@@ -82,6 +89,7 @@ class AssistantAPIView(APIView):
                 class_context=class_context,
                 session=session,
                 extras=extras,
+                idempotency_key=idempotency_key,
             )
         except RateLimitError as exc:
             return Response({'error': str(exc), 'code': 'rate_limit'}, status=status.HTTP_429_TOO_MANY_REQUESTS)
@@ -89,6 +97,8 @@ class AssistantAPIView(APIView):
             return Response({'error': str(exc), 'code': 'quota'}, status=status.HTTP_402_PAYMENT_REQUIRED)
         except UnsafeContentError as exc:
             return Response({'error': str(exc), 'code': 'guardrail'}, status=status.HTTP_403_FORBIDDEN)
+        except ContextTooLargeError as exc:
+            return Response({'error': str(exc), 'code': 'context_too_large'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
         except AIServiceError as exc:
             return Response({'error': str(exc), 'code': 'service'}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as exc:  # pragma: no cover
@@ -151,3 +161,44 @@ class AssistantFeedbackAPIView(APIView):
         ai_request.response_log.user_feedback = feedback
         ai_request.response_log.save(update_fields=['user_feedback'])
         return Response({'ok': True})
+
+
+class OptimizerCacheStatsAPIView(APIView):
+    permission_classes = [IsAuthenticatedAndActive]
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        if not (user.is_superuser or getattr(user, 'role', None) == 'admin'):
+            return Response({'error': _('Sem permissão.'), 'code': 'forbidden'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(OptimizerCache().stats())
+
+
+class ClassBriefAPIView(APIView):
+    """Resumo pré-calculado da turma (comando ``build_class_briefs``)."""
+
+    permission_classes = [IsAuthenticatedAndActive]
+
+    def get(self, request, class_id: int, *args, **kwargs):
+        from classes.models import Class
+
+        turma = get_object_or_404(Class, pk=class_id)
+        user = request.user
+        is_admin = user.is_superuser or getattr(user, 'role', None) == 'admin'
+        if not (is_admin or turma.teachers.filter(id=user.id).exists()):
+            return Response({'error': _('Sem permissão.'), 'code': 'forbidden'}, status=status.HTTP_403_FORBIDDEN)
+
+        service = ClassBriefService()
+        brief = ClassBrief.objects.filter(class_context=turma).first()
+        if brief is None:
+            return Response({'error': _('Resumo ainda não calculado.'), 'code': 'not_found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(
+            {
+                'class_id': turma.id,
+                'summary': brief.summary,
+                'brief_text': brief.brief_text,
+                'narrative': brief.narrative,
+                'generated_at': brief.generated_at,
+                'data_changed_at': brief.data_changed_at,
+                'is_fresh': service.get_fresh(turma) is not None,
+            }
+        )
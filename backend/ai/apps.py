@@ -5,3 +5,6 @@ class AiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai'
     verbose_name = 'Inteligência Artificial'
+
+    def ready(self):
+        import ai.checks  # noqa: F401
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+_PROCESS_LOCAL_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Os locks e vagas da IA e os carimbos do painel de PIT só funcionam entre workers com uma cache partilhada."""
+    backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    if backend in _PROCESS_LOCAL_CACHES:
+        return [
+            Warning(
+                "A cache 'default' é local a cada processo.",
+                hint=(
+                    "Define REDIS_URL: sem cache partilhada os pedidos IA idênticos não são "
+                    "agrupados entre workers, OLLAMA_MAX_CONCURRENCY não é respeitado e o "
+                    "painel de PIT pode ficar desatualizado noutros workers."
+                ),
+                id="ai.W001",
+            )
+        ]
+    return []
@@ -11,12 +11,53 @@ DEFAULT_MODEL_COSTS: Dict[str, Decimal] = {
     "gpt-5": Decimal("0.00300"),
 }
 
+# Preço por 1k tokens de saída; os valores acima (DEFAULT_MODEL_COSTS) são os de entrada.
+DEFAULT_MODEL_OUTPUT_COSTS: Dict[str, Decimal] = {
+    "gpt-5-nano": Decimal("0.00040"),
+    "gpt-5-mini": Decimal("0.00200"),
+    "gpt-5": Decimal("0.01000"),
+}
+
+# Janela de contexto (tokens de entrada + saída) por modelo. Para o Ollama usa-se o num_ctx.
+DEFAULT_MODEL_CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-5-nano": 400_000,
+    "gpt-5-mini": 400_000,
+    "gpt-5": 400_000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+# Valor por omissão do num_ctx no Ollama quando OLLAMA_OPTIONS não o define.
+DEFAULT_OLLAMA_NUM_CTX = 2048
+
 DEFAULT_MAX_TOKENS = 1200
+# Tamanho típico de uma resposta: reservado na janela de contexto e usado no custo estimado
+# antes da chamada (no Ollama, um num_predict em OLLAMA_OPTIONS tem precedência na reserva).
+DEFAULT_EXPECTED_OUTPUT_TOKENS = 400
+
+# Calibração do estimador de tokens contra os input_tokens reais registados.
+TOKEN_CALIBRATION_SAMPLE = 200
+TOKEN_CALIBRATION_TTL_SECONDS = 3600
 
 DEFAULT_TIMEOUT_SECONDS = 30
 
 DEFAULT_CACHE_TTL_SECONDS = 3600
 
+# Tempo máximo (s) que um pedido duplicado espera pelo pedido idêntico em curso.
+DEFAULT_SINGLE_FLIGHT_TIMEOUT_SECONDS = 20
+# Qualquer espera dentro de um pedido tem de acabar antes de o gunicorn matar o worker
+# (--timeout); a margem deixa tempo para responder ao cliente.
+DEFAULT_WORKER_TIMEOUT_SECONDS = 30
+WORKER_TIMEOUT_MARGIN_SECONDS = 5
+SINGLE_FLIGHT_POLL_INTERVAL_SECONDS = 0.1
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 128
+
+# O resultado do optimizador (intenção, tier, prompt reescrito) muda pouco: TTL longo.
+DEFAULT_OPTIMIZER_CACHE_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_OPTIMIZER_CACHE_SIZE = 512
+
+# Idade máxima de um resumo de turma: cobre o que não deixa carimbo (alunos que saem, projetos).
+DEFAULT_CLASS_BRIEF_MAX_AGE_SECONDS = 24 * 3600
+
 DEFAULT_RATE_LIMITS = {
     "student": 12,
     "teacher": 24,
@@ -24,6 +65,35 @@ DEFAULT_RATE_LIMITS = {
     "admin": 60,
 }
 
+# Incrementar sempre que o prefixo estático dos prompts de sistema mudar
+# (persona, bloco MEM ou regras de resposta) para invalidar caches do provider.
+PROMPT_PREFIX_VERSION = "2025.1"
+
+# Ollama local: tempo que cada tier fica carregado em RAM após o último pedido.
+# O nano serve o optimizador e o guardião em todos os pedidos, por isso fica mais tempo.
+DEFAULT_OLLAMA_KEEP_ALIVE = {
+    "nano": "24h",
+    "mini": "30m",
+    "normal": "5m",
+    "default": "5m",
+}
+DEFAULT_OLLAMA_MAX_CONCURRENCY = 1
+DEFAULT_OLLAMA_SLOT_WAIT_SECONDS = 20
+
+# Agrupamento automático (ZDP) a partir das marcas de checklist.
+MARK_MASTERY_SCORES = {
+    "NOT_STARTED": 0.0,
+    "IN_PROGRESS": 0.5,
+    "COMPLETED": 1.0,
+    "VALIDATED": 1.0,
+}
+DEFAULT_GROUP_SIZE = 5
+GROUP_STRENGTH_THRESHOLD = 0.75
+GROUP_NEED_THRESHOLD = 0.25
+GROUP_MAX_LISTED_ITEMS = 5
+GROUP_KMEANS_MAX_ITERATIONS = 50
+GROUP_PROFILE_SOURCE = "clustering"
+
 PROMPT_OPTIMIZER_MODEL = "gpt-5-nano"
 RESPONSE_GUARD_MODEL = "gpt-5-nano"
 
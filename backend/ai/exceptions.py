@@ -16,3 +16,7 @@ class UnsafeContentError(AIServiceError):
 
 class RateLimitError(AIServiceError):
     """Indica que o limite de pedidos por período foi excedido."""
+
+
+class ContextTooLargeError(AIServiceError):
+    """O pedido não cabe na janela de contexto de nenhum dos modelos disponíveis."""
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai.services.briefs import ClassBriefService
+from classes.models import Class
+
+
+class Command(BaseCommand):
+    help = (
+        'Pré-calcula o resumo de cada turma para o assistente e dashboards de professor. '
+        'Agendar (cron) depois do horário letivo; só recalcula turmas com marcas alteradas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class-id', action='append', type=int, dest='class_ids', help='Limita a uma turma (pode repetir).')
+        parser.add_argument('--narrative', action='store_true', help='Gera também a narrativa com o modelo (tier mini).')
+        parser.add_argument('--force', action='store_true', help='Recalcula mesmo sem alterações desde a última execução.')
+
+    def handle(self, *args, **options):
+        classes = Class.objects.order_by('id')
+        if options['class_ids']:
+            classes = classes.filter(id__in=options['class_ids'])
+            missing = set(options['class_ids']) - set(classes.values_list('id', flat=True))
+            if missing:
+                raise CommandError(f"Turmas inexistentes: {', '.join(map(str, sorted(missing)))}.")
+
+        built, skipped = ClassBriefService().refresh_changed(
+            classes,
+            narrative=options['narrative'],
+            force=options['force'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Resumos recalculados: {built}; sem alterações: {skipped}.'))
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai.services.grouping import GroupProfileBuilder
+from classes.models import Class
+
+
+class Command(BaseCommand):
+    help = (
+        'Agrupa os alunos de cada turma por perfis de domínio das checklists (k-means) '
+        'e atualiza os GroupLearningProfile automáticos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class-id', action='append', type=int, dest='class_ids', help='Limita a uma turma (pode repetir).')
+        parser.add_argument('--groups', type=int, help='Número de grupos por turma (por defeito ~5 alunos por grupo).')
+
+    def handle(self, *args, **options):
+        if options['groups'] is not None and options['groups'] < 1:
+            raise CommandError('--groups tem de ser pelo menos 1.')
+        classes = Class.objects.order_by('id')
+        if options['class_ids']:
+            classes = classes.filter(id__in=options['class_ids'])
+            missing = set(options['class_ids']) - set(classes.values_list('id', flat=True))
+            if missing:
+                raise CommandError(f"Turmas inexistentes: {', '.join(map(str, sorted(missing)))}.")
+
+        builder = GroupProfileBuilder()
+        for turma in classes:
+            profiles = builder.build(turma, groups=options['groups'])
+            self.stdout.write(f'{turma}: {len(profiles)} grupo(s).')
+        self.stdout.write(self.style.SUCCESS('Perfis de grupo atualizados.'))
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai.constants import PROVIDER_OLLAMA
+from ai.exceptions import AIServiceError
+from ai.services.config import get_provider_config
+from ai.services.ollama import OllamaManager
+
+
+class Command(BaseCommand):
+    help = 'Pré-carrega no Ollama os modelos dos tiers AI_MODEL_TIERS com o keep_alive configurado.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tier',
+            action='append',
+            dest='tiers',
+            help='Tier a pré-carregar (nano, mini, normal). Pode repetir; por defeito todos.',
+        )
+        parser.add_argument('--status', action='store_true', help='Mostra apenas os modelos atualmente carregados.')
+
+    def handle(self, *args, **options):
+        config = get_provider_config()
+        if config.name != PROVIDER_OLLAMA:
+            self.stdout.write(self.style.WARNING(f'Provider ativo é "{config.name}"; nada a pré-carregar.'))
+            return
+
+        manager = OllamaManager(config)
+        if options['status']:
+            try:
+                models = manager.loaded_models()
+            except AIServiceError as exc:
+                raise CommandError(str(exc)) from exc
+            for model in models:
+                self.stdout.write(f"{model.get('name')}  expira: {model.get('expires_at')}")
+            if not models:
+                self.stdout.write('Nenhum modelo carregado.')
+            return
+
+        tiers = options.get('tiers')
+        unknown = set(tiers or []) - set(manager.tiers)
+        if unknown:
+            raise CommandError(f"Tiers desconhecidos: {', '.join(sorted(unknown))}.")
+
+        results = manager.warm_up(tiers)
+        failures = 0
+        for result in results:
+            if result.ok:
+                self.stdout.write(
+                    f'{result.tier}: {result.model} carregado (keep_alive={result.keep_alive}, '
+                    f"load={result.timings.get('load_ms', 0)}ms, total={result.timings.get('latency_ms', 0)}ms)"
+                )
+            else:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f'{result.tier}: {result.model} falhou ({result.error})'))
+        if failures:
+            raise CommandError(f'{failures} modelo(s) não foram pré-carregados.')
+        self.stdout.write(self.style.SUCCESS('Modelos Ollama prontos.'))
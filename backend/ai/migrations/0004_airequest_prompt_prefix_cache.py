@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0003_studentprofile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airequest',
+            name='cached_input_tokens',
+            field=models.PositiveIntegerField(default=0, help_text='Tokens de entrada servidos pela cache de prompt do provider.'),
+        ),
+        migrations.AddField(
+            model_name='airequest',
+            name='prompt_prefix_hash',
+            field=models.CharField(blank=True, help_text='Hash do prefixo estático do prompt de sistema (persona + versão).', max_length=64),
+        ),
+    ]
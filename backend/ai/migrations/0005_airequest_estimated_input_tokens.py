@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0004_airequest_prompt_prefix_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airequest',
+            name='estimated_input_tokens',
+            field=models.PositiveIntegerField(default=0, help_text='Estimativa local (não calibrada) dos tokens de entrada, feita antes da chamada.'),
+        ),
+    ]
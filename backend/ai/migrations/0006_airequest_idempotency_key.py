@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-19 16:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0005_airequest_estimated_input_tokens'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airequest',
+            name='idempotency_key',
+            field=models.CharField(blank=True, help_text='Valor do cabeçalho Idempotency-Key; repetições devolvem a resposta guardada.', max_length=128, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='airequest',
+            constraint=models.UniqueConstraint(fields=('user', 'idempotency_key'), name='ai_request_unique_idempotency_key'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-19 16:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0006_airequest_idempotency_key'),
+        ('classes', '0003_classmembership'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassBrief',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('summary', models.JSONField(blank=True, default=dict, help_text='Resumo estruturado: visão geral, checklists e destaques do conselho.')),
+                ('brief_text', models.TextField(blank=True)),
+                ('narrative', models.TextField(blank=True, help_text='Narrativa gerada pelo modelo (opcional).')),
+                ('narrative_model', models.CharField(blank=True, max_length=40)),
+                ('data_changed_at', models.DateTimeField(blank=True, help_text='Última alteração de checklists, conselho ou alunos considerada neste resumo.', null=True)),
+                ('generated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('class_context', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ai_brief', to='classes.class')),
+            ],
+            options={
+                'verbose_name': 'Resumo de Turma',
+                'verbose_name_plural': 'Resumos de Turma',
+            },
+        ),
+    ]
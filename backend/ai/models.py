@@ -89,6 +89,25 @@ class AIRequest(models.Model):
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     input_tokens = models.PositiveIntegerField(default=0)
     output_tokens = models.PositiveIntegerField(default=0)
+    cached_input_tokens = models.PositiveIntegerField(
+        default=0,
+        help_text=_('Tokens de entrada servidos pela cache de prompt do provider.'),
+    )
+    idempotency_key = models.CharField(
+        max_length=128,
+        null=True,
+        blank=True,
+        help_text=_('Valor do cabeçalho Idempotency-Key; repetições devolvem a resposta guardada.'),
+    )
+    estimated_input_tokens = models.PositiveIntegerField(
+        default=0,
+        help_text=_('Estimativa local (não calibrada) dos tokens de entrada, feita antes da chamada.'),
+    )
+    prompt_prefix_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text=_('Hash do prefixo estático do prompt de sistema (persona + versão).'),
+    )
     cost_estimate = models.DecimalField(
         max_digits=12,
         decimal_places=5,
@@ -103,6 +122,12 @@ class AIRequest(models.Model):
         ordering = ("-created_at",)
         verbose_name = _("Pedido IA")
         verbose_name_plural = _("Pedidos IA")
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "idempotency_key"),
+                name="ai_request_unique_idempotency_key",
+            ),
+        ]
 
     def mark_completed(
         self,
@@ -111,10 +136,12 @@ class AIRequest(models.Model):
         tokens_out: int,
         cost: Decimal,
         latency_ms: int,
+        cached_tokens: int = 0,
     ) -> None:
         self.resolved_model = model_name
         self.input_tokens = tokens_in
         self.output_tokens = tokens_out
+        self.cached_input_tokens = cached_tokens
         self.cost_estimate = cost
         self.latency_ms = latency_ms
         self.status = AIRequest.Status.COMPLETED
@@ -124,6 +151,7 @@ class AIRequest(models.Model):
                 "resolved_model",
                 "input_tokens",
                 "output_tokens",
+                "cached_input_tokens",
                 "cost_estimate",
                 "latency_ms",
                 "status",
@@ -131,6 +159,11 @@ class AIRequest(models.Model):
             ]
         )
 
+    def mark_errored(self) -> None:
+        self.status = AIRequest.Status.ERRORED
+        self.completed_at = timezone.now()
+        self.save(update_fields=["status", "completed_at"])
+
 
 class AIResponseLog(models.Model):
     request = models.OneToOneField(
@@ -217,6 +250,37 @@ class GroupLearningProfile(models.Model):
         return f"{self.class_context}: {self.label}"
 
 
+class ClassBrief(models.Model):
+    """Resumo da turma pré-calculado fora do horário letivo para o assistente e dashboards."""
+
+    class_context = models.OneToOneField(
+        "classes.Class",
+        on_delete=models.CASCADE,
+        related_name="ai_brief",
+    )
+    summary = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text=_('Resumo estruturado: visão geral, checklists e destaques do conselho.'),
+    )
+    brief_text = models.TextField(blank=True)
+    narrative = models.TextField(blank=True, help_text=_('Narrativa gerada pelo modelo (opcional).'))
+    narrative_model = models.CharField(max_length=40, blank=True)
+    data_changed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=_('Última alteração de checklists, conselho ou alunos considerada neste resumo.'),
+    )
+    generated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = _("Resumo de Turma")
+        verbose_name_plural = _("Resumos de Turma")
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.class_context} · {self.generated_at:%Y-%m-%d %H:%M}"
+
+
 class TeacherFocusArea(models.Model):
     PRIORITY_LOW = "low"
     PRIORITY_MEDIUM = "medium"
@@ -468,6 +532,7 @@ __all__ = [
     "AIResponseLog",
     "LearnerContextSnapshot",
     "GroupLearningProfile",
+    "ClassBrief",
     "TeacherFocusArea",
     "AIUsageQuota",
     "StudentProfile",
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from ai.constants import DEFAULT_CLASS_BRIEF_MAX_AGE_SECONDS
+from ai.models import ClassBrief
+from ai.services.optimizer_cache import normalize_query
+from ai.services.prompting import build_prompt_prefix
+from ai.services.providers import get_provider
+
+# Intenções que o optimizador pode devolver para "como está a minha turma".
+CLASS_BRIEF_INTENT = "resumo_turma"
+CLASS_BRIEF_INTENTS = {CLASS_BRIEF_INTENT, "estado_turma", "ponto_situacao_turma"}
+
+_CLASS_BRIEF_QUERY_RE = re.compile(
+    r"\b(como (esta|vai|anda) a (minha )?turma"
+    r"|como (estao|vao|andam) os (meus )?alunos"
+    r"|(resumo|estado|ponto de situacao|balanco) da (minha )?turma)\b"
+)
+
+NARRATIVE_REQUEST = (
+    "Com base no resumo estruturado da turma abaixo, escreve para o professor um ponto de situação "
+    "curto (máx. 6 frases): progresso geral, pontos fortes, objetivos com mais alunos pendentes e "
+    "uma sugestão concreta para a próxima semana, ligada a um instrumento MEM.\n\nResumo: {summary}"
+)
+
+
+def wants_class_brief(intent: str, raw_query: str) -> bool:
+    if (intent or "").strip().lower() in CLASS_BRIEF_INTENTS:
+        return True
+    return bool(_CLASS_BRIEF_QUERY_RE.search(normalize_query(raw_query)))
+
+
+def _latest(*values: Optional[datetime]) -> Optional[datetime]:
+    present = [value for value in values if value is not None]
+    return max(present) if present else None
+
+
+def _max_by_class(queryset, class_field: str, field: str) -> Dict[int, Optional[datetime]]:
+    return dict(queryset.values_list(class_field).annotate(last=Max(field)).order_by())
+
+
+def class_data_changed_at(class_ids: Iterable[int]) -> Dict[int, Optional[datetime]]:
+    """Última alteração por turma do que entra no resumo: checklists, conselho e alunos inscritos.
+
+    Uma consulta agregada por tabela. Saídas de alunos não deixam carimbo; ficam
+    cobertas pela idade máxima do resumo (``AI_CLASS_BRIEF_MAX_AGE``).
+    """
+    from checklists.models import ChecklistMark, ChecklistStatus
+    from classes.models import ClassMembership
+    from council.models import CouncilDecision
+
+    class_ids = list(class_ids)
+    marks = _max_by_class(
+        ChecklistMark.objects.filter(status_record__student_class_id__in=class_ids),
+        "status_record__student_class_id",
+        "marked_at",
+    )
+    statuses = _max_by_class(
+        ChecklistStatus.objects.filter(student_class_id__in=class_ids), "student_class_id", "updated_at"
+    )
+    council = _max_by_class(
+        CouncilDecision.objects.filter(student_class_id__in=class_ids), "student_class_id", "updated_at"
+    )
+    members = _max_by_class(
+        ClassMembership.objects.filter(class_instance_id__in=class_ids, role=ClassMembership.Roles.STUDENT),
+        "class_instance_id",
+        "updated_at",
+    )
+    return {
+        class_id: _latest(marks.get(class_id), statuses.get(class_id), council.get(class_id), members.get(class_id))
+        for class_id in class_ids
+    }
+
+
+def brief_max_age() -> timedelta:
+    return timedelta(seconds=getattr(settings, "AI_CLASS_BRIEF_MAX_AGE", DEFAULT_CLASS_BRIEF_MAX_AGE_SECONDS))
+
+
+def _is_current(brief: ClassBrief, changed_at: Optional[datetime]) -> bool:
+    if brief.generated_at < timezone.now() - brief_max_age():
+        return False
+    return changed_at is None or (brief.data_changed_at is not None and changed_at <= brief.data_changed_at)
+
+
+class ClassBriefService:
+    """Calcula e serve os resumos de turma guardados em ``ClassBrief``."""
+
+    def __init__(self, context_broker=None) -> None:
+        if context_broker is None:
+            from ai.services.context import ContextBroker
+
+            context_broker = ContextBroker()
+        self.context_broker = context_broker
+
+    def get_fresh(self, class_context) -> Optional[ClassBrief]:
+        """Devolve o resumo guardado se os dados da turma não mudaram desde então e não é demasiado antigo."""
+        if class_context is None:
+            return None
+        brief = ClassBrief.objects.filter(class_context=class_context).first()
+        if brief is None:
+            return None
+        changed_at = class_data_changed_at([class_context.id])[class_context.id]
+        return brief if _is_current(brief, changed_at) else None
+
+    def build(self, class_context, *, narrative: bool = False, data_changed_at: Optional[datetime] = None) -> ClassBrief:
+        broker = self.context_broker
+        class_checklists = broker._class_checklist_summary(class_context)
+        summary = {
+            "class_overview": broker._class_overview(class_context),
+            "class_checklists": class_checklists,
+            "council_highlights": broker._recent_council_highlights(class_context),
+        }
+        if data_changed_at is None:
+            data_changed_at = class_data_changed_at([class_context.id])[class_context.id]
+        defaults = {
+            "summary": summary,
+            "brief_text": broker._teacher_class_brief(class_ck=class_checklists, class_context=class_context),
+            "narrative": "",
+            "narrative_model": "",
+            "data_changed_at": data_changed_at,
+            "generated_at": timezone.now(),
+        }
+        if narrative:
+            defaults["narrative"], defaults["narrative_model"] = self._generate_narrative(summary)
+        brief, _ = ClassBrief.objects.update_or_create(class_context=class_context, defaults=defaults)
+        return brief
+
+    def refresh_changed(
+        self,
+        classes,
+        *,
+        narrative: bool = False,
+        force: bool = False,
+    ) -> Tuple[int, int]:
+        """Recalcula apenas os resumos das turmas com dados alterados desde a última execução (ou antigos)."""
+        classes = list(classes)
+        changed_at = class_data_changed_at(turma.id for turma in classes)
+        existing = {
+            brief.class_context_id: brief
+            for brief in ClassBrief.objects.filter(class_context__in=classes).only(
+                "class_context_id", "data_changed_at", "generated_at"
+            )
+        }
+        built = skipped = 0
+        for turma in classes:
+            brief = existing.get(turma.id)
+            stamp = changed_at.get(turma.id)
+            if brief is not None and _is_current(brief, stamp) and not force:
+                skipped += 1
+                continue
+            self.build(turma, narrative=narrative, data_changed_at=stamp)
+            built += 1
+        return built, skipped
+
+    def _generate_narrative(self, summary: Dict) -> Tuple[str, str]:
+        tiers = getattr(settings, "AI_MODEL_TIERS", {}) or {}
+        model = tiers.get("mini") or getattr(settings, "AI_DEFAULT_MODEL", "")
+        # Os pares por aluno não acrescentam à narrativa e custam tokens.
+        compact = {**summary, "class_overview": {k: v for k, v in summary["class_overview"].items() if k != "peers"}}
+        messages = [
+            {"role": "system", "content": build_prompt_prefix("teacher").text},
+            {"role": "user", "content": NARRATIVE_REQUEST.format(summary=json.dumps(compact, ensure_ascii=False, default=str))},
+        ]
+        response = get_provider().chat_completion(messages, model=model, temperature=1)
+        return response.content.strip(), response.model
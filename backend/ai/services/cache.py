@@ -2,16 +2,28 @@ from __future__ import annotations
 
 import hashlib
 import json
+import time
+import uuid
 from typing import Any, Dict, Optional
 
+from django.conf import settings
 from django.core.cache import cache
 
-from ai.constants import DEFAULT_CACHE_TTL_SECONDS
+from ai.constants import (
+    DEFAULT_CACHE_TTL_SECONDS,
+    DEFAULT_SINGLE_FLIGHT_TIMEOUT_SECONDS,
+    SINGLE_FLIGHT_POLL_INTERVAL_SECONDS,
+)
+from ai.services.config import cap_wait_seconds
 
 
 class AIResponseCache:
-    def __init__(self, ttl: int = DEFAULT_CACHE_TTL_SECONDS) -> None:
+    def __init__(self, ttl: int = DEFAULT_CACHE_TTL_SECONDS, lock_timeout: Optional[int] = None) -> None:
         self.ttl = ttl
+        self.lock_timeout = cap_wait_seconds(
+            lock_timeout or getattr(settings, "AI_SINGLE_FLIGHT_TIMEOUT", DEFAULT_SINGLE_FLIGHT_TIMEOUT_SECONDS)
+        )
+        self._lock_tokens: Dict[str, str] = {}
 
     def make_key(self, persona: str, intent: str, optimized_prompt: str, context: Dict[str, Any]) -> str:
         context_for_cache = {
@@ -29,6 +41,44 @@ class AIResponseCache:
         digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
         return f"ai-response:{digest}"
 
+    def get_by_key(self, key: str) -> Optional[Dict[str, Any]]:
+        return cache.get(key)
+
+    def acquire_lock(self, key: str) -> bool:
+        """Marca o pedido como em curso; devolve False se outro pedido idêntico já o fez.
+
+        ``cache.add`` é atómico no Redis (obrigatório com vários workers; ver
+        ``REDIS_URL``), pelo que só um worker fica com o lock. O lock expira sozinho
+        ao fim de ``lock_timeout`` para não bloquear pedidos se o worker morrer.
+        """
+        token = uuid.uuid4().hex
+        if cache.add(f"{key}:lock", token, timeout=self.lock_timeout):
+            self._lock_tokens[key] = token
+            return True
+        return False
+
+    def release_lock(self, key: str) -> None:
+        token = self._lock_tokens.pop(key, None)
+        # Só remove o lock se ainda for nosso (pode ter expirado e sido adquirido por outro).
+        if token and cache.get(f"{key}:lock") == token:
+            cache.delete(f"{key}:lock")
+
+    def wait_for(self, key: str) -> Optional[Dict[str, Any]]:
+        """Espera pela resposta do pedido idêntico em curso.
+
+        Devolve ``None`` se o pedido original terminar sem guardar resposta (erro,
+        guardrail) ou se o tempo limite passar; nesse caso o chamador segue sozinho.
+        """
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            cached = cache.get(key)
+            if cached:
+                return cached
+            if cache.get(f"{key}:lock") is None:
+                return cache.get(key)
+            time.sleep(SINGLE_FLIGHT_POLL_INTERVAL_SECONDS)
+        return None
+
     def get(self, persona: str, intent: str, optimized_prompt: str, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         key = self.make_key(persona, intent, optimized_prompt, context)
         return cache.get(key)
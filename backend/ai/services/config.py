@@ -10,10 +10,13 @@ from django.conf import settings
 
 from ai.constants import (
     DEFAULT_MODEL_COSTS,
+    DEFAULT_MODEL_OUTPUT_COSTS,
     DEFAULT_TIMEOUT_SECONDS,
+    DEFAULT_WORKER_TIMEOUT_SECONDS,
     SUPPORTED_PROVIDERS,
     PROVIDER_OPENAI,
     PROVIDER_OLLAMA,
+    WORKER_TIMEOUT_MARGIN_SECONDS,
 )
 
 
@@ -103,8 +106,27 @@ def get_model_costs() -> Dict[str, Decimal]:
     return costs
 
 
+def get_model_output_costs() -> Dict[str, Decimal]:
+    """Preço por 1k tokens de saída; modelos sem valor próprio usam o preço de entrada."""
+    costs = get_model_costs()
+    costs.update(DEFAULT_MODEL_OUTPUT_COSTS)
+    overrides: Dict[str, str] = getattr(settings, "AI_MODEL_OUTPUT_COSTS", {})
+    for model_name, value in overrides.items():
+        try:
+            costs[model_name] = Decimal(str(value))
+        except Exception:
+            continue
+    return costs
+
+
 def is_fake_mode_enabled() -> bool:
     setting_value = getattr(settings, "AI_FAKE_RESPONSES", None)
     if setting_value is not None:
         return bool(setting_value)
     return os.environ.get("AI_FAKE_RESPONSES", "True").lower() in {"1", "true", "yes"}
+
+
+def cap_wait_seconds(seconds: int) -> int:
+    """Limita uma espera feita dentro de um pedido HTTP ao tempo de vida do worker gunicorn."""
+    worker_timeout = int(getattr(settings, "GUNICORN_TIMEOUT", DEFAULT_WORKER_TIMEOUT_SECONDS))
+    return min(int(seconds), max(1, worker_timeout - WORKER_TIMEOUT_MARGIN_SECONDS))
@@ -7,7 +7,7 @@ from typing import Any, Dict, Optional
 from django.db.models import Avg, Max
 from django.utils import timezone
 
-from ai.models import LearnerContextSnapshot
+from ai.models import GroupLearningProfile, LearnerContextSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +43,9 @@ class ContextBroker:
                 "name": getattr(class_context, "name", ""),
                 "year": getattr(class_context, "academic_year", ""),
             }
-        context["class_overview"] = self._class_overview(class_context)
+        if persona != "teacher":
+            # Para professores a visão geral vem de _teacher_context (resumo pré-calculado quando existe)
+            context["class_overview"] = self._class_overview(class_context)
         if persona == "student":
             context.update(self._student_context(user, class_context))
         elif persona == "teacher":
@@ -81,25 +83,48 @@ class ContextBroker:
             "pit": self._current_pit(user, class_context),
             "checklists": self._checklist_progress(user, class_context),
         }
-        profile["checklist_focus"] = self._checklist_focus(profile["checklists"])
+        profile["checklist_focus"] = self._checklist_focus(user, class_context)
         profile["recent_projects"] = self._recent_projects(user, class_context)
         profile["council_notes"] = self._recent_council_highlights(class_context)
         return {"learner_profile": profile}
 
     def _teacher_context(self, user, class_context) -> Dict[str, Any]:
-        class_ck = self._class_checklist_summary(class_context)
-        brief = self._teacher_class_brief(class_ck=class_ck, class_context=class_context)
+        from ai.services.briefs import ClassBriefService
+
+        stored = ClassBriefService(self).get_fresh(class_context)
+        if stored:
+            class_overview = stored.summary.get("class_overview", {})
+            class_ck = stored.summary.get("class_checklists", {})
+            brief = stored.brief_text
+        else:
+            class_overview = self._class_overview(class_context)
+            class_ck = self._class_checklist_summary(class_context)
+            brief = self._teacher_class_brief(class_ck=class_ck, class_context=class_context)
         return {
             "focus_areas": list(
                 user.focus_areas.filter(active=True, class_context=class_context).values(
                     "focus_text", "priority", "created_at"
                 )
             ),
-            "class_overview": self._class_overview(class_context),
+            "class_overview": class_overview,
             "class_checklists": class_ck,
             "teacher_class_brief": brief,
+            "group_profiles": self._group_profiles(class_context),
         }
 
+    def _group_profiles(self, class_context) -> list[Dict[str, Any]]:
+        if not class_context:
+            return []
+        return [
+            {
+                "label": profile.label,
+                "summary": profile.summary,
+                "members": profile.metadata.get("member_names", []),
+                "focus": profile.focus_competencies,
+            }
+            for profile in GroupLearningProfile.objects.filter(class_context=class_context)
+        ]
+
     def _latest_snapshot(self, user, class_context) -> Dict[str, Any]:
         snapshot = (
             LearnerContextSnapshot.objects.filter(student=user, class_context=class_context)
@@ -476,32 +501,28 @@ class ContextBroker:
         }
         return age_map.get(grade_level)
 
-    def _checklist_focus(self, checklists: Dict[str, Any]) -> list[Dict[str, str]]:
-        candidates = []
-        for data in checklists.values():
-            for item in data.get("pending_items", []):
-                candidates.append(item)
-        if not candidates:
-            return []
-        candidates.sort(key=lambda entry: (-entry.get("percent_complete", 0), entry.get("order", 0)))
-        trimmed = []
-        seen_templates = set()
-        for candidate in candidates:
-            template = candidate.get("template")
-            if template in seen_templates and len(trimmed) >= 2:
-                continue
-            trimmed.append(
-                {
-                    "template": template,
-                    "item": candidate.get("item"),
-                    "code": candidate.get("code"),
-                    "percent_complete": candidate.get("percent_complete"),
-                }
+    def _checklist_focus(self, user, class_context) -> list[Dict[str, Any]]:
+        from checklists.services import NextObjectiveRecommender, peer_helpers_for_items
+
+        objectives = NextObjectiveRecommender().recommend(user, student_class=class_context, limit=2)
+        helpers = {}
+        if class_context and objectives:
+            helpers = peer_helpers_for_items(
+                [objective["item_id"] for objective in objectives],
+                class_context,
+                exclude_student=user,
+                limit=3,
             )
-            seen_templates.add(template)
-            if len(trimmed) >= 2:
-                break
-        return trimmed
+        return [
+            {
+                "template": objective["template"],
+                "item": objective["text"],
+                "code": objective["code"],
+                "readiness": objective["readiness"],
+                "peer_helpers": [helper["name"] for helper in helpers.get(objective["item_id"], [])],
+            }
+            for objective in objectives
+        ]
 
     def _student_summary(self, student, class_context) -> Dict[str, Any]:
         summary = {
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.db import transaction
+
+from ai.constants import (
+    DEFAULT_GROUP_SIZE,
+    GROUP_KMEANS_MAX_ITERATIONS,
+    GROUP_MAX_LISTED_ITEMS,
+    GROUP_NEED_THRESHOLD,
+    GROUP_PROFILE_SOURCE,
+    GROUP_STRENGTH_THRESHOLD,
+    MARK_MASTERY_SCORES,
+)
+from ai.models import GroupLearningProfile
+
+
+@dataclass
+class MasteryMatrix:
+    """Matriz aluno × item de checklist com o domínio de cada item (0 a 1)."""
+
+    student_ids: List[int]
+    student_names: List[str]
+    item_ids: List[int]
+    item_labels: List[str]
+    values: np.ndarray
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self.student_ids), len(self.item_ids)
+
+
+@dataclass
+class StudentGroup:
+    members: List[int] = field(default_factory=list)
+    centroid: List[float] = field(default_factory=list)
+
+    @property
+    def mastery(self) -> float:
+        return sum(self.centroid) / len(self.centroid) if self.centroid else 0.0
+
+
+def _mark_score(mark_status: str, teacher_validated: bool) -> float:
+    if teacher_validated:
+        return MARK_MASTERY_SCORES["VALIDATED"]
+    return MARK_MASTERY_SCORES.get(mark_status, 0.0)
+
+
+def build_mastery_matrix(class_context) -> MasteryMatrix:
+    """Lê todas as marcas da turma numa só consulta; itens sem marca contam como 0."""
+    from checklists.models import ChecklistMark
+
+    students = list(
+        class_context.students.order_by("last_name", "first_name", "username").values_list(
+            "id", "first_name", "last_name", "username"
+        )
+    )
+    marks = ChecklistMark.objects.filter(status_record__student_class=class_context).values_list(
+        "status_record__student_id", "item_id", "item__code", "item__text", "mark_status", "teacher_validated"
+    )
+    row_of = {student[0]: index for index, student in enumerate(students)}
+    column_of: Dict[int, int] = {}
+    item_ids: List[int] = []
+    item_labels: List[str] = []
+    cells = []
+    for student_id, item_id, code, text, mark_status, validated in marks.order_by("item__template_id", "item__order"):
+        if student_id not in row_of:
+            continue
+        if item_id not in column_of:
+            column_of[item_id] = len(item_ids)
+            item_ids.append(item_id)
+            item_labels.append(code or text[:60])
+        cells.append((row_of[student_id], column_of[item_id], _mark_score(mark_status, validated)))
+
+    values = np.zeros((len(students), len(item_ids)))
+    if cells:
+        rows, columns, scores = zip(*cells)
+        values[list(rows), list(columns)] = scores
+    return MasteryMatrix(
+        student_ids=[student[0] for student in students],
+        student_names=[f"{first} {last}".strip() or username for _, first, last, username in students],
+        item_ids=item_ids,
+        item_labels=item_labels,
+        values=values,
+    )
+
+
+def _initial_centres(values: np.ndarray, k: int) -> List[int]:
+    # Determinístico: começa no aluno com maior domínio médio e escolhe sempre o mais afastado.
+    chosen = [int(values.mean(axis=1).argmax())]
+    nearest = ((values - values[chosen[0]]) ** 2).sum(axis=1)
+    while len(chosen) < k:
+        candidate = int(nearest.argmax())
+        chosen.append(candidate)
+        nearest = np.minimum(nearest, ((values - values[candidate]) ** 2).sum(axis=1))
+    return chosen
+
+
+def _kmeans(values: np.ndarray, k: int) -> List[int]:
+    centres = values[_initial_centres(values, k)].copy()
+    row_norms = (values**2).sum(axis=1)[:, None]
+    labels = None
+    for _ in range(GROUP_KMEANS_MAX_ITERATIONS):
+        # |x - c|² = |x|² - 2x·c + |c|², sem criar o tensor aluno × grupo × item.
+        distances = row_norms - 2 * values @ centres.T + (centres**2).sum(axis=1)[None, :]
+        new_labels = distances.argmin(axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centres)
+        np.add.at(sums, labels, values)
+        filled = counts > 0
+        centres[filled] = sums[filled] / counts[filled, None]
+    return labels.tolist()
+
+
+def cluster_students(matrix: MasteryMatrix, groups: Optional[int] = None) -> List[StudentGroup]:
+    """Agrupa os alunos por perfis de domínio semelhantes (k-means)."""
+    n_students, n_items = matrix.shape
+    if not n_students:
+        return []
+    if groups is None:
+        groups = round(n_students / DEFAULT_GROUP_SIZE)
+    k = max(1, min(int(groups), n_students))
+    values = np.asarray(matrix.values, dtype=float).reshape(n_students, n_items)
+    labels = [0] * n_students if n_items == 0 or k == 1 else _kmeans(values, k)
+
+    clusters: Dict[int, StudentGroup] = {}
+    for index, label in enumerate(labels):
+        clusters.setdefault(label, StudentGroup()).members.append(index)
+    for group in clusters.values():
+        group.centroid = values[group.members].mean(axis=0).tolist()
+    return sorted(clusters.values(), key=lambda group: (-group.mastery, group.members[0]))
+
+
+def _ranked_items(matrix: MasteryMatrix, group: StudentGroup, *, strengths: bool) -> List[str]:
+    if strengths:
+        picked = [(score, label) for score, label in zip(group.centroid, matrix.item_labels) if score >= GROUP_STRENGTH_THRESHOLD]
+        picked.sort(key=lambda pair: (-pair[0], pair[1]))
+    else:
+        picked = [(score, label) for score, label in zip(group.centroid, matrix.item_labels) if score <= GROUP_NEED_THRESHOLD]
+        picked.sort(key=lambda pair: (pair[0], pair[1]))
+    return [label for _, label in picked[:GROUP_MAX_LISTED_ITEMS]]
+
+
+class GroupProfileBuilder:
+    """Gera ``GroupLearningProfile`` automáticos (ZDP) a partir das checklists da turma.
+
+    Os perfis criados à mão ficam intactos; os automáticos (``metadata.source``)
+    são substituídos em cada execução.
+    """
+
+    def build(self, class_context, groups: Optional[int] = None) -> List[GroupLearningProfile]:
+        matrix = build_mastery_matrix(class_context)
+        clusters = cluster_students(matrix, groups)
+        profiles = []
+        for position, group in enumerate(clusters, start=1):
+            strengths = _ranked_items(matrix, group, strengths=True)
+            needs = _ranked_items(matrix, group, strengths=False)
+            names = [matrix.student_names[i] for i in group.members]
+            summary = f"{len(names)} aluno(s), domínio médio {group.mastery:.0%}."
+            if strengths:
+                summary += f" Pontos fortes: {', '.join(strengths)}."
+            if needs:
+                summary += f" A trabalhar: {', '.join(needs)}."
+            profiles.append(
+                GroupLearningProfile(
+                    class_context=class_context,
+                    label=f"Grupo {position}",
+                    summary=summary,
+                    focus_competencies=needs,
+                    metadata={
+                        "source": GROUP_PROFILE_SOURCE,
+                        "members": [matrix.student_ids[i] for i in group.members],
+                        "member_names": names,
+                        "strengths": strengths,
+                        "needs": needs,
+                        "mastery": round(group.mastery, 3),
+                        "items": len(matrix.item_ids),
+                    },
+                )
+            )
+        with transaction.atomic():
+            GroupLearningProfile.objects.filter(
+                class_context=class_context, metadata__source=GROUP_PROFILE_SOURCE
+            ).delete()
+            GroupLearningProfile.objects.bulk_create(profiles)
+        return profiles
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests import RequestException
+
+from ai.constants import (
+    DEFAULT_OLLAMA_KEEP_ALIVE,
+    DEFAULT_OLLAMA_MAX_CONCURRENCY,
+    DEFAULT_OLLAMA_SLOT_WAIT_SECONDS,
+    SINGLE_FLIGHT_POLL_INTERVAL_SECONDS,
+)
+from ai.exceptions import AIServiceError, RateLimitError
+from ai.services.config import ProviderConfig, cap_wait_seconds
+
+logger = logging.getLogger(__name__)
+
+_NS_PER_MS = 1_000_000
+
+
+def ollama_timings(data: Dict[str, Any]) -> Dict[str, int]:
+    """Converte as durações (ns) devolvidas pelo Ollama em milissegundos."""
+    timings = {
+        "latency_ms": int((data.get("total_duration") or 0) / _NS_PER_MS),
+        "load_ms": int((data.get("load_duration") or 0) / _NS_PER_MS),
+        "prompt_eval_ms": int((data.get("prompt_eval_duration") or 0) / _NS_PER_MS),
+        "eval_ms": int((data.get("eval_duration") or 0) / _NS_PER_MS),
+    }
+    eval_count = data.get("eval_count") or 0
+    if eval_count and timings["eval_ms"]:
+        timings["eval_tokens_per_s"] = int(eval_count * 1000 / timings["eval_ms"])
+    return timings
+
+
+@dataclass
+class WarmupResult:
+    tier: str
+    model: str
+    keep_alive: str
+    ok: bool
+    timings: Dict[str, int]
+    error: str = ""
+
+
+class OllamaManager:
+    """Gestão dos modelos locais do Ollama: pré-carregamento, keep_alive e concorrência.
+
+    O servidor corre no mesmo CPU que a aplicação, por isso trocar modelos em RAM é o
+    pior pico de latência. Cada tier fica carregado durante o seu ``keep_alive`` e o
+    número de pedidos simultâneos por modelo é limitado por slots na cache Redis
+    (``REDIS_URL``), a única visível a todos os workers gunicorn.
+    """
+
+    slot_prefix = "ollama-slot"
+
+    def __init__(self, config: ProviderConfig) -> None:
+        self.config = config
+        self.tiers: Dict[str, str] = getattr(settings, "AI_MODEL_TIERS", {}) or {}
+        self.keep_alive_by_tier: Dict[str, str] = {
+            **DEFAULT_OLLAMA_KEEP_ALIVE,
+            **(getattr(settings, "AI_OLLAMA_KEEP_ALIVE", {}) or {}),
+        }
+        self.max_concurrency = int(getattr(settings, "AI_OLLAMA_MAX_CONCURRENCY", DEFAULT_OLLAMA_MAX_CONCURRENCY))
+        self.slot_wait = cap_wait_seconds(getattr(settings, "AI_OLLAMA_SLOT_WAIT", DEFAULT_OLLAMA_SLOT_WAIT_SECONDS))
+
+    def tier_for(self, model: str) -> Optional[str]:
+        for tier, tier_model in self.tiers.items():
+            if tier_model == model:
+                return tier
+        return None
+
+    def keep_alive_for(self, model: str) -> str:
+        tier = self.tier_for(model)
+        if tier and tier in self.keep_alive_by_tier:
+            return self.keep_alive_by_tier[tier]
+        return self.keep_alive_by_tier.get("default", "5m")
+
+    @contextmanager
+    def slot(self, model: str) -> Iterator[None]:
+        """Ocupa um dos ``max_concurrency`` slots do modelo, esperando até ``slot_wait`` segundos."""
+        token = uuid.uuid4().hex
+        # O slot expira sozinho se o worker morrer a meio do pedido.
+        slot_timeout = int(self.config.timeout_seconds) + 5
+        deadline = time.monotonic() + self.slot_wait
+        acquired = None
+        while acquired is None:
+            for index in range(self.max_concurrency):
+                key = f"{self.slot_prefix}:{model}:{index}"
+                if cache.add(key, token, timeout=slot_timeout):
+                    acquired = key
+                    break
+            if acquired is None:
+                if time.monotonic() >= deadline:
+                    raise RateLimitError("O modelo local está ocupado. Tenta novamente daqui a pouco.")
+                time.sleep(SINGLE_FLIGHT_POLL_INTERVAL_SECONDS)
+        try:
+            yield
+        finally:
+            if cache.get(acquired) == token:
+                cache.delete(acquired)
+
+    def warm_up(self, tiers: Optional[List[str]] = None) -> List[WarmupResult]:
+        """Carrega os modelos dos tiers indicados (todos por defeito) com o respetivo keep_alive."""
+        results: List[WarmupResult] = []
+        seen = set()
+        for tier, model in self.tiers.items():
+            if tiers and tier not in tiers:
+                continue
+            if not model or model in seen:
+                continue
+            seen.add(model)
+            keep_alive = self.keep_alive_for(model)
+            # Um pedido sem mensagens apenas carrega o modelo em memória.
+            payload = {"model": model, "messages": [], "keep_alive": keep_alive, "stream": False}
+            try:
+                response = requests.post(
+                    f"{self.config.api_base}/api/chat",
+                    json=payload,
+                    timeout=max(int(self.config.timeout_seconds), 120),
+                )
+                response.raise_for_status()
+            except RequestException as exc:
+                logger.warning("Falha ao pré-carregar modelo Ollama %s: %s", model, exc)
+                results.append(WarmupResult(tier, model, keep_alive, False, {}, str(exc)))
+                continue
+            timings = ollama_timings(response.json())
+            logger.info("Ollama modelo %s (%s) carregado em %sms", model, tier, timings["load_ms"])
+            results.append(WarmupResult(tier, model, keep_alive, True, timings))
+        return results
+
+    def loaded_models(self) -> List[Dict[str, Any]]:
+        try:
+            response = requests.get(f"{self.config.api_base}/api/ps", timeout=self.config.timeout_seconds)
+            response.raise_for_status()
+        except RequestException as exc:
+            raise AIServiceError("Não foi possível contactar o Ollama local.") from exc
+        return response.json().get("models", [])
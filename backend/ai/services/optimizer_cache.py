@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ai.constants import DEFAULT_OPTIMIZER_CACHE_SIZE, DEFAULT_OPTIMIZER_CACHE_TTL_SECONDS
+
+COUNTER_KEYS = ("local_hits", "shared_hits", "misses")
+# Os acertos no LRU local são contados no processo e só vão para a cache partilhada
+# de tantos em tantos (ou quando se pedem as estatísticas): um INCR por acerto anularia o nível local.
+LOCAL_HITS_FLUSH_EVERY = 50
+
+_NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_query(raw_query: str) -> str:
+    """Normaliza o pedido para que variações triviais partilhem a mesma entrada.
+
+    Minúsculas, sem acentos, pontuação e espaços repetidos colapsados num só espaço.
+    """
+    decomposed = unicodedata.normalize("NFKD", raw_query or "")
+    without_accents = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_WORD_RE.sub(" ", without_accents.lower()).strip()
+
+
+class _LocalLRU:
+    """LRU do processo; cada entrada guarda o instante em que expira (mesmo TTL da cache partilhada)."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending_hits = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            self._pending_hits += 1
+            return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pending_hits(self) -> int:
+        return self._pending_hits
+
+    def take_pending_hits(self) -> int:
+        with self._lock:
+            hits, self._pending_hits = self._pending_hits, 0
+            return hits
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_local_lru: Optional[_LocalLRU] = None
+
+
+def _get_local_lru() -> _LocalLRU:
+    # Partilhado por todos os orquestradores do processo (são criados por pedido).
+    global _local_lru
+    if _local_lru is None:
+        _local_lru = _LocalLRU(getattr(settings, "AI_OPTIMIZER_CACHE_SIZE", DEFAULT_OPTIMIZER_CACHE_SIZE))
+    return _local_lru
+
+
+class OptimizerCache:
+    """Cache em dois níveis (LRU no processo + cache Django partilhada) para o PromptOptimizer."""
+
+    prefix = "ai-optimizer"
+
+    def __init__(self, ttl: Optional[int] = None, local: Optional[_LocalLRU] = None) -> None:
+        self.ttl = ttl or getattr(settings, "AI_OPTIMIZER_CACHE_TTL", DEFAULT_OPTIMIZER_CACHE_TTL_SECONDS)
+        self.local = local if local is not None else _get_local_lru()
+
+    def make_key(self, raw_query: str, persona: str, origin_app: str, namespace: str = "") -> str:
+        payload = "\n".join([namespace, persona or "", origin_app or "", normalize_query(raw_query)])
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{digest}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.local.get(key)
+        if value is not None:
+            if self.local.pending_hits() >= LOCAL_HITS_FLUSH_EVERY:
+                self._flush_local_hits()
+            return value
+        value = cache.get(key)
+        if value is not None:
+            # O TTL restante da entrada partilhada não é conhecido: no pior caso fica mais um TTL no processo.
+            self.local.set(key, value, self.ttl)
+            self._incr("shared_hits")
+            return value
+        self._incr("misses")
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.local.set(key, value, self.ttl)
+        cache.set(key, value, timeout=self.ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        self._flush_local_hits()
+        counters = cache.get_many([self._counter_key(name) for name in COUNTER_KEYS])
+        data: Dict[str, Any] = {name: counters.get(self._counter_key(name), 0) for name in COUNTER_KEYS}
+        lookups = sum(data[name] for name in COUNTER_KEYS)
+        data["hit_ratio"] = round((data["local_hits"] + data["shared_hits"]) / lookups, 4) if lookups else 0.0
+        data["local_size"] = len(self.local)
+        data["local_maxsize"] = self.local.maxsize
+        data["ttl"] = self.ttl
+        return data
+
+    def reset_stats(self) -> None:
+        self.local.take_pending_hits()
+        cache.delete_many([self._counter_key(name) for name in COUNTER_KEYS])
+
+    def _counter_key(self, name: str) -> str:
+        return f"{self.prefix}:stats:{name}"
+
+    def _flush_local_hits(self) -> None:
+        hits = self.local.take_pending_hits()
+        if hits:
+            self._incr("local_hits", hits)
+
+    def _incr(self, name: str, delta: int = 1) -> None:
+        key = self._counter_key(name)
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            if not cache.add(key, delta, timeout=None):
+                cache.incr(key, delta)
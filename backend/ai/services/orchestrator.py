@@ -1,20 +1,36 @@
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
+from datetime import timedelta
 from decimal import Decimal
 from typing import Any, Dict, Optional
 
-from django.db import transaction
-
 from django.conf import settings
-from ai.exceptions import AIServiceError, RateLimitError, UnsafeContentError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from ai.constants import (
+    DEFAULT_EXPECTED_OUTPUT_TOKENS,
+    DEFAULT_WORKER_TIMEOUT_SECONDS,
+    SINGLE_FLIGHT_POLL_INTERVAL_SECONDS,
+)
+from ai.exceptions import AIServiceError, ContextTooLargeError, RateLimitError, UnsafeContentError
 from ai.models import AIInteractionSession, AIRequest, AIResponseLog
+from ai.services.briefs import CLASS_BRIEF_INTENT, ClassBriefService, wants_class_brief
 from ai.services.cache import AIResponseCache
 from ai.services.context import ContextBroker
-from ai.services.prompting import PromptOptimizer, ResponseGuard
+from ai.services.prompting import (
+    OptimizerResult,
+    PromptOptimizer,
+    PromptPrefix,
+    ResponseGuard,
+    build_prompt_prefix,
+)
 from ai.services.providers import get_provider
 from ai.services.quotas import QuotaManager
 from ai.services.router import ModelRouter
+from ai.services.tokens import TokenEstimate, TokenEstimator
 
 
 @dataclass
@@ -34,6 +50,8 @@ class AIRequestOrchestrator:
         response_guard: Optional[ResponseGuard] = None,
         cache: Optional[AIResponseCache] = None,
         quota_manager: Optional[QuotaManager] = None,
+        token_estimator: Optional[TokenEstimator] = None,
+        brief_service: Optional[ClassBriefService] = None,
     ) -> None:
         self.optimizer = optimizer or PromptOptimizer()
         self.router = router or ModelRouter()
@@ -41,6 +59,8 @@ class AIRequestOrchestrator:
         self.response_guard = response_guard or ResponseGuard()
         self.cache = cache or AIResponseCache()
         self.quota_manager = quota_manager or QuotaManager(self.router.rate_limits)
+        self.token_estimator = token_estimator or TokenEstimator()
+        self.brief_service = brief_service or ClassBriefService(self.context_broker)
 
     def handle_request(
         self,
@@ -53,12 +73,104 @@ class AIRequestOrchestrator:
         session: Optional[AIInteractionSession] = None,
         extras: Optional[Dict[str, Any]] = None,
         use_cache: bool = True,
+        idempotency_key: str = "",
+    ) -> OrchestratorResult:
+        request_kwargs = dict(
+            user=user,
+            persona=persona,
+            origin_app=origin_app,
+            raw_query=raw_query,
+            class_context=class_context,
+            session=session,
+            extras=extras,
+            use_cache=use_cache,
+        )
+        if not idempotency_key:
+            return self._handle_request(**request_kwargs)
+
+        lock_key = f"ai-idempotency:{user.pk}:{idempotency_key}"
+        previous = self._wait_for_idempotent_request(user, idempotency_key, lock_key)
+        if previous:
+            return previous
+        try:
+            return self._handle_request(idempotency_key=idempotency_key, **request_kwargs)
+        finally:
+            self.cache.release_lock(lock_key)
+
+    def _wait_for_idempotent_request(self, user, idempotency_key: str, lock_key: str) -> Optional[OrchestratorResult]:
+        """Devolve a resposta de um pedido anterior com a mesma chave, esperando se estiver em curso.
+
+        Devolve ``None`` quando este pedido deve ser processado (fica com o lock da chave).
+        """
+        deadline = time.monotonic() + self.cache.lock_timeout
+        while True:
+            previous = (
+                AIRequest.objects.filter(user=user, idempotency_key=idempotency_key)
+                .select_related("response_log", "session")
+                .first()
+            )
+            if previous is None:
+                if self.cache.acquire_lock(lock_key):
+                    return None
+            elif previous.status == AIRequest.Status.COMPLETED and hasattr(previous, "response_log"):
+                return OrchestratorResult(
+                    response_text=previous.response_log.response_text,
+                    model_used=previous.resolved_model,
+                    meta={
+                        "idempotent_replay": True,
+                        "cached": previous.response_log.used_cache,
+                        "intent": previous.intent_label,
+                        "session_id": str(previous.session.session_id),
+                        "request_id": previous.id,
+                    },
+                )
+            elif self._is_abandoned(previous):
+                # A tentativa anterior falhou (ou o worker morreu a meio): liberta a chave
+                # para que esta volte a tentar. O filtro por estado evita libertar um pedido
+                # que entretanto terminou; a restrição única trava duas retomas em paralelo.
+                AIRequest.objects.filter(pk=previous.pk, status=previous.status).update(idempotency_key=None)
+                continue
+            if time.monotonic() >= deadline:
+                raise AIServiceError("O pedido anterior ainda está a ser processado. Tenta novamente daqui a pouco.")
+            time.sleep(SINGLE_FLIGHT_POLL_INTERVAL_SECONDS)
+
+    @staticmethod
+    def _is_abandoned(previous: AIRequest) -> bool:
+        """Decide pela base de dados (comum a todos os workers) se a tentativa anterior morreu.
+
+        Um pedido ainda pendente depois do timeout do worker gunicorn já não tem quem o termine.
+        """
+        if previous.status == AIRequest.Status.ERRORED:
+            return True
+        worker_timeout = int(getattr(settings, "GUNICORN_TIMEOUT", DEFAULT_WORKER_TIMEOUT_SECONDS))
+        return previous.created_at < timezone.now() - timedelta(seconds=worker_timeout)
+
+    def _handle_request(
+        self,
+        *,
+        user,
+        persona: str,
+        origin_app: str,
+        raw_query: str,
+        class_context=None,
+        session: Optional[AIInteractionSession] = None,
+        extras: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True,
+        idempotency_key: str = "",
     ) -> OrchestratorResult:
         extras = (extras or {}).copy()
         if not session:
             session_payload = self._session_payload(extras)
             session = self._ensure_session(user, persona, origin_app, class_context, session_payload)
 
+        # "Como está a minha turma?": serve o resumo pré-calculado sem construir contexto nem chamar modelos
+        if use_cache and persona == "teacher" and wants_class_brief("", raw_query):
+            served = self._serve_class_brief(
+                session, user, persona, origin_app, raw_query, class_context, None, idempotency_key
+            )
+            if served:
+                return served
+
         context_data = self.context_broker.build_context(
             user,
             persona,
@@ -68,17 +180,38 @@ class AIRequestOrchestrator:
             raw_query=raw_query,
         )
 
-        optimization = self.optimizer.optimize(raw_query, persona, context_data.payload)
+        optimization = self.optimizer.optimize(
+            raw_query,
+            persona,
+            origin_app=origin_app,
+            use_cache=use_cache,
+        )
+        if use_cache and persona == "teacher" and wants_class_brief(optimization.intent, ""):
+            served = self._serve_class_brief(
+                session, user, persona, origin_app, raw_query, class_context, optimization, idempotency_key
+            )
+            if served:
+                return served
+
         selected_model = self.router.select_model(persona, optimization.intent, optimization.suggested_model)
         conversation_messages = self._conversation_messages(extras)
+        prompt_prefix = build_prompt_prefix(persona)
 
+        lock_key = None
         if use_cache:
-            cached = self.cache.get(
+            cache_key = self.cache.make_key(
                 persona,
                 optimization.intent,
                 optimization.optimized_prompt,
                 context_data.payload,
             )
+            cached = self.cache.get_by_key(cache_key)
+            if not cached:
+                if self.cache.acquire_lock(cache_key):
+                    lock_key = cache_key
+                else:
+                    # Pedido idêntico já em curso (possivelmente noutro worker): aguarda o resultado dele
+                    cached = self.cache.wait_for(cache_key)
             if cached:
                 request = self._log_request(
                     session,
@@ -88,6 +221,8 @@ class AIRequestOrchestrator:
                     raw_query,
                     optimization,
                     context_data.payload,
+                    prompt_prefix,
+                    idempotency_key=idempotency_key,
                 )
                 request.mark_completed(selected_model, 0, 0, Decimal("0.00000"), 0)
                 AIResponseLog.objects.create(
@@ -108,7 +243,56 @@ class AIRequestOrchestrator:
                     },
                 )
 
-        estimated_cost = self.router.estimate_cost(selected_model, tokens=600)
+        try:
+            return self._complete_request(
+                session=session,
+                user=user,
+                persona=persona,
+                origin_app=origin_app,
+                raw_query=raw_query,
+                class_context=class_context,
+                context_data=context_data,
+                optimization=optimization,
+                selected_model=selected_model,
+                conversation_messages=conversation_messages,
+                prompt_prefix=prompt_prefix,
+                use_cache=use_cache,
+                idempotency_key=idempotency_key,
+            )
+        finally:
+            if lock_key:
+                self.cache.release_lock(lock_key)
+
+    def _complete_request(
+        self,
+        *,
+        session: AIInteractionSession,
+        user,
+        persona: str,
+        origin_app: str,
+        raw_query: str,
+        class_context,
+        context_data,
+        optimization,
+        selected_model: str,
+        conversation_messages: list[Dict[str, str]],
+        prompt_prefix: PromptPrefix,
+        use_cache: bool,
+        idempotency_key: str = "",
+    ) -> OrchestratorResult:
+        # Pré-verificação: estimar a entrada antes de gastar quota num pedido que seria truncado
+        selected_model, messages, token_estimate = self._fit_messages(
+            selected_model,
+            prompt_prefix,
+            context_data.payload,
+            conversation_messages,
+            optimization.optimized_prompt,
+        )
+        estimated_cost = self.router.estimate_cost(
+            selected_model,
+            token_estimate.input_tokens,
+            DEFAULT_EXPECTED_OUTPUT_TOKENS,
+        )
         self.quota_manager.ensure_within_limits(user, persona, class_context, estimated_cost)
 
         request = self._log_request(
@@ -119,47 +303,45 @@ class AIRequestOrchestrator:
             raw_query,
             optimization,
             context_data.payload,
+            prompt_prefix,
+            token_estimate,
+            idempotency_key=idempotency_key,
         )
 
         provider = get_provider()
-        # If teacher has multiple classes and none selected, or student is ambiguous, add a short clarification line
-        disambig = context_data.payload.get("disambiguation")
-        clarification = ""
-        if disambig and disambig.get("type") == "class":
-            opts = ", ".join(o.get("name") for o in (disambig.get("options") or []) if o.get("name"))
-            clarification = f"Nota: o professor tem várias turmas. Confirme uma turma: {opts}."
-        system_prompt = self._build_system_prompt(persona, context_data.payload)
-        if clarification:
-            system_prompt = system_prompt + "\n" + clarification
-        messages = [
-            {"role": "system", "content": system_prompt},
-            *conversation_messages,
-            {"role": "user", "content": optimization.optimized_prompt},
-        ]
 
         # Log selected model + intent for traceability
         import logging
         logging.getLogger(__name__).info(
-            "AI Orchestrator intent=%s suggested=%s selected=%s persona=%s",
+            "AI Orchestrator intent=%s suggested=%s selected=%s persona=%s prefix=%s/%s",
             optimization.intent,
             optimization.suggested_model,
             selected_model,
             persona,
+            prompt_prefix.version,
+            prompt_prefix.digest,
         )
 
-        response = provider.chat_completion(
-            messages,
-            model=selected_model,
-            temperature=1,
-        )
+        try:
+            response = provider.chat_completion(
+                messages,
+                model=selected_model,
+                temperature=1,
+            )
 
-        guard_decision = self.response_guard.check(response.content, persona, optimization.intent)
-        if not guard_decision.get("allow", False):
-            raise UnsafeContentError(guard_decision.get("rationale", "Resposta bloqueada."))
+            guard_decision = self.response_guard.check(response.content, persona, optimization.intent)
+            if not guard_decision.get("allow", False):
+                raise UnsafeContentError(guard_decision.get("rationale", "Resposta bloqueada."))
+        except Exception:
+            request.mark_errored()
+            raise
 
         usage = response.usage or {}
-        total_tokens = usage.get("total_tokens", usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0))
-        cost = self.router.estimate_cost(selected_model, total_tokens)
+        cost = self.router.estimate_cost(
+            selected_model,
+            usage.get("prompt_tokens", 0),
+            usage.get("completion_tokens", 0),
+        )
 
         with transaction.atomic():
             request.mark_completed(
@@ -168,6 +350,7 @@ class AIRequestOrchestrator:
                 usage.get("completion_tokens", 0),
                 cost,
                 usage.get("latency_ms", 0),
+                cached_tokens=usage.get("cached_tokens", 0),
             )
             AIResponseLog.objects.create(
                 request=request,
@@ -198,6 +381,94 @@ class AIRequestOrchestrator:
                 "optimizer_trace": optimization.optimizer_trace,
                 "context": context_data.payload,
                 "usage": usage,
+                "token_estimate": {"input_tokens": token_estimate.input_tokens, "factor": token_estimate.factor},
+                "prompt_prefix": {"version": prompt_prefix.version, "hash": prompt_prefix.digest},
+                "session_id": str(session.session_id),
+                "request_id": request.id,
+            },
+        )
+
+    def _fit_messages(
+        self,
+        model: str,
+        prompt_prefix: PromptPrefix,
+        context_payload: Dict[str, Any],
+        conversation_messages: list[Dict[str, str]],
+        user_prompt: str,
+    ) -> tuple[str, list[Dict[str, str]], TokenEstimate]:
+        """Monta as mensagens e escolhe um modelo onde caibam.
+
+        Se nenhum tier chegar, corta primeiro o histórico (das mensagens mais antigas) e
+        depois o contexto adicional; só rejeita o pedido quando nem assim cabe.
+        """
+        history = list(conversation_messages)
+        include_extra_context = True
+        while True:
+            system_prompt = self._build_system_prompt(prompt_prefix, context_payload, include_extra_context)
+            messages = [
+                {"role": "system", "content": system_prompt},
+                *history,
+                {"role": "user", "content": user_prompt},
+            ]
+            token_estimate = self.token_estimator.estimate_messages(messages)
+            try:
+                return self.router.fit_model(model, token_estimate.input_tokens), messages, token_estimate
+            except ContextTooLargeError:
+                if history:
+                    history.pop(0)
+                elif include_extra_context:
+                    include_extra_context = False
+                else:
+                    raise
+
+    def _serve_class_brief(
+        self,
+        session: AIInteractionSession,
+        user,
+        persona: str,
+        origin_app: str,
+        raw_query: str,
+        class_context,
+        optimization: Optional[OptimizerResult],
+        idempotency_key: str,
+    ) -> Optional[OrchestratorResult]:
+        brief = self.brief_service.get_fresh(class_context)
+        if brief is None or not brief.narrative:
+            return None
+        if optimization is None:
+            optimization = OptimizerResult(
+                optimized_prompt=raw_query,
+                intent=CLASS_BRIEF_INTENT,
+                suggested_model=None,
+                optimizer_trace={"source": "class_brief"},
+            )
+        request = self._log_request(
+            session,
+            user,
+            persona,
+            origin_app,
+            raw_query,
+            optimization,
+            {"class_brief_id": brief.id},
+            idempotency_key=idempotency_key,
+        )
+        request.mark_completed(brief.narrative_model, 0, 0, Decimal("0.00000"), 0)
+        AIResponseLog.objects.create(
+            request=request,
+            response_text=brief.narrative,
+            model_metadata={"source": "class_brief", "generated_at": brief.generated_at.isoformat()},
+            used_cache=True,
+        )
+        return OrchestratorResult(
+            response_text=brief.narrative,
+            model_used=brief.narrative_model,
+            meta={
+                "cached": True,
+                "intent": optimization.intent,
+                "class_brief": {
+                    "generated_at": brief.generated_at.isoformat(),
+                    "data_changed_at": brief.data_changed_at.isoformat() if brief.data_changed_at else None,
+                },
                 "session_id": str(session.session_id),
                 "request_id": request.id,
             },
@@ -233,6 +504,40 @@ class AIRequestOrchestrator:
         raw_query: str,
         optimization,
         context_payload,
+        prompt_prefix: Optional[PromptPrefix] = None,
+        token_estimate: Optional[TokenEstimate] = None,
+        idempotency_key: str = "",
+    ) -> AIRequest:
+        try:
+            with transaction.atomic():
+                return self._create_request_log(
+                    session,
+                    user,
+                    persona,
+                    origin_app,
+                    raw_query,
+                    optimization,
+                    context_payload,
+                    prompt_prefix,
+                    token_estimate,
+                    idempotency_key,
+                )
+        except IntegrityError as exc:
+            # Só acontece se o lock da chave expirar com o pedido original ainda em curso.
+            raise AIServiceError("Pedido duplicado ainda em processamento.") from exc
+
+    def _create_request_log(
+        self,
+        session: AIInteractionSession,
+        user,
+        persona: str,
+        origin_app: str,
+        raw_query: str,
+        optimization,
+        context_payload,
+        prompt_prefix: Optional[PromptPrefix],
+        token_estimate: Optional[TokenEstimate],
+        idempotency_key: str,
     ) -> AIRequest:
         return AIRequest.objects.create(
             session=session,
@@ -245,20 +550,28 @@ class AIRequestOrchestrator:
             intent_label=optimization.intent,
             target_model=optimization.suggested_model or "",
             meta_context=context_payload,
+            prompt_prefix_hash=prompt_prefix.digest if prompt_prefix else "",
+            estimated_input_tokens=token_estimate.raw_tokens if token_estimate else 0,
+            idempotency_key=idempotency_key or None,
         )
 
-    def _build_system_prompt(self, persona: str, context_payload: Dict[str, Any]) -> str:
-        intro = (
-            "És um assistente pedagógico alinhado com o Movimento da Escola Moderna. "
-            "Foca-te em promover autonomia, cooperação e participação democrática. "
-        )
+    def _build_system_prompt(
+        self,
+        prompt_prefix: PromptPrefix,
+        context_payload: Dict[str, Any],
+        include_extra_context: bool = True,
+    ) -> str:
+        # O prefixo estático vem sempre primeiro; tudo o que varia por pedido fica no sufixo.
+        return prompt_prefix.text + "\n\n" + self._build_dynamic_suffix(context_payload, include_extra_context)
+
+    def _build_dynamic_suffix(self, context_payload: Dict[str, Any], include_extra_context: bool = True) -> str:
         learner_profile = context_payload.get("learner_profile", {})
         grade_level = learner_profile.get("grade_level")
         age_hint = learner_profile.get("age_hint")
         checklist_focus = learner_profile.get("checklist_focus", [])
 
         focus_text = (
-            "; ".join(f"{item.get('template')}: {item.get('item')}" for item in checklist_focus)
+            "; ".join(self._focus_line(item) for item in checklist_focus)
             if checklist_focus
             else "sem itens em destaque"
         )
@@ -268,44 +581,25 @@ class AIRequestOrchestrator:
         if age_hint:
             profile_text += f", aproximadamente {age_hint} anos"
 
-        guidance_lines = [
-            intro,
+        lines = [
             f"Perfil do interlocutor: {profile_text}.",
             f"Objetivos prioritários da checklist: {focus_text}.",
-            "Não menciones modelos de IA, prompts internos ou detalhes técnicos.",
-            "Se o pedido estiver em português, responde em Português Europeu (pt-PT).",
         ]
-        if getattr(settings, "AI_ENFORCE_PT", True):
-            guidance_lines.append(
-                "Evita palavras/frases noutras línguas; se surgirem, reescreve para pt-PT."
-            )
-
-        if getattr(settings, "MEM_ENABLE", False):
-            mem_block = settings.MEM_GUIDELINES or (
-                "Princípios MEM: construtivismo social; cooperação; autonomia; participação democrática. "
-                "Instrumentos: Checklists de Aprendizagens (autoavaliação/validação), PIT (planeamento individual), "
-                "Projetos (trabalho cooperativo), Diário (reflexão/registo), Conselho (decisões coletivas). "
-                "Ao responder: sugere sempre próximos passos concretos (individual, em par/pequeno grupo, com professor/família), "
-                "liga-os a um instrumento MEM adequado e usa linguagem clara e acolhedora (pt‑PT)."
-            )
-            guidance_lines.append(f"MEM: {mem_block}")
-
-        if persona == "student":
-            guidance_lines.extend(
-                [
-                    "Responde no máximo em 3 frases curtas ou 3 pontos simples.",
-                    "Usa vocabulário acessível e orienta um passo de cada vez.",
-                    "Escolhe apenas 1 objetivo em destaque (ou 2 no máximo) e sugere passos concretos e rápidos.",
-                    "Inclui uma sugestão de evidência ou forma de mostrar progresso.",
-                    "Organiza a resposta como lista numerada: 1) tarefa individual/PIT, 2) trabalho com um colega ou pequeno grupo (indica como pedir apoio), 3) momento com o professor ou a família.",
-                    "Evita perguntas abertas; termina convidando o aluno a dizer se quer mais ideias adicionais.",
-                ]
-            )
-        else:
-            guidance_lines.append("Adapta o discurso ao papel do utilizador mantendo foco pedagógico.")
+        # If teacher has multiple classes and none selected, add a short clarification line
+        disambig = context_payload.get("disambiguation")
+        if disambig and disambig.get("type") == "class":
+            opts = ", ".join(o.get("name") for o in (disambig.get("options") or []) if o.get("name"))
+            lines.append(f"Nota: o professor tem várias turmas. Confirme uma turma: {opts}.")
+        if include_extra_context:
+            lines.append(f"Contexto adicional: {context_payload}.")
+        return "\n".join(lines)
 
-        guidance_lines.append(f"Contexto adicional: {context_payload}.")
-        return "\n".join(guidance_lines)
+    @staticmethod
+    def _focus_line(item: Dict[str, Any]) -> str:
+        line = f"{item.get('template')}: {item.get('item')}"
+        if item.get("peer_helpers"):
+            line += f" (colegas que já o concluíram: {', '.join(item['peer_helpers'])})"
+        return line
 
     def _conversation_messages(self, extras: Dict[str, Any]) -> list[Dict[str, str]]:
         history = extras.get("history") or []
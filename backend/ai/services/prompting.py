@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import hashlib
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 
 from django.conf import settings
-from ai.constants import PROMPT_OPTIMIZER_MODEL, RESPONSE_GUARD_MODEL
+from ai.constants import PROMPT_OPTIMIZER_MODEL, PROMPT_PREFIX_VERSION, RESPONSE_GUARD_MODEL
 from ai.services.config import is_fake_mode_enabled
+from ai.services.optimizer_cache import OptimizerCache
 from ai.services.providers import ProviderResponse, get_provider
 
 
@@ -115,6 +117,68 @@ Adapta o teu apoio a este perfil específico."""
     return base_prompt
 
 
+# ============================================================================
+# PREFIXO ESTÁTICO - igual para todos os pedidos da mesma persona, para que o
+# provider consiga reutilizar a cache de prompt (prefix caching).
+# ============================================================================
+
+DEFAULT_MEM_GUIDELINES = (
+    "Princípios MEM: construtivismo social; cooperação; autonomia; participação democrática. "
+    "Instrumentos: Checklists de Aprendizagens (autoavaliação/validação), PIT (planeamento individual), "
+    "Projetos (trabalho cooperativo), Diário (reflexão/registo), Conselho (decisões coletivas). "
+    "Ao responder: sugere sempre próximos passos concretos (individual, em par/pequeno grupo, com professor/família), "
+    "liga-os a um instrumento MEM adequado e usa linguagem clara e acolhedora (pt‑PT)."
+)
+
+STUDENT_RESPONSE_RULES = [
+    "Responde no máximo em 3 frases curtas ou 3 pontos simples.",
+    "Usa vocabulário acessível e orienta um passo de cada vez.",
+    "Escolhe apenas 1 objetivo em destaque (ou 2 no máximo) e sugere passos concretos e rápidos.",
+    "Inclui uma sugestão de evidência ou forma de mostrar progresso.",
+    "Organiza a resposta como lista numerada: 1) tarefa individual/PIT, 2) trabalho com um colega ou pequeno grupo (indica como pedir apoio), 3) momento com o professor ou a família.",
+    "Evita perguntas abertas; termina convidando o aluno a dizer se quer mais ideias adicionais.",
+]
+
+DEFAULT_RESPONSE_RULES = [
+    "Adapta o discurso ao papel do utilizador mantendo foco pedagógico.",
+]
+
+
+@dataclass(frozen=True)
+class PromptPrefix:
+    persona: str
+    version: str
+    text: str
+    digest: str
+
+
+def build_prompt_prefix(persona: str) -> PromptPrefix:
+    """
+    Constrói o prefixo estático do prompt de sistema para uma persona.
+
+    Contém apenas texto que não depende do pedido (persona, bloco MEM e regras
+    de resposta); os dados do aluno/turma vão no sufixo dinâmico.
+    """
+    lines = [
+        get_zdp_system_prompt(persona),
+        "",
+        "És um assistente pedagógico alinhado com o Movimento da Escola Moderna. "
+        "Foca-te em promover autonomia, cooperação e participação democrática.",
+        "Não menciones modelos de IA, prompts internos ou detalhes técnicos.",
+        "Se o pedido estiver em português, responde em Português Europeu (pt-PT).",
+    ]
+    if getattr(settings, "AI_ENFORCE_PT", True):
+        lines.append("Evita palavras/frases noutras línguas; se surgirem, reescreve para pt-PT.")
+    if getattr(settings, "MEM_ENABLE", False):
+        mem_block = getattr(settings, "MEM_GUIDELINES", "") or DEFAULT_MEM_GUIDELINES
+        lines.append(f"MEM: {mem_block}")
+    lines.extend(STUDENT_RESPONSE_RULES if persona == "student" else DEFAULT_RESPONSE_RULES)
+
+    text = "\n".join(lines)
+    digest = hashlib.sha256(f"{PROMPT_PREFIX_VERSION}\n{text}".encode("utf-8")).hexdigest()[:16]
+    return PromptPrefix(persona=persona, version=PROMPT_PREFIX_VERSION, text=text, digest=digest)
+
+
 @dataclass
 class OptimizerResult:
     optimized_prompt: str
@@ -130,12 +194,36 @@ class PromptOptimizer:
         "e recomenda modelo (nano, mini, normal) considerando profundidade necessária. "
         "Se o pedido estiver em português, responde em Português Europeu (pt-PT). Evita texto noutras línguas.\n\n"
         "Formata a resposta exatamente com três linhas (sem texto adicional):\n"
-        "intent: <uma palavra que represente a intenção, ex.: feedback_curto | orientacao_imediata | planeamento_prolongado | analise_dados | conselho_complexo | general>\n"
+        "intent: <uma palavra que represente a intenção, ex.: feedback_curto | orientacao_imediata | planeamento_prolongado | analise_dados | resumo_turma | conselho_complexo | general>\n"
         "model: <nano|mini|normal>\n"
         "optimized prompt: <o prompt melhorado em 1-2 frases curtas>"
     )
 
-    def optimize(self, raw_query: str, persona: str, context: Dict[str, Any]) -> OptimizerResult:
+    def __init__(self, cache: Optional[OptimizerCache] = None) -> None:
+        self.cache = cache or OptimizerCache()
+        # Alterar o prompt do optimizador invalida as entradas antigas.
+        self.cache_namespace = hashlib.sha256(self.SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+    def optimize(
+        self,
+        raw_query: str,
+        persona: str,
+        origin_app: str = "",
+        use_cache: bool = True,
+    ) -> OptimizerResult:
+        # O contexto do aluno fica de fora: o resultado é partilhado por todos os que fazem
+        # o mesmo pedido. O contexto completo segue depois no prompt de sistema da resposta.
+        cache_key = self.cache.make_key(raw_query, persona, origin_app, self.cache_namespace)
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached:
+                return OptimizerResult(
+                    optimized_prompt=cached["optimized_prompt"],
+                    intent=cached["intent"],
+                    suggested_model=cached.get("suggested_model"),
+                    optimizer_trace={"source": "cache", "model": cached.get("model")},
+                )
+
         provider = get_provider()
         # Pick a cheap model for optimization; on Ollama map to nano-tier from env
         optimizer_model = PROMPT_OPTIMIZER_MODEL
@@ -147,7 +235,7 @@ class PromptOptimizer:
             {
                 "role": "user",
                 "content": (
-                    f"Persona: {persona}. Contexto: {context}. Pedido original (pt-PT): {raw_query}"
+                    f"Persona: {persona}. Origem: {origin_app or 'geral'}. Pedido original (pt-PT): {raw_query}"
                 ),
             },
         ]
@@ -159,6 +247,17 @@ class PromptOptimizer:
         trace = response.raw
         parsed = self._parse_response(response.content)
         trace.update({"model": response.model})
+        # Respostas simuladas não são classificações reais: não as guardar durante dias.
+        if use_cache and not is_fake_mode_enabled():
+            self.cache.set(
+                cache_key,
+                {
+                    "optimized_prompt": parsed["optimized_prompt"],
+                    "intent": parsed["intent"],
+                    "suggested_model": parsed.get("suggested_model"),
+                    "model": response.model,
+                },
+            )
         return OptimizerResult(
             optimized_prompt=parsed["optimized_prompt"],
             intent=parsed["intent"],
@@ -11,6 +11,7 @@ from requests import HTTPError, RequestException
 
 from ai.exceptions import ProviderNotConfiguredError, RateLimitError, AIServiceError
 from ai.services.config import ProviderConfig, get_provider_config, is_fake_mode_enabled
+from ai.services.ollama import OllamaManager, ollama_timings
 
 
 @dataclass
@@ -83,6 +84,7 @@ class OpenAIProvider(BaseProvider):
         choice = data["choices"][0]
         message = choice.get("message", {})
         usage = data.get("usage", {})
+        prompt_details = usage.get("prompt_tokens_details") or {}
         return ProviderResponse(
             content=message.get("content", ""),
             model=data.get("model", payload["model"]),
@@ -90,6 +92,8 @@ class OpenAIProvider(BaseProvider):
                 "prompt_tokens": usage.get("prompt_tokens", 0),
                 "completion_tokens": usage.get("completion_tokens", 0),
                 "total_tokens": usage.get("total_tokens", 0),
+                # Tokens do prefixo reaproveitados pela cache de prompt do provider
+                "cached_tokens": prompt_details.get("cached_tokens", 0),
             },
             raw=data,
         )
@@ -103,75 +107,86 @@ class OpenAIProvider(BaseProvider):
         )
 
 
+class OllamaProvider(BaseProvider):
+    def __init__(self, config: Optional[ProviderConfig] = None) -> None:
+        super().__init__(config)
+        self.manager = OllamaManager(self.config)
+
+    def chat_completion(self, messages, model=None, **kwargs):
+        if is_fake_mode_enabled():
+            content = OpenAIProvider._fake_completion(messages)
+            return ProviderResponse(
+                content=content,
+                model=model or (self.config.default_model or "llama3.1"),
+                usage={"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                raw={"fake": True},
+            )
+
+        # Prefer native Ollama chat API for compatibility
+        payload = {
+            "model": model or (self.config.default_model or "llama3.1"),
+            "messages": messages,
+            "stream": False,
+        }
+        payload.update(kwargs)
+        # Mantém o modelo do tier em memória para evitar recarregamentos entre pedidos
+        payload.setdefault("keep_alive", self.manager.keep_alive_for(payload["model"]))
+        # Merge configured options into payload
+        options = (self.config.extra_params or {}).get("options") or {}
+        if options:
+            payload["options"] = {**options, **payload.get("options", {})}
+        url = f"{self.config.api_base}/api/chat"
+        logging.getLogger(__name__).info("OLLAMA request %s payload=%s", url, payload)
+        try:
+            with self.manager.slot(payload["model"]):
+                response = requests.post(
+                    url,
+                    json=payload,
+                    timeout=self.config.timeout_seconds,
+                )
+            response.raise_for_status()
+        except HTTPError as exc:
+            status = exc.response.status_code if exc.response else None
+            detail = exc.response.text if exc.response is not None else ''
+            if status == 429:
+                raise RateLimitError("Limite do provedor de IA atingido no Ollama.") from exc
+            message = f"Erro ao contactar Ollama ({status})."
+            if detail:
+                message += f" Detalhe: {detail}"
+            raise AIServiceError(message) from exc
+        except RequestException as exc:
+            raise AIServiceError("Não foi possível contactar o Ollama local. Verifique se está a correr em http://localhost:11434.") from exc
+
+        data = response.json()
+        logging.getLogger(__name__).info("OLLAMA response status=%s keys=%s", response.status_code, list(data.keys()))
+        # Native Ollama returns: { message: { role, content }, eval_count, prompt_eval_count, model, ... }
+        msg_obj = data.get("message") or {}
+        content = msg_obj.get("content") or data.get("response") or ""
+        prompt_tokens = data.get("prompt_eval_count", 0)
+        completion_tokens = data.get("eval_count", 0)
+        usage = {
+            "prompt_tokens": int(prompt_tokens or 0),
+            "completion_tokens": int(completion_tokens or 0),
+            "total_tokens": int(prompt_tokens or 0) + int(completion_tokens or 0),
+            **ollama_timings(data),
+        }
+        if usage["load_ms"] > 1000:
+            logging.getLogger(__name__).warning(
+                "OLLAMA modelo %s recarregado (%sms); rever keep_alive/warm-up", payload["model"], usage["load_ms"]
+            )
+        return ProviderResponse(
+            content=content,
+            model=data.get("model") or payload["model"],
+            usage=usage,
+            raw=data,
+        )
+
+
 def get_provider(config: Optional[ProviderConfig] = None) -> BaseProvider:
     cfg = config or get_provider_config()
     if cfg.name == PROVIDER_OPENAI:
         return OpenAIProvider(cfg)
     if cfg.name == PROVIDER_OLLAMA:
-        # Minimal inline provider for Ollama chat completions
-        class OllamaProvider(BaseProvider):
-            def chat_completion(self, messages, model=None, **kwargs):
-                if is_fake_mode_enabled():
-                    content = OpenAIProvider._fake_completion(messages)
-                    return ProviderResponse(
-                        content=content,
-                        model=model or (self.config.default_model or "llama3.1"),
-                        usage={"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
-                        raw={"fake": True},
-                    )
-
-                # Prefer native Ollama chat API for compatibility
-                payload = {
-                    "model": model or (self.config.default_model or "llama3.1"),
-                    "messages": messages,
-                    "stream": False,
-                }
-                payload.update(kwargs)
-                # Merge configured options into payload
-                options = (self.config.extra_params or {}).get("options") or {}
-                if options:
-                    payload["options"] = {**options, **payload.get("options", {})}
-                url = f"{self.config.api_base}/api/chat"
-                logging.getLogger(__name__).info("OLLAMA request %s payload=%s", url, payload)
-                try:
-                    response = requests.post(
-                        url,
-                        json=payload,
-                        timeout=self.config.timeout_seconds,
-                    )
-                    response.raise_for_status()
-                except HTTPError as exc:
-                    status = exc.response.status_code if exc.response else None
-                    detail = exc.response.text if exc.response is not None else ''
-                    if status == 429:
-                        raise RateLimitError("Limite do provedor de IA atingido no Ollama.") from exc
-                    message = f"Erro ao contactar Ollama ({status})."
-                    if detail:
-                        message += f" Detalhe: {detail}"
-                    raise AIServiceError(message) from exc
-                except RequestException as exc:
-                    raise AIServiceError("Não foi possível contactar o Ollama local. Verifique se está a correr em http://localhost:11434.") from exc
-
-                data = response.json()
-                logging.getLogger(__name__).info("OLLAMA response status=%s keys=%s", response.status_code, list(data.keys()))
-                # Native Ollama returns: { message: { role, content }, eval_count, prompt_eval_count, model, ... }
-                msg_obj = data.get("message") or {}
-                content = msg_obj.get("content") or data.get("response") or ""
-                prompt_tokens = data.get("prompt_eval_count", 0)
-                completion_tokens = data.get("eval_count", 0)
-                usage = {
-                    "prompt_tokens": int(prompt_tokens or 0),
-                    "completion_tokens": int(completion_tokens or 0),
-                    "total_tokens": int(prompt_tokens or 0) + int(completion_tokens or 0),
-                    "latency_ms": int((data.get("total_duration") or 0) / 1_000_000),
-                }
-                return ProviderResponse(
-                    content=content,
-                    model=data.get("model") or payload["model"],
-                    usage=usage,
-                    raw=data,
-                )
-
         return OllamaProvider(cfg)
 
     # Fallback
@@ -5,8 +5,16 @@ from typing import Dict
 
 from django.conf import settings
 
-from ai.constants import DEFAULT_RATE_LIMITS
-from ai.services.config import get_model_costs
+from ai.constants import (
+    DEFAULT_CONTEXT_WINDOW,
+    DEFAULT_EXPECTED_OUTPUT_TOKENS,
+    DEFAULT_MODEL_CONTEXT_WINDOWS,
+    DEFAULT_OLLAMA_NUM_CTX,
+    DEFAULT_RATE_LIMITS,
+    PROVIDER_OLLAMA,
+)
+from ai.exceptions import ContextTooLargeError
+from ai.services.config import get_model_costs, get_model_output_costs, get_provider_config
 
 
 class ModelRouter:
@@ -14,6 +22,7 @@ class ModelRouter:
 
     def __init__(self, rate_limits: Dict[str, int] | None = None) -> None:
         self.model_costs = get_model_costs()
+        self.output_costs = get_model_output_costs()
         config_limits = getattr(settings, "AI_RATE_LIMITS", {})
         if rate_limits:
             self.rate_limits = rate_limits
@@ -53,9 +62,48 @@ class ModelRouter:
             return tier_mini
         return tier_nano
 
-    def estimate_cost(self, model_name: str, tokens: int) -> Decimal:
-        cost = self.model_costs.get(model_name, Decimal("0.00100"))
-        return cost * Decimal(tokens or 0) / Decimal(1000)
+    def context_window(self, model_name: str) -> int:
+        overrides = getattr(settings, "AI_MODEL_CONTEXT_WINDOWS", {}) or {}
+        if model_name in overrides:
+            return int(overrides[model_name])
+        config = get_provider_config()
+        if config.name == PROVIDER_OLLAMA:
+            # No Ollama a janela é o num_ctx configurado, não a do modelo base.
+            options = (config.extra_params or {}).get("options") or {}
+            return int(options.get("num_ctx") or DEFAULT_OLLAMA_NUM_CTX)
+        return DEFAULT_MODEL_CONTEXT_WINDOWS.get(model_name, DEFAULT_CONTEXT_WINDOW)
+
+    def output_reserve(self) -> int:
+        """Tokens de resposta a reservar na janela: o num_predict pedido ao Ollama ou uma resposta típica."""
+        config = get_provider_config()
+        if config.name == PROVIDER_OLLAMA:
+            options = (config.extra_params or {}).get("options") or {}
+            num_predict = int(options.get("num_predict") or 0)
+            if num_predict > 0:
+                return num_predict
+        return DEFAULT_EXPECTED_OUTPUT_TOKENS
+
+    def input_budget(self, model_name: str) -> int:
+        return self.context_window(model_name) - self.output_reserve()
+
+    def fit_model(self, model_name: str, input_tokens: int) -> str:
+        """Garante que o pedido cabe na janela do modelo, subindo de tier se necessário."""
+        if input_tokens <= self.input_budget(model_name):
+            return model_name
+        tiers = getattr(settings, "AI_MODEL_TIERS", {}) or {}
+        for tier in ("nano", "mini", "normal"):
+            candidate = tiers.get(tier)
+            if candidate and candidate != model_name and input_tokens <= self.input_budget(candidate):
+                return candidate
+        raise ContextTooLargeError(
+            "O pedido é demasiado extenso para os modelos disponíveis. Encurta a pergunta ou o histórico."
+        )
+
+    def estimate_cost(self, model_name: str, input_tokens: int, output_tokens: int = 0) -> Decimal:
+        input_cost = self.model_costs.get(model_name, Decimal("0.00100"))
+        output_cost = self.output_costs.get(model_name, input_cost)
+        total = input_cost * Decimal(input_tokens or 0) + output_cost * Decimal(output_tokens or 0)
+        return total / Decimal(1000)
 
     def get_rate_limit(self, persona: str) -> int:
         return self.rate_limits.get(persona, 10)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from django.core.cache import cache
+
+from ai.constants import TOKEN_CALIBRATION_SAMPLE, TOKEN_CALIBRATION_TTL_SECONDS
+
+# Palavras, números e qualquer símbolo isolado; o espaço antes de uma palavra funde-se com ela (como no BPE).
+_PIECE_RE = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_", re.UNICODE)
+
+# Custo fixo de formatação de cada mensagem de chat (papel + separadores) e da resposta.
+_MESSAGE_OVERHEAD = 4
+_REPLY_OVERHEAD = 3
+
+_MIN_FACTOR = 0.5
+_MAX_FACTOR = 2.0
+
+
+def _word_tokens(word: str) -> int:
+    # Palavras curtas e frequentes são 1 token; as longas partem-se em ~4 caracteres
+    # (3 quando têm acentos, que os vocabulários BPE cobrem pior).
+    chunk = 3 if not word.isascii() else 4
+    return 1 + max(0, len(word) - 2) // chunk
+
+
+def estimate_text_tokens(text: str) -> int:
+    tokens = 0
+    for piece in _PIECE_RE.findall(text or ""):
+        if piece.isdigit():
+            tokens += (len(piece) + 2) // 3
+        elif piece[0].isalpha():
+            tokens += _word_tokens(piece)
+        else:
+            tokens += 1
+    return tokens
+
+
+@dataclass(frozen=True)
+class TokenEstimate:
+    raw_tokens: int
+    factor: float
+
+    @property
+    def input_tokens(self) -> int:
+        return int(round(self.raw_tokens * self.factor))
+
+
+class TokenEstimator:
+    """Estimativa local de tokens de entrada, sem chamar o provider.
+
+    A heurística aproxima um tokenizador BPE e é corrigida por um fator calculado
+    a partir dos ``input_tokens`` reais dos últimos pedidos concluídos.
+    """
+
+    calibration_key = "ai-token-calibration"
+
+    def estimate_messages(self, messages: List[Dict[str, str]]) -> TokenEstimate:
+        raw = _REPLY_OVERHEAD + sum(
+            _MESSAGE_OVERHEAD + estimate_text_tokens(message.get("content") or "") for message in messages
+        )
+        return TokenEstimate(raw_tokens=raw, factor=self.calibration_factor())
+
+    def calibration_factor(self) -> float:
+        factor = cache.get(self.calibration_key)
+        if factor is None:
+            factor = self.calibrate()
+        return factor
+
+    def calibrate(self, sample: Optional[int] = None) -> float:
+        from ai.models import AIRequest
+
+        rows = list(
+            AIRequest.objects.filter(
+                status=AIRequest.Status.COMPLETED,
+                input_tokens__gt=0,
+                estimated_input_tokens__gt=0,
+            )
+            .order_by("-created_at")
+            .values_list("input_tokens", "estimated_input_tokens")[: sample or TOKEN_CALIBRATION_SAMPLE]
+        )
+        factor = 1.0
+        if rows:
+            actual = sum(row[0] for row in rows)
+            estimated = sum(row[1] for row in rows)
+            factor = min(_MAX_FACTOR, max(_MIN_FACTOR, actual / estimated))
+        cache.set(self.calibration_key, factor, timeout=TOKEN_CALIBRATION_TTL_SECONDS)
+        return factor
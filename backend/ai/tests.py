@@ -1,10 +1,32 @@
 from __future__ import annotations
 
-from django.test import TestCase, override_settings
+import threading
+import time
+from io import StringIO
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
 
-from ai.models import AIRequest
+from ai.models import AIRequest, ClassBrief, GroupLearningProfile
+from ai.services import AIRequestOrchestrator
+from ai.exceptions import AIServiceError, ContextTooLargeError, QuotaExceededError, RateLimitError
+from ai.services.briefs import ClassBriefService, wants_class_brief
+from ai.services.cache import AIResponseCache
+from ai.services.config import ProviderConfig
+from ai.services.grouping import GroupProfileBuilder, MasteryMatrix, build_mastery_matrix, cluster_students
+from ai.services.ollama import OllamaManager, ollama_timings
+from ai.services.optimizer_cache import OptimizerCache, _LocalLRU, normalize_query
+from ai.services.prompting import PromptOptimizer, build_prompt_prefix
+from ai.services.providers import ProviderResponse
+from ai.services.router import ModelRouter
+from ai.services.tokens import TokenEstimator, estimate_text_tokens
 from classes.models import Class
 from users.models import User
 
@@ -35,6 +57,9 @@ class AIAssistantViewTests(TestCase):
         self.assertIn("response", data)
         self.assertTrue(data["session_id"])
         self.assertTrue(AIRequest.objects.filter(user=self.user).exists())
+        ai_request = AIRequest.objects.get(id=data["request_id"])
+        self.assertEqual(ai_request.prompt_prefix_hash, build_prompt_prefix("student").digest)
+        self.assertEqual(data["meta"]["prompt_prefix"]["hash"], ai_request.prompt_prefix_hash)
 
     @override_settings(AI_FAKE_RESPONSES=True)
     def test_feedback_endpoint_updates_response(self) -> None:
@@ -82,6 +107,661 @@ class AIAssistantViewTests(TestCase):
         self.assertTrue(meta_second.get("cached", False))
 
 
+class SingleFlightTests(TransactionTestCase):
+    key = "ai-response:single-flight-test"
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="aluno-sf",
+            email="aluno-sf@example.com",
+            password="senha",
+            role="aluno",
+            status="ativo",
+        )
+        patcher = mock.patch.object(AIResponseCache, "make_key", return_value=self.key)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _ask_concurrently(self, chat_completion, count: int = 2):
+        """Corre ``count`` pedidos idênticos em threads, como workers diferentes."""
+        provider = mock.Mock()
+        provider.chat_completion.side_effect = chat_completion
+        results, errors = [], []
+        barrier = threading.Barrier(count)
+
+        def ask():
+            try:
+                barrier.wait()
+                results.append(
+                    AIRequestOrchestrator(cache=AIResponseCache(lock_timeout=5)).handle_request(
+                        user=self.user,
+                        persona="student",
+                        origin_app="portal",
+                        raw_query="O que é uma fração?",
+                    )
+                )
+            except Exception as exc:  # pragma: no cover - reportado na asserção
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        with mock.patch("ai.services.orchestrator.get_provider", return_value=provider):
+            threads = [threading.Thread(target=ask) for _ in range(count)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=10)
+        return provider, results, errors
+
+    @override_settings(AI_FAKE_RESPONSES=True)
+    def test_concurrent_duplicates_call_provider_once(self) -> None:
+        def slow_completion(messages, **kwargs):
+            time.sleep(0.3)
+            return ProviderResponse(content="Resposta partilhada", model=kwargs["model"], usage={}, raw={})
+
+        provider, results, errors = self._ask_concurrently(slow_completion, count=3)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(provider.chat_completion.call_count, 1)
+        self.assertEqual(len(results), 3)
+        self.assertEqual({result.response_text for result in results}, {"Resposta partilhada"})
+        self.assertEqual(sorted(bool(result.meta.get("cached")) for result in results), [False, True, True])
+        self.assertEqual(AIRequest.objects.filter(user=self.user, response_log__used_cache=True).count(), 2)
+
+    @override_settings(AI_FAKE_RESPONSES=True)
+    def test_duplicate_proceeds_when_in_flight_request_fails(self) -> None:
+        calls = []
+
+        def fail_first(messages, **kwargs):
+            calls.append(kwargs["model"])
+            time.sleep(0.2)
+            if len(calls) == 1:
+                raise AIServiceError("falha simulada")
+            return ProviderResponse(content="Segunda tentativa", model=kwargs["model"], usage={}, raw={})
+
+        provider, results, errors = self._ask_concurrently(fail_first)
+
+        self.assertEqual([str(error) for error in errors], ["falha simulada"])
+        self.assertEqual(provider.chat_completion.call_count, 2)
+        self.assertEqual([result.response_text for result in results], ["Segunda tentativa"])
+        self.assertIsNotNone(cache.get(self.key))
+        self.assertIsNone(cache.get(f"{self.key}:lock"))
+
+    @override_settings(GUNICORN_TIMEOUT=30, AI_SINGLE_FLIGHT_TIMEOUT=45)
+    def test_wait_stays_below_worker_timeout(self) -> None:
+        self.assertEqual(AIResponseCache().lock_timeout, 25)
+
+
+@override_settings(AI_FAKE_RESPONSES=False)
+class OptimizerCacheTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.optimizer = PromptOptimizer(cache=OptimizerCache(local=_LocalLRU(2)))
+        self.provider = mock.Mock()
+        self.provider.chat_completion.side_effect = lambda messages, **kwargs: ProviderResponse(
+            content="intent: general\nmodel: nano\noptimized prompt: Explica frações com um exemplo.",
+            model=kwargs["model"],
+            usage={},
+            raw={},
+        )
+        patcher = mock.patch("ai.services.prompting.get_provider", return_value=self.provider)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_normalize_query_folds_case_accents_and_punctuation(self) -> None:
+        self.assertEqual(normalize_query("  Como   resolvo FRAÇÕES?!  "), "como resolvo fracoes")
+        self.assertEqual(normalize_query("como_resolvo... fracoes"), "como resolvo fracoes")
+
+    def test_equivalent_queries_reuse_optimizer_result(self) -> None:
+        first = self.optimizer.optimize("Como resolvo frações?", "student", origin_app="pit")
+        second = self.optimizer.optimize("como resolvo fracoes", "student", origin_app="pit")
+        self.assertEqual(self.provider.chat_completion.call_count, 1)
+        self.assertEqual(second.optimized_prompt, first.optimized_prompt)
+        self.assertEqual(second.optimizer_trace["source"], "cache")
+
+        stats = self.optimizer.cache.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["local_hits"], 1)
+
+    def test_student_context_is_not_sent_to_the_optimizer(self) -> None:
+        self.optimizer.optimize("Como resolvo frações?", "student", origin_app="pit")
+        messages = self.provider.chat_completion.call_args.args[0]
+        self.assertNotIn("Contexto", messages[-1]["content"])
+
+    def test_persona_and_origin_are_part_of_the_key(self) -> None:
+        self.optimizer.optimize("Plano da semana", "student", origin_app="pit")
+        self.optimizer.optimize("Plano da semana", "teacher", origin_app="pit")
+        self.optimizer.optimize("Plano da semana", "student", origin_app="portal")
+        self.assertEqual(self.optimizer.cache.stats()["misses"], 3)
+
+    def test_evicted_local_entry_is_served_from_shared_cache(self) -> None:
+        for query in ("um", "dois", "tres"):
+            self.optimizer.optimize(query, "student")
+        self.assertEqual(len(self.optimizer.cache.local), 2)
+        self.optimizer.optimize("um", "student")
+        self.assertEqual(self.optimizer.cache.stats()["shared_hits"], 1)
+
+    def test_expired_local_entry_is_a_miss(self) -> None:
+        local = _LocalLRU(2)
+        local.set("chave", {"optimized_prompt": "x"}, ttl=60)
+        self.assertIsNotNone(local.get("chave"))
+        with mock.patch("ai.services.optimizer_cache.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNone(local.get("chave"))
+        self.assertEqual(len(local), 0)
+
+    def test_local_hits_do_not_touch_the_shared_counters(self) -> None:
+        self.optimizer.optimize("Como resolvo frações?", "student")
+        with mock.patch.object(OptimizerCache, "_incr") as incr:
+            for _ in range(3):
+                self.optimizer.optimize("Como resolvo frações?", "student")
+        incr.assert_not_called()
+        self.assertEqual(self.optimizer.cache.stats()["local_hits"], 3)
+
+    @override_settings(AI_FAKE_RESPONSES=True)
+    def test_fake_mode_results_are_not_cached(self) -> None:
+        self.optimizer.optimize("Plano da semana", "student")
+        self.optimizer.optimize("Plano da semana", "student")
+        self.assertEqual(self.provider.chat_completion.call_count, 2)
+        self.assertEqual(len(self.optimizer.cache.local), 0)
+
+    def test_stats_endpoint_is_admin_only(self) -> None:
+        client = APIClient()
+        aluno = User.objects.create_user(username="oc-aluno", email="oc-aluno@example.com", password="x", role="aluno", status="ativo")
+        admin = User.objects.create_user(username="oc-admin", email="oc-admin@example.com", password="x", role="admin", status="ativo")
+        client.force_authenticate(user=aluno)
+        self.assertEqual(client.get(reverse("ai-optimizer-cache-stats")).status_code, 403)
+        client.force_authenticate(user=admin)
+        response = client.get(reverse("ai-optimizer-cache-stats"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("hit_ratio", response.data)
+
+
+@override_settings(
+    AI_FAKE_RESPONSES=False,
+    AI_MODEL_TIERS={"nano": "qwen2.5:0.5b", "mini": "llama3.1", "normal": "llama3.1:70b"},
+    AI_OLLAMA_KEEP_ALIVE={"nano": "24h", "mini": "30m"},
+    AI_OLLAMA_MAX_CONCURRENCY=1,
+    AI_OLLAMA_SLOT_WAIT=0,
+)
+class OllamaManagerTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.config = ProviderConfig(name="ollama", api_key="", api_base="http://ollama.test", default_model="llama3.1")
+
+    def _ollama_response(self, **data):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = data
+        return response
+
+    def test_timings_are_converted_to_milliseconds(self) -> None:
+        timings = ollama_timings(
+            {"total_duration": 2_500_000_000, "load_duration": 1_200_000_000, "eval_duration": 1_000_000_000, "eval_count": 40}
+        )
+        self.assertEqual(timings["latency_ms"], 2500)
+        self.assertEqual(timings["load_ms"], 1200)
+        self.assertEqual(timings["eval_tokens_per_s"], 40)
+
+    def test_keep_alive_follows_model_tier(self) -> None:
+        manager = OllamaManager(self.config)
+        self.assertEqual(manager.keep_alive_for("qwen2.5:0.5b"), "24h")
+        self.assertEqual(manager.keep_alive_for("llama3.1"), "30m")
+        self.assertEqual(manager.keep_alive_for("outro-modelo"), "5m")
+
+    def test_slot_limits_concurrent_requests_per_model(self) -> None:
+        manager = OllamaManager(self.config)
+        with manager.slot("llama3.1"):
+            with self.assertRaises(RateLimitError):
+                with manager.slot("llama3.1"):
+                    pass
+            with manager.slot("qwen2.5:0.5b"):
+                pass
+        with manager.slot("llama3.1"):
+            pass
+
+    @override_settings(GUNICORN_TIMEOUT=30, AI_OLLAMA_SLOT_WAIT=60)
+    def test_slot_wait_stays_below_worker_timeout(self) -> None:
+        self.assertEqual(OllamaManager(self.config).slot_wait, 25)
+
+    def test_provider_sends_keep_alive_and_reports_load_time(self) -> None:
+        from ai.services.providers import OllamaProvider
+
+        reply = self._ollama_response(
+            model="llama3.1",
+            message={"role": "assistant", "content": "Olá"},
+            prompt_eval_count=10,
+            eval_count=5,
+            total_duration=900_000_000,
+            load_duration=300_000_000,
+        )
+        with mock.patch("ai.services.providers.requests.post", return_value=reply) as post:
+            result = OllamaProvider(self.config).chat_completion([{"role": "user", "content": "Olá"}], model="llama3.1")
+        self.assertEqual(post.call_args.kwargs["json"]["keep_alive"], "30m")
+        self.assertEqual(result.usage["load_ms"], 300)
+        self.assertEqual(result.usage["latency_ms"], 900)
+        self.assertIsNone(cache.get("ollama-slot:llama3.1:0"))
+
+    def test_warm_up_loads_each_tier_model_once(self) -> None:
+        with self.settings(AI_MODEL_TIERS={"nano": "qwen2.5:0.5b", "mini": "llama3.1", "normal": "llama3.1"}):
+            manager = OllamaManager(self.config)
+            with mock.patch(
+                "ai.services.ollama.requests.post",
+                return_value=self._ollama_response(load_duration=2_000_000_000, total_duration=2_100_000_000),
+            ) as post:
+                results = manager.warm_up()
+        self.assertEqual([result.model for result in results], ["qwen2.5:0.5b", "llama3.1"])
+        self.assertEqual(post.call_args_list[0].kwargs["json"]["keep_alive"], "24h")
+        self.assertEqual(results[0].timings["load_ms"], 2000)
+
+
+class TokenEstimationTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="aluno-tok",
+            email="aluno-tok@example.com",
+            password="senha",
+            role="aluno",
+            status="ativo",
+        )
+
+    def test_text_estimate_grows_with_length_and_symbols(self) -> None:
+        self.assertEqual(estimate_text_tokens(""), 0)
+        short = estimate_text_tokens("Olá, turma!")
+        long = estimate_text_tokens("Olá, turma! " * 20)
+        self.assertGreater(long, short * 15)
+        self.assertGreater(estimate_text_tokens("2025-10-19"), estimate_text_tokens("hoje"))
+
+    def test_calibration_uses_recorded_input_tokens(self) -> None:
+        session = AIRequestOrchestrator()._ensure_session(self.user, "student", "portal", None, {})
+        for actual in (150, 250):
+            AIRequest.objects.create(
+                session=session,
+                user=self.user,
+                persona="student",
+                origin_app="portal",
+                raw_query="x",
+                status=AIRequest.Status.COMPLETED,
+                input_tokens=actual,
+                estimated_input_tokens=100,
+            )
+        estimator = TokenEstimator()
+        self.assertEqual(estimator.calibrate(), 2.0)
+        estimate = estimator.estimate_messages([{"role": "user", "content": "Olá"}])
+        self.assertEqual(estimate.input_tokens, estimate.raw_tokens * 2)
+
+    def test_input_and_output_are_priced_separately(self) -> None:
+        router = ModelRouter()
+        self.assertEqual(router.estimate_cost("gpt-5", 1000, 0), Decimal("0.003"))
+        self.assertEqual(router.estimate_cost("gpt-5", 0, 1000), Decimal("0.01"))
+
+    @override_settings(
+        AI_SERVICE_PROVIDER="ollama",
+        AI_MODEL_TIERS={"nano": "small", "mini": "medium", "normal": "large"},
+        AI_MODEL_CONTEXT_WINDOWS={"small": 2048, "medium": 8192, "large": 32768},
+    )
+    def test_fit_model_escalates_to_a_tier_with_enough_context(self) -> None:
+        router = ModelRouter()
+        self.assertEqual(router.fit_model("small", 1500), "small")
+        self.assertEqual(router.fit_model("small", 4000), "medium")
+        with self.assertRaises(ContextTooLargeError):
+            router.fit_model("small", 40000)
+
+    @override_settings(AI_SERVICE_PROVIDER="ollama")
+    def test_output_reserve_follows_num_predict(self) -> None:
+        router = ModelRouter()
+        self.assertEqual(router.input_budget("llama3.1"), 2048 - 400)
+        with mock.patch.dict("os.environ", {"OLLAMA_OPTIONS": '{"num_ctx": 4096, "num_predict": 256}'}):
+            self.assertEqual(router.input_budget("llama3.1"), 4096 - 256)
+
+    @override_settings(AI_FAKE_RESPONSES=True, AI_SERVICE_PROVIDER="ollama")
+    def test_stock_student_prompt_fits_default_ollama_window(self) -> None:
+        with mock.patch.dict("os.environ", {"OLLAMA_OPTIONS": ""}):
+            result = AIRequestOrchestrator().handle_request(
+                user=self.user, persona="student", origin_app="portal", raw_query="O que é uma fração?", use_cache=False
+            )
+        self.assertLessEqual(result.meta["token_estimate"]["input_tokens"], 2048 - 400)
+
+    @override_settings(AI_FAKE_RESPONSES=True, AI_SERVICE_PROVIDER="ollama")
+    def test_history_is_trimmed_before_rejecting(self) -> None:
+        history = [{"role": "user", "content": "Fala-me das frações equivalentes. " * 60}] * 4
+        with mock.patch.dict("os.environ", {"OLLAMA_OPTIONS": ""}):
+            result = AIRequestOrchestrator().handle_request(
+                user=self.user,
+                persona="student",
+                origin_app="portal",
+                raw_query="E agora?",
+                extras={"history": history},
+                use_cache=False,
+            )
+        self.assertLessEqual(result.meta["token_estimate"]["input_tokens"], 2048 - 400)
+
+    @override_settings(AI_FAKE_RESPONSES=True)
+    def test_request_over_budget_is_rejected_before_provider_call(self) -> None:
+        orchestrator = AIRequestOrchestrator()
+        result = orchestrator.handle_request(
+            user=self.user, persona="student", origin_app="portal", raw_query="Explica as frações.", use_cache=False
+        )
+        request = AIRequest.objects.get(id=result.meta["request_id"])
+        self.assertGreater(request.estimated_input_tokens, 0)
+        self.assertEqual(result.meta["token_estimate"]["factor"], 1.0)
+
+        from ai.models import AIUsageQuota
+
+        AIUsageQuota.objects.filter(user=self.user).update(max_cost=Decimal("0.00001"))
+        with mock.patch("ai.services.orchestrator.get_provider") as provider:
+            with self.assertRaises(QuotaExceededError):
+                orchestrator.handle_request(
+                    user=self.user, persona="student", origin_app="portal", raw_query="Outra pergunta.", use_cache=False
+                )
+        provider.assert_not_called()
+
+
+@override_settings(AI_FAKE_RESPONSES=True)
+class IdempotencyKeyTests(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="aluno-idem",
+            email="aluno-idem@example.com",
+            password="senha",
+            role="aluno",
+            status="ativo",
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def _post(self, key: str, message: str = "Ajuda-me com o texto."):
+        return self.client.post(
+            reverse("ai-assistant"),
+            {"message": message},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_completed_duplicate_returns_stored_response(self) -> None:
+        from ai.models import AIUsageQuota
+
+        first = self._post("tap-1")
+        self.assertEqual(first.status_code, 200, first.content)
+        with mock.patch("ai.services.orchestrator.get_provider") as provider:
+            second = self._post("tap-1")
+        provider.assert_not_called()
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data["request_id"], first.data["request_id"])
+        self.assertEqual(second.data["response"], first.data["response"])
+        self.assertTrue(second.data["meta"]["idempotent_replay"])
+        self.assertEqual(AIRequest.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(AIUsageQuota.objects.get(user=self.user).requests_made, 1)
+
+        third = self._post("tap-2")
+        self.assertNotEqual(third.data["request_id"], first.data["request_id"])
+
+    def test_in_flight_duplicate_waits_for_original(self) -> None:
+        orchestrator = AIRequestOrchestrator()
+        pending = self._pending_original("tap-3")
+
+        def original_finishes(_seconds):
+            AIRequest.objects.filter(pk=pending.pk).update(status=AIRequest.Status.COMPLETED)
+
+        with mock.patch("ai.services.orchestrator.time.sleep", side_effect=original_finishes) as sleep:
+            result = orchestrator.handle_request(
+                user=self.user,
+                persona="student",
+                origin_app="portal",
+                raw_query="Ajuda-me com o texto.",
+                idempotency_key="tap-3",
+            )
+        sleep.assert_called_once()
+        self.assertEqual(result.meta["request_id"], pending.pk)
+
+    def _pending_original(self, key: str, age_seconds: int = 0) -> AIRequest:
+        original = self._post("tap-0")
+        pending = AIRequest.objects.get(id=original.data["request_id"])
+        AIRequest.objects.filter(pk=pending.pk).update(
+            idempotency_key=key,
+            status=AIRequest.Status.PENDING,
+            created_at=timezone.now() - timedelta(seconds=age_seconds),
+        )
+        return pending
+
+    @override_settings(GUNICORN_TIMEOUT=30)
+    def test_retry_on_another_worker_does_not_take_over_recent_request(self) -> None:
+        # Sem o lock deste processo (como noutro worker), o pedido pendente continua a valer.
+        self._pending_original("tap-5")
+        orchestrator = AIRequestOrchestrator(cache=AIResponseCache(lock_timeout=1))
+        with mock.patch("ai.services.orchestrator.get_provider") as provider:
+            with self.assertRaises(AIServiceError):
+                orchestrator.handle_request(
+                    user=self.user,
+                    persona="student",
+                    origin_app="portal",
+                    raw_query="Ajuda-me com o texto.",
+                    idempotency_key="tap-5",
+                )
+        provider.assert_not_called()
+        self.assertEqual(AIRequest.objects.filter(user=self.user, idempotency_key="tap-5").count(), 1)
+
+    @override_settings(GUNICORN_TIMEOUT=30)
+    def test_pending_request_older_than_worker_timeout_is_retried(self) -> None:
+        stale = self._pending_original("tap-6", age_seconds=60)
+        retry = self._post("tap-6")
+        self.assertEqual(retry.status_code, 200, retry.content)
+        self.assertNotEqual(retry.data["request_id"], stale.pk)
+        stale.refresh_from_db()
+        self.assertIsNone(stale.idempotency_key)
+
+    def test_errored_attempt_can_be_retried_with_same_key(self) -> None:
+        with mock.patch("ai.services.orchestrator.get_provider") as provider:
+            provider.return_value.chat_completion.side_effect = AIServiceError("falhou")
+            failed = self._post("tap-4")
+        self.assertEqual(failed.status_code, 400)
+        errored = AIRequest.objects.get(user=self.user)
+        self.assertEqual(errored.status, AIRequest.Status.ERRORED)
+
+        retry = self._post("tap-4")
+        self.assertEqual(retry.status_code, 200, retry.content)
+        self.assertNotEqual(retry.data["request_id"], errored.pk)
+        errored.refresh_from_db()
+        self.assertIsNone(errored.idempotency_key)
+
+    def test_overlong_key_is_rejected(self) -> None:
+        response = self._post("x" * 200)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["code"], "invalid_idempotency_key")
+
+
+class ClassBriefTests(TestCase):
+    def setUp(self) -> None:
+        from checklists.models import ChecklistItem, ChecklistMark, ChecklistStatus, ChecklistTemplate
+
+        cache.clear()
+        self.teacher = User.objects.create_user(
+            username="prof-brief", email="prof-brief@example.com", password="senha", role="professor", status="ativo"
+        )
+        self.student = User.objects.create_user(
+            username="aluno-brief", email="aluno-brief@example.com", password="senha", role="aluno", status="ativo"
+        )
+        self.turma = Class.objects.create(name="6.º B", year=2025)
+        self.turma.teachers.add(self.teacher)
+        self.turma.students.add(self.student)
+        template = ChecklistTemplate.objects.create(name="Português")
+        self.item = ChecklistItem.objects.create(template=template, code="L1", text="Leio em voz alta", order=1)
+        status = ChecklistStatus.objects.create(template=template, student=self.student, student_class=self.turma)
+        self.mark = ChecklistMark.objects.create(status_record=status, item=self.item, mark_status="IN_PROGRESS")
+
+    def test_query_detection(self) -> None:
+        self.assertTrue(wants_class_brief("", "Como está a minha turma?"))
+        self.assertTrue(wants_class_brief("resumo_turma", "?"))
+        self.assertFalse(wants_class_brief("", "Como está o Pedro a matemática?"))
+
+    def test_brief_goes_stale_when_marks_change(self) -> None:
+        service = ClassBriefService()
+        brief = service.build(self.turma)
+        self.assertEqual(service.get_fresh(self.turma), brief)
+        self.assertIn("class_checklists", brief.summary)
+
+        self.mark.mark_status = "COMPLETED"
+        self.mark.save()
+        self.assertIsNone(service.get_fresh(self.turma))
+
+    def test_brief_goes_stale_on_council_decisions_and_new_students(self) -> None:
+        from council.models import CouncilDecision
+
+        service = ClassBriefService()
+        service.build(self.turma)
+        CouncilDecision.objects.create(
+            student_class=self.turma, date=timezone.localdate(), category="rule", description="Rever regras"
+        )
+        self.assertIsNone(service.get_fresh(self.turma))
+
+        service.build(self.turma)
+        newcomer = User.objects.create_user(
+            username="aluno-novo", email="aluno-novo@example.com", password="senha", role="aluno", status="ativo"
+        )
+        self.turma.students.add(newcomer)
+        self.assertIsNone(service.get_fresh(self.turma))
+
+    @override_settings(AI_CLASS_BRIEF_MAX_AGE=3600)
+    def test_old_brief_is_not_served(self) -> None:
+        service = ClassBriefService()
+        brief = service.build(self.turma)
+        ClassBrief.objects.filter(pk=brief.pk).update(generated_at=timezone.now() - timedelta(hours=2))
+        self.assertIsNone(service.get_fresh(self.turma))
+        self.assertEqual(service.refresh_changed([self.turma]), (1, 0))
+        self.assertIsNotNone(service.get_fresh(self.turma))
+
+    def test_refresh_skips_unchanged_classes(self) -> None:
+        other = Class.objects.create(name="6.º C", year=2025)
+        service = ClassBriefService()
+        self.assertEqual(service.refresh_changed([self.turma, other]), (2, 0))
+        self.assertEqual(service.refresh_changed([self.turma, other]), (0, 2))
+
+        self.mark.mark_status = "COMPLETED"
+        self.mark.save()
+        self.assertEqual(service.refresh_changed([self.turma, other]), (1, 1))
+        self.assertEqual(service.refresh_changed([self.turma, other], force=True), (2, 0))
+
+    @override_settings(AI_FAKE_RESPONSES=True)
+    def test_teacher_class_query_is_served_from_brief(self) -> None:
+        from django.core.management import call_command
+
+        call_command("build_class_briefs", "--narrative", stdout=StringIO())
+        brief = ClassBrief.objects.get(class_context=self.turma)
+        self.assertTrue(brief.narrative)
+
+        with mock.patch("ai.services.orchestrator.get_provider") as provider, mock.patch(
+            "ai.services.prompting.get_provider"
+        ) as optimizer_provider:
+            result = AIRequestOrchestrator().handle_request(
+                user=self.teacher,
+                persona="teacher",
+                origin_app="portal",
+                raw_query="Como está a minha turma?",
+                class_context=self.turma,
+            )
+        provider.assert_not_called()
+        optimizer_provider.assert_not_called()
+        self.assertEqual(result.response_text, brief.narrative)
+        self.assertTrue(result.meta["cached"])
+        request = AIRequest.objects.get(pk=result.meta["request_id"])
+        self.assertEqual(request.meta_context["class_brief_id"], brief.pk)
+
+    def test_brief_endpoint_is_limited_to_class_teachers(self) -> None:
+        ClassBriefService().build(self.turma)
+        client = APIClient()
+        url = reverse("ai-class-brief", args=[self.turma.id])
+
+        client.force_authenticate(user=self.student)
+        self.assertEqual(client.get(url).status_code, 403)
+
+        client.force_authenticate(user=self.teacher)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["is_fresh"])
+
+
+class GroupClusteringTests(TestCase):
+    def setUp(self) -> None:
+        from checklists.models import ChecklistItem, ChecklistMark, ChecklistStatus, ChecklistTemplate
+
+        self.turma = Class.objects.create(name="4.º A", year=2025)
+        template = ChecklistTemplate.objects.create(name="Matemática")
+        items = [
+            ChecklistItem.objects.create(template=template, code=f"M{i}", text=f"Objetivo {i}", order=i)
+            for i in range(1, 5)
+        ]
+        self.students = []
+        for index in range(6):
+            student = User.objects.create_user(
+                username=f"aluno-g{index}", email=f"aluno-g{index}@example.com", password="senha", role="aluno"
+            )
+            self.turma.students.add(student)
+            self.students.append(student)
+            status = ChecklistStatus.objects.create(template=template, student=student, student_class=self.turma)
+            # Três alunos dominam M1/M2, os outros três dominam M3/M4.
+            done = items[:2] if index < 3 else items[2:]
+            for item in done:
+                ChecklistMark.objects.create(status_record=status, item=item, mark_status="COMPLETED")
+
+    def test_matrix_is_built_in_one_marks_query(self) -> None:
+        with self.assertNumQueries(2):
+            matrix = build_mastery_matrix(self.turma)
+        self.assertEqual(matrix.shape, (6, 4))
+        self.assertEqual(sum(map(sum, matrix.values)), 12)
+
+    def test_students_with_similar_marks_share_a_group(self) -> None:
+        matrix = build_mastery_matrix(self.turma)
+        groups = cluster_students(matrix, groups=2)
+        grouped = [{matrix.student_ids[i] for i in group.members} for group in groups]
+        self.assertCountEqual(
+            grouped,
+            [{student.id for student in self.students[:3]}, {student.id for student in self.students[3:]}],
+        )
+
+    def test_builder_replaces_only_automatic_profiles(self) -> None:
+        GroupLearningProfile.objects.create(class_context=self.turma, label="Manual", summary="Criado pelo professor")
+        GroupProfileBuilder().build(self.turma, groups=2)
+        profiles = GroupProfileBuilder().build(self.turma, groups=2)
+
+        self.assertEqual(GroupLearningProfile.objects.filter(class_context=self.turma).count(), 3)
+        self.assertTrue(GroupLearningProfile.objects.filter(label="Manual").exists())
+        by_strength = {tuple(profile.metadata["strengths"]): profile for profile in profiles}
+        self.assertEqual(by_strength[("M1", "M2")].metadata["needs"], ["M3", "M4"])
+        self.assertEqual(by_strength[("M1", "M2")].focus_competencies, ["M3", "M4"])
+
+    def test_large_class_clusters_quickly(self) -> None:
+        import random
+        import time
+
+        rng = random.Random(7)
+        values = [[rng.choice((0.0, 0.5, 1.0)) for _ in range(300)] for _ in range(30)]
+        matrix = MasteryMatrix(list(range(30)), [""] * 30, list(range(300)), [f"I{i}" for i in range(300)], values)
+        started = time.perf_counter()
+        groups = cluster_students(matrix, groups=6)
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(sum(len(group.members) for group in groups), 30)
+
+
+class PromptPrefixTests(TestCase):
+    def test_static_prefix_is_shared_between_requests(self) -> None:
+        orchestrator = AIRequestOrchestrator()
+        prefix = build_prompt_prefix("student")
+        first = orchestrator._build_system_prompt(prefix, {"learner_profile": {"grade_level": 5}})
+        second = orchestrator._build_system_prompt(prefix, {"learner_profile": {"grade_level": 6}})
+        self.assertTrue(first.startswith(prefix.text))
+        self.assertTrue(second.startswith(prefix.text))
+        self.assertNotIn("Contexto adicional", prefix.text)
+        self.assertEqual(build_prompt_prefix("student").digest, prefix.digest)
+        self.assertNotEqual(build_prompt_prefix("teacher").digest, prefix.digest)
+
+    def test_prefix_hash_changes_with_mem_block(self) -> None:
+        default_digest = build_prompt_prefix("student").digest
+        with self.settings(MEM_ENABLE=True, MEM_GUIDELINES="Outras orientações MEM."):
+            custom = build_prompt_prefix("student")
+        self.assertIn("Outras orientações MEM.", custom.text)
+        self.assertNotEqual(custom.digest, default_digest)
+
+
 class AIAssistantAPITests(APITestCase):
     @classmethod
     def setUpTestData(cls):
@@ -11,7 +11,8 @@ from django.utils.translation import gettext as _
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET, require_POST
 
-from ai.exceptions import AIServiceError, QuotaExceededError, RateLimitError, UnsafeContentError
+from ai.constants import IDEMPOTENCY_KEY_MAX_LENGTH
+from ai.exceptions import AIServiceError, ContextTooLargeError, QuotaExceededError, RateLimitError, UnsafeContentError
 from ai.models import AIInteractionSession, AIRequest
 from ai.services import AIRequestOrchestrator
 
@@ -55,6 +56,10 @@ def ai_assistant_view(request: HttpRequest) -> JsonResponse:
 
     persona = _resolve_persona(request.user)
 
+    idempotency_key = (request.headers.get("Idempotency-Key") or "").strip()
+    if len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        return JsonResponse({"error": _("Idempotency-Key demasiado longa."), "code": "invalid_idempotency_key"}, status=400)
+
     session: Optional[AIInteractionSession] = None
     session_id = payload.get("session_id")
     if session_id:
@@ -88,6 +93,7 @@ def ai_assistant_view(request: HttpRequest) -> JsonResponse:
             class_context=class_context,
             session=session,
             extras=extras,
+            idempotency_key=idempotency_key,
         )
     except RateLimitError as exc:
         return JsonResponse({"error": str(exc), "code": "rate_limit"}, status=429)
@@ -95,6 +101,8 @@ def ai_assistant_view(request: HttpRequest) -> JsonResponse:
         return JsonResponse({"error": str(exc), "code": "quota"}, status=402)
     except UnsafeContentError as exc:
         return JsonResponse({"error": str(exc), "code": "guardrail"}, status=403)
+    except ContextTooLargeError as exc:
+        return JsonResponse({"error": str(exc), "code": "context_too_large"}, status=413)
     except AIServiceError as exc:
         return JsonResponse({"error": str(exc), "code": "service"}, status=400)
     except Exception as exc:  # pragma: no cover - fallback
@@ -1,6 +1,15 @@
 # checklists/admin.py
 from django.contrib import admin
-from .models import ChecklistTemplate, ChecklistItem, ChecklistMark, ChecklistStatus
+from .models import (
+    ChecklistItem,
+    ChecklistItemMastery,
+    ChecklistMark,
+    ChecklistMarkEvent,
+    ChecklistMarkEventRollup,
+    ChecklistStatus,
+    ChecklistTemplate,
+)
+from .services import recount_statuses
 
 # Inline configuration for Checklist Items within Checklist Templates
 class ChecklistItemInline(admin.TabularInline):
@@ -27,6 +36,11 @@ class ChecklistTemplateAdmin(admin.ModelAdmin):
     # Include the inline form for managing items
     inlines = [ChecklistItemInline]
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Items added/removed inline change every status total
+        recount_statuses(ChecklistStatus.objects.filter(template=form.instance))
+
 
 @admin.register(ChecklistItem)
 class ChecklistItemAdmin(admin.ModelAdmin):
@@ -59,10 +73,10 @@ class ChecklistMarkAdmin(admin.ModelAdmin):
 @admin.register(ChecklistStatus)
 class ChecklistStatusAdmin(admin.ModelAdmin):
     """Admin configuration for ChecklistStatus model."""
-    list_display = ('student', 'template', 'student_class', 'percent_complete', 'updated_at')
+    list_display = ('student', 'template', 'student_class', 'percent_complete', 'completed_items', 'total_items', 'last_activity_at')
     list_filter = ('student_class', 'template', 'student')
     search_fields = ('student__username', 'student__first_name', 'student__last_name', 'template__name', 'student_class__name')
-    readonly_fields = ('percent_complete', 'updated_at')
+    readonly_fields = ('percent_complete', 'total_items', 'completed_items', 'validated_items', 'last_activity_at', 'updated_at')
     autocomplete_fields = ['student', 'template', 'student_class']
     ordering = ('student_class', 'student', 'template')
 
@@ -70,3 +84,29 @@ class ChecklistStatusAdmin(admin.ModelAdmin):
 # The @admin.register decorator replaces that when using a ModelAdmin class.
 
 # Register your models here.
+
+
+@admin.register(ChecklistItemMastery)
+class ChecklistItemMasteryAdmin(admin.ModelAdmin):
+    """Read-only view of the peer-helper index (rebuilt by rebuild_peer_index)."""
+    list_display = ('item', 'student', 'student_class', 'teacher_validated', 'achieved_at')
+    list_filter = ('student_class', 'teacher_validated')
+    raw_id_fields = ('item', 'student', 'student_class', 'mark')
+
+
+@admin.register(ChecklistMarkEvent)
+class ChecklistMarkEventAdmin(admin.ModelAdmin):
+    """Append-only history of mark changes (aggregated by rollup_checklist_events)."""
+    list_display = ('created_at', 'student', 'item', 'kind', 'from_status', 'to_status', 'actor')
+    list_filter = ('kind', 'student_class', 'template')
+    raw_id_fields = ('mark', 'item', 'template', 'student_class', 'student', 'actor')
+    date_hierarchy = 'created_at'
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ChecklistMarkEventRollup)
+class ChecklistMarkEventRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'student_class', 'template', 'kind', 'count')
+    list_filter = ('kind', 'student_class', 'template')
@@ -4,6 +4,8 @@ from django.contrib.auth import get_user_model
 
 from classes.models import Class
 from checklists.models import ChecklistTemplate, ChecklistItem, ChecklistStatus, ChecklistMark
+from checklists.services import provision_statuses, sync_template_items
+from core.serializers import SparseFieldsetMixin
 from users.api.serializers import UserSerializer
 
 User = get_user_model()
@@ -27,7 +29,15 @@ class ChecklistTemplateClassSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'year']
 
 
-class ChecklistTemplateSerializer(serializers.ModelSerializer):
+class ChecklistTemplateSummarySerializer(serializers.ModelSerializer):
+    """Modelo sem itens, para ``?expand=template`` (os itens vêm de ``templates/{id}/items``)."""
+
+    class Meta:
+        model = ChecklistTemplate
+        fields = ['id', 'name', 'description', 'version', 'is_published']
+
+
+class ChecklistTemplateSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = ChecklistItemSerializer(many=True, required=False)
     classes = ChecklistTemplateClassSerializer(many=True, read_only=True)
     class_ids = serializers.PrimaryKeyRelatedField(
@@ -70,6 +80,8 @@ class ChecklistTemplateSerializer(serializers.ModelSerializer):
         if classes:
             template.classes.set(classes)
         self._sync_items(template, items_data)
+        if classes:
+            provision_statuses([turma.pk for turma in classes], template_ids=[template.pk])
         return template
 
     def update(self, instance, validated_data):
@@ -86,43 +98,26 @@ class ChecklistTemplateSerializer(serializers.ModelSerializer):
         if items_data is not None:
             self._sync_items(instance, items_data)
 
+        if classes:
+            provision_statuses([turma.pk for turma in classes], template_ids=[instance.pk])
+
         return instance
 
     def _sync_items(self, template: ChecklistTemplate, items_data: list[dict]) -> None:
-        existing_items = {item.id: item for item in template.items.all()}
-        seen_ids = set()
-
-        for position, item_data in enumerate(items_data, start=1):
-            item_id = item_data.pop('id', None)
-            is_deleted = item_data.pop('is_deleted', False)
-            item_data.setdefault('order', position)
-
-            if item_id and item_id in existing_items:
-                seen_ids.add(item_id)
-                item = existing_items[item_id]
-                if is_deleted:
-                    item.delete()
-                    continue
-                for attr, value in item_data.items():
-                    setattr(item, attr, value)
-                item.save()
-            else:
-                if is_deleted:
-                    continue
-                ChecklistItem.objects.create(template=template, **item_data)
+        sync_template_items(template, items_data)
 
-        # Remove items not referenced anymore
-        for item_id, item in existing_items.items():
-            if item_id not in seen_ids and all(entry.get('id') != item_id for entry in items_data):
-                item.delete()
 
-
-class ChecklistMarkSerializer(serializers.ModelSerializer):
-    item = ChecklistItemSerializer(read_only=True)
+class ChecklistMarkSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    item = serializers.PrimaryKeyRelatedField(read_only=True)
     item_id = serializers.PrimaryKeyRelatedField(
         queryset=ChecklistItem.objects.all(), source='item', write_only=True, required=False
     )
-    marked_by = UserSerializer(read_only=True)
+    marked_by = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    expandable_fields = {
+        'item': (ChecklistItemSerializer, {}),
+        'marked_by': (UserSerializer, {}),
+    }
 
     class Meta:
         model = ChecklistMark
@@ -186,10 +181,12 @@ class ChecklistMarkSerializer(serializers.ModelSerializer):
         return instance
 
 
-class ChecklistStatusSerializer(serializers.ModelSerializer):
-    student = UserSerializer(read_only=True)
-    template = ChecklistTemplateSerializer(read_only=True)
-    student_class = ChecklistTemplateClassSerializer(read_only=True)
+class ChecklistStatusSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """LV com relações como ids por omissão; ``?expand=`` e ``?fields=`` ajustam a forma."""
+
+    student = serializers.PrimaryKeyRelatedField(read_only=True)
+    template = serializers.PrimaryKeyRelatedField(read_only=True)
+    student_class = serializers.PrimaryKeyRelatedField(read_only=True)
     marks = ChecklistMarkSerializer(many=True, read_only=True)
     template_id = serializers.PrimaryKeyRelatedField(
         queryset=ChecklistTemplate.objects.all(), source='template', write_only=True, required=True
@@ -201,6 +198,12 @@ class ChecklistStatusSerializer(serializers.ModelSerializer):
         queryset=Class.objects.all(), source='student_class', write_only=True, required=True
     )
 
+    expandable_fields = {
+        'student': (UserSerializer, {}),
+        'template': (ChecklistTemplateSummarySerializer, {}),
+        'student_class': (ChecklistTemplateClassSerializer, {}),
+    }
+
     class Meta:
         model = ChecklistStatus
         fields = [
@@ -215,6 +218,10 @@ class ChecklistStatusSerializer(serializers.ModelSerializer):
             'state',
             'student_notes',
             'percent_complete',
+            'total_items',
+            'completed_items',
+            'validated_items',
+            'last_activity_at',
             'started_at',
             'submitted_at',
             'updated_at',
@@ -226,6 +233,10 @@ class ChecklistStatusSerializer(serializers.ModelSerializer):
             'student',
             'student_class',
             'percent_complete',
+            'total_items',
+            'completed_items',
+            'validated_items',
+            'last_activity_at',
             'started_at',
             'submitted_at',
             'updated_at',
@@ -316,3 +327,14 @@ class ChecklistStatusSerializer(serializers.ModelSerializer):
             instance.save(update_fields=['student_notes', 'updated_at'])
 
         return instance
+
+
+class BulkMarkEntrySerializer(serializers.Serializer):
+    item_id = serializers.IntegerField()
+    student_id = serializers.IntegerField(required=False)
+    mark_status = serializers.ChoiceField(choices=[choice for choice, _ in ChecklistMark.STATUS_CHOICES])
+    comment = serializers.CharField(required=False, allow_blank=True)
+
+
+class BulkMarkSerializer(serializers.Serializer):
+    marks = BulkMarkEntrySerializer(many=True, allow_empty=False, max_length=500)
@@ -1,12 +1,37 @@
 """API endpoints for checklist templates, statuses and marks."""
-from rest_framework import viewsets, mixins
-from rest_framework.exceptions import PermissionDenied
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from django.contrib.auth import get_user_model
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags
 from django.utils.translation import gettext_lazy as _
 
-from checklists.models import ChecklistTemplate, ChecklistStatus, ChecklistMark
-from core.permissions import IsAuthenticatedAndActive
+from checklists.models import ChecklistTemplate, ChecklistStatus, ChecklistMark, ChecklistItem
+from checklists.services import (
+    EVENT_BUCKETS,
+    GRID_ENCODINGS,
+    AnalyticsScope,
+    ChecklistAnalytics,
+    MarkChange,
+    NextObjectiveRecommender,
+    apply_mark_changes,
+    build_class_grid,
+    event_timeseries,
+    notify_bulk_changes,
+    payload_etag,
+    peer_helpers,
+)
+from classes.models import Class
+from core.permissions import IsAuthenticatedAndActive, can_view_student, is_class_teacher_or_admin
+from core.serializers import requested_expansions, requested_fields, wants_field
 from .serializers import (
+    BulkMarkSerializer,
+    ChecklistItemSerializer,
     ChecklistTemplateSerializer,
     ChecklistStatusSerializer,
     ChecklistMarkSerializer,
@@ -20,7 +45,10 @@ class ChecklistTemplateViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        base_qs = ChecklistTemplate.objects.prefetch_related('items').all()
+        fields = requested_fields(self.request)
+        base_qs = ChecklistTemplate.objects.prefetch_related(
+            *[name for name in ('items', 'classes') if wants_field(fields, name)]
+        )
         role = getattr(user, 'role', None)
 
         if user.is_superuser or role == 'admin':
@@ -53,6 +81,20 @@ class ChecklistTemplateViewSet(viewsets.ModelViewSet):
             raise PermissionDenied(_('Apenas professores ou administradores podem remover modelos.'))
         instance.delete()
 
+    @action(detail=True, methods=['get'])
+    def items(self, request, pk=None):
+        """Itens do modelo, com ETag: as LV referem-nos só por id e o cliente guarda-os em cache."""
+        template = get_object_or_404(self.get_queryset().prefetch_related(None), pk=pk)
+        payload = ChecklistItemSerializer(template.items.order_by('order', 'code'), many=True).data
+        etag = payload_etag(payload)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(payload)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
     @staticmethod
     def _can_manage_templates(user):
         role = getattr(user, 'role', None)
@@ -67,9 +109,7 @@ class ChecklistStatusViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         role = getattr(user, 'role', None)
-        base_qs = ChecklistStatus.objects.select_related(
-            'template', 'student', 'student_class'
-        ).prefetch_related('template__items', 'marks__item').order_by('-updated_at')
+        base_qs = self._with_requested_relations(ChecklistStatus.objects.order_by('-updated_at'))
 
         if user.is_superuser or role == 'admin':
             return base_qs
@@ -81,6 +121,22 @@ class ChecklistStatusViewSet(viewsets.ModelViewSet):
             return base_qs.filter(student__encarregados_relations__encarregado=user)
         return base_qs.none()
 
+    def _with_requested_relations(self, queryset):
+        """Só carrega as relações que a resposta vai serializar (``?fields=``/``?expand=``)."""
+        fields = requested_fields(self.request)
+        expand = requested_expansions(self.request)
+        related = [name for name in ('template', 'student', 'student_class') if name in expand and wants_field(fields, name)]
+        if related:
+            queryset = queryset.select_related(*related)
+        if wants_field(fields, 'marks'):
+            mark_related = [
+                f'marks__{name}'
+                for name in ('item', 'marked_by')
+                if f'marks.{name}' in expand and wants_field(fields, f'marks.{name}')
+            ]
+            queryset = queryset.prefetch_related('marks', *mark_related)
+        return queryset
+
     def perform_create(self, serializer):
         serializer.save()
 
@@ -96,6 +152,183 @@ class ChecklistStatusViewSet(viewsets.ModelViewSet):
 
         serializer.save()
 
+    @action(detail=True, methods=['post'], url_path='marks/bulk')
+    def bulk_marks(self, request, pk=None):
+        """Aplica várias marcas da LV numa só transação."""
+        user = request.user
+        role = getattr(user, 'role', None)
+        status_record = get_object_or_404(
+            self.get_queryset().prefetch_related(None).select_related('student_class', 'template', 'student'),
+            pk=pk,
+        )
+        if role == 'aluno' and status_record.student_id != user.id:
+            raise PermissionDenied(_('Aluno não pode alterar LV de outro aluno.'))
+        if role not in {'aluno', 'professor'} and not (user.is_superuser or role == 'admin'):
+            raise PermissionDenied(_('Perfil sem permissão para alterar marcas.'))
+
+        entries = _validated_bulk_entries(request, as_teacher=role != 'aluno')
+        _check_items(status_record.template_id, entries)
+        changes = [
+            MarkChange(status_record, entry['item_id'], entry['mark_status'], entry.get('comment'))
+            for entry in entries
+        ]
+        return _apply_bulk(request, changes, as_teacher=role != 'aluno')
+
+
+def _validated_bulk_entries(request, *, as_teacher: bool) -> list[dict]:
+    serializer = BulkMarkSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    entries = serializer.validated_data['marks']
+    if not as_teacher and any(entry['mark_status'] == 'VALIDATED' for entry in entries):
+        raise ValidationError(_('Alunos não podem validar objetivos.'))
+    return entries
+
+
+def _check_items(template_id: int, entries: list[dict]) -> None:
+    requested = {entry['item_id'] for entry in entries}
+    valid = set(ChecklistItem.objects.filter(template_id=template_id, id__in=requested).order_by().values_list('id', flat=True))
+    if requested - valid:
+        raise ValidationError({'item_id': _('Itens que não pertencem ao modelo: %s') % sorted(requested - valid)})
+
+
+def _apply_bulk(request, changes: list[MarkChange], *, as_teacher: bool) -> Response:
+    result = apply_mark_changes(changes, actor=request.user, as_teacher=as_teacher)
+    notify_bulk_changes(request, result, as_teacher=as_teacher)
+    return Response(
+        {
+            'created': len(result.created),
+            'updated': len(result.updated),
+            'unchanged': result.unchanged,
+            'statuses': [
+                {'id': item.id, 'student_id': item.student_id, 'percent_complete': item.percent_complete}
+                for item in result.statuses
+            ],
+            'marks': [
+                {
+                    'id': mark.id,
+                    'status_record': mark.status_record_id,
+                    'item_id': mark.item_id,
+                    'mark_status': mark.mark_status,
+                    'teacher_validated': mark.teacher_validated,
+                    'marked_at': mark.marked_at,
+                }
+                for mark in result.changed
+            ],
+        }
+    )
+
+
+class ClassChecklistBulkMarkAPIView(APIView):
+    """Grelha da turma: o professor valida/corrige marcas de vários alunos de uma vez."""
+
+    permission_classes = [IsAuthenticatedAndActive]
+
+    def post(self, request, class_id: int, template_id: int, *args, **kwargs):
+        turma = get_object_or_404(Class, pk=class_id)
+        user = request.user
+        if not is_class_teacher_or_admin(user, turma):
+            raise PermissionDenied(_('Professor não associado à turma.'))
+
+        entries = _validated_bulk_entries(request, as_teacher=True)
+        if any('student_id' not in entry for entry in entries):
+            raise ValidationError({'student_id': _('Obrigatório indicar o aluno em cada marca.')})
+        _check_items(template_id, entries)
+        statuses = {
+            item.student_id: item
+            for item in ChecklistStatus.objects.filter(
+                template_id=template_id,
+                student_class=turma,
+                student_id__in={entry['student_id'] for entry in entries},
+            ).select_related('student', 'student_class', 'template')
+        }
+        missing = {entry['student_id'] for entry in entries} - set(statuses)
+        if missing:
+            raise ValidationError({'student_id': _('Alunos sem esta LV na turma: %s') % sorted(missing)})
+        changes = [
+            MarkChange(statuses[entry['student_id']], entry['item_id'], entry['mark_status'], entry.get('comment'))
+            for entry in entries
+        ]
+        return _apply_bulk(request, changes, as_teacher=True)
+
+
+class ClassChecklistGridAPIView(APIView):
+    """Grelha compacta turma × objetivos (``?encoding=dense|rle``), com ETag."""
+
+    permission_classes = [IsAuthenticatedAndActive]
+
+    def get(self, request, class_id: int, template_id: int, *args, **kwargs):
+        turma = get_object_or_404(Class, pk=class_id)
+        user = request.user
+        if not is_class_teacher_or_admin(user, turma):
+            raise PermissionDenied(_('Professor não associado à turma.'))
+        template = get_object_or_404(ChecklistTemplate, pk=template_id)
+        encoding = request.query_params.get('encoding', 'dense')
+        if encoding not in GRID_ENCODINGS:
+            return Response({'detail': _('Codificação inválida.')}, status=status.HTTP_400_BAD_REQUEST)
+
+        payload = build_class_grid(turma, template, encoding=encoding)
+        etag = payload_etag(payload)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(payload)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class ClassChecklistEventSeriesAPIView(APIView):
+    """Série temporal das mudanças de marcas da turma (``?bucket=day|week``, ``?since=``, ``?until=``, ``?template_id=``)."""
+
+    permission_classes = [IsAuthenticatedAndActive]
+
+    def get(self, request, class_id: int, *args, **kwargs):
+        turma = get_object_or_404(Class, pk=class_id)
+        user = request.user
+        if not is_class_teacher_or_admin(user, turma):
+            raise PermissionDenied(_('Professor não associado à turma.'))
+        params = request.query_params
+        bucket = params.get('bucket', 'week')
+        since = parse_date(params['since']) if params.get('since') else None
+        until = parse_date(params['until']) if params.get('until') else None
+        template_id = params.get('template_id')
+        if (
+            bucket not in EVENT_BUCKETS
+            or (params.get('since') and since is None)
+            or (params.get('until') and until is None)
+            or (template_id and not template_id.isdigit())
+        ):
+            return Response({'detail': _('Parâmetros inválidos.')}, status=status.HTTP_400_BAD_REQUEST)
+        series = event_timeseries(
+            turma, bucket=bucket, since=since, until=until, template=int(template_id) if template_id else None
+        )
+        return Response({'class_id': turma.id, 'bucket': bucket, 'results': series})
+
+
+class ChecklistAnalyticsAPIView(APIView):
+    """Análise de um modelo: por turma (``?class_id=``), por ano (``?year=``) ou da escola toda.
+
+    Professores só consultam as suas turmas; ano e escola ficam para administradores.
+    """
+
+    permission_classes = [IsAuthenticatedAndActive]
+
+    def get(self, request, template_id: int, *args, **kwargs):
+        template = get_object_or_404(ChecklistTemplate, pk=template_id)
+        try:
+            class_id = int(request.query_params['class_id']) if request.query_params.get('class_id') else None
+            year = int(request.query_params['year']) if request.query_params.get('year') else None
+        except ValueError:
+            return Response({'detail': _('Parâmetros inválidos.')}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        if not (user.is_superuser or getattr(user, 'role', None) == 'admin'):
+            teaches = class_id is not None and Class.objects.filter(pk=class_id, teachers=user).exists()
+            if not teaches:
+                raise PermissionDenied(_('Sem permissão para consultar esta análise.'))
+        scope = AnalyticsScope(class_id=class_id, year=year if class_id is None else None)
+        return Response(ChecklistAnalytics(template, scope).report())
+
 
 class ChecklistMarkViewSet(mixins.UpdateModelMixin,
                            mixins.RetrieveModelMixin,
@@ -108,8 +341,11 @@ class ChecklistMarkViewSet(mixins.UpdateModelMixin,
     def get_queryset(self):
         user = self.request.user
         role = getattr(user, 'role', None)
+        fields = requested_fields(self.request)
+        expand = requested_expansions(self.request)
         base_qs = ChecklistMark.objects.select_related(
-            'status_record', 'status_record__student', 'status_record__student_class', 'item'
+            'status_record',
+            *[name for name in ('item', 'marked_by') if name in expand and wants_field(fields, name)],
         ).order_by('item__order')
 
         if user.is_superuser or role == 'admin':
@@ -141,3 +377,49 @@ class ChecklistMarkViewSet(mixins.UpdateModelMixin,
             raise PermissionDenied('Role not permitted to update checklist marks.')
 
         serializer.save()
+
+
+class StudentNextObjectivesAPIView(APIView):
+    """Próximos objetivos recomendados para um aluno (``?class_id=``, ``?limit=``)."""
+
+    permission_classes = [IsAuthenticatedAndActive]
+
+    def get(self, request, student_id: int, *args, **kwargs):
+        student = get_object_or_404(get_user_model(), pk=student_id, role='aluno')
+        if not can_view_student(request.user, student):
+            raise PermissionDenied(_('Sem permissão para consultar este aluno.'))
+        try:
+            class_id = int(request.query_params['class_id']) if request.query_params.get('class_id') else None
+            limit = min(max(int(request.query_params.get('limit', 5)), 1), 50)
+        except ValueError:
+            return Response({'detail': _('Parâmetros inválidos.')}, status=status.HTTP_400_BAD_REQUEST)
+        objectives = NextObjectiveRecommender().recommend(student, student_class=class_id, limit=limit)
+        return Response({'student_id': student.id, 'results': objectives})
+
+
+class ChecklistItemHelpersAPIView(APIView):
+    """Colegas da turma que já concluíram o item (``?class_id=`` obrigatório)."""
+
+    permission_classes = [IsAuthenticatedAndActive]
+
+    def get(self, request, item_id: int, *args, **kwargs):
+        item = get_object_or_404(ChecklistItem, pk=item_id)
+        try:
+            class_id = int(request.query_params.get('class_id', ''))
+        except ValueError:
+            return Response({'detail': _('Indica a turma (class_id).')}, status=status.HTTP_400_BAD_REQUEST)
+        turma = get_object_or_404(Class, pk=class_id)
+
+        user = request.user
+        role = getattr(user, 'role', None)
+        allowed = (
+            user.is_superuser
+            or role == 'admin'
+            or turma.teachers.filter(id=user.id).exists()
+            or turma.students.filter(id=user.id).exists()
+        )
+        if not allowed:
+            raise PermissionDenied(_('Sem permissão para consultar esta turma.'))
+
+        helpers = peer_helpers(item.id, turma, exclude_student=user, limit=None)
+        return Response({'item_id': item.id, 'class_id': turma.id, 'results': helpers})
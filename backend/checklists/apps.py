@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ChecklistsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'checklists'
+
+    def ready(self):
+        import checklists.signals  # noqa: F401
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from checklists.services import rebuild_peer_index
+from classes.models import Class
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice item → colegas que já o concluíram a partir das marcas existentes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class-id', action='append', type=int, dest='class_ids', help='Limita a uma turma (pode repetir).')
+
+    def handle(self, *args, **options):
+        classes = None
+        if options['class_ids']:
+            classes = Class.objects.filter(id__in=options['class_ids'])
+            missing = set(options['class_ids']) - set(classes.values_list('id', flat=True))
+            if missing:
+                raise CommandError(f"Turmas inexistentes: {', '.join(map(str, sorted(missing)))}.")
+        total = rebuild_peer_index(classes)
+        self.stdout.write(self.style.SUCCESS(f'Índice de pares reconstruído: {total} entradas.'))
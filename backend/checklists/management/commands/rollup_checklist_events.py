@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from checklists.services import rollup_events
+
+
+class Command(BaseCommand):
+    help = 'Agrega por dia os eventos de marcas antigos e apaga-os, para manter o histórico limitado.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-days',
+            type=int,
+            help='Dias de eventos a manter em detalhe (predefinição: CHECKLIST_EVENT_RETENTION_DAYS ou 180).',
+        )
+
+    def handle(self, *args, **options):
+        keep_days = options['keep_days']
+        if keep_days is not None and keep_days < 0:
+            raise CommandError('--keep-days tem de ser positivo.')
+        rollups, deleted = rollup_events(keep_days)
+        self.stdout.write(self.style.SUCCESS(f'{deleted} eventos agregados em {rollups} linhas diárias.'))
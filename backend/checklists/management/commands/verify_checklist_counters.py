@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from checklists.models import ChecklistStatus
+from checklists.services import find_drift, recount_statuses
+from classes.models import Class
+
+
+class Command(BaseCommand):
+    help = 'Verifica se os contadores das listas de verificação coincidem com as marcas (e corrige com --fix).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class-id', action='append', type=int, dest='class_ids', help='Limita a uma turma (pode repetir).')
+        parser.add_argument('--fix', action='store_true', help='Reconta os contadores das listas com desvios.')
+
+    def handle(self, *args, **options):
+        statuses = ChecklistStatus.objects.all()
+        if options['class_ids']:
+            found = set(Class.objects.filter(id__in=options['class_ids']).values_list('id', flat=True))
+            missing = set(options['class_ids']) - found
+            if missing:
+                raise CommandError(f"Turmas inexistentes: {', '.join(map(str, sorted(missing)))}.")
+            statuses = statuses.filter(student_class_id__in=found)
+
+        drift = find_drift(statuses)
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Contadores consistentes.'))
+            return
+        for entry in drift:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"LV {entry['status_id']}: guardado {entry['stored']} / real {entry['actual']}"
+                )
+            )
+        if options['fix']:
+            fixed = recount_statuses(ChecklistStatus.objects.filter(pk__in=[entry['status_id'] for entry in drift]))
+            self.stdout.write(self.style.SUCCESS(f'{fixed} listas recontadas.'))
+        else:
+            raise CommandError(f'{len(drift)} listas com contadores desalinhados (usa --fix para corrigir).')
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-19 16:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checklists', '0008_checkliststatus_started_at_checkliststatus_state_and_more'),
+        ('classes', '0003_classmembership'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChecklistItemMastery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('teacher_validated', models.BooleanField(default=False, verbose_name='teacher validated')),
+                ('achieved_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='achieved at')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='masteries', to='checklists.checklistitem')),
+                ('mark', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='mastery', to='checklists.checklistmark')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checklist_masteries', to=settings.AUTH_USER_MODEL)),
+                ('student_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checklist_masteries', to='classes.class')),
+            ],
+            options={
+                'verbose_name': 'Checklist Item Mastery',
+                'verbose_name_plural': 'Checklist Item Masteries',
+                'ordering': ['-teacher_validated', 'achieved_at'],
+                'indexes': [models.Index(fields=['item', 'student_class'], name='checklist_mastery_item_class')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2 on 2026-10-19 16:53
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    ChecklistItem = apps.get_model('checklists', 'ChecklistItem')
+    ChecklistMark = apps.get_model('checklists', 'ChecklistMark')
+    ChecklistStatus = apps.get_model('checklists', 'ChecklistStatus')
+    totals = dict(
+        ChecklistItem.objects.values_list('template_id').annotate(total=Count('id')).order_by()
+    )
+    marks = {
+        status_id: (completed, validated)
+        for status_id, completed, validated in ChecklistMark.objects.values_list('status_record_id')
+        .annotate(
+            completed=Count('id', filter=Q(mark_status__in=('COMPLETED', 'VALIDATED'))),
+            validated=Count('id', filter=Q(teacher_validated=True) | Q(mark_status='VALIDATED')),
+        )
+        .order_by()
+    }
+    statuses = list(ChecklistStatus.objects.only('id', 'template_id', 'updated_at'))
+    for status in statuses:
+        status.total_items = totals.get(status.template_id, 0)
+        status.completed_items, status.validated_items = marks.get(status.id, (0, 0))
+        status.last_activity_at = status.updated_at
+    ChecklistStatus.objects.bulk_update(
+        statuses, ['total_items', 'completed_items', 'validated_items', 'last_activity_at'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checklists', '0009_checklistitemmastery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checkliststatus',
+            name='completed_items',
+            field=models.PositiveIntegerField(default=0, verbose_name='completed items'),
+        ),
+        migrations.AddField(
+            model_name='checkliststatus',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='last activity'),
+        ),
+        migrations.AddField(
+            model_name='checkliststatus',
+            name='total_items',
+            field=models.PositiveIntegerField(default=0, verbose_name='total items'),
+        ),
+        migrations.AddField(
+            model_name='checkliststatus',
+            name='validated_items',
+            field=models.PositiveIntegerField(default=0, verbose_name='validated items'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
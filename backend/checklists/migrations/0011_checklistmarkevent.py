@@ -0,0 +1,59 @@
+# Generated by Django 5.2 on 2026-10-19 17:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checklists', '0010_checkliststatus_counters'),
+        ('classes', '0003_classmembership'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChecklistMarkEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('progress', 'Progress'), ('completed', 'Completed'), ('validated', 'Validated'), ('reopened', 'Reopened')], max_length=20, verbose_name='kind')),
+                ('from_status', models.CharField(blank=True, max_length=20, verbose_name='from status')),
+                ('to_status', models.CharField(max_length=20, verbose_name='to status')),
+                ('from_validated', models.BooleanField(default=False, verbose_name='was validated')),
+                ('to_validated', models.BooleanField(default=False, verbose_name='validated')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='created at')),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mark_events', to='checklists.checklistitem')),
+                ('mark', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='checklists.checklistmark')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checklist_mark_events', to=settings.AUTH_USER_MODEL)),
+                ('student_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checklist_mark_events', to='classes.class')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mark_events', to='checklists.checklisttemplate')),
+            ],
+            options={
+                'verbose_name': 'Checklist Mark Event',
+                'verbose_name_plural': 'Checklist Mark Events',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['student_class', 'created_at'], name='checklist_event_class_time')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ChecklistMarkEventRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='day')),
+                ('kind', models.CharField(choices=[('progress', 'Progress'), ('completed', 'Completed'), ('validated', 'Validated'), ('reopened', 'Reopened')], max_length=20, verbose_name='kind')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='count')),
+                ('student_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checklist_mark_event_rollups', to='classes.class')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mark_event_rollups', to='checklists.checklisttemplate')),
+            ],
+            options={
+                'verbose_name': 'Checklist Mark Event Rollup',
+                'verbose_name_plural': 'Checklist Mark Event Rollups',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('student_class', 'template', 'day', 'kind'), name='unique_checklist_event_rollup')],
+            },
+        ),
+    ]
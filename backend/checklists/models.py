@@ -1,5 +1,5 @@
 # checklists/models.py
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.conf import settings
@@ -67,6 +67,9 @@ class ChecklistItem(models.Model):
     def __str__(self):
         return f"{self.code}: {self.text[:60]}..." if self.code else f"{self.text[:60]}..."
 
+DONE_MARK_STATUSES = ('COMPLETED', 'VALIDATED')
+
+
 class ChecklistMark(models.Model):
     """ Tracks the status of a specific ChecklistItem for a specific student checklist status. """
     STATUS_CHOICES = [
@@ -117,15 +120,32 @@ class ChecklistMark(models.Model):
         item_code = self.item.code if self.item else 'N/A'
         return f"{student_username} - {item_code} - {self.get_mark_status_display()}"
 
+    def counter_state(self):
+        """(concluído, validado) tal como contam nos contadores da ChecklistStatus."""
+        return (
+            self.mark_status in DONE_MARK_STATUSES,
+            bool(self.teacher_validated) or self.mark_status == 'VALIDATED',
+        )
+
     def save(self, *args, **kwargs):
-        """ Override save to update parent status percentage and handle validation reset. """
+        """ Override save to update parent status counters and handle validation reset. """
+        with transaction.atomic():
+            self._save_and_track(*args, **kwargs)
+
+    def _save_and_track(self, *args, **kwargs):
+        before = (False, False)
+        previous = ('', False)
         # Reset validation if student changes status from completed
         if not self.pk: # If creating
              self.marked_at = timezone.now() # Set initial timestamp
         else: # If updating
             # Check if mark_status changed *from* completed *by the student*
             try:
-                orig = ChecklistMark.objects.get(pk=self.pk)
+                # Bloqueia a linha: duas gravações simultâneas da mesma marca (duplo clique,
+                # aluno e professor) não podem partir do mesmo estado anterior.
+                orig = ChecklistMark.objects.select_for_update().get(pk=self.pk)
+                before = orig.counter_state()
+                previous = (orig.mark_status, orig.teacher_validated)
                 if orig.mark_status == 'COMPLETED' and self.mark_status != 'COMPLETED' and self.marked_by == self.status_record.student:
                      self.teacher_validated = False
                      
@@ -145,9 +165,20 @@ class ChecklistMark(models.Model):
             self.teacher_validated = False
             
         super().save(*args, **kwargs)
-        # Update parent status after saving the mark
-        if self.status_record:
-            self.status_record.update_percent_complete()
+        # Update parent status counters after saving the mark (no recount)
+        if self.status_record_id:
+            self.status_record.apply_mark_transition(before, self.counter_state())
+            event = ChecklistMarkEvent.for_transition(self, previous, actor_id=self.marked_by_id)
+            if event:
+                event.save()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            current = ChecklistMark.objects.select_for_update().filter(pk=self.pk).first()
+            result = super().delete(*args, **kwargs)
+            if current is not None and self.status_record_id:
+                self.status_record.apply_mark_transition(current.counter_state(), (False, False))
+        return result
 
 class ChecklistStatus(models.Model):
     """Instância da LV para um aluno/turma específica."""
@@ -182,6 +213,12 @@ class ChecklistStatus(models.Model):
         default=0,
         help_text=_('Automatically calculated percentage of completed items.')
     )
+    # Contadores desnormalizados: ajustados com F() em cada transição de marca
+    # (ChecklistMark.save) e recontados por checklists.services.counters.
+    total_items = models.PositiveIntegerField(_('total items'), default=0)
+    completed_items = models.PositiveIntegerField(_('completed items'), default=0)
+    validated_items = models.PositiveIntegerField(_('validated items'), default=0)
+    last_activity_at = models.DateTimeField(_('last activity'), null=True, blank=True)
     template_version = models.PositiveIntegerField(_('template version'), default=1)
     state = models.CharField(_('state'), max_length=20, choices=LVState.choices, default=LVState.DRAFT)
     student_notes = models.TextField(_('student notes'), blank=True)
@@ -199,23 +236,38 @@ class ChecklistStatus(models.Model):
     def __str__(self):
         return f"{self.student.username} - {self.template.name} ({self.student_class.name}) - {self.percent_complete:.0f}%"
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.total_items and self.template_id:
+            self.total_items = self.template.items.count()
+        super().save(*args, **kwargs)
+
+    def apply_mark_transition(self, before, after):
+        """Ajusta os contadores num só UPDATE com F() (sem recontar as marcas)."""
+        done_delta = int(after[0]) - int(before[0])
+        validated_delta = int(after[1]) - int(before[1])
+        now = timezone.now()
+        updates = {'last_activity_at': now, 'updated_at': now}
+        if done_delta:
+            updates['completed_items'] = models.F('completed_items') + done_delta
+            updates['percent_complete'] = models.Case(
+                models.When(total_items=0, then=models.Value(0.0)),
+                default=models.ExpressionWrapper(
+                    (models.F('completed_items') + done_delta) * 100.0 / models.F('total_items'),
+                    output_field=models.FloatField(),
+                ),
+            )
+        if validated_delta:
+            updates['validated_items'] = models.F('validated_items') + validated_delta
+        ChecklistStatus.objects.filter(pk=self.pk).update(**updates)
+
     def update_percent_complete(self):
-        """Recalculates the completion percentage based on marks."""
-        total_items = self.template.items.count()
-        if total_items == 0:
-            new_percent = 0
-        else:
-            # Count items marked as COMPLETED OR VALIDATED as 'done'
-            # Use related_name 'marks' from ChecklistMark.status_record
-            completed_or_validated_count = self.marks.filter(
-                models.Q(mark_status='COMPLETED') | models.Q(mark_status='VALIDATED')
-            ).count()
-            new_percent = (completed_or_validated_count / total_items) * 100
-        
-        # Only save if percentage actually changed to avoid unnecessary updates/signals
-        if self.percent_complete != new_percent:
-            self.percent_complete = new_percent
-            self.save(update_fields=['percent_complete', 'updated_at'])
+        """Full recount of the counters from the marks (normal saves adjust them incrementally)."""
+        from checklists.services.counters import recount_statuses
+
+        recount_statuses(ChecklistStatus.objects.filter(pk=self.pk))
+        self.refresh_from_db(
+            fields=['total_items', 'completed_items', 'validated_items', 'percent_complete', 'updated_at']
+        )
 
     def initialise_marks(self):
         existing_items = set(self.marks.values_list('item_id', flat=True))
@@ -236,3 +288,130 @@ class ChecklistStatus(models.Model):
         self.state = self.LVState.SUBMITTED
         self.submitted_at = timezone.now()
         self.save(update_fields=['state', 'submitted_at', 'updated_at'])
+
+
+class ChecklistItemMastery(models.Model):
+    """Índice invertido item → alunos da turma que já o concluíram (ajuda entre pares).
+
+    Mantido a partir de ``ChecklistMark`` (ver ``checklists.signals``); o comando
+    ``rebuild_peer_index`` reconstrói-o a partir das marcas existentes.
+    """
+    item = models.ForeignKey(ChecklistItem, on_delete=models.CASCADE, related_name='masteries')
+    student_class = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='checklist_masteries')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='checklist_masteries')
+    mark = models.OneToOneField(ChecklistMark, on_delete=models.CASCADE, related_name='mastery')
+    teacher_validated = models.BooleanField(_("teacher validated"), default=False)
+    achieved_at = models.DateTimeField(_("achieved at"), default=timezone.now)
+
+    class Meta:
+        verbose_name = _("Checklist Item Mastery")
+        verbose_name_plural = _("Checklist Item Masteries")
+        ordering = ['-teacher_validated', 'achieved_at']
+        indexes = [models.Index(fields=['item', 'student_class'], name='checklist_mastery_item_class')]
+
+    def __str__(self):
+        return f"{self.item_id} @ {self.student_class_id}: {self.student_id}"
+
+
+class ChecklistMarkEvent(models.Model):
+    """Histórico só de acrescento das mudanças de estado das marcas.
+
+    Escrito na mesma transação que a marca (``ChecklistMark.save`` e a marcação
+    em lote). Os eventos antigos são agregados em ``ChecklistMarkEventRollup``
+    pelo comando ``rollup_checklist_events``.
+    """
+
+    class Kind(models.TextChoices):
+        PROGRESS = 'progress', _('Progress')
+        COMPLETED = 'completed', _('Completed')
+        VALIDATED = 'validated', _('Validated')
+        REOPENED = 'reopened', _('Reopened')
+
+    mark = models.ForeignKey(ChecklistMark, on_delete=models.SET_NULL, null=True, blank=True, related_name='events')
+    item = models.ForeignKey(ChecklistItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='mark_events')
+    template = models.ForeignKey(ChecklistTemplate, on_delete=models.CASCADE, related_name='mark_events')
+    student_class = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='checklist_mark_events')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='checklist_mark_events')
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    kind = models.CharField(_('kind'), max_length=20, choices=Kind.choices)
+    from_status = models.CharField(_('from status'), max_length=20, blank=True)
+    to_status = models.CharField(_('to status'), max_length=20)
+    from_validated = models.BooleanField(_('was validated'), default=False)
+    to_validated = models.BooleanField(_('validated'), default=False)
+    created_at = models.DateTimeField(_('created at'), default=timezone.now)
+
+    class Meta:
+        verbose_name = _('Checklist Mark Event')
+        verbose_name_plural = _('Checklist Mark Events')
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['student_class', 'created_at'], name='checklist_event_class_time')]
+
+    def __str__(self):
+        return f"{self.student_id} {self.item_id}: {self.from_status or '-'} → {self.to_status} ({self.kind})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('ChecklistMarkEvent is append-only.')
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def classify(cls, before, after):
+        """Tipo da transição entre dois pares (mark_status, teacher_validated); None se nada mudou."""
+        before_status, before_validated = before[0] or 'NOT_STARTED', before[1] or before[0] == 'VALIDATED'
+        after_status, after_validated = after[0], after[1] or after[0] == 'VALIDATED'
+        if (before_status, before_validated) == (after_status, after_validated):
+            return None
+        before_done = before_status in DONE_MARK_STATUSES
+        after_done = after_status in DONE_MARK_STATUSES
+        if after_validated and not before_validated:
+            return cls.Kind.VALIDATED
+        if after_done and not before_done:
+            return cls.Kind.COMPLETED
+        if (before_done and not after_done) or (before_validated and not after_validated):
+            return cls.Kind.REOPENED
+        return cls.Kind.PROGRESS
+
+    @classmethod
+    def for_transition(cls, mark, previous, *, actor_id=None, at=None):
+        """Evento (por gravar) para a marca, ou None se o estado não mudou."""
+        kind = cls.classify(previous, (mark.mark_status, mark.teacher_validated))
+        if kind is None:
+            return None
+        status = mark.status_record
+        return cls(
+            mark_id=mark.pk,
+            item_id=mark.item_id,
+            template_id=status.template_id,
+            student_class_id=status.student_class_id,
+            student_id=status.student_id,
+            actor_id=actor_id,
+            kind=kind,
+            from_status=previous[0],
+            to_status=mark.mark_status,
+            from_validated=previous[1],
+            to_validated=mark.teacher_validated,
+            created_at=at or timezone.now(),
+        )
+
+
+class ChecklistMarkEventRollup(models.Model):
+    """Contagem diária de eventos já agregados e apagados de ``ChecklistMarkEvent``."""
+
+    template = models.ForeignKey(ChecklistTemplate, on_delete=models.CASCADE, related_name='mark_event_rollups')
+    student_class = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='checklist_mark_event_rollups')
+    day = models.DateField(_('day'))
+    kind = models.CharField(_('kind'), max_length=20, choices=ChecklistMarkEvent.Kind.choices)
+    count = models.PositiveIntegerField(_('count'), default=0)
+
+    class Meta:
+        verbose_name = _('Checklist Mark Event Rollup')
+        verbose_name_plural = _('Checklist Mark Event Rollups')
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student_class', 'template', 'day', 'kind'], name='unique_checklist_event_rollup'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.student_class_id} {self.day} {self.kind}: {self.count}"
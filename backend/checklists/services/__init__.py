@@ -0,0 +1,68 @@
+from checklists.services.analytics import AnalyticsScope, ChecklistAnalytics, data_version
+from checklists.services.counters import find_drift, recount_statuses
+from checklists.services.events import EVENT_BUCKETS, event_timeseries, rollup_events
+from checklists.services.grid import GRID_ENCODINGS, GRID_STATES, build_class_grid, payload_etag
+from checklists.services.importers import (
+    IMPORTERS,
+    CurriculumItem,
+    CurriculumTemplate,
+    ImportDiff,
+    import_curriculum,
+    read_curriculum,
+    register_importer,
+)
+from checklists.services.marks import BulkMarkResult, MarkChange, apply_mark_changes, notify_bulk_changes
+from checklists.services.peers import (
+    peer_helpers,
+    peer_helpers_for_items,
+    rebuild_peer_index,
+    record_mark,
+    sync_marks,
+)
+from checklists.services.provisioning import ProvisionResult, missing_statuses, provision_statuses
+from checklists.services.recommendations import (
+    NextObjectiveRecommender,
+    PrerequisiteIndex,
+    invalidate_next_objectives,
+)
+from checklists.services.templates import ItemSyncResult, refresh_template_statuses, sync_template_items
+
+__all__ = [
+    "AnalyticsScope",
+    "ChecklistAnalytics",
+    "CurriculumItem",
+    "CurriculumTemplate",
+    "EVENT_BUCKETS",
+    "GRID_ENCODINGS",
+    "GRID_STATES",
+    "IMPORTERS",
+    "ImportDiff",
+    "BulkMarkResult",
+    "ItemSyncResult",
+    "MarkChange",
+    "NextObjectiveRecommender",
+    "PrerequisiteIndex",
+    "ProvisionResult",
+    "apply_mark_changes",
+    "build_class_grid",
+    "data_version",
+    "event_timeseries",
+    "find_drift",
+    "import_curriculum",
+    "invalidate_next_objectives",
+    "missing_statuses",
+    "notify_bulk_changes",
+    "payload_etag",
+    "peer_helpers",
+    "peer_helpers_for_items",
+    "provision_statuses",
+    "rebuild_peer_index",
+    "recount_statuses",
+    "read_curriculum",
+    "record_mark",
+    "refresh_template_statuses",
+    "register_importer",
+    "rollup_events",
+    "sync_marks",
+    "sync_template_items",
+]
@@ -0,0 +1,220 @@
+"""Análise das checklists de um modelo por turma, ano ou escola inteira.
+
+As marcas do âmbito são lidas numa só consulta (``values_list``) e agregadas em
+vetores: mapa de calor item × turma, distribuição do tempo até concluir,
+objetivos encravados e comparação entre turmas. O resultado fica em cache com
+uma chave que inclui a versão dos dados (contadores das LV), por isso qualquer
+marca nova invalida-o sem ser preciso apagar nada.
+"""
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from checklists.services.recommendations import DONE_STATUSES
+
+DEFAULT_ANALYTICS_TTL = 6 * 3600
+ANALYTICS_CACHE_PREFIX = 'checklist-analytics'
+STUCK_AFTER_DAYS = 14
+DEFAULT_STUCK_LIMIT = 10
+PERCENTILES = (25, 50, 75, 90)
+
+
+@dataclass(frozen=True)
+class AnalyticsScope:
+    """Turma, ano (``Class.year``) ou escola inteira (sem filtros)."""
+
+    class_id: Optional[int] = None
+    year: Optional[int] = None
+
+    @property
+    def label(self) -> str:
+        if self.class_id is not None:
+            return f'class:{self.class_id}'
+        if self.year is not None:
+            return f'year:{self.year}'
+        return 'school'
+
+    def statuses(self, template_id: int):
+        from checklists.models import ChecklistStatus
+
+        queryset = ChecklistStatus.objects.filter(template_id=template_id)
+        if self.class_id is not None:
+            queryset = queryset.filter(student_class_id=self.class_id)
+        if self.year is not None:
+            queryset = queryset.filter(student_class__year=self.year)
+        return queryset.order_by()
+
+
+def data_version(template_id: int, scope: AnalyticsScope) -> str:
+    """Carimbo barato dos dados do âmbito, lido dos contadores desnormalizados das LV."""
+    stamp = scope.statuses(template_id).aggregate(
+        statuses=Count('id'),
+        activity=Max('last_activity_at'),
+        updated=Max('updated_at'),
+        total=Sum('total_items'),
+        completed=Sum('completed_items'),
+        validated=Sum('validated_items'),
+    )
+    raw = '|'.join(str(stamp[key]) for key in sorted(stamp))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _percentiles(values: np.ndarray) -> Dict[str, Any]:
+    if not len(values):
+        return {'count': 0, **{f'p{p}': None for p in PERCENTILES}}
+    points = np.percentile(values, PERCENTILES)
+    return {'count': len(values), **{f'p{p}': round(float(v), 1) for p, v in zip(PERCENTILES, points)}}
+
+
+def _positions(ids: np.ndarray, keys: Sequence[int]) -> np.ndarray:
+    """Posição de cada id na lista ``keys`` (-1 quando não está lá)."""
+    keys = np.asarray(keys, dtype=np.int64)
+    if not len(keys):
+        return np.full(len(ids), -1, dtype=np.int64)
+    order = np.argsort(keys)
+    found = np.clip(np.searchsorted(keys[order], ids), 0, len(keys) - 1)
+    return np.where(keys[order][found] == ids, order[found], -1)
+
+
+def _timestamps(values: Sequence[Any]) -> np.ndarray:
+    """Datas em segundos (``nan`` quando faltam), para comparar e subtrair em vetor."""
+    return np.fromiter((value.timestamp() if value else np.nan for value in values), dtype=float, count=len(values))
+
+
+def _rates(done: np.ndarray, total: np.ndarray) -> np.ndarray:
+    total = np.asarray(total, dtype=float)
+    return np.round(np.divide(done, total, out=np.zeros_like(total * done, dtype=float), where=total > 0), 3)
+
+
+class ChecklistAnalytics:
+    """Mapa de calor, tempos de conclusão, encravados e coortes para um modelo."""
+
+    def __init__(self, template, scope: Optional[AnalyticsScope] = None, *, stuck_limit: int = DEFAULT_STUCK_LIMIT):
+        self.template = template
+        self.scope = scope or AnalyticsScope()
+        self.stuck_limit = stuck_limit
+
+    def _cache_key(self, version: str) -> str:
+        return f'{ANALYTICS_CACHE_PREFIX}:{self.template.pk}:{self.scope.label}:{self.stuck_limit}:{version}'
+
+    def report(self, *, use_cache: bool = True) -> Dict[str, Any]:
+        version = data_version(self.template.pk, self.scope)
+        key = self._cache_key(version)
+        if use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        report = self.compute()
+        report['data_version'] = version
+        ttl = getattr(settings, 'CHECKLIST_ANALYTICS_TTL', DEFAULT_ANALYTICS_TTL)
+        cache.set(key, report, ttl)
+        return report
+
+    def compute(self) -> Dict[str, Any]:
+        from checklists.models import ChecklistItem, ChecklistMark
+
+        items = list(
+            ChecklistItem.objects.filter(template=self.template).order_by('order', 'code').values('id', 'code', 'text')
+        )
+        classes = list(
+            self.scope.statuses(self.template.pk)
+            .values('student_class_id', 'student_class__name', 'student_class__year')
+            .annotate(students=Count('id'))
+            .order_by('student_class__year', 'student_class__name')
+        )
+
+        marks = list(
+            ChecklistMark.objects.filter(status_record__in=self.scope.statuses(self.template.pk))
+            .values_list(
+                'status_record__student_class_id',
+                'item_id',
+                'mark_status',
+                'teacher_validated',
+                'marked_at',
+                'status_record__started_at',
+            )
+            .order_by()
+        )
+        class_ids, item_ids, mark_statuses, validated, marked_at, started_at = (
+            zip(*marks) if marks else ((),) * 6
+        )
+        rows = _positions(np.array(item_ids, dtype=np.int64), [item['id'] for item in items])
+        cols = _positions(np.array(class_ids, dtype=np.int64), [row['student_class_id'] for row in classes])
+        in_scope = (rows >= 0) & (cols >= 0)
+        statuses = np.array(mark_statuses, dtype=object)
+        is_done = in_scope & (np.isin(statuses, list(DONE_STATUSES)) | np.array(validated, dtype=bool))
+        in_progress_mask = in_scope & ~is_done & (statuses == 'IN_PROGRESS')
+        marked = _timestamps(marked_at)
+        days = np.maximum((marked - _timestamps(started_at)) / 86400, 0.0)
+        stuck_mask = in_progress_mask & (marked < (timezone.now() - timedelta(days=STUCK_AFTER_DAYS)).timestamp())
+
+        n_items, n_classes = len(items), len(classes)
+        done = np.bincount(
+            rows[is_done] * n_classes + cols[is_done], minlength=n_items * n_classes
+        ).reshape(n_items, n_classes)
+        in_progress = np.bincount(rows[in_progress_mask], minlength=n_items)
+        stuck = np.bincount(rows[stuck_mask], minlength=n_items)
+        students = np.array([row['students'] for row in classes], dtype=np.int64)
+        total_students = int(students.sum())
+
+        heatmap = _rates(done, students[None, :]).tolist()
+        item_rates = _rates(done.sum(axis=1), np.full(n_items, total_students)).tolist()
+        scope_rate = float(_rates(done.sum(), total_students * n_items))
+        class_rates = _rates(done.sum(axis=0), students * n_items).tolist()
+
+        cohorts = [
+            {
+                'class_id': row['student_class_id'],
+                'name': row['student_class__name'],
+                'year': row['student_class__year'],
+                'students': int(students[c]),
+                'completion_rate': class_rates[c],
+                'delta': round(class_rates[c] - scope_rate, 3),
+            }
+            for c, row in enumerate(classes)
+        ]
+
+        stuck_items = sorted(
+            (
+                {
+                    **items[i],
+                    'stuck': int(stuck[i]),
+                    'in_progress': int(in_progress[i]),
+                    'completion_rate': item_rates[i],
+                }
+                for i in np.flatnonzero(stuck)
+            ),
+            key=lambda entry: (-entry['stuck'], entry['completion_rate']),
+        )[: self.stuck_limit]
+
+        timed = is_done & ~np.isnan(days)
+        timed_rows, timed_days = rows[timed], days[timed]
+        item_times = {
+            items[i]['id']: _percentiles(timed_days[timed_rows == i]) for i in np.unique(timed_rows)
+        }
+
+        return {
+            'template_id': self.template.pk,
+            'scope': self.scope.label,
+            'generated_at': timezone.now().isoformat(),
+            'items': items,
+            'classes': cohorts,
+            'completion_rate': scope_rate,
+            'heatmap': heatmap,
+            'item_completion_rates': item_rates,
+            'time_to_completion_days': {
+                'overall': _percentiles(timed_days),
+                'items': item_times,
+            },
+            'stuck_objectives': stuck_items,
+            'stuck_after_days': STUCK_AFTER_DAYS,
+        }
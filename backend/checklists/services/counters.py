@@ -0,0 +1,81 @@
+"""Contadores desnormalizados da ``ChecklistStatus`` (recontagem e deteção de desvios).
+
+Em funcionamento normal os contadores são ajustados com ``F()`` por
+``ChecklistMark.save``/``delete``; aqui ficam as recontagens em conjunto, usadas
+quando os itens do modelo mudam ou para corrigir desvios.
+"""
+from __future__ import annotations
+
+from typing import Dict, List
+
+from django.db.models import Count, ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, NullIf
+
+from checklists.services.recommendations import DONE_STATUSES
+
+COUNTER_FIELDS = ('total_items', 'completed_items', 'validated_items')
+
+
+def _count_subquery(queryset, group_field: str, outer_field: str):
+    counted = (
+        queryset.filter(**{group_field: OuterRef(outer_field)})
+        .order_by()
+        .values(group_field)
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def actual_counts() -> Dict[str, object]:
+    """Expressões (subconsultas correlacionadas) com os valores reais de cada contador."""
+    from checklists.models import ChecklistItem, ChecklistMark
+
+    return {
+        'total_items': _count_subquery(ChecklistItem.objects.all(), 'template_id', 'template_id'),
+        'completed_items': _count_subquery(
+            ChecklistMark.objects.filter(mark_status__in=DONE_STATUSES), 'status_record_id', 'pk'
+        ),
+        'validated_items': _count_subquery(
+            ChecklistMark.objects.filter(Q(teacher_validated=True) | Q(mark_status='VALIDATED')),
+            'status_record_id',
+            'pk',
+        ),
+    }
+
+
+def recount_statuses(queryset, **extra) -> int:
+    """Reconta os contadores (e a percentagem) das LV do queryset num só UPDATE."""
+    counts = actual_counts()
+    # Numa UPDATE as colunas leem os valores anteriores, por isso a percentagem
+    # usa as mesmas subconsultas e não os contadores acabados de escrever.
+    percent = Coalesce(
+        ExpressionWrapper(
+            counts['completed_items'] * 100.0 / NullIf(counts['total_items'], 0),
+            output_field=FloatField(),
+        ),
+        Value(0.0),
+    )
+    return queryset.order_by().update(**counts, percent_complete=percent, **extra)
+
+
+def find_drift(queryset) -> List[Dict[str, object]]:
+    """LV cujos contadores guardados diferem dos valores reais."""
+    counts = {f'actual_{name}': expression for name, expression in actual_counts().items()}
+    mismatch = Q()
+    for name in COUNTER_FIELDS:
+        mismatch |= ~Q(**{name: F(f'actual_{name}')})
+    rows = (
+        queryset.annotate(**counts)
+        .filter(mismatch)
+        .order_by('pk')
+        .values('pk', *COUNTER_FIELDS, *counts)
+    )
+    return [
+        {
+            'status_id': row['pk'],
+            'stored': {name: row[name] for name in COUNTER_FIELDS},
+            'actual': {name: row[f'actual_{name}'] for name in COUNTER_FIELDS},
+        }
+        for row in rows
+    ]
@@ -0,0 +1,113 @@
+"""Séries temporais do histórico de marcas e agregação dos eventos antigos."""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Trunc, TruncDate
+from django.utils import timezone
+
+EVENT_BUCKETS = ('day', 'week')
+DEFAULT_EVENT_RETENTION_DAYS = 180
+
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def event_timeseries(
+    student_class,
+    *,
+    bucket: str = 'week',
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    template=None,
+) -> List[Dict[str, Any]]:
+    """Contagens por intervalo (dia/semana) e tipo de evento, agregadas na base de dados.
+
+    Junta os eventos ainda guardados com os totais diários já agregados, para que
+    a série não perca dias antigos depois de ``rollup_checklist_events``.
+    """
+    from checklists.models import ChecklistMarkEvent, ChecklistMarkEventRollup
+
+    if bucket not in EVENT_BUCKETS:
+        raise ValueError(f'Intervalo inválido: {bucket}')
+    events = ChecklistMarkEvent.objects.filter(student_class=student_class)
+    rollups = ChecklistMarkEventRollup.objects.filter(student_class=student_class)
+    if template is not None:
+        events = events.filter(template=template)
+        rollups = rollups.filter(template=template)
+    if since:
+        events = events.filter(created_at__date__gte=since)
+        rollups = rollups.filter(day__gte=since)
+    if until:
+        events = events.filter(created_at__date__lte=until)
+        rollups = rollups.filter(day__lte=until)
+
+    kinds = [kind for kind, _ in ChecklistMarkEvent.Kind.choices]
+    series: Dict[date, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(kinds, 0))
+    raw = (
+        events.annotate(bucket=Trunc('created_at', bucket))
+        .values('bucket', 'kind')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    rolled = (
+        rollups.annotate(bucket=Trunc('day', bucket))
+        .values('bucket', 'kind')
+        .annotate(total=Sum('count'))
+        .order_by()
+    )
+    for rows in (raw, rolled):
+        for row in rows:
+            series[_as_date(row['bucket'])][row['kind']] += row['total']
+    return [{'bucket': start, **counts} for start, counts in sorted(series.items())]
+
+
+@transaction.atomic
+def rollup_events(keep_days: Optional[int] = None) -> Tuple[int, int]:
+    """Agrega por dia os eventos com mais de ``keep_days`` dias e apaga-os.
+
+    Só entram dias completos, por isso cada dia é agregado uma única vez; se já
+    existir uma linha (corrida anterior com outra retenção) a contagem é somada.
+    Devolve ``(linhas de agregado escritas, eventos apagados)``.
+    """
+    from checklists.models import ChecklistMarkEvent, ChecklistMarkEventRollup
+
+    if keep_days is None:
+        keep_days = getattr(settings, 'CHECKLIST_EVENT_RETENTION_DAYS', DEFAULT_EVENT_RETENTION_DAYS)
+    cutoff = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=keep_days)
+    old = ChecklistMarkEvent.objects.filter(created_at__lt=cutoff)
+    totals = {
+        (row['student_class_id'], row['template_id'], row['day'], row['kind']): row['total']
+        for row in old.annotate(day=TruncDate('created_at'))
+        .values('student_class_id', 'template_id', 'day', 'kind')
+        .annotate(total=Count('id'))
+        .order_by()
+    }
+    if not totals:
+        return 0, 0
+
+    existing = {
+        (row.student_class_id, row.template_id, row.day, row.kind): row
+        for row in ChecklistMarkEventRollup.objects.filter(day__in={key[2] for key in totals})
+    }
+    to_create, to_update = [], []
+    for key, total in totals.items():
+        row = existing.get(key)
+        if row is None:
+            class_id, template_id, day, kind = key
+            to_create.append(ChecklistMarkEventRollup(
+                student_class_id=class_id, template_id=template_id, day=day, kind=kind, count=total
+            ))
+        else:
+            row.count += total
+            to_update.append(row)
+    ChecklistMarkEventRollup.objects.bulk_create(to_create, batch_size=1000)
+    ChecklistMarkEventRollup.objects.bulk_update(to_update, ['count'], batch_size=1000)
+    deleted, _ = old.delete()
+    return len(to_create) + len(to_update), deleted
@@ -0,0 +1,102 @@
+"""Grelha turma × objetivos em formato colunar (itens e alunos uma vez, estados densos).
+
+Em vez de repetir o modelo, os itens e o utilizador em cada LV, devolve-se a
+lista de itens, a lista de alunos e, por aluno, uma linha de códigos de estado
+(ver ``GRID_STATES``) na ordem dos itens. Construída em duas consultas.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Dict, List
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import FilteredRelation, Q
+
+# Índice = código na grelha.
+GRID_STATES = ('NOT_STARTED', 'IN_PROGRESS', 'COMPLETED', 'VALIDATED')
+GRID_ENCODINGS = ('dense', 'rle')
+
+_CODES = {state: index for index, state in enumerate(GRID_STATES)}
+
+
+def _state_code(mark_status: str, teacher_validated: bool) -> int:
+    if teacher_validated or mark_status == 'VALIDATED':
+        return _CODES['VALIDATED']
+    return _CODES.get(mark_status, 0)
+
+
+def _run_length(row: List[int]) -> List[int]:
+    """``[estado, repetições, estado, repetições, ...]``."""
+    encoded: List[int] = []
+    for code in row:
+        if encoded and encoded[-2] == code:
+            encoded[-1] += 1
+        else:
+            encoded.extend((code, 1))
+    return encoded
+
+
+def build_class_grid(turma, template, *, encoding: str = 'dense') -> Dict[str, Any]:
+    from checklists.models import ChecklistItem
+
+    items = list(
+        ChecklistItem.objects.filter(template=template)
+        .order_by('order', 'code')
+        .values('id', 'code', 'text', 'order')
+    )
+    column = {item['id']: index for index, item in enumerate(items)}
+
+    # Uma linha por (aluno, marca); alunos sem LV ou sem marcas aparecem com nulos.
+    rows = (
+        get_user_model()
+        .objects.filter(classes_attended=turma)
+        .annotate(lv=FilteredRelation('checklist_statuses', condition=Q(
+            checklist_statuses__template=template,
+            checklist_statuses__student_class=turma,
+        )))
+        .order_by('first_name', 'last_name', 'id')
+        .values_list(
+            'id',
+            'first_name',
+            'last_name',
+            'username',
+            'lv__percent_complete',
+            'lv__marks__item_id',
+            'lv__marks__mark_status',
+            'lv__marks__teacher_validated',
+        )
+    )
+    students: List[Dict[str, Any]] = []
+    cells: List[List[int]] = []
+    for student_id, first_name, last_name, username, percent, item_id, mark_status, validated in rows:
+        if not students or students[-1]['id'] != student_id:
+            students.append({
+                'id': student_id,
+                'name': f'{first_name} {last_name}'.strip() or username,
+                'percent_complete': round(percent or 0, 1),
+            })
+            cells.append([0] * len(items))
+        if item_id in column:
+            cells[-1][column[item_id]] = _state_code(mark_status, validated)
+
+    if encoding == 'rle':
+        encoded = [_run_length(row) for row in cells]
+    else:
+        encoded = [''.join(map(str, row)) for row in cells]
+    return {
+        'class_id': turma.id,
+        'template_id': template.id,
+        'template_version': template.version,
+        'states': list(GRID_STATES),
+        'encoding': encoding,
+        'items': items,
+        'students': students,
+        'cells': encoded,
+    }
+
+
+def payload_etag(payload: Any) -> str:
+    body = json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return '"%s"' % hashlib.sha1(body.encode('utf-8')).hexdigest()
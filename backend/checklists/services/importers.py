@@ -0,0 +1,167 @@
+"""Importação de listas de verificação curriculares (Markdown e SpreadsheetML).
+
+Cada formato é um leitor que percorre o ficheiro em streaming (linha a linha ou
+com ``iterparse``) e produz ``CurriculumItem``; a gravação é comum: um
+``bulk_create(update_conflicts=True)`` por modelo, com o código do item como
+chave natural, o que torna as reimportações idempotentes.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+from xml.etree.ElementTree import iterparse
+
+from django.db import transaction
+
+from checklists.services.templates import refresh_template_statuses
+
+OBJECTIVE_LINE_PATTERN = re.compile(r'^([A-Z]+\d+)\.\s*(.+)$')
+# Restos de citações deixados por ferramentas de conversão ("citeturn0file0",
+# por vezes entre caracteres de uso privado).
+CITATION_ARTIFACT = re.compile(r'\s*[-]*cite[-]*turn\d+\w*[-]*')
+
+SPREADSHEET_NS = '{urn:schemas-microsoft-com:office:spreadsheet}'
+
+IMPORTERS: Dict[str, Callable[[Path], Iterator['CurriculumItem']]] = {}
+
+
+@dataclass(frozen=True)
+class CurriculumItem:
+    code: str
+    text: str
+
+
+@dataclass
+class CurriculumTemplate:
+    """Forma intermédia comum a todos os formatos."""
+
+    name: str
+    description: str = ''
+    items: List[CurriculumItem] = field(default_factory=list)
+
+
+@dataclass
+class ImportDiff:
+    template: str
+    template_created: bool = False
+    created: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    missing: List[str] = field(default_factory=list)
+    marks_created: int = 0
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.template_created or self.created or self.updated)
+
+
+def register_importer(*suffixes: str):
+    """Regista um leitor para as extensões indicadas (ex.: ``'.md'``)."""
+
+    def decorator(reader):
+        for suffix in suffixes:
+            IMPORTERS[suffix.lower()] = reader
+        return reader
+
+    return decorator
+
+
+def parse_objective(line: str) -> Optional[CurriculumItem]:
+    match = OBJECTIVE_LINE_PATTERN.match(line.strip())
+    if not match:
+        return None
+    text = CITATION_ARTIFACT.sub('', match.group(2)).strip()
+    return CurriculumItem(code=match.group(1), text=text) if text else None
+
+
+@register_importer('.md', '.markdown', '.txt')
+def read_markdown(path: Path) -> Iterator[CurriculumItem]:
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            item = parse_objective(line)
+            if item:
+                yield item
+
+
+@register_importer('.xml')
+def read_spreadsheet_xml(path: Path) -> Iterator[CurriculumItem]:
+    """Folha Excel 2003 (SpreadsheetML): o objetivo está na primeira célula de cada linha."""
+    for _, element in iterparse(path, events=('end',)):
+        if element.tag != f'{SPREADSHEET_NS}Row':
+            continue
+        data = element.find(f'{SPREADSHEET_NS}Cell/{SPREADSHEET_NS}Data')
+        if data is not None and data.text:
+            item = parse_objective(data.text)
+            if item:
+                yield item
+        element.clear()
+
+
+def read_curriculum(path, name: str, description: str = '') -> CurriculumTemplate:
+    path = Path(path)
+    reader = IMPORTERS.get(path.suffix.lower())
+    if reader is None:
+        raise ValueError(f'Formato não suportado: {path.suffix or path.name}')
+    # Código repetido no mesmo ficheiro: fica a posição da primeira ocorrência e o texto da última.
+    items: Dict[str, CurriculumItem] = {}
+    for item in reader(path):
+        items[item.code] = item
+    return CurriculumTemplate(name=name, description=description, items=list(items.values()))
+
+
+@transaction.atomic
+def import_curriculum(curriculum: CurriculumTemplate, *, dry_run: bool = False) -> ImportDiff:
+    """Cria/atualiza o modelo e os itens; com ``dry_run`` só calcula a diferença.
+
+    Itens que existem na base de dados mas não no ficheiro não são apagados
+    (podem ter marcas): ficam listados em ``missing``.
+    """
+    from checklists.models import ChecklistItem, ChecklistTemplate
+
+    diff = ImportDiff(template=curriculum.name)
+    template = ChecklistTemplate.objects.filter(name=curriculum.name).order_by('-version').first()
+    existing = {}
+    if template is not None:
+        existing = {code: (text, order) for code, text, order in template.items.values_list('code', 'text', 'order')}
+    incoming = {item.code for item in curriculum.items}
+    for order, item in enumerate(curriculum.items, start=1):
+        current = existing.get(item.code)
+        if current is None:
+            diff.created.append(item.code)
+        elif current != (item.text, order):
+            diff.updated.append(item.code)
+        else:
+            diff.unchanged += 1
+    diff.missing = sorted(code for code in existing if code not in incoming)
+    diff.template_created = template is None
+
+    description_changed = bool(
+        template and curriculum.description and curriculum.description != template.description
+    )
+    if dry_run or not (diff.has_changes or description_changed):
+        return diff
+
+    if template is None:
+        template = ChecklistTemplate.objects.create(name=curriculum.name, description=curriculum.description)
+    elif description_changed:
+        template.description = curriculum.description
+        template.save(update_fields=['description', 'updated_at'])
+
+    changed = set(diff.created) | set(diff.updated)
+    ChecklistItem.objects.bulk_create(
+        [
+            ChecklistItem(template=template, code=item.code, text=item.text, order=order)
+            for order, item in enumerate(curriculum.items, start=1)
+            if item.code in changed
+        ],
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['template', 'code'],
+        update_fields=['text', 'order'],
+    )
+    if diff.created:
+        new_ids = template.items.filter(code__in=diff.created).values_list('id', flat=True)
+        diff.marks_created = refresh_template_statuses(template, new_ids)
+    return diff
@@ -0,0 +1,212 @@
+"""Aplicação de várias marcas de uma vez (uma transação, uma recontagem por conjunto)."""
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from checklists.services.counters import COUNTER_FIELDS, recount_statuses
+from checklists.services.peers import sync_marks
+from checklists.services.recommendations import invalidate_next_objectives
+from core.notifications import dispatch_notification
+
+
+@dataclass
+class MarkChange:
+    status: object  # ChecklistStatus
+    item_id: int
+    mark_status: str
+    comment: Optional[str] = None
+
+
+@dataclass
+class BulkMarkResult:
+    created: List = field(default_factory=list)
+    updated: List = field(default_factory=list)
+    unchanged: int = 0
+    statuses: List = field(default_factory=list)
+
+    @property
+    def changed(self) -> List:
+        return self.created + self.updated
+
+
+def _apply(mark, change: MarkChange, *, actor, as_teacher: bool, now) -> bool:
+    """Replica as regras de ``ChecklistMark.save`` e das vistas; devolve se algo mudou."""
+    mark_status = change.mark_status
+    teacher_validated = mark.teacher_validated
+    if as_teacher:
+        # VALIDATED é normalizado para COMPLETED + validação do professor.
+        if mark_status == 'VALIDATED':
+            mark_status = 'COMPLETED'
+        teacher_validated = mark_status == 'COMPLETED'
+    elif mark.mark_status == 'COMPLETED' and mark_status != 'COMPLETED':
+        teacher_validated = False
+    if mark_status != 'COMPLETED':
+        teacher_validated = False
+    comment = mark.comment if change.comment is None else change.comment
+
+    if (mark_status, comment, teacher_validated) == (mark.mark_status, mark.comment, mark.teacher_validated):
+        return False
+    if mark.pk is None or mark_status != mark.mark_status or comment != mark.comment:
+        mark.marked_at = now
+    mark.mark_status = mark_status
+    mark.comment = comment
+    mark.teacher_validated = teacher_validated
+    mark.marked_by = actor
+    return True
+
+
+def _refresh_counters(statuses: Iterable, now) -> None:
+    from checklists.models import ChecklistStatus
+
+    statuses = {status.pk: status for status in statuses}
+    # bulk_update não passa por ChecklistMark.save: reconta-se uma vez por conjunto.
+    recount_statuses(ChecklistStatus.objects.filter(pk__in=statuses), last_activity_at=now, updated_at=now)
+    fields = ('percent_complete', *COUNTER_FIELDS)
+    for row in ChecklistStatus.objects.filter(pk__in=statuses).order_by().values('pk', *fields):
+        status = statuses[row['pk']]
+        for name in fields:
+            setattr(status, name, row[name])
+        status.last_activity_at = status.updated_at = now
+
+
+@transaction.atomic
+def apply_mark_changes(changes: List[MarkChange], *, actor, as_teacher: bool) -> BulkMarkResult:
+    """Aplica N alterações de marcas com ``bulk_create``/``bulk_update``.
+
+    Os efeitos que ``ChecklistMark.save`` e os sinais tratariam marca a marca
+    (contadores da LV, índice de pares, histórico de eventos, cache de
+    recomendações) são feitos uma única vez para o conjunto.
+    """
+    from checklists.models import ChecklistMark, ChecklistMarkEvent
+
+    result = BulkMarkResult()
+    if not changes:
+        return result
+    statuses = {change.status.pk: change.status for change in changes}
+    existing = {}
+    for mark in ChecklistMark.objects.filter(
+        status_record_id__in=statuses,
+        item_id__in={change.item_id for change in changes},
+    ).order_by():
+        mark.status_record = statuses[mark.status_record_id]
+        existing[(mark.status_record_id, mark.item_id)] = mark
+    previous = {key: (mark.mark_status, mark.teacher_validated) for key, mark in existing.items()}
+    now = timezone.now()
+    to_create: Dict[tuple, ChecklistMark] = {}
+    to_update: Dict[int, ChecklistMark] = {}
+    for change in changes:
+        key = (change.status.pk, change.item_id)
+        mark = existing.get(key) or to_create.get(key)
+        if mark is None:
+            mark = ChecklistMark(status_record=change.status, item_id=change.item_id, comment='')
+        if not _apply(mark, change, actor=actor, as_teacher=as_teacher, now=now):
+            result.unchanged += 1
+            continue
+        if mark.pk is None:
+            to_create[key] = mark
+        else:
+            to_update[mark.pk] = mark
+
+    if to_update:
+        ChecklistMark.objects.bulk_update(
+            to_update.values(), ['mark_status', 'comment', 'teacher_validated', 'marked_by', 'marked_at']
+        )
+    if to_create:
+        ChecklistMark.objects.bulk_create(to_create.values())
+    result.created = list(to_create.values())
+    result.updated = list(to_update.values())
+
+    touched = {mark.status_record_id for mark in result.changed}
+    result.statuses = [statuses[status_id] for status_id in touched]
+    if result.statuses:
+        _refresh_counters(result.statuses, now)
+        sync_marks(result.changed)
+        events = [
+            ChecklistMarkEvent.for_transition(
+                mark, previous.get((mark.status_record_id, mark.item_id), ('', False)), actor_id=actor.pk, at=now
+            )
+            for mark in result.changed
+        ]
+        ChecklistMarkEvent.objects.bulk_create([event for event in events if event], batch_size=1000)
+        invalidate_next_objectives(status.student_id for status in result.statuses)
+    return result
+
+
+def _marks_summary(marks) -> str:
+    return '\n'.join(f'- {mark.item.code or mark.item.text}: {mark.get_mark_status_display()}' for mark in marks)
+
+
+def notify_bulk_changes(request, result: BulkMarkResult, *, as_teacher: bool) -> None:
+    """Uma notificação por LV alterada, em vez de uma por marca."""
+    by_status = defaultdict(list)
+    for mark in result.changed:
+        by_status[mark.status_record_id].append(mark)
+    if not by_status:
+        return
+    from checklists.models import ChecklistMark
+
+    marks = {
+        mark.pk: mark
+        for mark in ChecklistMark.objects.filter(pk__in=[mark.pk for mark in result.changed]).select_related('item').order_by()
+    }
+    for status in result.statuses:
+        changed = sorted((marks[mark.pk] for mark in by_status[status.pk]), key=lambda mark: mark.item.order)
+        if as_teacher:
+            _notify_student(request, status, changed)
+        else:
+            _notify_teachers(request, status, changed)
+
+
+def _notify_teachers(request, status, marks) -> None:
+    recipients = [teacher.email for teacher in status.student_class.teachers.all() if teacher.email]
+    if not recipients:
+        return
+    student_name = status.student.get_full_name() or status.student.username
+    turma_url = request.build_absolute_uri(
+        reverse('checklists:checklist_turma', args=[status.student_class_id, status.template_id])
+    )
+    dispatch_notification(
+        subject=_('[Infantinho] {student} atualizou {template}').format(
+            student=student_name, template=status.template.name
+        ),
+        message=_('O aluno {student} atualizou {count} objetivos:\n{marks}\n\nConsultar progresso da turma: {url}').format(
+            student=student_name, count=len(marks), marks=_marks_summary(marks), url=turma_url
+        ),
+        recipients=recipients,
+        category='checklist_student_update',
+        metadata={
+            'class_id': status.student_class_id,
+            'template_id': status.template_id,
+            'student_id': status.student_id,
+            'item_ids': [mark.item_id for mark in marks],
+        },
+    )
+
+
+def _notify_student(request, status, marks) -> None:
+    if not status.student.email:
+        return
+    teacher_name = request.user.get_full_name() or request.user.username
+    detail_url = request.build_absolute_uri(reverse('checklists:checklist_detail', args=[status.template_id]))
+    dispatch_notification(
+        subject=_('[Infantinho] O professor atualizou {template}').format(template=status.template.name),
+        message=_('O professor {teacher} atualizou {count} objetivos:\n{marks}\n\nRevê a tua checklist: {url}').format(
+            teacher=teacher_name, count=len(marks), marks=_marks_summary(marks), url=detail_url
+        ),
+        recipients=[status.student.email],
+        category='checklist_teacher_update',
+        metadata={
+            'class_id': status.student_class_id,
+            'template_id': status.template_id,
+            'student_id': status.student_id,
+            'item_ids': [mark.item_id for mark in marks],
+            'marked_by': request.user.id,
+        },
+    )
@@ -0,0 +1,150 @@
+"""Índice de colegas que já dominam cada objetivo (tutoria entre pares no MEM)."""
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Q
+
+from checklists.services.recommendations import DONE_STATUSES
+
+DEFAULT_PEER_HELPERS_LIMIT = 5
+
+
+def _is_mastered(mark_status: str, teacher_validated: bool) -> bool:
+    return mark_status in DONE_STATUSES or teacher_validated
+
+
+def record_mark(mark) -> None:
+    """Atualiza o índice para uma marca acabada de gravar (chamado em ``post_save``)."""
+    from checklists.models import ChecklistItemMastery
+
+    if not _is_mastered(mark.mark_status, mark.teacher_validated):
+        ChecklistItemMastery.objects.filter(mark_id=mark.pk).delete()
+        return
+    status = mark.status_record
+    ChecklistItemMastery.objects.update_or_create(
+        mark_id=mark.pk,
+        defaults={
+            'item_id': mark.item_id,
+            'student_class_id': status.student_class_id,
+            'student_id': status.student_id,
+            'teacher_validated': mark.teacher_validated or mark.mark_status == 'VALIDATED',
+            'achieved_at': mark.marked_at,
+        },
+    )
+
+
+def sync_marks(marks) -> None:
+    """Versão em lote de ``record_mark`` para marcas gravadas com ``bulk_update``/``bulk_create``."""
+    from checklists.models import ChecklistItemMastery
+
+    marks = list(marks)
+    ChecklistItemMastery.objects.filter(mark_id__in=[mark.pk for mark in marks]).delete()
+    ChecklistItemMastery.objects.bulk_create(
+        [
+            ChecklistItemMastery(
+                mark_id=mark.pk,
+                item_id=mark.item_id,
+                student_class_id=mark.status_record.student_class_id,
+                student_id=mark.status_record.student_id,
+                teacher_validated=mark.teacher_validated or mark.mark_status == 'VALIDATED',
+                achieved_at=mark.marked_at,
+            )
+            for mark in marks
+            if _is_mastered(mark.mark_status, mark.teacher_validated)
+        ]
+    )
+
+
+def _helper_entry(row: Dict[str, Any]) -> Dict[str, Any]:
+    full_name = f"{row['student__first_name']} {row['student__last_name']}".strip()
+    return {
+        'student_id': row['student_id'],
+        'name': full_name or row['student__username'],
+        'teacher_validated': row['teacher_validated'],
+        'achieved_at': row['achieved_at'],
+    }
+
+
+_HELPER_FIELDS = (
+    'item_id',
+    'student_id',
+    'student__first_name',
+    'student__last_name',
+    'student__username',
+    'teacher_validated',
+    'achieved_at',
+)
+
+
+def peer_helpers(
+    item_id: int,
+    student_class,
+    *,
+    exclude_student=None,
+    limit: Optional[int] = DEFAULT_PEER_HELPERS_LIMIT,
+) -> List[Dict[str, Any]]:
+    """Colegas da turma que concluíram o item; os validados pelo professor primeiro."""
+    return peer_helpers_for_items([item_id], student_class, exclude_student=exclude_student, limit=limit).get(
+        item_id, []
+    )
+
+
+def peer_helpers_for_items(
+    item_ids: Iterable[int],
+    student_class,
+    *,
+    exclude_student=None,
+    limit: Optional[int] = DEFAULT_PEER_HELPERS_LIMIT,
+) -> Dict[int, List[Dict[str, Any]]]:
+    """Vários itens numa só consulta indexada (item, turma)."""
+    from checklists.models import ChecklistItemMastery
+
+    rows = ChecklistItemMastery.objects.filter(
+        item_id__in=list(item_ids),
+        student_class_id=getattr(student_class, 'pk', student_class),
+    )
+    if exclude_student is not None:
+        rows = rows.exclude(student_id=getattr(exclude_student, 'pk', exclude_student))
+    helpers: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for row in rows.values(*_HELPER_FIELDS).order_by('-teacher_validated', 'achieved_at'):
+        entries = helpers[row['item_id']]
+        if limit is None or len(entries) < limit:
+            entries.append(_helper_entry(row))
+    return dict(helpers)
+
+
+@transaction.atomic
+def rebuild_peer_index(classes=None) -> int:
+    """Reconstrói o índice a partir das marcas (todas as turmas ou só as indicadas)."""
+    from checklists.models import ChecklistItemMastery, ChecklistMark
+
+    existing = ChecklistItemMastery.objects.all()
+    marks = ChecklistMark.objects.filter(Q(mark_status__in=DONE_STATUSES) | Q(teacher_validated=True))
+    if classes is not None:
+        existing = existing.filter(student_class__in=classes)
+        marks = marks.filter(status_record__student_class__in=classes)
+    existing.delete()
+    rows = [
+        ChecklistItemMastery(
+            mark_id=mark_id,
+            item_id=item_id,
+            student_class_id=class_id,
+            student_id=student_id,
+            teacher_validated=validated or mark_status == 'VALIDATED',
+            achieved_at=marked_at,
+        )
+        for mark_id, item_id, class_id, student_id, mark_status, validated, marked_at in marks.values_list(
+            'id',
+            'item_id',
+            'status_record__student_class_id',
+            'status_record__student_id',
+            'mark_status',
+            'teacher_validated',
+            'marked_at',
+        ).iterator(chunk_size=2000)
+    ]
+    ChecklistItemMastery.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
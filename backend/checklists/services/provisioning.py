@@ -0,0 +1,130 @@
+"""Criação em bloco das LV quando muda a composição das turmas ou os modelos atribuídos."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef
+
+from checklists.services.recommendations import invalidate_next_objectives
+
+
+@dataclass
+class ProvisionResult:
+    """Linhas efetivamente inseridas, contadas antes e depois de cada inserção.
+
+    Com ``ignore_conflicts`` o ``bulk_create`` devolve todos os objetos, incluindo
+    os ignorados; o que um pedido concorrente já tinha inserido não entra aqui.
+    """
+
+    statuses_created: int = 0
+    marks_created: int = 0
+
+
+def missing_statuses(
+    class_ids: Iterable[int],
+    *,
+    student_ids: Optional[Iterable[int]] = None,
+    template_ids: Optional[Iterable[int]] = None,
+):
+    """Triplos ``(turma, aluno, modelo)`` sem LV, calculados numa só consulta.
+
+    Parte das inscrições dos alunos (``Class.students``) cruzadas com os modelos
+    atribuídos à turma (``ChecklistTemplate.classes``) e exclui as LV existentes.
+    """
+    from checklists.models import ChecklistStatus
+    from classes.models import Class
+
+    memberships = Class.students.through.objects.filter(class_id__in=list(class_ids), user__role='aluno')
+    if student_ids is not None:
+        memberships = memberships.filter(user_id__in=list(student_ids))
+    memberships = memberships.annotate(template_id=F('class__checklist_templates')).filter(template_id__isnull=False)
+    if template_ids is not None:
+        memberships = memberships.filter(template_id__in=list(template_ids))
+    existing = ChecklistStatus.objects.filter(
+        student_class_id=OuterRef('class_id'),
+        student_id=OuterRef('user_id'),
+        template_id=OuterRef('template_id'),
+    )
+    return memberships.exclude(Exists(existing)).values_list('class_id', 'user_id', 'template_id').order_by()
+
+
+@transaction.atomic
+def provision_statuses(
+    class_ids: Iterable[int],
+    *,
+    student_ids: Optional[Iterable[int]] = None,
+    template_ids: Optional[Iterable[int]] = None,
+) -> ProvisionResult:
+    """Cria as LV em falta e as respetivas marcas ``NOT_STARTED`` com ``bulk_create``.
+
+    Substitui o ``get_or_create`` por aluno × modelo: uma consulta para os pares
+    em falta, outra para os itens dos modelos envolvidos e duas inserções em
+    bloco (``ignore_conflicts`` protege de pedidos concorrentes), mais as
+    contagens antes e depois de cada inserção para o ``ProvisionResult``. Os contadores
+    nascem já certos (``total_items`` do modelo, nada concluído).
+    """
+    from checklists.models import ChecklistItem, ChecklistMark, ChecklistStatus, ChecklistTemplate
+
+    missing = set(missing_statuses(class_ids, student_ids=student_ids, template_ids=template_ids))
+    if not missing:
+        return ProvisionResult()
+
+    templates = {
+        row['id']: row
+        for row in ChecklistTemplate.objects.filter(id__in={template_id for _, _, template_id in missing})
+        .annotate(item_count=Count('items'))
+        .values('id', 'version', 'item_count')
+        .order_by()
+    }
+    # Com ignore_conflicts não há ids devolvidos: relêem-se as LV dos pares em falta.
+    def present_statuses():
+        return [
+            (status_id, template_id)
+            for status_id, class_id, student_id, template_id in ChecklistStatus.objects.filter(
+                student_class_id__in={class_id for class_id, _, _ in missing},
+                student_id__in={student_id for _, student_id, _ in missing},
+                template_id__in=templates,
+            )
+            .order_by()
+            .values_list('id', 'student_class_id', 'student_id', 'template_id')
+            if (class_id, student_id, template_id) in missing
+        ]
+
+    statuses_before = len(present_statuses())
+    ChecklistStatus.objects.bulk_create(
+        [
+            ChecklistStatus(
+                student_class_id=class_id,
+                student_id=student_id,
+                template_id=template_id,
+                template_version=templates[template_id]['version'],
+                total_items=templates[template_id]['item_count'],
+            )
+            for class_id, student_id, template_id in missing
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+    created = present_statuses()
+    status_marks = ChecklistMark.objects.filter(status_record_id__in=[status_id for status_id, _ in created])
+    marks_before = status_marks.count()
+    items_by_template = {}
+    for item_id, template_id in ChecklistItem.objects.filter(template_id__in=templates).values_list('id', 'template_id'):
+        items_by_template.setdefault(template_id, []).append(item_id)
+    ChecklistMark.objects.bulk_create(
+        [
+            ChecklistMark(status_record_id=status_id, item_id=item_id, mark_status='NOT_STARTED')
+            for status_id, template_id in created
+            for item_id in items_by_template.get(template_id, ())
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    invalidate_next_objectives({student_id for _, student_id, _ in missing})
+    return ProvisionResult(
+        statuses_created=len(created) - statuses_before,
+        marks_created=status_marks.count() - marks_before,
+    )
@@ -0,0 +1,224 @@
+"""Recomendação dos próximos objetivos de cada aluno a partir das checklists.
+
+As dependências entre itens não estão escritas em lado nenhum: são inferidas da
+ordem em que os alunos (de todas as turmas) foram concluindo os itens de cada
+modelo. Se quase todos os alunos que concluíram B concluíram A antes, A é
+tratado como pré-requisito de B.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+DONE_STATUSES = ('COMPLETED', 'VALIDATED')
+
+# Um par A→B só conta como pré-requisito com pelo menos N alunos e C de confiança.
+PREREQUISITE_MIN_SUPPORT = 3
+PREREQUISITE_MIN_CONFIDENCE = 0.8
+
+DEFAULT_PREREQUISITE_INDEX_TTL = 6 * 3600
+DEFAULT_NEXT_OBJECTIVES_TTL = 24 * 3600
+DEFAULT_NEXT_OBJECTIVES_LIMIT = 5
+
+INDEX_CACHE_PREFIX = 'checklist-prereq-index'
+NEXT_OBJECTIVES_CACHE_PREFIX = 'checklist-next-objectives'
+
+
+def _done_filter(prefix: str = '') -> Q:
+    return Q(**{f'{prefix}mark_status__in': DONE_STATUSES}) | Q(**{f'{prefix}teacher_validated': True})
+
+
+@dataclass
+class PrerequisiteIndex:
+    template_id: int
+    sequences: int = 0
+    prerequisites: Dict[int, List[int]] = field(default_factory=dict)
+    completed: Dict[int, int] = field(default_factory=dict)
+    mean_position: Dict[int, float] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, template_id: int) -> 'PrerequisiteIndex':
+        """Estatísticas de precedência de um modelo, lidas numa só consulta."""
+        from checklists.models import ChecklistMark
+
+        rows = (
+            ChecklistMark.objects.filter(item__template_id=template_id)
+            .filter(_done_filter())
+            .values_list('status_record_id', 'item_id', 'marked_at')
+            .order_by('status_record_id', 'marked_at', 'item_id')
+        )
+        sequences: Dict[int, List[tuple]] = defaultdict(list)
+        for status_id, item_id, marked_at in rows:
+            sequences[status_id].append((item_id, marked_at))
+
+        before: Dict[tuple, int] = defaultdict(int)
+        completed: Dict[int, int] = defaultdict(int)
+        position_sum: Dict[int, float] = defaultdict(float)
+        for sequence in sequences.values():
+            last = max(len(sequence) - 1, 1)
+            for index, (item_id, marked_at) in enumerate(sequence):
+                completed[item_id] += 1
+                position_sum[item_id] += index / last
+                for later_id, later_at in sequence[index + 1:]:
+                    # Itens marcados no mesmo instante (marcação em lote) não dizem nada sobre a ordem.
+                    if later_at > marked_at:
+                        before[(item_id, later_id)] += 1
+
+        prerequisites: Dict[int, List[int]] = defaultdict(list)
+        for (first, then), count in before.items():
+            if (
+                count >= PREREQUISITE_MIN_SUPPORT
+                and count / completed[then] >= PREREQUISITE_MIN_CONFIDENCE
+                and count > before.get((then, first), 0)
+            ):
+                prerequisites[then].append(first)
+
+        return cls(
+            template_id=template_id,
+            sequences=len(sequences),
+            prerequisites={item: sorted(reqs) for item, reqs in prerequisites.items()},
+            completed=dict(completed),
+            mean_position={item: position_sum[item] / completed[item] for item in completed},
+        )
+
+    @classmethod
+    def get(cls, template_id: int) -> 'PrerequisiteIndex':
+        key = f'{INDEX_CACHE_PREFIX}:{template_id}'
+        index = cache.get(key)
+        if index is None:
+            index = cls.build(template_id)
+            ttl = getattr(settings, 'CHECKLIST_PREREQUISITE_INDEX_TTL', DEFAULT_PREREQUISITE_INDEX_TTL)
+            cache.set(key, index, timeout=ttl)
+        return index
+
+
+def _student_key(student_id: int) -> str:
+    return f'{NEXT_OBJECTIVES_CACHE_PREFIX}:{student_id}'
+
+
+def invalidate_next_objectives(student_ids: Iterable[int]) -> None:
+    """Descarta as recomendações em cache (chamar sempre que as marcas mudam)."""
+    cache.delete_many([_student_key(student_id) for student_id in set(student_ids)])
+
+
+class NextObjectiveRecommender:
+    """Ordena os itens pendentes de um aluno por prontidão (pré-requisitos já concluídos)."""
+
+    def recommend(
+        self,
+        student,
+        student_class=None,
+        limit: Optional[int] = DEFAULT_NEXT_OBJECTIVES_LIMIT,
+    ) -> List[Dict[str, Any]]:
+        ranked = self.recommend_many([student.pk], limit=None)[student.pk]
+        return self.select(ranked, student_class=student_class, limit=limit)
+
+    def recommend_many(
+        self,
+        student_ids: Iterable[int],
+        limit: Optional[int] = DEFAULT_NEXT_OBJECTIVES_LIMIT,
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """Recomendações de vários alunos: uma leitura da cache e, para os que faltam,
+        uma ordenação em lote com consultas em número fixo."""
+        keys = {student_id: _student_key(student_id) for student_id in set(student_ids)}
+        cached = cache.get_many(list(keys.values()))
+        ranked = {student_id: cached[key] for student_id, key in keys.items() if key in cached}
+        missing = [student_id for student_id in keys if student_id not in ranked]
+        if missing:
+            fresh = self._rank_many(missing)
+            ttl = getattr(settings, 'CHECKLIST_NEXT_OBJECTIVES_TTL', DEFAULT_NEXT_OBJECTIVES_TTL)
+            cache.set_many({keys[student_id]: fresh[student_id] for student_id in missing}, timeout=ttl)
+            ranked.update(fresh)
+        return {student_id: self.select(entries, limit=limit) for student_id, entries in ranked.items()}
+
+    @staticmethod
+    def select(
+        ranked: List[Dict[str, Any]],
+        student_class=None,
+        limit: Optional[int] = DEFAULT_NEXT_OBJECTIVES_LIMIT,
+    ) -> List[Dict[str, Any]]:
+        if student_class is not None:
+            class_id = getattr(student_class, 'pk', student_class)
+            ranked = [entry for entry in ranked if entry['class_id'] == class_id]
+        return ranked[:limit] if limit else list(ranked)
+
+    def _rank(self, student) -> List[Dict[str, Any]]:
+        return self._rank_many([student.pk])[student.pk]
+
+    def _rank_many(self, student_ids: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+        from checklists.models import ChecklistItem, ChecklistMark, ChecklistStatus
+
+        student_ids = list(student_ids)
+        ranked_by_student: Dict[int, List[Dict[str, Any]]] = {student_id: [] for student_id in student_ids}
+        statuses = list(
+            ChecklistStatus.objects.filter(student_id__in=student_ids).select_related('template').order_by(
+                'student_class', 'student', 'template'
+            )
+        )
+        if not statuses:
+            return ranked_by_student
+        template_ids = {status.template_id for status in statuses}
+        items_by_template: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        for item in (
+            ChecklistItem.objects.filter(template_id__in=template_ids)
+            .values('id', 'template_id', 'code', 'text', 'order')
+            .order_by('order', 'id')
+        ):
+            items_by_template[item['template_id']].append(item)
+        marks = {
+            (status_id, item_id): (mark_status, validated)
+            for status_id, item_id, mark_status, validated in ChecklistMark.objects.filter(
+                status_record__student_id__in=student_ids
+            ).values_list('status_record_id', 'item_id', 'mark_status', 'teacher_validated').order_by()
+        }
+        indexes = {template_id: PrerequisiteIndex.get(template_id) for template_id in template_ids}
+
+        for status in statuses:
+            ranked = ranked_by_student[status.student_id]
+            index = indexes[status.template_id]
+            items = items_by_template[status.template_id]
+            codes = {item['id']: item['code'] or str(item['order']) for item in items}
+            done = set()
+            for item in items:
+                mark_status, validated = marks.get((status.pk, item['id']), ('NOT_STARTED', False))
+                if mark_status in DONE_STATUSES or validated:
+                    done.add(item['id'])
+            for item in items:
+                if item['id'] in done:
+                    continue
+                prerequisites = index.prerequisites.get(item['id'], [])
+                missing = [req for req in prerequisites if req not in done]
+                readiness = 1 - len(missing) / len(prerequisites) if prerequisites else 1.0
+                mark_status = marks.get((status.pk, item['id']), ('NOT_STARTED', False))[0]
+                ranked.append(
+                    {
+                        'item_id': item['id'],
+                        'code': item['code'],
+                        'text': item['text'],
+                        'order': item['order'],
+                        'template_id': status.template_id,
+                        'template': status.template.name,
+                        'class_id': status.student_class_id,
+                        'status': mark_status,
+                        'readiness': round(readiness, 3),
+                        'missing_prerequisites': [codes.get(req, str(req)) for req in missing],
+                        # Posição típica em que os outros alunos concluem o item (0 = cedo).
+                        'typical_position': round(index.mean_position.get(item['id'], 1.0), 3),
+                    }
+                )
+        for ranked in ranked_by_student.values():
+            ranked.sort(
+                key=lambda entry: (
+                    -entry['readiness'],
+                    entry['status'] != 'IN_PROGRESS',
+                    entry['typical_position'],
+                    entry['order'],
+                    entry['item_id'],
+                )
+            )
+        return ranked_by_student
@@ -0,0 +1,109 @@
+"""Sincronização dos itens de um modelo por diferença (poucas instruções SQL)."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List
+
+from django.db import transaction
+
+from checklists.services.counters import recount_statuses
+from checklists.services.recommendations import invalidate_next_objectives
+
+ITEM_FIELDS = ('code', 'text', 'order', 'contracted_in_council')
+
+
+@dataclass
+class ItemSyncResult:
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    marks_created: int = 0
+
+    @property
+    def membership_changed(self) -> bool:
+        return bool(self.created or self.deleted)
+
+
+@transaction.atomic
+def sync_template_items(template, items_data: List[dict]) -> ItemSyncResult:
+    """Aplica a lista de itens enviada ao modelo.
+
+    Itens com ``id`` conhecido são atualizados (ou apagados com ``is_deleted``),
+    os restantes criados; os que não vêm na lista são removidos. As LV já
+    existentes recebem marcas ``NOT_STARTED`` para os itens novos (as marcas dos
+    itens removidos caem em cascata) e os contadores são recontados uma vez.
+    """
+    from checklists.models import ChecklistItem
+
+    existing: Dict[int, ChecklistItem] = {item.id: item for item in template.items.order_by()}
+    keep = set()
+    to_create: List[ChecklistItem] = []
+    to_update: List[ChecklistItem] = []
+    changed_fields = set()
+
+    for position, item_data in enumerate(items_data, start=1):
+        item_data = dict(item_data)
+        item_id = item_data.pop('id', None)
+        is_deleted = item_data.pop('is_deleted', False)
+        item_data.setdefault('order', position)
+
+        item = existing.get(item_id) if item_id else None
+        if item is None:
+            if not is_deleted:
+                to_create.append(ChecklistItem(template=template, **item_data))
+            continue
+        if is_deleted:
+            continue
+        keep.add(item.id)
+        dirty = [attr for attr, value in item_data.items() if attr in ITEM_FIELDS and getattr(item, attr) != value]
+        for attr in dirty:
+            setattr(item, attr, item_data[attr])
+        if dirty:
+            changed_fields.update(dirty)
+            to_update.append(item)
+
+    result = ItemSyncResult()
+    created: List[ChecklistItem] = []
+    removed = [item_id for item_id in existing if item_id not in keep]
+    if removed:
+        # Apagar antes de criar/atualizar liberta os códigos (únicos por modelo).
+        ChecklistItem.objects.filter(id__in=removed).delete()
+        result.deleted = len(removed)
+    if to_update:
+        ChecklistItem.objects.bulk_update(to_update, sorted(changed_fields), batch_size=500)
+        result.updated = len(to_update)
+    if to_create:
+        created = ChecklistItem.objects.bulk_create(to_create, batch_size=500)
+        result.created = len(created)
+
+    if result.membership_changed:
+        result.marks_created = refresh_template_statuses(template, [item.id for item in created])
+    return result
+
+
+def refresh_template_statuses(template, new_item_ids: Iterable[int] = ()) -> int:
+    """Depois de mudar os itens de um modelo: marcas para os itens novos em todas as
+    LV existentes, recontagem dos contadores e recomendações descartadas.
+
+    Devolve o número de marcas criadas.
+    """
+    from checklists.models import ChecklistMark, ChecklistStatus
+
+    statuses = list(ChecklistStatus.objects.filter(template=template).order_by().values_list('id', 'student_id'))
+    if not statuses:
+        return 0
+    new_item_ids = list(new_item_ids)
+    marks = []
+    if new_item_ids:
+        marks = ChecklistMark.objects.bulk_create(
+            [
+                ChecklistMark(status_record_id=status_id, item_id=item_id, mark_status='NOT_STARTED')
+                for status_id, _ in statuses
+                for item_id in new_item_ids
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+    recount_statuses(ChecklistStatus.objects.filter(template=template))
+    invalidate_next_objectives(student_id for _, student_id in statuses)
+    return len(marks)
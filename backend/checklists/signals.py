@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from checklists.models import ChecklistMark, ChecklistStatus
+from checklists.services import invalidate_next_objectives, record_mark
+
+
+@receiver(post_save, sender=ChecklistMark)
+def update_peer_index(sender, instance, **kwargs):
+    """Mantém o índice item → colegas que o concluíram (as remoções seguem por CASCADE)."""
+    record_mark(instance)
+
+
+@receiver(post_save, sender=ChecklistMark)
+@receiver(post_delete, sender=ChecklistMark)
+def mark_changed(sender, instance, **kwargs):
+    """Recomendações de próximos objetivos deixam de ser válidas quando uma marca muda."""
+    if ChecklistMark.status_record.is_cached(instance):
+        student_id = instance.status_record.student_id
+    else:
+        student_id = (
+            ChecklistStatus.objects.filter(pk=instance.status_record_id).values_list('student_id', flat=True).first()
+        )
+    if student_id:
+        invalidate_next_objectives([student_id])
+
+
+@receiver(post_save, sender=ChecklistStatus)
+@receiver(post_delete, sender=ChecklistStatus)
+def status_changed(sender, instance, **kwargs):
+    invalidate_next_objectives([instance.student_id])
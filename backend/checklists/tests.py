@@ -1,5 +1,7 @@
 # checklists/tests.py
+from django.db import connection
 from django.test import TestCase, Client # Removed override_settings for now
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.utils import timezone
@@ -355,7 +357,9 @@ class ChecklistAPITests(APITestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data['count'], 1)
         self.assertEqual(len(response.data['results']), 1)
-        self.assertEqual(response.data['results'][0]['template']['name'], self.template.name)
+        self.assertEqual(response.data['results'][0]['template'], self.template.id)
+        expanded = self.client.get(url, {'expand': 'template'})
+        self.assertEqual(expanded.data['results'][0]['template']['name'], self.template.name)
 
     def test_student_updates_mark_to_completed(self):
         self.client.force_authenticate(user=self.student)
@@ -494,3 +498,837 @@ class ChecklistAPITests(APITestCase):
         status.refresh_from_db()
         self.assertEqual(status.state, ChecklistStatus.LVState.SUBMITTED)
         self.assertIsNotNone(status.submitted_at)
+
+
+class NextObjectiveRecommenderTests(APITestCase):
+    """Prerequisites are inferred from the order other students completed items."""
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.teacher = User.objects.create_user(
+            username='rec_teacher', email='rec_teacher@test.com', password='pwd', role='professor', status='ativo'
+        )
+        self.turma = Class.objects.create(name='Turma Rec', year=2025)
+        self.turma.teachers.add(self.teacher)
+        self.template = ChecklistTemplate.objects.create(name='Leitura')
+        # Ordem do modelo: A, B, C; os alunos concluem sempre A, depois C e só depois B.
+        self.item_a = ChecklistItem.objects.create(template=self.template, code='A', text='Sílabas', order=1)
+        self.item_b = ChecklistItem.objects.create(template=self.template, code='B', text='Textos', order=2)
+        self.item_c = ChecklistItem.objects.create(template=self.template, code='C', text='Frases', order=3)
+        start = timezone.now() - timezone.timedelta(days=30)
+        for index in range(4):
+            status = self._status(f'rec_hist{index}')
+            for step, item in enumerate((self.item_a, self.item_c, self.item_b)):
+                mark = ChecklistMark.objects.create(status_record=status, item=item, mark_status='COMPLETED')
+                ChecklistMark.objects.filter(pk=mark.pk).update(
+                    marked_at=start + timezone.timedelta(days=index, hours=step)
+                )
+        self.student_status = self._status('rec_student')
+        self.student = self.student_status.student
+
+    def _status(self, username):
+        student = User.objects.create_user(
+            username=username, email=f'{username}@test.com', password='pwd', role='aluno', status='ativo'
+        )
+        self.turma.students.add(student)
+        status, _ = ChecklistStatus.objects.get_or_create(
+            template=self.template, student=student, student_class=self.turma
+        )
+        return status
+
+    def test_ranks_by_inferred_prerequisites_and_refreshes_on_mark_change(self):
+        from checklists.services import NextObjectiveRecommender, PrerequisiteIndex
+
+        index = PrerequisiteIndex.build(self.template.id)
+        self.assertEqual(index.prerequisites[self.item_b.id], sorted([self.item_a.id, self.item_c.id]))
+        self.assertEqual(index.prerequisites[self.item_c.id], [self.item_a.id])
+
+        recommender = NextObjectiveRecommender()
+        first = recommender.recommend(self.student, student_class=self.turma)
+        self.assertEqual([entry['code'] for entry in first], ['A', 'C', 'B'])
+        self.assertEqual(first[2]['missing_prerequisites'], ['A', 'C'])
+
+        ChecklistMark.objects.create(status_record=self.student_status, item=self.item_a, mark_status='COMPLETED')
+        second = recommender.recommend(self.student, student_class=self.turma)
+        self.assertEqual([entry['code'] for entry in second], ['C', 'B'])
+        self.assertEqual(second[0]['readiness'], 1.0)
+        self.assertEqual(second[1]['readiness'], 0.5)
+
+    def test_endpoint_is_limited_to_related_users(self):
+        url = reverse('student-next-objectives', args=[self.student.id])
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(url, {'class_id': self.turma.id, 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry['code'] for entry in response.data['results']], ['A'])
+
+        other = User.objects.create_user(
+            username='rec_other', email='rec_other@test.com', password='pwd', role='aluno', status='ativo'
+        )
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class PeerHelperIndexTests(APITestCase):
+    """The item → classmates index follows mark changes and can be rebuilt."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.turma = Class.objects.create(name='Turma Pares', year=2025)
+        cls.other_class = Class.objects.create(name='Outra Turma', year=2025)
+        cls.template = ChecklistTemplate.objects.create(name='Matemática Pares')
+        cls.item = ChecklistItem.objects.create(template=cls.template, code='M1', text='Tabuada do 3', order=1)
+        cls.students = []
+        for index, turma in enumerate((cls.turma, cls.turma, cls.turma, cls.other_class)):
+            student = User.objects.create_user(
+                username=f'peer{index}', email=f'peer{index}@test.com', password='pwd', role='aluno', status='ativo'
+            )
+            turma.students.add(student)
+            cls.students.append(student)
+
+    def _mark(self, student, turma, mark_status='COMPLETED'):
+        status, _ = ChecklistStatus.objects.get_or_create(template=self.template, student=student, student_class=turma)
+        mark, _ = ChecklistMark.objects.update_or_create(
+            status_record=status, item=self.item, defaults={'mark_status': mark_status}
+        )
+        return mark
+
+    def test_index_follows_mark_changes(self):
+        from checklists.services import peer_helpers
+
+        first = self._mark(self.students[0], self.turma)
+        self._mark(self.students[1], self.turma, 'IN_PROGRESS')
+        self._mark(self.students[3], self.other_class)
+        self.assertEqual([h['student_id'] for h in peer_helpers(self.item.id, self.turma)], [self.students[0].id])
+
+        first.mark_status = 'IN_PROGRESS'
+        first.save()
+        self.assertEqual(peer_helpers(self.item.id, self.turma), [])
+
+        self._mark(self.students[1], self.turma)
+        self.assertEqual(
+            [h['student_id'] for h in peer_helpers(self.item.id, self.turma, exclude_student=self.students[2])],
+            [self.students[1].id],
+        )
+
+    def test_rebuild_command_backfills_index(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from checklists.models import ChecklistItemMastery
+
+        self._mark(self.students[0], self.turma)
+        self._mark(self.students[3], self.other_class)
+        ChecklistItemMastery.objects.all().delete()
+
+        call_command('rebuild_peer_index', '--class-id', str(self.turma.id), stdout=StringIO())
+        self.assertEqual(list(ChecklistItemMastery.objects.values_list('student_id', flat=True)), [self.students[0].id])
+        call_command('rebuild_peer_index', stdout=StringIO())
+        self.assertEqual(ChecklistItemMastery.objects.count(), 2)
+
+    def test_helpers_endpoint_requires_class_membership(self):
+        self._mark(self.students[0], self.turma)
+        url = reverse('checklist-item-helpers', args=[self.item.id])
+
+        self.client.force_authenticate(user=self.students[2])
+        response = self.client.get(url, {'class_id': self.turma.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['student_id'], self.students[0].id)
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+        self.client.force_authenticate(user=self.students[3])
+        self.assertEqual(self.client.get(url, {'class_id': self.turma.id}).status_code, 403)
+
+
+class BulkMarkAPITests(APITestCase):
+    """Many marks in one request: one transaction, one recompute, one notification."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(
+            username='bulk_student', email='bulk_student@test.com', password='pwd', role='aluno', status='ativo'
+        )
+        cls.other = User.objects.create_user(
+            username='bulk_other', email='bulk_other@test.com', password='pwd', role='aluno', status='ativo'
+        )
+        cls.teacher = User.objects.create_user(
+            username='bulk_teacher', email='bulk_teacher@test.com', password='pwd', role='professor', status='ativo'
+        )
+        cls.turma = Class.objects.create(name='Turma Lote', year=2025)
+        cls.turma.students.add(cls.student, cls.other)
+        cls.turma.teachers.add(cls.teacher)
+        cls.template = ChecklistTemplate.objects.create(name='Lote')
+        cls.items = [
+            ChecklistItem.objects.create(template=cls.template, code=f'L{i}', text=f'Objetivo {i}', order=i)
+            for i in range(1, 21)
+        ]
+        cls.status = ChecklistStatus.objects.create(template=cls.template, student=cls.student, student_class=cls.turma)
+        cls.other_status = ChecklistStatus.objects.create(
+            template=cls.template, student=cls.other, student_class=cls.turma
+        )
+        # Metade das marcas já existe (como depois de initialise_marks parcial).
+        for item in cls.items[:10]:
+            ChecklistMark.objects.create(status_record=cls.status, item=item)
+
+    def _payload(self, items, mark_status='COMPLETED', **extra):
+        return {'marks': [{'item_id': item.id, 'mark_status': mark_status, **extra} for item in items]}
+
+    def test_student_marks_twenty_items_with_few_queries(self):
+        from checklists.models import ChecklistItemMastery
+
+        self.client.force_authenticate(user=self.student)
+        url = reverse('checklist-status-bulk-marks', args=[self.status.id])
+        with patch('checklists.services.marks.dispatch_notification') as notify:
+            with self.assertNumQueries(14):
+                response = self.client.post(url, self._payload(self.items), format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['created'], response.data['updated']), (10, 10))
+        notify.assert_called_once()
+        self.assertEqual(notify.call_args.kwargs['recipients'], ['bulk_teacher@test.com'])
+
+        self.status.refresh_from_db()
+        self.assertEqual(self.status.percent_complete, 100.0)
+        self.assertEqual(ChecklistItemMastery.objects.filter(student=self.student).count(), 20)
+
+        again = self.client.post(url, self._payload(self.items[:2]), format='json')
+        self.assertEqual(again.data['unchanged'], 2)
+
+    def test_student_cannot_validate_or_use_foreign_items(self):
+        self.client.force_authenticate(user=self.student)
+        url = reverse('checklist-status-bulk-marks', args=[self.status.id])
+        self.assertEqual(self.client.post(url, self._payload(self.items[:1], 'VALIDATED'), format='json').status_code, 400)
+
+        foreign = ChecklistItem.objects.create(
+            template=ChecklistTemplate.objects.create(name='Outro'), code='X', text='Fora', order=1
+        )
+        self.assertEqual(self.client.post(url, self._payload([foreign]), format='json').status_code, 400)
+
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.client.post(url, self._payload(self.items[:1]), format='json').status_code, 404)
+
+    def test_teacher_validates_class_grid(self):
+        self.client.force_authenticate(user=self.teacher)
+        url = reverse('checklist-class-marks-bulk', args=[self.turma.id, self.template.id])
+        marks = [
+            {'student_id': student.id, 'item_id': item.id, 'mark_status': 'VALIDATED'}
+            for student in (self.student, self.other)
+            for item in self.items[:5]
+        ]
+        with patch('checklists.services.marks.dispatch_notification') as notify:
+            response = self.client.post(url, {'marks': marks}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(notify.call_count, 2)
+        self.assertTrue(
+            all(mark['mark_status'] == 'COMPLETED' and mark['teacher_validated'] for mark in response.data['marks'])
+        )
+        self.other_status.refresh_from_db()
+        self.assertEqual(self.other_status.percent_complete, 25.0)
+
+        self.client.force_authenticate(user=self.student)
+        self.assertEqual(self.client.post(url, {'marks': marks}, format='json').status_code, 403)
+
+
+class ChecklistCounterTests(APITestCase):
+    """Denormalised progress counters on ChecklistStatus."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(
+            username='counter_student', email='counter_student@test.com', password='pwd', role='aluno', status='ativo'
+        )
+        cls.teacher = User.objects.create_user(
+            username='counter_teacher', email='counter_teacher@test.com', password='pwd', role='professor', status='ativo'
+        )
+        cls.turma = Class.objects.create(name='Turma Contadores', year=2025)
+        cls.turma.students.add(cls.student)
+        cls.turma.teachers.add(cls.teacher)
+        cls.template = ChecklistTemplate.objects.create(name='Contadores')
+        cls.template.classes.add(cls.turma)
+        cls.items = [
+            ChecklistItem.objects.create(template=cls.template, code=f'C{i}', text=f'Objetivo {i}', order=i)
+            for i in range(1, 5)
+        ]
+
+    def setUp(self):
+        self.status = ChecklistStatus.objects.create(template=self.template, student=self.student, student_class=self.turma)
+
+    def _counters(self):
+        self.status.refresh_from_db()
+        return (
+            self.status.total_items,
+            self.status.completed_items,
+            self.status.validated_items,
+            self.status.percent_complete,
+        )
+
+    def test_mark_transitions_adjust_counters_without_recount(self):
+        self.assertEqual(self._counters(), (4, 0, 0, 0))
+        mark = ChecklistMark.objects.create(status_record=self.status, item=self.items[0], mark_status='IN_PROGRESS')
+        with CaptureQueriesContext(connection) as queries:
+            mark.mark_status = 'COMPLETED'
+            mark.teacher_validated = True
+            mark.save()
+        self.assertFalse([query['sql'] for query in queries if 'COUNT(' in query['sql']])
+        self.assertEqual(self._counters(), (4, 1, 1, 25.0))
+        self.assertIsNotNone(self.status.last_activity_at)
+
+        mark.mark_status = 'IN_PROGRESS'
+        mark.save()
+        self.assertEqual(self._counters(), (4, 0, 0, 0))
+
+        ChecklistMark.objects.create(status_record=self.status, item=self.items[1], mark_status='VALIDATED')
+        self.assertEqual(self._counters(), (4, 1, 1, 25.0))
+        mark.mark_status = 'COMPLETED'
+        mark.save()
+        self.assertEqual(self._counters(), (4, 2, 1, 50.0))
+        mark.delete()
+        self.assertEqual(self._counters(), (4, 1, 1, 25.0))
+
+    def test_template_item_sync_updates_all_statuses(self):
+        ChecklistMark.objects.create(status_record=self.status, item=self.items[0], mark_status='COMPLETED')
+        self.client.force_authenticate(user=self.teacher)
+        items = [
+            {'id': item.id, 'code': item.code, 'text': item.text, 'order': item.order}
+            for item in self.items[:2]
+        ] + [{'code': 'C9', 'text': 'Novo objetivo', 'order': 9}]
+        response = self.client.patch(
+            reverse('checklist-template-detail', args=[self.template.id]), {'items': items}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self._counters(), (3, 1, 0, 100 / 3))
+
+    def test_verify_command_detects_and_fixes_drift(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        ChecklistMark.objects.create(status_record=self.status, item=self.items[0], mark_status='COMPLETED')
+        call_command('verify_checklist_counters', stdout=StringIO())
+
+        ChecklistStatus.objects.filter(pk=self.status.pk).update(completed_items=3, total_items=1)
+        with self.assertRaises(CommandError):
+            call_command('verify_checklist_counters', stdout=StringIO())
+        out = StringIO()
+        call_command('verify_checklist_counters', '--fix', stdout=out)
+        self.assertIn(f'LV {self.status.id}', out.getvalue())
+        self.assertEqual(self._counters(), (4, 1, 0, 25.0))
+
+
+class ClassChecklistGridAPITests(APITestCase):
+    """Columnar class × objective grid."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='grid_teacher', email='grid_teacher@test.com', password='pwd', role='professor', status='ativo'
+        )
+        cls.outsider = User.objects.create_user(
+            username='grid_outsider', email='grid_outsider@test.com', password='pwd', role='professor', status='ativo'
+        )
+        cls.ana = User.objects.create_user(
+            username='grid_ana', email='grid_ana@test.com', first_name='Ana', password='pwd', role='aluno', status='ativo'
+        )
+        cls.bruno = User.objects.create_user(
+            username='grid_bruno', email='grid_bruno@test.com', first_name='Bruno', password='pwd', role='aluno', status='ativo'
+        )
+        cls.turma = Class.objects.create(name='Turma Grelha', year=2025)
+        cls.turma.students.add(cls.ana, cls.bruno)
+        cls.turma.teachers.add(cls.teacher)
+        cls.template = ChecklistTemplate.objects.create(name='Grelha')
+        cls.items = [
+            ChecklistItem.objects.create(template=cls.template, code=f'G{i}', text=f'Objetivo {i}', order=i)
+            for i in range(1, 6)
+        ]
+        status = ChecklistStatus.objects.create(template=cls.template, student=cls.ana, student_class=cls.turma)
+        ChecklistMark.objects.create(status_record=status, item=cls.items[0], mark_status='COMPLETED')
+        ChecklistMark.objects.create(status_record=status, item=cls.items[1], mark_status='IN_PROGRESS')
+        ChecklistMark.objects.create(status_record=status, item=cls.items[2], mark_status='VALIDATED')
+        cls.url = reverse('class-checklist-grid', args=[cls.turma.id, cls.template.id])
+
+    def test_grid_is_columnar_and_built_in_two_queries(self):
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(self.url)  # warm the session/auth queries
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        grid_queries = [q for q in queries if 'checklists_checklistitem' in q['sql'] or 'checklists_checklistmark' in q['sql']]
+        self.assertEqual(len(grid_queries), 2)
+
+        data = response.data
+        self.assertEqual([item['code'] for item in data['items']], ['G1', 'G2', 'G3', 'G4', 'G5'])
+        self.assertEqual([student['name'] for student in data['students']], ['Ana', 'Bruno'])
+        self.assertEqual(data['cells'], ['21300', '00000'])
+        self.assertEqual(data['students'][0]['percent_complete'], 40.0)
+
+        rle = self.client.get(self.url, {'encoding': 'rle'}).data
+        self.assertEqual(rle['cells'], [[2, 1, 1, 1, 3, 1, 0, 2], [0, 5]])
+        self.assertEqual(self.client.get(self.url, {'encoding': 'bits'}).status_code, 400)
+
+    def test_etag_round_trip(self):
+        self.client.force_authenticate(user=self.teacher)
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        status = ChecklistStatus.objects.get(student=self.ana)
+        ChecklistMark.objects.filter(status_record=status, item=self.items[1]).get().delete()
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_only_class_teachers(self):
+        self.client.force_authenticate(user=self.outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_authenticate(user=self.ana)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class ChecklistAnalyticsTests(APITestCase):
+    """Heatmap, completion times, stuck objectives and cohort deltas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='an_admin', email='an_admin@test.com', password='pwd', role='admin', status='ativo'
+        )
+        cls.teacher = User.objects.create_user(
+            username='an_teacher', email='an_teacher@test.com', password='pwd', role='professor', status='ativo'
+        )
+        cls.class_a = Class.objects.create(name='5º A', year=2025)
+        cls.class_b = Class.objects.create(name='5º B', year=2025)
+        cls.class_a.teachers.add(cls.teacher)
+        cls.template = ChecklistTemplate.objects.create(name='Análise')
+        cls.items = [
+            ChecklistItem.objects.create(template=cls.template, code=f'A{i}', text=f'Objetivo {i}', order=i)
+            for i in range(1, 3)
+        ]
+        cls.statuses = []
+        for index, turma in enumerate((cls.class_a, cls.class_a, cls.class_b)):
+            student = User.objects.create_user(
+                username=f'an_student{index}', email=f'an_student{index}@test.com', password='pwd', role='aluno', status='ativo'
+            )
+            turma.students.add(student)
+            cls.statuses.append(ChecklistStatus.objects.create(
+                template=cls.template,
+                student=student,
+                student_class=turma,
+                started_at=timezone.now() - timezone.timedelta(days=30),
+            ))
+        a1, a2, b1 = cls.statuses
+        for status in (a1, a2):
+            ChecklistMark.objects.create(status_record=status, item=cls.items[0], mark_status='COMPLETED')
+        stuck = ChecklistMark.objects.create(status_record=b1, item=cls.items[1], mark_status='IN_PROGRESS')
+        ChecklistMark.objects.filter(pk=stuck.pk).update(marked_at=timezone.now() - timezone.timedelta(days=20))
+        cls.url = reverse('checklist-analytics', args=[cls.template.id])
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+
+    def test_school_report(self):
+        self.client.force_authenticate(user=self.admin)
+        data = self.client.get(self.url).data
+        self.assertEqual(data['scope'], 'school')
+        self.assertEqual([row['name'] for row in data['classes']], ['5º A', '5º B'])
+        self.assertEqual(data['heatmap'], [[1.0, 0.0], [0.0, 0.0]])
+        self.assertEqual(data['item_completion_rates'], [0.667, 0.0])
+        self.assertEqual(data['completion_rate'], 0.333)
+        self.assertEqual([row['delta'] for row in data['classes']], [0.167, -0.333])
+        self.assertEqual(data['stuck_objectives'][0]['code'], 'A2')
+        self.assertEqual(data['time_to_completion_days']['overall']['count'], 2)
+        self.assertAlmostEqual(data['time_to_completion_days']['overall']['p50'], 30.0, delta=0.1)
+
+    def test_cached_by_data_version(self):
+        from checklists.services import AnalyticsScope, ChecklistAnalytics
+
+        analytics = ChecklistAnalytics(self.template, AnalyticsScope(year=2025))
+        first = analytics.report()
+        with self.assertNumQueries(1):
+            self.assertEqual(analytics.report(), first)
+
+        ChecklistMark.objects.create(status_record=self.statuses[2], item=self.items[0], mark_status='COMPLETED')
+        second = analytics.report()
+        self.assertNotEqual(second['data_version'], first['data_version'])
+        self.assertEqual(second['heatmap'][0], [1.0, 1.0])
+
+    def test_template_without_marks(self):
+        from checklists.services import ChecklistAnalytics
+
+        empty = ChecklistTemplate.objects.create(name='Sem marcas')
+        ChecklistItem.objects.create(template=empty, code='E1', text='Objetivo', order=1)
+        report = ChecklistAnalytics(empty).compute()
+        self.assertEqual(report['heatmap'], [[]])
+        self.assertEqual(report['completion_rate'], 0.0)
+        self.assertEqual(report['time_to_completion_days']['overall']['count'], 0)
+        self.assertEqual(report['stuck_objectives'], [])
+
+    def test_teachers_limited_to_their_classes(self):
+        self.client.force_authenticate(user=self.teacher)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.get(self.url, {'class_id': self.class_b.id}).status_code, 403)
+        response = self.client.get(self.url, {'class_id': self.class_a.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['heatmap'], [[1.0], [0.0]])
+
+
+class TemplateItemSyncTests(APITestCase):
+    """Template item edits are applied as a diff and provision marks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='sync_teacher', email='sync_teacher@test.com', password='pwd', role='professor', status='ativo'
+        )
+        cls.turma = Class.objects.create(name='Turma Sync', year=2025)
+        cls.turma.teachers.add(cls.teacher)
+        cls.students = [
+            User.objects.create_user(
+                username=f'sync_student{i}', email=f'sync_student{i}@test.com', password='pwd', role='aluno', status='ativo'
+            )
+            for i in range(3)
+        ]
+        cls.turma.students.add(*cls.students)
+
+    def setUp(self):
+        self.template = ChecklistTemplate.objects.create(name='Sync')
+        self.template.classes.add(self.turma)
+        self.items = [
+            ChecklistItem.objects.create(template=self.template, code=f'S{i}', text=f'Objetivo {i}', order=i)
+            for i in range(1, 41)
+        ]
+        self.statuses = []
+        for student in self.students:
+            status = ChecklistStatus.objects.create(template=self.template, student=student, student_class=self.turma)
+            status.initialise_marks()
+            self.statuses.append(status)
+        mark = ChecklistMark.objects.get(status_record=self.statuses[0], item=self.items[0])
+        mark.mark_status = 'COMPLETED'
+        mark.save()
+
+    def _payload(self, items):
+        return [
+            {'id': item.id, 'code': item.code, 'text': item.text, 'order': item.order}
+            for item in items
+        ]
+
+    def test_statement_count_does_not_grow_with_items(self):
+        from checklists.services import sync_template_items
+
+        payload = self._payload(self.items[:-1])  # drop one
+        for entry in payload:
+            entry['order'] += 100  # reorder everything
+        payload += [{'code': f'N{i}', 'text': f'Novo {i}', 'order': 200 + i} for i in range(5)]
+        with CaptureQueriesContext(connection) as queries:
+            result = sync_template_items(self.template, payload)
+        self.assertLess(len(queries), 20)
+        self.assertEqual((result.created, result.updated, result.deleted), (5, 39, 1))
+        self.assertEqual(result.marks_created, 15)
+
+        self.assertEqual(self.template.items.count(), 44)
+        for status in self.statuses:
+            self.assertEqual(status.marks.count(), 44)
+            status.refresh_from_db()
+            self.assertEqual(status.total_items, 44)
+        self.assertEqual(self.statuses[0].completed_items, 1)
+
+    def test_api_update_and_is_deleted_flag(self):
+        self.client.force_authenticate(user=self.teacher)
+        payload = self._payload(self.items[:2])
+        payload[0]['text'] = 'Texto revisto'
+        payload[1]['is_deleted'] = True
+        response = self.client.patch(
+            reverse('checklist-template-detail', args=[self.template.id]), {'items': payload}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual([item['text'] for item in response.data['items']], ['Texto revisto'])
+        self.statuses[0].refresh_from_db()
+        self.assertEqual(
+            (self.statuses[0].total_items, self.statuses[0].completed_items, self.statuses[0].percent_complete),
+            (1, 1, 100.0),
+        )
+        self.assertEqual(ChecklistMark.objects.filter(status_record__template=self.template).count(), 3)
+
+
+class CurriculumImportTests(TestCase):
+    """Streaming Markdown/SpreadsheetML importer behind load_checklists."""
+
+    docs = __import__('pathlib').Path(__file__).resolve().parents[2] / 'docs'
+
+    def _call(self, *args):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('load_checklists', *args, stdout=out)
+        return out.getvalue()
+
+    def test_markdown_import_is_idempotent_and_provisions_marks(self):
+        path = str(self.docs / 'aprendizagens_PT_5Ano.md')
+        self.assertIn('[dry-run] New template', self._call(path, '--dry-run'))
+        self.assertFalse(ChecklistTemplate.objects.exists())
+
+        self._call(path)
+        template = ChecklistTemplate.objects.get(name='Português 5º Ano')
+        codes = list(template.items.values_list('code', flat=True))
+        self.assertIn('E1', codes)  # "E1.Descrever" has no space after the dot
+        self.assertEqual(len(codes), len(set(codes)))
+        self.assertFalse(template.items.filter(text__contains='cite').exists())
+
+        student = User.objects.create_user(username='imp_student', email='imp@test.com', password='pwd', role='aluno')
+        turma = Class.objects.create(name='Turma Import', year=2025)
+        status = ChecklistStatus.objects.create(template=template, student=student, student_class=turma)
+        status.initialise_marks()
+        template.items.filter(code='E1').delete()
+
+        output = self._call(path)
+        self.assertIn('1 new, 0 updated', output)
+        self.assertEqual(status.marks.count(), len(codes))
+        status.refresh_from_db()
+        self.assertEqual(status.total_items, len(codes))
+        self.assertIn('0 new, 0 updated', self._call(path))
+
+    def test_spreadsheet_xml(self):
+        from checklists.services import read_curriculum
+
+        path = next(self.docs.glob('Lista de Verifica*.xml'))
+        curriculum = read_curriculum(path, 'Português (lista oficial)')
+        self.assertEqual(curriculum.items[0].code, 'OC1')
+        self.assertGreater(len(curriculum.items), 40)
+
+        self._call(str(path), '--name', 'Português (lista oficial)')
+        self.assertEqual(
+            ChecklistItem.objects.filter(template__name='Português (lista oficial)').count(), len(curriculum.items)
+        )
+
+
+class ChecklistMarkEventTests(APITestCase):
+    """Append-only mark history, time series and rollup."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='ev_teacher', email='ev_teacher@test.com', password='pwd', role='professor', status='ativo'
+        )
+        cls.student = User.objects.create_user(
+            username='ev_student', email='ev_student@test.com', password='pwd', role='aluno', status='ativo'
+        )
+        cls.turma = Class.objects.create(name='5º A', year=2025)
+        cls.turma.teachers.add(cls.teacher)
+        cls.turma.students.add(cls.student)
+        cls.template = ChecklistTemplate.objects.create(name='Eventos')
+        cls.items = [
+            ChecklistItem.objects.create(template=cls.template, code=f'V{i}', text=f'Objetivo {i}', order=i)
+            for i in range(1, 4)
+        ]
+
+    def setUp(self):
+        self.status = ChecklistStatus.objects.create(template=self.template, student=self.student, student_class=self.turma)
+
+    def test_save_records_transitions(self):
+        from checklists.models import ChecklistMarkEvent
+
+        mark = ChecklistMark.objects.create(status_record=self.status, item=self.items[0], marked_by=self.student)
+        self.assertFalse(ChecklistMarkEvent.objects.exists())  # NOT_STARTED → NOT_STARTED
+        mark.mark_status = 'COMPLETED'
+        mark.save()
+        mark.comment = 'só comentário'
+        mark.save()
+        mark.marked_by = self.teacher
+        mark.teacher_validated = True
+        mark.save()
+        mark.mark_status = 'IN_PROGRESS'
+        mark.save()
+        events = list(ChecklistMarkEvent.objects.order_by('id').values_list('kind', 'from_status', 'to_status', 'actor'))
+        self.assertEqual(events, [
+            ('completed', 'NOT_STARTED', 'COMPLETED', self.student.id),
+            ('validated', 'COMPLETED', 'COMPLETED', self.teacher.id),
+            ('reopened', 'COMPLETED', 'IN_PROGRESS', self.teacher.id),
+        ])
+        event = ChecklistMarkEvent.objects.first()
+        with self.assertRaises(ValueError):
+            event.save()
+
+    def test_bulk_marks_log_events(self):
+        from checklists.models import ChecklistMarkEvent
+
+        self.client.force_authenticate(user=self.teacher)
+        url = reverse('checklist-class-marks-bulk', args=[self.turma.id, self.template.id])
+        marks = [{'student_id': self.student.id, 'item_id': item.id, 'mark_status': 'VALIDATED'} for item in self.items]
+        with patch('checklists.services.marks.dispatch_notification'):
+            self.assertEqual(self.client.post(url, {'marks': marks}, format='json').status_code, 200)
+        self.assertEqual(
+            list(ChecklistMarkEvent.objects.values_list('kind', flat=True).distinct()), ['validated']
+        )
+        self.assertEqual(ChecklistMarkEvent.objects.filter(actor=self.teacher).count(), 3)
+
+    def test_timeseries_and_rollup(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from checklists.models import ChecklistMarkEvent, ChecklistMarkEventRollup
+
+        for item in self.items:
+            ChecklistMark.objects.create(status_record=self.status, item=item, mark_status='COMPLETED')
+        old = timezone.now() - timezone.timedelta(days=400)
+        ChecklistMarkEvent.objects.filter(item=self.items[0]).update(created_at=old)
+
+        self.client.force_authenticate(user=self.teacher)
+        url = reverse('class-checklist-events', args=[self.turma.id])
+        before = self.client.get(url, {'bucket': 'day'}).data['results']
+        self.assertEqual([row['completed'] for row in before], [1, 2])
+
+        call_command('rollup_checklist_events', '--keep-days', '30', stdout=StringIO())
+        self.assertEqual(ChecklistMarkEvent.objects.count(), 2)
+        self.assertEqual(ChecklistMarkEventRollup.objects.get().count, 1)
+        self.assertEqual(self.client.get(url, {'bucket': 'day'}).data['results'], before)
+
+        weekly = self.client.get(url, {'bucket': 'week', 'since': timezone.localdate().isoformat()}).data['results']
+        self.assertEqual(sum(row['completed'] for row in weekly), 2)
+        self.assertEqual(self.client.get(url, {'bucket': 'month'}).status_code, 400)
+
+
+class StatusProvisioningTests(TestCase):
+    """Membership changes and template assignments create statuses and marks in bulk."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='prov_teacher', email='prov_teacher@test.com', password='pwd', role='professor', status='ativo'
+        )
+        cls.turma = Class.objects.create(name='Turma Provisão', year=2025)
+        cls.turma.teachers.add(cls.teacher)
+        cls.students = [
+            User.objects.create_user(
+                username=f'prov_student{i}', email=f'prov_student{i}@test.com', password='pwd', role='aluno', status='ativo'
+            )
+            for i in range(20)
+        ]
+        cls.templates = []
+        for t in range(3):
+            template = ChecklistTemplate.objects.create(name=f'Provisão {t}')
+            ChecklistItem.objects.bulk_create(
+                ChecklistItem(template=template, code=f'P{t}-{i}', text=f'Objetivo {i}', order=i) for i in range(1, 11)
+            )
+            cls.templates.append(template)
+
+    def test_adding_students_provisions_all_pairs_with_constant_queries(self):
+        for template in self.templates:
+            template.classes.add(self.turma)
+        with CaptureQueriesContext(connection) as small:
+            self.turma.students.add(*self.students[:2])
+        with CaptureQueriesContext(connection) as large:
+            self.turma.students.add(*self.students[2:])
+
+        # Only insert batches grow (SQLite parameter limit); there are no per-student queries.
+        self.assertLess(len(large), len(small) + 5)
+        self.assertEqual(ChecklistStatus.objects.filter(student_class=self.turma).count(), 60)
+        self.assertEqual(ChecklistMark.objects.filter(status_record__student_class=self.turma).count(), 600)
+        self.assertEqual(
+            set(ChecklistStatus.objects.values_list('total_items', 'completed_items', 'percent_complete')),
+            {(10, 0, 0.0)},
+        )
+
+    def test_provisioning_is_idempotent_and_fills_only_missing_pairs(self):
+        from checklists.services import provision_statuses
+
+        self.templates[0].classes.add(self.turma)
+        self.turma.students.add(*self.students[:5])
+        self.assertEqual(ChecklistStatus.objects.count(), 5)
+
+        self.templates[1].classes.add(self.turma)
+        result = provision_statuses([self.turma.pk])
+        self.assertEqual((result.statuses_created, result.marks_created), (5, 50))
+        self.assertEqual(provision_statuses([self.turma.pk]).statuses_created, 0)
+
+    def test_rows_inserted_concurrently_are_not_counted(self):
+        from unittest.mock import patch
+
+        from checklists.services import provision_statuses, provisioning
+
+        self.templates[0].classes.add(self.turma)
+        self.turma.students.add(*self.students[:3])
+        # As if the three LV had been inserted by another request after the missing-pairs query.
+        stale = [(self.turma.pk, student.pk, self.templates[0].pk) for student in self.students[:3]]
+        self.templates[1].classes.add(self.turma)
+        fresh = [(self.turma.pk, student.pk, self.templates[1].pk) for student in self.students[:3]]
+        ChecklistStatus.objects.filter(template=self.templates[1]).delete()
+        with patch.object(provisioning, 'missing_statuses', return_value=stale + fresh):
+            result = provision_statuses([self.turma.pk])
+        self.assertEqual((result.statuses_created, result.marks_created), (3, 30))
+
+    def test_assign_view_provisions_current_students(self):
+        self.turma.students.add(*self.students[:4])
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse('classes:add_checklist_to_class', args=[self.turma.pk]),
+            {'checklist_template': self.templates[2].pk},
+        )
+        self.assertEqual(response.status_code, 302)
+        statuses = ChecklistStatus.objects.filter(template=self.templates[2], student_class=self.turma)
+        self.assertEqual(statuses.count(), 4)
+        self.assertEqual(ChecklistMark.objects.filter(status_record__in=statuses).count(), 40)
+
+
+class SparseFieldsetTests(APITestCase):
+    """``?fields=``/``?expand=`` shape checklist responses and the prefetch plan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='sparse_teacher', email='sparse_teacher@test.com', password='pwd', role='professor', status='ativo'
+        )
+        cls.turma = Class.objects.create(name='Turma Sparse', year=2025)
+        cls.turma.teachers.add(cls.teacher)
+        cls.template = ChecklistTemplate.objects.create(name='Sparse')
+        ChecklistItem.objects.bulk_create(
+            ChecklistItem(template=cls.template, code=f'F{i}', text=f'Objetivo {i}', order=i) for i in range(1, 6)
+        )
+        cls.template.classes.add(cls.turma)
+        cls.turma.students.add(*[
+            User.objects.create_user(
+                username=f'sparse_student{i}', email=f'sparse_student{i}@test.com', password='pwd', role='aluno', status='ativo'
+            )
+            for i in range(4)
+        ])
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.teacher)
+        self.url = reverse('checklist-status-list')
+
+    def test_slim_default_uses_ids(self):
+        status = self.client.get(self.url).data['results'][0]
+        self.assertIsInstance(status['template'], int)
+        self.assertIsInstance(status['student'], int)
+        self.assertEqual(len(status['marks']), 5)
+        self.assertIsInstance(status['marks'][0]['item'], int)
+
+    def test_fields_and_nested_expand(self):
+        response = self.client.get(self.url, {'fields': 'id,state,marks.item,marks.mark_status', 'expand': 'marks.item'})
+        status = response.data['results'][0]
+        self.assertEqual(set(status), {'id', 'state', 'marks'})
+        self.assertEqual(set(status['marks'][0]), {'item', 'mark_status'})
+        self.assertEqual(status['marks'][0]['item']['code'][0], 'F')
+
+    def test_unrequested_relations_are_not_loaded(self):
+        with CaptureQueriesContext(connection) as slim:
+            self.client.get(self.url, {'fields': 'id,state,percent_complete'})
+        self.assertFalse(any('checklists_checklistmark' in query['sql'] for query in slim.captured_queries))
+
+        with CaptureQueriesContext(connection) as expanded:
+            self.client.get(self.url, {'expand': 'template,student,student_class,marks.item,marks.marked_by'})
+        # Fixed number of queries regardless of how many statuses/marks are returned.
+        self.assertLessEqual(len(expanded), len(slim) + 3)
+
+    def test_template_items_endpoint_supports_etag(self):
+        url = reverse('checklist-template-items', args=[self.template.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['code'] for item in response.data], ['F1', 'F2', 'F3', 'F4', 'F5'])
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        listing = self.client.get(reverse('checklist-template-list'), {'fields': 'id,name'})
+        self.assertEqual(set(listing.data['results'][0]), {'id', 'name'})
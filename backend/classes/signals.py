@@ -7,21 +7,20 @@ from .models import Class, ClassMembership
 User = get_user_model()
 
 try:
-    from checklists.models import ChecklistTemplate, ChecklistStatus
+    from checklists.services import provision_statuses
     CHECKLISTS_APP_EXISTS = True
 except ImportError:
-    ChecklistTemplate, ChecklistStatus = None, None
+    provision_statuses = None
     CHECKLISTS_APP_EXISTS = False
 
 
 def _sync_memberships(instance, role, pk_set, action):
     if action == 'post_add' and pk_set:
-        for user_id in pk_set:
-            ClassMembership.objects.get_or_create(
-                class_instance=instance,
-                user_id=user_id,
-                defaults={'role': role},
-            )
+        # (class_instance, user) é único: quem já tem inscrição mantém o papel.
+        ClassMembership.objects.bulk_create(
+            [ClassMembership(class_instance=instance, user_id=user_id, role=role) for user_id in pk_set],
+            ignore_conflicts=True,
+        )
     elif action == 'post_remove' and pk_set:
         ClassMembership.objects.filter(
             class_instance=instance,
@@ -43,22 +42,8 @@ def students_changed(sender, instance, action, pk_set, **kwargs):
 
     _sync_memberships(instance, ClassMembership.Roles.STUDENT, pk_set, action)
 
-    if CHECKLISTS_APP_EXISTS and action == "post_add":
-        turma = instance
-        templates_for_class = turma.checklist_templates.all()
-
-        if not templates_for_class.exists():
-            return
-
-        added_students = User.objects.filter(id__in=pk_set, role='aluno')
-
-        for student in added_students:
-            for template in templates_for_class:
-                ChecklistStatus.objects.get_or_create(
-                    student=student,
-                    template=template,
-                    student_class=turma
-                )
+    if CHECKLISTS_APP_EXISTS and action == "post_add" and pk_set:
+        provision_statuses([instance.pk], student_ids=pk_set)
 
 
 @receiver(m2m_changed, sender=Class.teachers.through)
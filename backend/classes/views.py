@@ -8,7 +8,7 @@ from django.views.decorators.http import require_http_methods, require_POST
 from django import forms
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
-from django.db.models import Avg, Count, Q, Prefetch, Max, F
+from django.db.models import Avg, Prefetch, Max, F
 from django.db import models
 from django.db import IntegrityError # Para tratar emails duplicados
 from django.contrib.auth.decorators import login_required, user_passes_test
@@ -36,9 +36,11 @@ except ImportError:
 
 try:
     from checklists.models import ChecklistTemplate, ChecklistStatus, ChecklistItem, ChecklistMark
+    from checklists.services import provision_statuses
     CHECKLISTS_APP_EXISTS = True
 except ImportError:
     ChecklistTemplate, ChecklistStatus, ChecklistItem, ChecklistMark = None, None, None, None
+    provision_statuses = None
     CHECKLISTS_APP_EXISTS = False
 
 @login_required
@@ -119,45 +121,16 @@ def class_detail(request, class_id):
     # Prepare checklist data if Checklists app exists
     checklist_progress_data = {}
     if CHECKLISTS_APP_EXISTS and ChecklistStatus and ChecklistItem and student_count > 0:
-        # Get all status records for students in THIS specific class
+        # Progress is a denormalised column on each status (kept by ChecklistMark.save)
         class_statuses = ChecklistStatus.objects.filter(
             student_class=turma,
             student__in=students # Redundant due to student_class filter, but safe
-        ).select_related('student', 'template').prefetch_related(
-            Prefetch('marks', queryset=ChecklistMark.objects.filter(Q(mark_status='COMPLETED') | Q(mark_status='VALIDATED')))
-            # Removed item prefetch here, count comes from template
-            # Prefetch('template__items') # Potential performance hit if many templates/items
-        )
-
-        # Get total item counts for templates used in this class
-        template_ids_used = class_statuses.values_list('template_id', flat=True).distinct()
-        template_item_counts = ChecklistTemplate.objects.filter(
-            id__in=template_ids_used
-        ).annotate(
-            num_items=Count('items')
-        ).values('id', 'num_items')
-        
-        item_counts_dict = {item['id']: item['num_items'] for item in template_item_counts}
-        
+        ).values_list('student_id', 'percent_complete').order_by()
+
         # Aggregate progress per student (average across their assigned templates in this class)
         student_agg_progress = {}
-        for status in class_statuses:
-            student_id = status.student_id
-            template_id = status.template_id
-            total_items = item_counts_dict.get(template_id, 0)
-
-            if total_items > 0:
-                # Use the pre-fetched completed/validated marks
-                completed_count = status.marks.count() # Count the prefetched marks
-                # Calculate percentage for THIS status record
-                percentage = round((completed_count / total_items) * 100) 
-            else:
-                percentage = 0 # Template has no items
-
-            # Store percentage for each student/template pair
-            if student_id not in student_agg_progress:
-                student_agg_progress[student_id] = []
-            student_agg_progress[student_id].append(percentage)
+        for student_id, percent_complete in class_statuses:
+            student_agg_progress.setdefault(student_id, []).append(round(percent_complete))
 
         # Calculate the average percentage for each student across their templates
         for student_id, percentages in student_agg_progress.items():
@@ -176,6 +149,11 @@ def class_detail(request, class_id):
         }
         student_progress_list.append(student_data)
 
+    # Resumo pré-calculado durante a noite (ai.build_class_briefs); não recalcula aqui.
+    class_brief = None
+    if is_admin or is_teacher_of_class:
+        from ai.models import ClassBrief
+        class_brief = ClassBrief.objects.filter(class_context=turma).first()
 
     context = {
         'turma': turma,
@@ -186,6 +164,7 @@ def class_detail(request, class_id):
         'student_progress_list': student_progress_list,
         'checklist_app_enabled': CHECKLISTS_APP_EXISTS, # Pass flags to template
         'diary_app_enabled': DIARY_APP_EXISTS,
+        'class_brief': class_brief,
     }
     return render(request, 'classes/class_detail.html', context)
 
@@ -540,18 +519,11 @@ def add_checklist_to_class(request, pk):
             # 1. Adicionar a turma à relação M2M do template
             checklist_template.classes.add(turma)
             
-            # 2. Criar ChecklistStatus para os alunos atuais da turma (se não existir)
-            students_in_class = turma.students.filter(role='aluno') # Filtrar apenas alunos
-            created_count = 0
-            for student in students_in_class:
-                status, created = ChecklistStatus.objects.get_or_create(
-                    student=student,
-                    template=checklist_template,
-                    student_class=turma
-                )
-                if created:
-                    created_count += 1
-            
+            # 2. Criar ChecklistStatus (e marcas) em bloco para os alunos atuais da turma
+            created_count = provision_statuses(
+                [turma.pk], template_ids=[checklist_template.pk]
+            ).statuses_created
+
             # Mensagem de sucesso
             messages.success(request, _("Checklist template '{template_name}' assigned to class '{class_name}'.").format(
                 template_name=checklist_template.name, class_name=turma.name
@@ -13,3 +13,22 @@ class IsAuthenticatedAndActive(BasePermission):
         if callable(is_guest) and is_guest():
             return False
         return True
+
+
+def is_class_teacher_or_admin(user, turma) -> bool:
+    """Return True for admins and for teachers of ``turma``."""
+    if user.is_superuser or getattr(user, 'role', None) == 'admin':
+        return True
+    return turma.teachers.filter(id=user.id).exists()
+
+
+def can_view_student(user, student) -> bool:
+    """Return True for admins, the student, their teachers and their guardians."""
+    role = getattr(user, 'role', None)
+    if user.is_superuser or role == 'admin' or user.id == student.id:
+        return True
+    if role == 'professor':
+        return student.classes_attended.filter(teachers=user).exists()
+    if role == 'encarregado':
+        return student.encarregados_relations.filter(encarregado=user).exists()
+    return False
@@ -1,4 +1,6 @@
 """Reusable DRF serializer helpers."""
+from typing import Optional, Set
+
 from rest_framework import serializers
 
 
@@ -8,3 +10,88 @@ class TimestampedSerializer(serializers.ModelSerializer):
 
     class Meta:
         abstract = True
+
+
+def _query_list(request, name: str) -> Optional[Set[str]]:
+    """Valores separados por vírgulas (ou parâmetro repetido); ``None`` se ausente."""
+    if request is None or name not in getattr(request, 'query_params', {}):
+        return None
+    return {
+        part.strip()
+        for chunk in request.query_params.getlist(name)
+        for part in chunk.split(',')
+        if part.strip()
+    }
+
+
+def requested_fields(request) -> Optional[Set[str]]:
+    """Caminhos pedidos em ``?fields=`` (ex.: ``id,state,marks.mark_status``) ou ``None``."""
+    return _query_list(request, 'fields')
+
+
+def requested_expansions(request) -> Set[str]:
+    """Caminhos pedidos em ``?expand=`` (ex.: ``template,marks.item``)."""
+    return _query_list(request, 'expand') or set()
+
+
+def wants_field(fields: Optional[Set[str]], path: str) -> bool:
+    """Indica se ``path`` (com pontos) sobrevive ao filtro ``?fields=``."""
+    if fields is None:
+        return True
+    head, _, _ = path.partition('.')
+    level = {value.split('.')[0] for value in fields}
+    if head not in level:
+        return False
+    rest = path[len(head) + 1:]
+    if not rest:
+        return True
+    nested = {value[len(head) + 1:] for value in fields if value.startswith(f'{head}.')}
+    return wants_field(nested or None, rest)
+
+
+class SparseFieldsetMixin:
+    """``?fields=`` e ``?expand=`` para serializers (também quando aninhados).
+
+    Por omissão as relações são devolvidas como ids; ``expandable_fields`` indica
+    o serializer (e argumentos) que substitui cada uma quando pedida em
+    ``?expand=``. Os caminhos com pontos aplicam-se aos serializers aninhados
+    (``marks.item``). ``?fields=`` só restringe campos de leitura, por isso os
+    campos de escrita continuam disponíveis em POST/PATCH.
+    """
+
+    expandable_fields: dict = {}
+
+    def _field_path(self) -> str:
+        parts = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                parts.append(node.field_name)
+            node = node.parent
+        return '.'.join(reversed(parts))
+
+    @staticmethod
+    def _scoped(values: Set[str], prefix: str) -> Set[str]:
+        if not prefix:
+            return set(values)
+        return {value[len(prefix) + 1:] for value in values if value.startswith(f'{prefix}.')}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        prefix = self._field_path()
+
+        expand = {value.split('.')[0] for value in self._scoped(requested_expansions(request), prefix)}
+        for name in expand & set(self.expandable_fields):
+            if name in fields:
+                serializer_class, kwargs = self.expandable_fields[name]
+                fields[name] = serializer_class(read_only=True, **kwargs)
+
+        sparse = requested_fields(request)
+        if sparse is not None:
+            level = {value.split('.')[0] for value in self._scoped(sparse, prefix)}
+            if level:
+                fields = {
+                    name: field for name, field in fields.items() if name in level or field.write_only
+                }
+        return fields
@@ -5,11 +5,11 @@ from rest_framework.routers import DefaultRouter
 from users.api.views import UserViewSet, CurrentUserViewSet
 from classes.api.views import ClassViewSet
 from blog.api.views import PostViewSet, PublicPostListAPIView
-from checklists.api.views import ChecklistTemplateViewSet, ChecklistStatusViewSet, ChecklistMarkViewSet
-from pit.api.views import IndividualPlanViewSet, PlanTaskViewSet
+from checklists.api.views import ChecklistTemplateViewSet, ChecklistStatusViewSet, ChecklistMarkViewSet, StudentNextObjectivesAPIView, ChecklistItemHelpersAPIView, ClassChecklistBulkMarkAPIView, ClassChecklistGridAPIView, ChecklistAnalyticsAPIView, ClassChecklistEventSeriesAPIView
+from pit.api.views import IndividualPlanViewSet, PlanExportViewSet, PlanTaskViewSet, StudentPlanTimelineAPIView
 from projects.api.views import ProjectViewSet, ProjectTaskViewSet
 from council.api.views import CouncilDecisionViewSet, StudentProposalViewSet
-from ai.api.views import AssistantAPIView, SessionDetailAPIView, AssistantFeedbackAPIView
+from ai.api.views import AssistantAPIView, SessionDetailAPIView, AssistantFeedbackAPIView, OptimizerCacheStatsAPIView, ClassBriefAPIView
 from users.api.auth_views import (
     MicrosoftLoginInitAPIView,
     MicrosoftCallbackAPIView,
@@ -36,6 +36,7 @@ router.register('checklists/statuses', ChecklistStatusViewSet, basename='checkli
 router.register('checklists/marks', ChecklistMarkViewSet, basename='checklist-mark')
 router.register('pit/plans', IndividualPlanViewSet, basename='pit-plan')
 router.register('pit/tasks', PlanTaskViewSet, basename='pit-task')
+router.register('pit/exports', PlanExportViewSet, basename='pit-export')
 router.register('projects', ProjectViewSet, basename='project')
 router.register('project-tasks', ProjectTaskViewSet, basename='project-task')
 router.register('council/decisions', CouncilDecisionViewSet, basename='council-decision')
@@ -50,6 +51,13 @@ urlpatterns = [
     path('ai/assistant', AssistantAPIView.as_view(), name='ai-assistant'),
     path('ai/sessions/<uuid:session_id>', SessionDetailAPIView.as_view(), name='ai-session-detail'),
     path('ai/feedback', AssistantFeedbackAPIView.as_view(), name='ai-feedback'),
+    path('ai/optimizer-cache/stats', OptimizerCacheStatsAPIView.as_view(), name='ai-optimizer-cache-stats'),
+    path('ai/classes/<int:class_id>/brief', ClassBriefAPIView.as_view(), name='ai-class-brief'),
+    path('analytics/checklists/<int:template_id>', ChecklistAnalyticsAPIView.as_view(), name='checklist-analytics'),
+    path('checklists/classes/<int:class_id>/templates/<int:template_id>/marks/bulk', ClassChecklistBulkMarkAPIView.as_view(), name='checklist-class-marks-bulk'),
+    path('checklists/items/<int:item_id>/helpers', ChecklistItemHelpersAPIView.as_view(), name='checklist-item-helpers'),
+    path('students/<int:student_id>/next-objectives', StudentNextObjectivesAPIView.as_view(), name='student-next-objectives'),
+    path('students/<int:student_id>/pit-timeline', StudentPlanTimelineAPIView.as_view(), name='student-pit-timeline'),
     path('auth/microsoft/login', MicrosoftLoginInitAPIView.as_view(), name='auth-microsoft-login'),
     path('auth/microsoft/callback', MicrosoftCallbackAPIView.as_view(), name='auth-microsoft-callback'),
     path('auth/login/local', LocalLoginAPIView.as_view(), name='auth-login-local'),
@@ -57,6 +65,8 @@ urlpatterns = [
     path('auth/password/change', ForcePasswordChangeAPIView.as_view(), name='auth-password-change'),
     path('auth/token/refresh', TokenRefreshCookieAPIView.as_view(), name='auth-token-refresh'),
     path('auth/logout', LogoutAPIView.as_view(), name='auth-logout'),
+    path('classes/<int:class_id>/checklists/<int:template_id>/grid', ClassChecklistGridAPIView.as_view(), name='class-checklist-grid'),
+    path('classes/<int:class_id>/checklists/events', ClassChecklistEventSeriesAPIView.as_view(), name='class-checklist-events'),
     path('classes/<int:class_id>/diary/active', ClassDiaryActiveAPIView.as_view(), name='class-diary-active'),
     path('classes/<int:class_id>/diary/sessions', ClassDiarySessionsListAPIView.as_view(), name='class-diary-sessions'),
     path('classes/<int:class_id>/diary/sessions/<int:session_id>', ClassDiarySessionDetailAPIView.as_view(), name='class-diary-session-detail'),
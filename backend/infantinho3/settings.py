@@ -16,6 +16,7 @@ from datetime import timedelta
 import os
 from dotenv import load_dotenv
 from django.urls import reverse_lazy # Use reverse_lazy for settings
+from corsheaders.defaults import default_headers
 
 load_dotenv(override=True)
 
@@ -140,6 +141,30 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Escritas concorrentes (vários threads/processos) esperam pelo lock em vez de falhar
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+            # Base de testes em ficheiro (a versão em memória não aceita escritas em paralelo),
+            # uma por processo para que execuções simultâneas não apaguem a base uma da outra
+            'TEST': {'NAME': BASE_DIR / f'test_db_{os.getpid()}.sqlite3'},
+        }
+    }
+
+# Cache
+# Em produção (vários workers gunicorn) REDIS_URL é obrigatório: os locks de pedidos IA
+# idênticos, as vagas por modelo do Ollama, as respostas em cache e os carimbos de versão
+# do painel de PIT só são partilhados entre workers numa cache comum. A LocMemCache só
+# serve para desenvolvimento com um único processo (`manage.py check --deploy` avisa quando falta).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         }
     }
 
@@ -197,6 +222,23 @@ STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.ManifestStaticFilesSto
 MEDIA_URL = os.environ.get('MEDIA_URL', '/media/')
 MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
 
+# PDFs dos PIT já renderizados (chave = hash do conteúdo). Fora de MEDIA_ROOT:
+# são dados pessoais e só devem ser servidos pela API, com permissões.
+PIT_PDF_CACHE_DIR = os.environ.get('PIT_PDF_CACHE_DIR', BASE_DIR / 'var' / 'pit-pdf')
+PIT_PDF_BACKGROUND_RENDER = os.environ.get('PIT_PDF_BACKGROUND_RENDER', 'True').lower() in {'1', 'true', 'yes', 'sim'}
+# Segundos sem alterações a um PIT antes de o renderizar em segundo plano (agrupa gravações seguidas)
+PIT_PDF_RENDER_DELAY = float(os.environ.get('PIT_PDF_RENDER_DELAY', 30))
+PIT_PDF_CACHE_MAX_AGE_DAYS = int(os.environ.get('PIT_PDF_CACHE_MAX_AGE_DAYS', 60))
+# Processos para renderizar as exportações de PIT por turma (0 = no próprio processo).
+PIT_EXPORT_WORKERS = int(os.environ.get('PIT_EXPORT_WORKERS', min(4, os.cpu_count() or 1)))
+# Exportações em fila ou em curso há mais do que isto ficaram órfãs (o worker reiniciou) e passam a falhadas.
+PIT_EXPORT_STALE_MINUTES = int(os.environ.get('PIT_EXPORT_STALE_MINUTES', 30))
+# Edições sucessivas iguais (mesmo autor e campos) de um PIT dentro desta janela ficam num só registo.
+PIT_LOG_COALESCE_SECONDS = int(os.environ.get('PIT_LOG_COALESCE_SECONDS', 120))
+# Validade do resumo dos PIT por turma (o carimbo de versão invalida-o a cada escrita,
+# em todos os workers só com a cache partilhada de REDIS_URL).
+PIT_DASHBOARD_TTL = int(os.environ.get('PIT_DASHBOARD_TTL', 3600))
+
 # REMOVED CKEditor Config section
 # CKEDITOR_CONFIGS = { ... }
 # CKEDITOR_UPLOAD_PATH = "uploads/"
@@ -343,6 +385,8 @@ X_FRAME_OPTIONS = 'DENY'
 CORS_ALLOWED_ORIGINS = env_list('CORS_ALLOWED_ORIGINS')
 CORS_ALLOWED_ORIGIN_REGEXES = env_list('CORS_ALLOWED_ORIGIN_REGEXES')
 CORS_ALLOW_CREDENTIALS = True
+# Idempotency-Key: permite ao frontend repetir pedidos ao assistente IA sem duplicar custos
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 CSRF_TRUSTED_ORIGINS = env_list('CSRF_TRUSTED_ORIGINS')
 
 if DEBUG and not CORS_ALLOWED_ORIGINS and not CORS_ALLOWED_ORIGIN_REGEXES:
@@ -388,6 +432,12 @@ AI_MODEL_COSTS = {
     'llama3.1': os.environ.get('AI_COST_LLAM A31', '0.00000'),
     'qwen2.5:7b': os.environ.get('AI_COST_QWEN25_7B', '0.00000'),
 }
+# Preço por 1k tokens de saída (os de AI_MODEL_COSTS aplicam-se à entrada)
+AI_MODEL_OUTPUT_COSTS = {
+    'gpt-5-nano': os.environ.get('AI_OUTPUT_COST_GPT5_NANO', '0.00040'),
+    'gpt-5-mini': os.environ.get('AI_OUTPUT_COST_GPT5_MINI', '0.00200'),
+    'gpt-5': os.environ.get('AI_OUTPUT_COST_GPT5', '0.01000'),
+}
 AI_FAKE_RESPONSES = os.environ.get('AI_FAKE_RESPONSES', 'True').lower() in {'1', 'true', 'sim', 'yes'}
 AI_RATE_LIMITS = {
     'student': int(os.environ.get('AI_LIMIT_STUDENT', 12)),
@@ -395,6 +445,15 @@ AI_RATE_LIMITS = {
     'guardian': int(os.environ.get('AI_LIMIT_GUARDIAN', 6)),
     'admin': int(os.environ.get('AI_LIMIT_ADMIN', 60)),
 }
+# Timeout dos workers gunicorn (--timeout); as esperas dentro de um pedido ficam abaixo dele
+GUNICORN_TIMEOUT = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+# Pedidos idênticos em simultâneo: só um chama o provider, os restantes esperam (segundos)
+AI_SINGLE_FLIGHT_TIMEOUT = int(os.environ.get('AI_SINGLE_FLIGHT_TIMEOUT', 20))
+# Cache do optimizador de prompts (pedido normalizado + persona + origem)
+AI_OPTIMIZER_CACHE_TTL = int(os.environ.get('AI_OPTIMIZER_CACHE_TTL', 7 * 24 * 3600))
+AI_OPTIMIZER_CACHE_SIZE = int(os.environ.get('AI_OPTIMIZER_CACHE_SIZE', 512))
+# Resumos de turma mais antigos do que isto (segundos) são recalculados mesmo sem alterações registadas
+AI_CLASS_BRIEF_MAX_AGE = int(os.environ.get('AI_CLASS_BRIEF_MAX_AGE', 24 * 3600))
 
 # --- MEM Guidance ---
 MEM_ENABLE = os.environ.get('MEM_ENABLE', 'True').lower() in {'1', 'true', 'yes', 'sim'}
@@ -409,6 +468,14 @@ AI_MODEL_TIERS = {
     'mini': os.environ.get('AI_MODEL_TIER_MINI', 'gpt-5-mini'),
     'normal': os.environ.get('AI_MODEL_TIER_NORMAL', 'gpt-5'),
 }
+# Ollama local: keep_alive por tier e nº máximo de pedidos simultâneos por modelo
+AI_OLLAMA_KEEP_ALIVE = {
+    'nano': os.environ.get('OLLAMA_KEEP_ALIVE_NANO', '24h'),
+    'mini': os.environ.get('OLLAMA_KEEP_ALIVE_MINI', '30m'),
+    'normal': os.environ.get('OLLAMA_KEEP_ALIVE_NORMAL', '5m'),
+}
+AI_OLLAMA_MAX_CONCURRENCY = int(os.environ.get('OLLAMA_MAX_CONCURRENCY', 1))
+AI_OLLAMA_SLOT_WAIT = int(os.environ.get('OLLAMA_SLOT_WAIT', 20))
 
 # Map persona -> preferred model (overrides router defaults when set)
 # Valid keys: 'student', 'teacher', 'guardian', 'admin', 'staff'
@@ -8,6 +8,7 @@ from .models import (
     PlanSuggestion,
     PlanSection,
     PlanLogEntry,
+    PlanExportJob,
 )
 
 
@@ -75,4 +76,12 @@ class PlanLogEntryAdmin(admin.ModelAdmin):
     ordering = ('-created_at',)
 
 
+@admin.register(PlanExportJob)
+class PlanExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'student_class', 'period_label', 'format', 'status', 'completed', 'total', 'created_at')
+    list_filter = ('status', 'format', 'student_class')
+    search_fields = ('period_label', 'student_class__name')
+    ordering = ('-created_at',)
+
+
 # Register your models here.
@@ -1,8 +1,9 @@
 """Serializers for the PIT headless API."""
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 
-from pit.models import IndividualPlan, PlanTask, PitTemplate, PlanSuggestion
+from pit.models import IndividualPlan, PlanExportJob, PlanTask, PitTemplate, PlanSuggestion
 from users.api.serializers import UserSerializer
 
 User = get_user_model()
@@ -153,3 +154,34 @@ class IndividualPlanSerializer(serializers.ModelSerializer):
             }
             for section in sections
         ]
+
+
+class PlanExportJobSerializer(serializers.ModelSerializer):
+    student_class_id = serializers.IntegerField(read_only=True)
+    progress = serializers.FloatField(read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PlanExportJob
+        fields = [
+            'id',
+            'student_class_id',
+            'period_label',
+            'format',
+            'status',
+            'total',
+            'completed',
+            'reused',
+            'progress',
+            'error',
+            'download_url',
+            'created_at',
+            'started_at',
+            'finished_at',
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != PlanExportJob.Status.DONE:
+            return None
+        return reverse('pit-export-download', args=[obj.pk], request=self.context.get('request'))
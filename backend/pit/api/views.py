@@ -3,28 +3,45 @@ from django.utils.translation import gettext_lazy as _
 from datetime import date
 
 from django.core.exceptions import ValidationError as DjangoValidationError
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import get_object_or_404
 from django.utils.dateparse import parse_date
-from django.utils.text import slugify
+from django.utils.http import http_date, parse_etags
 
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from core.permissions import IsAuthenticatedAndActive
+from core.permissions import IsAuthenticatedAndActive, can_view_student
 from classes.models import Class
-from pit.models import IndividualPlan, PlanTask, PlanLogEntry
+from pit.models import IndividualPlan, PlanExportJob, PlanTask, PlanLogEntry
 from pit.views import (
     _notify_teachers_submission,
     _notify_student_status,
     _notify_teachers_self_evaluation,
     _notify_student_teacher_eval,
 )
-from pit.services import generate_weekly_plan, render_plan_pdf, log_plan_event
+from pit.services import (
+    class_rollups,
+    export_filename,
+    export_path,
+    fail_stale_exports,
+    generate_weekly_plan,
+    generate_weekly_plans,
+    log_plan_event,
+    plan_content_hash,
+    plan_log_batch,
+    plan_pdf_filename,
+    read_plan_pdf,
+    start_export,
+    student_timeline,
+    weekly_period_label,
+)
 from pit.api.permissions import IsPlanParticipant, IsPlanTaskParticipant
 from django.contrib.auth import get_user_model
-from .serializers import IndividualPlanSerializer, PlanTaskSerializer
+from .serializers import IndividualPlanSerializer, PlanExportJobSerializer, PlanTaskSerializer
 
 
 def _user_role(user):
@@ -32,6 +49,8 @@ def _user_role(user):
 
 User = get_user_model()
 
+DASHBOARD_ALL_PERIODS = 'all'
+
 
 class IndividualPlanViewSet(viewsets.ModelViewSet):
     serializer_class = IndividualPlanSerializer
@@ -57,6 +76,7 @@ class IndividualPlanViewSet(viewsets.ModelViewSet):
             return qs.filter(student__encarregados_relations__encarregado=user)
         return qs.none()
 
+    @plan_log_batch()
     def perform_update(self, serializer):
         plan = self.get_object()
         user = self.request.user
@@ -76,6 +96,7 @@ class IndividualPlanViewSet(viewsets.ModelViewSet):
             actor=self.request.user,
             message='Plano atualizado pelo aluno/professor.',
             payload={'updated_fields': list(serializer.validated_data.keys())},
+            coalesce=True,
         )
 
     @action(detail=False, methods=['post'], url_path='generate')
@@ -124,6 +145,82 @@ class IndividualPlanViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(result.plan)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'], url_path='generate-batch')
+    def generate_batch(self, request):
+        """Gera o PIT da semana para uma turma (``student_class_id``), um ano (``year``) ou a escola."""
+        user = request.user
+        role = _user_role(user)
+        is_admin = user.is_superuser or role == 'admin'
+        class_id = request.data.get('student_class_id')
+        year = request.data.get('year')
+
+        turma = None
+        if class_id:
+            try:
+                turma = Class.objects.get(pk=class_id)
+            except (Class.DoesNotExist, ValueError, TypeError) as exc:
+                raise ValidationError({'student_class_id': 'Turma inexistente.'}) from exc
+            if not is_admin and not (role == 'professor' and turma.teachers.filter(id=user.id).exists()):
+                raise PermissionDenied(_('Professor não associado à turma.'))
+        elif not is_admin:
+            raise PermissionDenied(_('Só administradores podem gerar PIT para um ano ou para a escola.'))
+        if year not in (None, ''):
+            try:
+                year = int(year)
+            except (TypeError, ValueError) as exc:
+                raise ValidationError({'year': 'Ano inválido.'}) from exc
+        else:
+            year = None
+
+        target_date_raw = request.data.get('target_date')
+        target_date: date | None = None
+        if target_date_raw:
+            target_date = parse_date(str(target_date_raw))
+            if target_date is None:
+                raise ValidationError({'target_date': 'Data inválida. Use o formato YYYY-MM-DD.'})
+
+        result = generate_weekly_plans(student_class=turma, year=year, target_date=target_date, actor=user)
+        return Response(
+            {
+                'period_label': result.period_label,
+                'created': result.created,
+                'skipped_existing': result.skipped_existing,
+                'classes_without_template': result.classes_without_template,
+                'plan_ids': [plan.id for plan in result.plans],
+            },
+            status=status.HTTP_201_CREATED if result.created else status.HTTP_200_OK,
+        )
+
+    @action(detail=False, methods=['get'])
+    def dashboard(self, request):
+        """Resumo por turma (``?class_id=``, ``?period_label=``): estados dos PIT e tarefas concluídas por aluno.
+
+        Sem ``period_label`` mostra a semana atual; ``period_label=all`` soma todo o histórico da turma.
+        """
+        user = request.user
+        role = _user_role(user)
+        is_admin = user.is_superuser or role == 'admin'
+        if not is_admin and role != 'professor':
+            raise PermissionDenied(_('Só professores e administradores podem consultar o resumo dos PIT.'))
+
+        classes = Class.objects.order_by('name')
+        if not is_admin:
+            classes = classes.filter(teachers=user)
+        class_id = request.query_params.get('class_id')
+        if class_id:
+            try:
+                turma = Class.objects.get(pk=class_id)
+            except (Class.DoesNotExist, ValueError, TypeError) as exc:
+                raise ValidationError({'class_id': 'Turma inexistente.'}) from exc
+            if not is_admin and not turma.teachers.filter(id=user.id).exists():
+                raise PermissionDenied(_('Professor não associado à turma.'))
+            classes = [turma]
+
+        period_label = (request.query_params.get('period_label') or '').strip() or weekly_period_label(date.today())
+        if period_label == DASHBOARD_ALL_PERIODS:
+            period_label = None
+        return Response({'period_label': period_label, 'classes': class_rollups(classes, period_label)})
+
     @action(detail=True, methods=['post'])
     def submit(self, request, pk=None):
         plan = self.get_object()
@@ -226,16 +323,85 @@ class IndividualPlanViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'], url_path='export-pdf')
     def export_pdf(self, request, pk=None):
         plan = self.get_object()
-        pdf_bytes = render_plan_pdf(plan)
-        student_part = slugify((plan.student.get_full_name() or plan.student.username) if plan.student_id else 'aluno')
-        class_part = slugify(plan.student_class.name) if plan.student_class_id and plan.student_class else 'turma'
-        period_part = slugify(plan.period_label)
-        filename = f"pit-{student_part}-{class_part}-{period_part}.pdf"
+        content_hash = plan_content_hash(plan)
+        etag = f'"{content_hash}"'
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+
+        cached, pdf_bytes, modified = read_plan_pdf(plan, content_hash=content_hash)
         response = HttpResponse(pdf_bytes, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Content-Disposition'] = f'attachment; filename="{plan_pdf_filename(plan)}"'
+        response['ETag'] = cached.etag
+        response['Last-Modified'] = http_date(modified)
+        response['Cache-Control'] = 'private, no-cache'
         return response
 
 
+class PlanExportViewSet(mixins.RetrieveModelMixin,
+                        mixins.ListModelMixin,
+                        viewsets.GenericViewSet):
+    """Exportação de todos os PIT de uma turma num período (ZIP ou PDF único), em segundo plano."""
+
+    serializer_class = PlanExportJobSerializer
+    permission_classes = [IsAuthenticatedAndActive]
+
+    def get_queryset(self):
+        user = self.request.user
+        role = _user_role(user)
+        fail_stale_exports()
+        qs = PlanExportJob.objects.select_related('student_class')
+        if user.is_superuser or role == 'admin':
+            return qs
+        if role == 'professor':
+            return qs.filter(student_class__teachers=user)
+        return qs.none()
+
+    def create(self, request):
+        user = request.user
+        role = _user_role(user)
+        try:
+            turma = Class.objects.get(pk=request.data.get('student_class_id'))
+        except (Class.DoesNotExist, ValueError, TypeError) as exc:
+            raise ValidationError({'student_class_id': 'Turma inexistente.'}) from exc
+        if not (user.is_superuser or role == 'admin') and not (
+            role == 'professor' and turma.teachers.filter(id=user.id).exists()
+        ):
+            raise PermissionDenied(_('Professor não associado à turma.'))
+
+        export_format = request.data.get('format') or PlanExportJob.Format.ZIP
+        if export_format not in PlanExportJob.Format.values:
+            raise ValidationError({'format': 'Formato inválido. Use "zip" ou "pdf".'})
+
+        period_label = (request.data.get('period_label') or '').strip()
+        if not period_label:
+            target_date_raw = request.data.get('target_date')
+            target_date = parse_date(str(target_date_raw)) if target_date_raw else date.today()
+            if target_date is None:
+                raise ValidationError({'target_date': 'Data inválida. Use o formato YYYY-MM-DD.'})
+            period_label = weekly_period_label(target_date)
+        if not IndividualPlan.objects.filter(student_class=turma, period_label=period_label).exists():
+            raise ValidationError({'period_label': 'Não há PIT desta turma para o período indicado.'})
+
+        job = start_export(turma, period_label, format=export_format, requested_by=user)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        path = export_path(job)
+        if path is None:
+            if job.status in (PlanExportJob.Status.QUEUED, PlanExportJob.Status.RUNNING):
+                return Response(self.get_serializer(job).data, status=status.HTTP_409_CONFLICT)
+            raise Http404(_('Exportação indisponível.'))
+        content_type = 'application/pdf' if job.format == PlanExportJob.Format.PDF else 'application/zip'
+        return FileResponse(
+            path.open('rb'), as_attachment=True, filename=export_filename(job), content_type=content_type
+        )
+
+
 class PlanTaskViewSet(mixins.CreateModelMixin,
                       mixins.RetrieveModelMixin,
                       mixins.UpdateModelMixin,
@@ -280,6 +446,7 @@ class PlanTaskViewSet(mixins.CreateModelMixin,
         if role not in {'aluno', 'professor'}:
             raise PermissionDenied(_('Perfil sem permissão para gerir tarefas.'))
 
+    @plan_log_batch()
     def perform_create(self, serializer):
         plan_id = self.request.data.get('plan')
         if not plan_id:
@@ -298,6 +465,7 @@ class PlanTaskViewSet(mixins.CreateModelMixin,
             payload={'task_id': task.id, 'description': task.description},
         )
 
+    @plan_log_batch()
     def perform_update(self, serializer):
         task = self.get_object()
         self._assert_can_edit(task)
@@ -315,8 +483,10 @@ class PlanTaskViewSet(mixins.CreateModelMixin,
             actor=self.request.user,
             message='Tarefa atualizada.',
             payload={'task_id': task.id, 'changes': changes},
+            coalesce=True,
         )
 
+    @plan_log_batch()
     def perform_destroy(self, instance):
         self._assert_can_edit(instance)
         plan = instance.plan
@@ -329,3 +499,20 @@ class PlanTaskViewSet(mixins.CreateModelMixin,
             message='Tarefa removida do plano.',
             payload=payload,
         )
+
+
+class StudentPlanTimelineAPIView(APIView):
+    """Cronologia dos PIT de um aluno, paginada por cursor (``?cursor=``, ``?limit=``)."""
+
+    permission_classes = [IsAuthenticatedAndActive]
+
+    def get(self, request, student_id: int, *args, **kwargs):
+        student = get_object_or_404(User, pk=student_id, role='aluno')
+        if not can_view_student(request.user, student):
+            raise PermissionDenied(_('Sem permissão para consultar este aluno.'))
+        try:
+            limit = int(request.query_params.get('limit', 20))
+            page = student_timeline(student, cursor=request.query_params.get('cursor') or None, limit=limit)
+        except ValueError as exc:
+            raise ValidationError({'detail': str(exc) or _('Parâmetros inválidos.')}) from exc
+        return Response({'student_id': student.id, 'results': page.results, 'next_cursor': page.next_cursor})
@@ -12,3 +12,6 @@ from django.apps import AppConfig
 class PitConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pit'
+
+    def ready(self):
+        import pit.signals  # noqa: F401
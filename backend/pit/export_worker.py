@@ -0,0 +1,30 @@
+"""Funções executadas nos processos filhos da exportação de PIT por turma.
+
+Ficam fora de ``pit.services`` porque os processos são lançados com ``spawn``:
+o módulo é importado antes de o Django estar configurado, por isso não pode
+importar modelos ao nível do módulo.
+"""
+from __future__ import annotations
+
+import os
+
+
+def init_worker(settings_module: str) -> None:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+
+    django.setup()
+
+
+def render_plan(plan_id: int, content_hash: str) -> str:
+    """Renderiza (ou reaproveita) o PDF do plano e devolve o caminho do ficheiro em cache."""
+    from django.db import connections
+
+    from pit.models import IndividualPlan
+    from pit.services.pdf import cached_plan_pdf
+
+    try:
+        plan = IndividualPlan.objects.select_related('student', 'student_class', 'template').get(pk=plan_id)
+        return str(cached_plan_pdf(plan, content_hash=content_hash).path)
+    finally:
+        connections.close_all()
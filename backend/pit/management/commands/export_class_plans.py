@@ -0,0 +1,48 @@
+import shutil
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from classes.models import Class
+from pit.models import IndividualPlan, PlanExportJob
+from pit.services import export_path, run_export_job, weekly_period_label
+
+
+class Command(BaseCommand):
+    help = 'Exporta todos os PIT de uma turma num período, como ZIP (um PDF por aluno) ou PDF único.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class-id', type=int, required=True, help='Turma a exportar.')
+        parser.add_argument('--period-label', help='Período exato dos PIT (ex.: "Semana 02/03 – 08/03").')
+        parser.add_argument('--date', help='Um dia da semana a exportar (YYYY-MM-DD; predefinição: hoje).')
+        parser.add_argument(
+            '--format', choices=PlanExportJob.Format.values, default=PlanExportJob.Format.ZIP, help='zip ou pdf.'
+        )
+        parser.add_argument('--output', help='Copiar o ficheiro final para este caminho.')
+
+    def handle(self, *args, **options):
+        turma = Class.objects.filter(pk=options['class_id']).first()
+        if turma is None:
+            raise CommandError(f"Turma {options['class_id']} não existe.")
+        period_label = options['period_label']
+        if not period_label:
+            target_date = date.today()
+            if options['date']:
+                target_date = parse_date(options['date'])
+                if target_date is None:
+                    raise CommandError('Data inválida. Use o formato YYYY-MM-DD.')
+            period_label = weekly_period_label(target_date)
+        if not IndividualPlan.objects.filter(student_class=turma, period_label=period_label).exists():
+            raise CommandError(f'A turma {turma} não tem PIT para "{period_label}".')
+
+        job = PlanExportJob.objects.create(student_class=turma, period_label=period_label, format=options['format'])
+        job = run_export_job(job.pk)
+        if job.status != PlanExportJob.Status.DONE:
+            raise CommandError(f'A exportação falhou: {job.error}')
+        path = export_path(job)
+        if options['output']:
+            path = shutil.copyfile(path, options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{job.total} PIT exportados ({job.reused} reaproveitados da cache): {path}'
+        ))
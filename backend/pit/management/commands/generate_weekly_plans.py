@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from classes.models import Class
+from pit.services import generate_weekly_plans
+
+
+class Command(BaseCommand):
+    help = 'Gera o PIT da semana para todos os alunos de uma turma, de um ano ou da escola inteira.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class-id', type=int, help='Só esta turma.')
+        parser.add_argument('--year', type=int, help='Só as turmas deste ano.')
+        parser.add_argument('--date', help='Um dia da semana a gerar (YYYY-MM-DD; predefinição: hoje).')
+
+    def handle(self, *args, **options):
+        turma = None
+        if options['class_id'] is not None:
+            turma = Class.objects.filter(pk=options['class_id']).first()
+            if turma is None:
+                raise CommandError(f"Turma {options['class_id']} não existe.")
+        target_date = None
+        if options['date']:
+            target_date = parse_date(options['date'])
+            if target_date is None:
+                raise CommandError('Data inválida. Use o formato YYYY-MM-DD.')
+
+        result = generate_weekly_plans(student_class=turma, year=options['year'], target_date=target_date)
+        if result.classes_without_template:
+            self.stdout.write(self.style.WARNING(
+                'Turmas sem modelo de PIT ativo: ' + ', '.join(map(str, result.classes_without_template))
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.period_label}: {result.created} PIT criados, {result.skipped_existing} já existiam.'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pit.services import fail_stale_exports, prune_pdf_cache
+
+
+class Command(BaseCommand):
+    help = 'Apaga os PDF de PIT em cache que já não são usados e fecha as exportações órfãs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age-days',
+            type=int,
+            help='Idade máxima dos ficheiros (predefinição: PIT_PDF_CACHE_MAX_AGE_DAYS ou 60).',
+        )
+
+    def handle(self, *args, **options):
+        max_age_days = options['max_age_days']
+        if max_age_days is not None and max_age_days < 0:
+            raise CommandError('--max-age-days tem de ser positivo.')
+        removed = prune_pdf_cache(max_age_days)
+        failed = fail_stale_exports()
+        self.stdout.write(self.style.SUCCESS(
+            f'{removed} ficheiros removidos; {failed} exportações órfãs dadas como falhadas.'
+        ))
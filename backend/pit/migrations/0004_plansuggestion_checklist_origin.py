@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pit', '0003_add_plan_suggestions_sections_logs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='plansuggestion',
+            name='origin',
+            field=models.CharField(choices=[('template', 'Modelo'), ('council', 'Conselho'), ('pending', 'Pendência'), ('checklist', 'Lista de verificação'), ('manual', 'Manual')], default='template', max_length=20, verbose_name='origem'),
+        ),
+    ]
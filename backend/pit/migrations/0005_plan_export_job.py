@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-19 17:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0003_classmembership'),
+        ('pit', '0004_plansuggestion_checklist_origin'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_label', models.CharField(max_length=100, verbose_name='período')),
+                ('format', models.CharField(choices=[('zip', 'ZIP (um PDF por aluno)'), ('pdf', 'PDF único')], default='zip', max_length=10, verbose_name='formato')),
+                ('status', models.CharField(choices=[('queued', 'Em fila'), ('running', 'Em curso'), ('done', 'Concluída'), ('failed', 'Falhou')], default='queued', max_length=20, verbose_name='estado')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='planos')),
+                ('completed', models.PositiveIntegerField(default=0, verbose_name='planos processados')),
+                ('reused', models.PositiveIntegerField(default=0, verbose_name='PDF reutilizados da cache')),
+                ('file_path', models.CharField(blank=True, max_length=500, verbose_name='ficheiro')),
+                ('error', models.TextField(blank=True, verbose_name='erro')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='início')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='fim')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pit_export_jobs', to=settings.AUTH_USER_MODEL, verbose_name='pedido por')),
+                ('student_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pit_export_jobs', to='classes.class', verbose_name='turma')),
+            ],
+            options={
+                'verbose_name': 'Exportação de PIT',
+                'verbose_name_plural': 'Exportações de PIT',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
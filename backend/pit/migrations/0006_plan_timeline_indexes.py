@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-19 17:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_log_students(apps, schema_editor):
+    IndividualPlan = apps.get_model('pit', 'IndividualPlan')
+    PlanLogEntry = apps.get_model('pit', 'PlanLogEntry')
+    PlanLogEntry.objects.filter(student__isnull=True).update(
+        student=Subquery(IndividualPlan.objects.filter(pk=OuterRef('plan_id')).values('student_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0003_classmembership'),
+        ('pit', '0005_plan_export_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planlogentry',
+            name='student',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pit_timeline_entries', to=settings.AUTH_USER_MODEL, verbose_name='aluno'),
+        ),
+        migrations.RunPython(backfill_log_students, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='individualplan',
+            index=models.Index(fields=['student', '-created_at', '-id'], name='pit_plan_student_timeline'),
+        ),
+        migrations.AddIndex(
+            model_name='planlogentry',
+            index=models.Index(fields=['student', '-created_at', '-id'], name='pit_log_student_timeline'),
+        ),
+    ]
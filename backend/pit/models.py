@@ -162,6 +162,7 @@ class IndividualPlan(models.Model):
                 name='unique_plan_per_period_per_class'
             )
         ]
+        indexes = [models.Index(fields=['student', '-created_at', '-id'], name='pit_plan_student_timeline')]
 
     def __str__(self) -> str:
         return f"{self.student} · {self.student_class} · {self.period_label} ({self.get_status_display()})"
@@ -208,6 +209,7 @@ class PlanSuggestion(models.Model):
         TEMPLATE = 'template', _('Modelo')
         COUNCIL = 'council', _('Conselho')
         PENDING = 'pending', _('Pendência')
+        CHECKLIST = 'checklist', _('Lista de verificação')
         MANUAL = 'manual', _('Manual')
 
     plan = models.ForeignKey(
@@ -305,15 +307,84 @@ class PlanLogEntry(models.Model):
         related_name='pit_log_entries',
         verbose_name=_('autor'),
     )
+    # Cópia de plan.student: a cronologia do aluno lê um só índice, sem juntar aos planos.
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name='pit_timeline_entries',
+        verbose_name=_('aluno'),
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = _('Log do Plano')
         verbose_name_plural = _('Logs do Plano')
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['student', '-created_at', '-id'], name='pit_log_student_timeline')]
+
+    def save(self, *args, **kwargs):
+        if self.student_id is None and self.plan_id is not None:
+            self.student_id = self.plan.student_id
+        super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         return f"{self.plan.period_label} · {self.get_action_display()} · {self.created_at:%Y-%m-%d %H:%M}"
 
 
+
+class PlanExportJob(models.Model):
+    """Exportação de todos os PIT de uma turma num período (ZIP ou PDF único), feita em segundo plano."""
+
+    class Format(models.TextChoices):
+        ZIP = 'zip', _('ZIP (um PDF por aluno)')
+        PDF = 'pdf', _('PDF único')
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', _('Em fila')
+        RUNNING = 'running', _('Em curso')
+        DONE = 'done', _('Concluída')
+        FAILED = 'failed', _('Falhou')
+
+    student_class = models.ForeignKey(
+        Class,
+        on_delete=models.CASCADE,
+        related_name='pit_export_jobs',
+        verbose_name=_('turma'),
+    )
+    period_label = models.CharField(_('período'), max_length=100)
+    format = models.CharField(_('formato'), max_length=10, choices=Format.choices, default=Format.ZIP)
+    status = models.CharField(_('estado'), max_length=20, choices=Status.choices, default=Status.QUEUED)
+    total = models.PositiveIntegerField(_('planos'), default=0)
+    completed = models.PositiveIntegerField(_('planos processados'), default=0)
+    reused = models.PositiveIntegerField(_('PDF reutilizados da cache'), default=0)
+    file_path = models.CharField(_('ficheiro'), max_length=500, blank=True)
+    error = models.TextField(_('erro'), blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='pit_export_jobs',
+        verbose_name=_('pedido por'),
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(_('início'), null=True, blank=True)
+    finished_at = models.DateTimeField(_('fim'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('Exportação de PIT')
+        verbose_name_plural = _('Exportações de PIT')
+        ordering = ['-created_at']
+
+    def __str__(self) -> str:
+        return f"{self.student_class} · {self.period_label} · {self.get_status_display()}"
+
+    @property
+    def progress(self) -> float:
+        return round(self.completed / self.total, 3) if self.total else (1.0 if self.status == self.Status.DONE else 0.0)
+
+
 # Create your models here.
@@ -0,0 +1,56 @@
+from pit.services.audit import log_plan_event, plan_log_batch
+from pit.services.batch import BatchGenerationResult, generate_weekly_plans
+from pit.services.dashboard import bump_dashboard_versions, class_rollups, compute_rollups
+from pit.services.exports import (
+    export_filename,
+    export_path,
+    fail_stale_exports,
+    run_export_job,
+    start_export,
+)
+from pit.services.pdf import (
+    CachedPlanPdf,
+    cached_plan_pdf,
+    plan_content_hash,
+    plan_pdf_filename,
+    prune_pdf_cache,
+    read_plan_pdf,
+    schedule_plan_render,
+)
+from pit.services.plans import (
+    CHECKLIST_OBJECTIVES_PER_PLAN,
+    GenerationResult,
+    generate_weekly_plan,
+    render_plan_pdf,
+    weekly_period_label,
+)
+from pit.services.timeline import TimelinePage, student_timeline
+
+__all__ = [
+    "BatchGenerationResult",
+    "CHECKLIST_OBJECTIVES_PER_PLAN",
+    "CachedPlanPdf",
+    "GenerationResult",
+    "TimelinePage",
+    "bump_dashboard_versions",
+    "cached_plan_pdf",
+    "class_rollups",
+    "compute_rollups",
+    "export_filename",
+    "export_path",
+    "fail_stale_exports",
+    "generate_weekly_plan",
+    "generate_weekly_plans",
+    "log_plan_event",
+    "plan_content_hash",
+    "plan_log_batch",
+    "plan_pdf_filename",
+    "prune_pdf_cache",
+    "read_plan_pdf",
+    "render_plan_pdf",
+    "run_export_job",
+    "schedule_plan_render",
+    "start_export",
+    "student_timeline",
+    "weekly_period_label",
+]
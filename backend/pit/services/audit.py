@@ -0,0 +1,134 @@
+"""Registo de auditoria dos PIT (``PlanLogEntry``) com escrita agrupada.
+
+Dentro de ``plan_log_batch`` os registos ficam em memória e são gravados de uma
+vez no fim do bloco, na mesma transação que as alterações que descrevem (se a
+transação falhar, os registos também não ficam). Fora do bloco cada registo é
+gravado logo, como antes.
+
+Os registos pedidos com ``coalesce=True`` (edições sucessivas do guardar
+automático) juntam-se ao registo anterior do mesmo plano quando este é do mesmo
+autor, da mesma ação e sobre os mesmos campos, e foi criado há menos de
+``PIT_LOG_COALESCE_SECONDS``: fica o valor inicial (``from``) do primeiro, o
+final (``to``) do último, o número de edições (``coalesced``) e a hora da última
+(``last_at``). Qualquer outro registo pelo meio interrompe a junção.
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from pit.models import IndividualPlan, PlanLogEntry
+
+DEFAULT_PLAN_LOG_COALESCE_SECONDS = 120
+
+_local = threading.local()
+
+
+def _coalesce_key(entry: PlanLogEntry) -> Tuple:
+    payload = entry.payload or {}
+    fields = payload.get('changes', payload.get('updated_fields')) or ()
+    return (entry.actor_id, entry.action, entry.message, payload.get('task_id'), tuple(sorted(fields)))
+
+
+def _merge(into: PlanLogEntry, newer: PlanLogEntry, now) -> None:
+    payload = dict(into.payload or {})
+    newer_payload = newer.payload or {}
+    if 'changes' in newer_payload:
+        changes = dict(payload.get('changes') or {})
+        for field, change in newer_payload['changes'].items():
+            first = changes.get(field, change)
+            changes[field] = {'from': first.get('from'), 'to': change.get('to')}
+        payload['changes'] = changes
+    payload['coalesced'] = payload.get('coalesced', 1) + newer_payload.get('coalesced', 1)
+    payload['last_at'] = now.isoformat()
+    into.payload = payload
+
+
+@transaction.atomic
+def _write(pending: List[Tuple[PlanLogEntry, bool]]) -> List[PlanLogEntry]:
+    """Grava os registos pendentes (``bulk_create``), juntando os que podem ser juntos.
+
+    Devolve, para cada registo pedido, o registo em que ficou gravado.
+    """
+    now = timezone.now()
+    latest: Dict[int, PlanLogEntry] = {}
+    if any(coalesce for _, coalesce in pending):
+        window = getattr(settings, 'PIT_LOG_COALESCE_SECONDS', DEFAULT_PLAN_LOG_COALESCE_SECONDS)
+        recent = (
+            PlanLogEntry.objects.select_for_update()
+            .filter(plan_id__in={entry.plan_id for entry, _ in pending}, created_at__gte=now - timedelta(seconds=window))
+            .order_by('-created_at', '-id')
+        )
+        for entry in recent:
+            latest.setdefault(entry.plan_id, entry)
+
+    to_create: List[PlanLogEntry] = []
+    to_update: Dict[int, PlanLogEntry] = {}
+    written: List[PlanLogEntry] = []
+    for entry, coalesce in pending:
+        previous = latest.get(entry.plan_id)
+        if coalesce and previous is not None and _coalesce_key(previous) == _coalesce_key(entry):
+            _merge(previous, entry, now)
+            if previous.pk is not None:
+                to_update[previous.pk] = previous
+            written.append(previous)
+            continue
+        to_create.append(entry)
+        latest[entry.plan_id] = entry
+        written.append(entry)
+
+    PlanLogEntry.objects.bulk_create(to_create)
+    if to_update:
+        PlanLogEntry.objects.bulk_update(list(to_update.values()), ['payload'])
+    return written
+
+
+def log_plan_event(
+    *,
+    plan: IndividualPlan,
+    action: PlanLogEntry.Action,
+    actor=None,
+    message: str = '',
+    payload: Optional[dict] = None,
+    coalesce: bool = False,
+) -> PlanLogEntry:
+    """Cria um registo de auditoria para o plano.
+
+    Dentro de ``plan_log_batch`` o registo só é gravado no fim do bloco. Com
+    ``coalesce`` pode ser junto ao registo anterior equivalente (ver módulo).
+    """
+
+    entry = PlanLogEntry(
+        plan=plan, student_id=plan.student_id, action=action, message=message, payload=payload or {}, actor=actor
+    )
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        return _write([(entry, coalesce)])[0]
+    buffer.append((entry, coalesce))
+    return entry
+
+
+@contextmanager
+def plan_log_batch():
+    """Transação em que os registos de ``log_plan_event`` são gravados juntos no fim.
+
+    Pode ser usado como decorador; blocos aninhados juntam-se ao exterior.
+    """
+    if getattr(_local, 'buffer', None) is not None:
+        yield
+        return
+    _local.buffer = []
+    try:
+        with transaction.atomic():
+            yield
+            pending, _local.buffer = _local.buffer, None
+            if pending:
+                _write(pending)
+    finally:
+        _local.buffer = None
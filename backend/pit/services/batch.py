@@ -0,0 +1,253 @@
+"""Geração em lote dos PIT semanais de uma turma, de um ano ou da escola inteira.
+
+Tudo o que ``generate_weekly_plan`` lê aluno a aluno (modelo, plano de origem,
+tarefas pendentes, decisões do Conselho, próximos objetivos) é carregado de uma
+vez para todos os alunos; os planos e as respetivas secções, sugestões e
+registos são depois gravados com ``bulk_create``. O número de consultas não
+depende do número de alunos.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from checklists.services import NextObjectiveRecommender
+from classes.models import Class
+from pit.models import (
+    IndividualPlan,
+    PlanLogEntry,
+    PlanSection,
+    PlanSuggestion,
+    PlanTask,
+    PitTemplate,
+    TemplateSection,
+    TemplateSuggestion,
+)
+from pit.services.dashboard import bump_dashboard_versions
+from pit.services.plans import (
+    CHECKLIST_OBJECTIVES_PER_PLAN,
+    COUNCIL_SUGGESTIONS_PER_PLAN,
+    _build_period_label,
+    _council_suggestion,
+    _generation_log_entry,
+    _objective_suggestion,
+    _open_council_decisions,
+    _pending_suggestion,
+    _week_bounds,
+)
+
+
+@dataclass
+class BatchGenerationResult:
+    period_label: str
+    plans: List[IndividualPlan] = field(default_factory=list)
+    skipped_existing: int = 0
+    classes_without_template: List[int] = field(default_factory=list)
+    created_sections: int = 0
+    created_suggestions: int = 0
+
+    @property
+    def created(self) -> int:
+        return len(self.plans)
+
+
+def _pick_templates(class_ids: List[int]) -> Dict[int, PitTemplate]:
+    """Modelo ativo mais recente de cada turma, ou o geral quando a turma não tem."""
+    per_class: Dict[int, PitTemplate] = {}
+    fallback: Optional[PitTemplate] = None
+    for template in PitTemplate.objects.filter(is_active=True).filter(
+        Q(student_class_id__in=class_ids) | Q(student_class__isnull=True)
+    ).order_by('-version', '-updated_at'):
+        if template.student_class_id is None:
+            fallback = fallback or template
+        else:
+            per_class.setdefault(template.student_class_id, template)
+    if fallback is not None:
+        for class_id in class_ids:
+            per_class.setdefault(class_id, fallback)
+    return per_class
+
+
+def _targets(memberships, week_start: date, period_label: str):
+    """``(turma, aluno, plano de origem, já tem plano)`` numa só consulta."""
+    plans = IndividualPlan.objects.filter(student_id=OuterRef('user_id'), student_class_id=OuterRef('class_id'))
+    previous = (
+        plans.exclude(start_date__isnull=True)
+        .filter(start_date__lt=week_start)
+        .order_by('-start_date', '-created_at')
+        .values('id')[:1]
+    )
+    latest = plans.order_by('-start_date', '-created_at').values('id')[:1]
+    return (
+        memberships.annotate(
+            origin_id=Coalesce(Subquery(previous), Subquery(latest)),
+            has_plan=Exists(plans.filter(period_label=period_label)),
+        )
+        .values_list('class_id', 'user_id', 'origin_id', 'has_plan')
+        .order_by('class_id', 'user_id')
+    )
+
+
+@transaction.atomic
+def generate_weekly_plans(
+    *,
+    student_class: Optional[Class] = None,
+    year: Optional[int] = None,
+    target_date: Optional[date] = None,
+    actor=None,
+) -> BatchGenerationResult:
+    """Gera o PIT da semana para todos os alunos do âmbito que ainda não o têm.
+
+    Sem ``student_class`` nem ``year`` o âmbito é a escola inteira. É idempotente:
+    alunos que já têm plano para o período são contados em ``skipped_existing``.
+    """
+    if target_date is None:
+        target_date = date.today()
+    week_start, week_end = _week_bounds(target_date)
+    period_label = _build_period_label(week_start, week_end)
+    result = BatchGenerationResult(period_label=period_label)
+
+    memberships = Class.students.through.objects.filter(user__role='aluno')
+    if student_class is not None:
+        memberships = memberships.filter(class_id=student_class.pk)
+    if year is not None:
+        memberships = memberships.filter(class__year=year)
+
+    targets = []
+    for class_id, student_id, origin_id, has_plan in _targets(memberships, week_start, period_label):
+        if has_plan:
+            result.skipped_existing += 1
+        else:
+            targets.append((class_id, student_id, origin_id))
+    if not targets:
+        return result
+
+    class_ids = sorted({class_id for class_id, _, _ in targets})
+    templates = _pick_templates(class_ids)
+    result.classes_without_template = [class_id for class_id in class_ids if class_id not in templates]
+    targets = [target for target in targets if target[0] in templates]
+    if not targets:
+        return result
+    template_ids = {template.id for template in templates.values()}
+
+    sections_by_template = defaultdict(list)
+    for section in TemplateSection.objects.filter(template_id__in=template_ids).order_by('order', 'id'):
+        sections_by_template[section.template_id].append(section)
+    suggestions_by_template = defaultdict(list)
+    for suggestion in TemplateSuggestion.objects.filter(template_id__in=template_ids).order_by('order', 'id'):
+        suggestions_by_template[suggestion.template_id].append(suggestion)
+
+    origin_ids = {origin_id for _, _, origin_id in targets if origin_id}
+    pending_by_plan = defaultdict(list)
+    for task in (
+        PlanTask.objects.filter(plan_id__in=origin_ids)
+        .exclude(state__in=[PlanTask.TaskState.DONE, PlanTask.TaskState.VALIDATED])
+        .order_by('plan_id', 'order', 'id')
+    ):
+        pending_by_plan[task.plan_id].append(task)
+
+    council_by_class = defaultdict(list)
+    for decision in _open_council_decisions(week_start).filter(student_class_id__in=class_ids):
+        if len(council_by_class[decision.student_class_id]) < COUNCIL_SUGGESTIONS_PER_PLAN:
+            council_by_class[decision.student_class_id].append(decision)
+
+    recommender = NextObjectiveRecommender()
+    ranked = recommender.recommend_many({student_id for _, student_id, _ in targets}, limit=None)
+
+    plans: List[IndividualPlan] = []
+    sources = []
+    for class_id, student_id, origin_id in targets:
+        template = templates[class_id]
+        objectives = recommender.select(
+            ranked.get(student_id, []), student_class=class_id, limit=CHECKLIST_OBJECTIVES_PER_PLAN
+        )
+        pending = pending_by_plan.get(origin_id, [])
+        plans.append(
+            IndividualPlan(
+                student_id=student_id,
+                student_class_id=class_id,
+                template=template,
+                template_version=template.version,
+                origin_plan_id=origin_id,
+                period_label=period_label,
+                start_date=week_start,
+                end_date=week_end,
+                status=IndividualPlan.PlanStatus.DRAFT,
+                suggestions_imported=bool(suggestions_by_template[template.id] or objectives),
+                pendings_imported=bool(pending),
+            )
+        )
+        sources.append((template, pending, council_by_class.get(class_id, []), objectives))
+    IndividualPlan.objects.bulk_create(plans, batch_size=500)
+
+    sections: List[PlanSection] = []
+    suggestions: List[PlanSuggestion] = []
+    log_entries: List[PlanLogEntry] = []
+    for plan, (template, pending, decisions, objectives) in zip(plans, sources):
+        template_sections = sections_by_template[template.id]
+        sections.extend(
+            PlanSection(
+                plan=plan,
+                title=section.title,
+                area_code=section.area_code,
+                order=section.order,
+                template_section=section,
+            )
+            for section in template_sections
+        )
+        template_suggestions = suggestions_by_template[template.id]
+        plan_suggestions = [
+            PlanSuggestion(
+                plan=plan,
+                text=suggestion.text,
+                origin=PlanSuggestion.SuggestionSource.TEMPLATE,
+                template_suggestion=suggestion,
+                order=index,
+                is_pending=suggestion.is_pending,
+            )
+            for index, suggestion in enumerate(template_suggestions, start=1)
+        ]
+        plan_suggestions += [
+            _pending_suggestion(plan, task, len(plan_suggestions) + offset)
+            for offset, task in enumerate(pending, start=1)
+        ]
+        plan_suggestions += [
+            _council_suggestion(plan, decision, len(plan_suggestions) + offset)
+            for offset, decision in enumerate(decisions, start=1)
+        ]
+        plan_suggestions += [
+            _objective_suggestion(plan, objective, len(plan_suggestions) + offset)
+            for offset, objective in enumerate(objectives, start=1)
+        ]
+        suggestions.extend(plan_suggestions)
+
+        entry = _generation_log_entry(
+            plan,
+            template,
+            len(template_sections),
+            len(template_suggestions),
+            len(pending),
+            len(decisions),
+            len(objectives),
+        )
+        entry.actor = actor
+        entry.payload['batch'] = True
+        log_entries.append(entry)
+
+    PlanSection.objects.bulk_create(sections, batch_size=1000)
+    PlanSuggestion.objects.bulk_create(suggestions, batch_size=1000)
+    PlanLogEntry.objects.bulk_create(log_entries, batch_size=1000)
+    # bulk_create não envia sinais: o painel das turmas é invalidado aqui.
+    created_class_ids = {plan.student_class_id for plan in plans}
+    transaction.on_commit(lambda: bump_dashboard_versions(created_class_ids))
+
+    result.plans = plans
+    result.created_sections = len(sections)
+    result.created_suggestions = len(suggestions)
+    return result
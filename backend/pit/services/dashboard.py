@@ -0,0 +1,156 @@
+"""Resumo dos PIT por turma para o painel do professor.
+
+Para cada turma: quantos planos estão por submeter, à espera de decisão, sem
+autoavaliação ou por avaliar; para cada aluno: planos por estado e proporção de
+tarefas concluídas. Tudo sai de agregações condicionais na base de dados, com
+um número fixo de consultas para qualquer número de turmas.
+
+Cada turma tem um carimbo de versão na cache que qualquer escrita num PIT
+(plano ou tarefa) incrementa; o resumo fica guardado com o carimbo na chave, por
+isso não é preciso apagar nada. O carimbo só é visto por todos os workers numa
+cache partilhada (``REDIS_URL``, obrigatório em produção): com a LocMemCache
+cada processo tem o seu e um worker pode servir um resumo antigo até ao fim de
+``PIT_DASHBOARD_TTL``.
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from pit.models import IndividualPlan, PlanTask
+
+DEFAULT_DASHBOARD_TTL = 3600
+DASHBOARD_CACHE_PREFIX = 'pit-dashboard'
+
+Status = IndividualPlan.PlanStatus
+DONE_TASK_STATES = (PlanTask.TaskState.DONE, PlanTask.TaskState.VALIDATED)
+
+_PLAN_COUNTS = {
+    'plans': Count('id'),
+    'awaiting_submission': Count('id', filter=Q(status=Status.DRAFT)),
+    'awaiting_decision': Count('id', filter=Q(status=Status.SUBMITTED)),
+    'missing_self_evaluation': Count(
+        'id', filter=Q(status__in=[Status.APPROVED, Status.CONCLUDED, Status.EVALUATED], self_evaluation='')
+    ),
+    'awaiting_evaluation': Count('id', filter=Q(status=Status.CONCLUDED)),
+    'evaluated': Count('id', filter=Q(status=Status.EVALUATED)),
+}
+
+
+def _version_key(class_id: int) -> str:
+    return f'{DASHBOARD_CACHE_PREFIX}:version:{class_id}'
+
+
+def bump_dashboard_versions(class_ids: Iterable[int]) -> None:
+    """Invalida o resumo das turmas (chamar sempre que um PIT ou tarefa muda)."""
+    for class_id in set(class_ids):
+        key = _version_key(class_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Sem carimbo (nunca lido ou expulso da cache): o novo valor tem de ser maior que os anteriores.
+            if not cache.add(key, int(time.time() * 1000), timeout=None):
+                cache.incr(key)
+
+
+def _versions(class_ids: List[int]) -> Dict[int, int]:
+    keys = {class_id: _version_key(class_id) for class_id in class_ids}
+    stored = cache.get_many(list(keys.values()))
+    versions = {}
+    for class_id, key in keys.items():
+        if key not in stored:
+            cache.add(key, int(time.time() * 1000), timeout=None)
+            stored[key] = cache.get(key)
+        versions[class_id] = stored[key]
+    return versions
+
+
+def _ratio(done: int, total: int) -> float:
+    return round(done / total, 3) if total else 0.0
+
+
+def compute_rollups(classes, period_label: Optional[str] = None) -> Dict[int, Dict[str, Any]]:
+    """Resumo sem cache de várias turmas: duas consultas agregadas, seja qual for o número de turmas."""
+    classes = list(classes)
+    class_ids = [turma.pk for turma in classes]
+    plans = IndividualPlan.objects.filter(student_class_id__in=class_ids)
+    tasks = PlanTask.objects.filter(plan__student_class_id__in=class_ids)
+    if period_label:
+        plans = plans.filter(period_label=period_label)
+        tasks = tasks.filter(plan__period_label=period_label)
+
+    rollups: Dict[int, Dict[str, Any]] = {
+        turma.pk: {
+            'class_id': turma.pk,
+            'class_name': turma.name,
+            'period_label': period_label,
+            **{name: 0 for name in _PLAN_COUNTS},
+            'tasks': 0,
+            'tasks_done': 0,
+            'completion_ratio': 0.0,
+            'students': [],
+        }
+        for turma in classes
+    }
+    students: Dict[tuple, Dict[str, Any]] = {}
+    for row in (
+        plans.values('student_class_id', 'student_id', 'student__first_name', 'student__last_name', 'student__username')
+        .annotate(**_PLAN_COUNTS)
+        .order_by('student__first_name', 'student__last_name', 'student__username')
+    ):
+        name = f"{row['student__first_name']} {row['student__last_name']}".strip() or row['student__username']
+        entry = {
+            'student_id': row['student_id'],
+            'name': name,
+            **{counter: row[counter] for counter in _PLAN_COUNTS},
+            'tasks': 0,
+            'tasks_done': 0,
+            'completion_ratio': 0.0,
+        }
+        students[(row['student_class_id'], row['student_id'])] = entry
+        rollup = rollups[row['student_class_id']]
+        rollup['students'].append(entry)
+        for counter in _PLAN_COUNTS:
+            rollup[counter] += row[counter]
+
+    for row in (
+        tasks.values('plan__student_class_id', 'plan__student_id')
+        .annotate(total=Count('id'), done=Count('id', filter=Q(state__in=DONE_TASK_STATES)))
+        .order_by()
+    ):
+        entry = students.get((row['plan__student_class_id'], row['plan__student_id']))
+        if entry is None:
+            continue
+        entry['tasks'], entry['tasks_done'] = row['total'], row['done']
+        entry['completion_ratio'] = _ratio(row['done'], row['total'])
+        rollup = rollups[row['plan__student_class_id']]
+        rollup['tasks'] += row['total']
+        rollup['tasks_done'] += row['done']
+
+    for rollup in rollups.values():
+        rollup['completion_ratio'] = _ratio(rollup['tasks_done'], rollup['tasks'])
+    return rollups
+
+
+def class_rollups(classes, period_label: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Resumos das turmas, lidos da cache quando o carimbo da turma não mudou."""
+    classes = list(classes)
+    if not classes:
+        return []
+    period_part = hashlib.sha1((period_label or '').encode('utf-8')).hexdigest()[:12]
+    versions = _versions([turma.pk for turma in classes])
+    keys = {turma.pk: f'{DASHBOARD_CACHE_PREFIX}:{turma.pk}:{versions[turma.pk]}:{period_part}' for turma in classes}
+    cached = cache.get_many(list(keys.values()))
+    rollups = {class_id: cached[key] for class_id, key in keys.items() if key in cached}
+    missing = [turma for turma in classes if turma.pk not in rollups]
+    if missing:
+        fresh = compute_rollups(missing, period_label)
+        ttl = getattr(settings, 'PIT_DASHBOARD_TTL', DEFAULT_DASHBOARD_TTL)
+        cache.set_many({keys[class_id]: rollup for class_id, rollup in fresh.items()}, timeout=ttl)
+        rollups.update(fresh)
+    return [rollups[turma.pk] for turma in classes]
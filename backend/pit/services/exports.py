@@ -0,0 +1,250 @@
+"""Exportação de todos os PIT de uma turma num período, como ZIP ou como um único PDF.
+
+O pedido HTTP só cria o ``PlanExportJob``; o trabalho corre depois do commit
+numa thread própria e o progresso fica no registo (``completed``/``total``).
+Como a thread morre com o worker (reinício, ``max_requests``), os registos que
+ficam em fila ou em curso para lá de ``PIT_EXPORT_STALE_MINUTES`` são dados
+como falhados por ``fail_stale_exports``.
+Os PDF que já estão na cache de ``pit.services.pdf`` (mesmo hash de conteúdo)
+são reaproveitados; os restantes são renderizados em paralelo num conjunto de
+processos (o reportlab ocupa a CPU e não liberta o GIL). O ZIP vai sendo
+escrito à medida que cada PDF fica pronto. Cada PDF é ligado (hard link, ou
+copiado) para a pasta de trabalho da exportação assim que é encontrado: uma
+renderização em segundo plano de um plano editado entretanto apaga a versão
+antiga da cache, mas não a cópia da exportação.
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import zipfile
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from pit import export_worker
+from pit.models import IndividualPlan, PlanExportJob
+from pit.services.pdf import _write_atomic, cache_dir, cached_plan_pdf, plan_content_hash, plan_pdf_filename
+from pit.services.plans import render_plan_pdf
+from pypdf import PdfWriter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPORT_WORKERS = 4
+DEFAULT_STALE_MINUTES = 30
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def export_workers() -> int:
+    """Processos de renderização (``PIT_EXPORT_WORKERS``; 0 ou 1 renderiza no próprio processo)."""
+    configured = getattr(settings, 'PIT_EXPORT_WORKERS', None)
+    if configured is None:
+        return min(DEFAULT_EXPORT_WORKERS, os.cpu_count() or 1)
+    return max(int(configured), 0)
+
+
+def fail_stale_exports(max_age_minutes: Optional[int] = None) -> int:
+    """Marca como falhadas as exportações abandonadas (a thread que as corria já não existe)."""
+    if max_age_minutes is None:
+        max_age_minutes = getattr(settings, 'PIT_EXPORT_STALE_MINUTES', DEFAULT_STALE_MINUTES)
+    cutoff = timezone.now() - timedelta(minutes=max_age_minutes)
+    return PlanExportJob.objects.filter(
+        Q(status=PlanExportJob.Status.QUEUED, created_at__lt=cutoff)
+        | Q(status=PlanExportJob.Status.RUNNING, started_at__lt=cutoff)
+    ).update(
+        status=PlanExportJob.Status.FAILED,
+        error='Exportação interrompida; peça-a de novo.',
+        finished_at=timezone.now(),
+    )
+
+
+def export_filename(job: PlanExportJob) -> str:
+    return f"pit-{slugify(job.student_class.name)}-{slugify(job.period_label)}.{job.format}"
+
+
+def class_plans(student_class, period_label: str):
+    return (
+        IndividualPlan.objects.filter(student_class=student_class, period_label=period_label)
+        .select_related('student', 'student_class', 'template')
+        .order_by('student__first_name', 'student__last_name', 'student__username', 'id')
+    )
+
+
+def start_export(
+    student_class, period_label: str, *, format: str = PlanExportJob.Format.ZIP, requested_by=None
+) -> PlanExportJob:
+    """Regista a exportação e agenda-a para depois do commit; devolve logo o registo."""
+    job = PlanExportJob.objects.create(
+        student_class=student_class,
+        period_label=period_label,
+        format=format,
+        total=class_plans(student_class, period_label).count(),
+        requested_by=requested_by,
+    )
+    transaction.on_commit(lambda: _submit(_run_in_background, job.pk))
+    return job
+
+
+def _submit(fn, *args) -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pit-export')
+    _executor.submit(fn, *args)
+
+
+def _run_in_background(job_id: int) -> None:
+    try:
+        run_export_job(job_id)
+    finally:
+        connections.close_all()
+
+
+def _render_missing(missing: List[IndividualPlan], hashes: Dict[int, str]) -> Iterator[Tuple[int, Path]]:
+    """Renderiza os planos sem PDF em cache, devolvendo ``(plano, ficheiro)`` pela ordem em que terminam."""
+    workers = min(export_workers(), len(missing))
+    if workers <= 1:
+        for plan in missing:
+            yield plan.pk, cached_plan_pdf(plan, content_hash=hashes[plan.pk]).path
+        return
+
+    settings_module = os.environ.get('DJANGO_SETTINGS_MODULE', 'infantinho3.settings')
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=export_worker.init_worker,
+        initargs=(settings_module,),
+    ) as pool:
+        futures = {
+            pool.submit(export_worker.render_plan, plan.pk, hashes[plan.pk]): plan.pk for plan in missing
+        }
+        for future in as_completed(futures):
+            yield futures[future], Path(future.result())
+
+
+def _pin(source: Path, target: Path) -> bool:
+    """Liga ``source`` a ``target`` (ou copia, noutro sistema de ficheiros); ``False`` se já não existir."""
+    try:
+        os.link(source, target)
+    except FileNotFoundError:
+        return False
+    except OSError:
+        try:
+            shutil.copyfile(source, target)
+        except FileNotFoundError:
+            return False
+    return True
+
+
+def _rendered(missing: List[IndividualPlan], hashes: Dict[int, str], work: Path) -> Iterator[Tuple[int, Path]]:
+    """``_render_missing`` com cada PDF já preso na pasta de trabalho (renderizado aqui se entretanto sumiu)."""
+    by_id = {plan.pk: plan for plan in missing}
+    for plan_id, path in _render_missing(missing, hashes):
+        pinned = work / f'{plan_id}.pdf'
+        if not _pin(path, pinned):
+            _write_atomic(pinned, render_plan_pdf(by_id[plan_id]))
+        yield plan_id, pinned
+
+
+def _advance(job: PlanExportJob, count: int = 1) -> None:
+    PlanExportJob.objects.filter(pk=job.pk).update(completed=F('completed') + count)
+
+
+def run_export_job(job_id: int) -> PlanExportJob:
+    """Executa a exportação: reaproveita a cache, renderiza o que falta e escreve o ficheiro final."""
+    job = PlanExportJob.objects.select_related('student_class').get(pk=job_id)
+    plans = list(class_plans(job.student_class, job.period_label))
+    job.status = PlanExportJob.Status.RUNNING
+    job.started_at = timezone.now()
+    job.total = len(plans)
+    job.completed = 0
+    job.error = ''
+    job.save(update_fields=['status', 'started_at', 'total', 'completed', 'error'])
+
+    target = cache_dir() / 'exports' / f'{job.pk}.{job.format}'
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f'.{target.name}.tmp')
+    work = target.with_name(f'.{job.pk}')
+    work.mkdir(exist_ok=True)
+    try:
+        hashes = {plan.pk: plan_content_hash(plan) for plan in plans}
+        ready: Dict[int, Path] = {}
+        missing: List[IndividualPlan] = []
+        for plan in plans:
+            cached = cached_plan_pdf(plan, content_hash=hashes[plan.pk], render=False)
+            pinned = work / f'{plan.pk}.pdf'
+            if cached is not None and _pin(cached.path, pinned):
+                ready[plan.pk] = pinned
+            else:
+                missing.append(plan)
+        PlanExportJob.objects.filter(pk=job.pk).update(reused=len(ready))
+
+        if job.format == PlanExportJob.Format.ZIP:
+            _write_zip(job, plans, ready, missing, hashes, tmp, work)
+        else:
+            _advance(job, len(ready))
+            for plan_id, path in _rendered(missing, hashes, work):
+                ready[plan_id] = path
+                _advance(job)
+            writer = PdfWriter()
+            for plan in plans:
+                writer.append(str(ready[plan.pk]))
+            with open(tmp, 'wb') as handle:
+                writer.write(handle)
+        os.replace(tmp, target)
+    except Exception as exc:
+        logger.exception('Falha na exportação de PIT %s', job.pk)
+        tmp.unlink(missing_ok=True)
+        PlanExportJob.objects.filter(pk=job.pk).update(
+            status=PlanExportJob.Status.FAILED, error=str(exc) or exc.__class__.__name__, finished_at=timezone.now()
+        )
+    else:
+        PlanExportJob.objects.filter(pk=job.pk).update(
+            status=PlanExportJob.Status.DONE, file_path=str(target), finished_at=timezone.now()
+        )
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    job.refresh_from_db()
+    return job
+
+
+def _write_zip(job, plans, ready, missing, hashes, tmp: Path, work: Path) -> None:
+    """Escreve no ZIP primeiro os PDF em cache e depois cada renderização à medida que termina."""
+    names: Dict[int, str] = {}
+    used = set()
+    for plan in plans:
+        name = plan_pdf_filename(plan)
+        if name in used:
+            name = f'{name[:-4]}-{plan.pk}.pdf'
+        used.add(name)
+        names[plan.pk] = name
+
+    # Os PDF já vêm comprimidos: guardá-los sem nova compressão poupa CPU.
+    with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for plan in plans:
+            if plan.pk in ready:
+                archive.write(ready[plan.pk], names[plan.pk])
+        _advance(job, len(ready))
+        for plan_id, path in _rendered(missing, hashes, work):
+            archive.write(path, names[plan_id])
+            _advance(job)
+
+
+def export_path(job: PlanExportJob) -> Optional[Path]:
+    """Ficheiro final da exportação, se estiver concluída e ainda existir."""
+    if job.status != PlanExportJob.Status.DONE or not job.file_path:
+        return None
+    path = Path(job.file_path)
+    return path if path.exists() else None
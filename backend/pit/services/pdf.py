@@ -0,0 +1,245 @@
+"""PDF dos PIT guardados em disco, com o hash do conteúdo como chave.
+
+O hash cobre tudo o que aparece no documento (plano, modelo, secções, tarefas,
+sugestões), por isso um PIT que não mudou é servido sem voltar a renderizar e o
+próprio hash serve de ETag. Depois de cada alteração o PDF é renderizado numa
+thread em segundo plano (após o commit), para que o download seguinte seja
+imediato; ``prune_pit_pdfs`` limpa as versões antigas.
+
+A renderização ocupa a CPU dentro do worker web, por isso é adiada até o plano
+estar ``PIT_PDF_RENDER_DELAY`` segundos sem alterações: uma rajada de
+gravações automáticas dá uma só renderização, e nenhuma se o PDF desse
+conteúdo já estiver em disco.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.utils.text import slugify
+
+from pit.models import IndividualPlan
+from pit.services.plans import render_plan_pdf
+
+logger = logging.getLogger(__name__)
+
+# Incrementar quando o aspeto do PDF muda, para invalidar as versões em cache.
+RENDER_VERSION = 1
+DEFAULT_PDF_CACHE_MAX_AGE_DAYS = 60
+DEFAULT_RENDER_DELAY_SECONDS = 30
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Plano -> instante (monotónico) a partir do qual pode ser renderizado.
+_pending: dict[int, float] = {}
+_pending_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class CachedPlanPdf:
+    path: Path
+    content_hash: str
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.content_hash}"'
+
+    @property
+    def last_modified(self) -> float:
+        return self.path.stat().st_mtime
+
+
+def cache_dir() -> Path:
+    return Path(getattr(settings, 'PIT_PDF_CACHE_DIR', Path(settings.BASE_DIR) / 'var' / 'pit-pdf'))
+
+
+def plan_content_hash(plan: IndividualPlan) -> str:
+    """Hash de tudo o que ``render_plan_pdf`` escreve no documento (três consultas)."""
+    student = plan.student
+    content = {
+        'render_version': RENDER_VERSION,
+        'plan': [
+            plan.period_label,
+            plan.status,
+            plan.start_date,
+            plan.end_date,
+            plan.general_objectives,
+            plan.self_evaluation,
+            plan.teacher_evaluation,
+        ],
+        'student': [student.get_full_name(), student.username] if plan.student_id else None,
+        'class': plan.student_class.name if plan.student_class_id else None,
+        'template': [plan.template.name, plan.template_version] if plan.template_id else None,
+        'sections': list(plan.sections.order_by('order', 'id').values_list('id', 'title', 'area_code', 'order')),
+        'tasks': list(
+            plan.tasks.order_by('order', 'id').values_list(
+                'id', 'description', 'subject', 'state', 'teacher_feedback', 'evidence_link', 'order'
+            )
+        ),
+        'suggestions': list(
+            plan.suggestions.order_by('order', 'id').values_list('id', 'text', 'origin', 'is_pending', 'order')
+        ),
+    }
+    body = json.dumps(content, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+
+def plan_pdf_filename(plan: IndividualPlan) -> str:
+    student_part = slugify((plan.student.get_full_name() or plan.student.username) if plan.student_id else 'aluno')
+    class_part = slugify(plan.student_class.name) if plan.student_class_id and plan.student_class else 'turma'
+    return f"pit-{student_part}-{class_part}-{slugify(plan.period_label)}.pdf"
+
+
+def _pdf_path(plan_id: int, content_hash: str) -> Path:
+    return cache_dir() / str(plan_id) / f'{content_hash}.pdf'
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def cached_plan_pdf(
+    plan: IndividualPlan, *, content_hash: Optional[str] = None, render: bool = True
+) -> Optional[CachedPlanPdf]:
+    """PDF atual do plano, renderizado agora se ainda não existir (ou ``None`` com ``render=False``)."""
+    content_hash = content_hash or plan_content_hash(plan)
+    path = _pdf_path(plan.pk, content_hash)
+    if not path.exists():
+        if not render:
+            return None
+        _write_atomic(path, render_plan_pdf(plan))
+        for stale in path.parent.glob('*.pdf'):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+    return CachedPlanPdf(path=path, content_hash=content_hash)
+
+
+def read_plan_pdf(plan: IndividualPlan, *, content_hash: Optional[str] = None) -> Tuple[CachedPlanPdf, bytes, float]:
+    """Conteúdo e data do PDF atual; se outra thread o substituir entretanto, volta a tentar."""
+    content_hash = content_hash or plan_content_hash(plan)
+    for _ in range(2):
+        cached = cached_plan_pdf(plan, content_hash=content_hash)
+        try:
+            return cached, cached.path.read_bytes(), cached.last_modified
+        except FileNotFoundError:
+            continue
+    cached = cached_plan_pdf(plan, content_hash=content_hash)
+    return cached, cached.path.read_bytes(), cached.last_modified
+
+
+def render_delay() -> float:
+    return float(getattr(settings, 'PIT_PDF_RENDER_DELAY', DEFAULT_RENDER_DELAY_SECONDS))
+
+
+def schedule_plan_render(plan_id: int) -> None:
+    """Renderiza o PDF em segundo plano depois do commit, quando o plano deixar de mudar."""
+    if not getattr(settings, 'PIT_PDF_BACKGROUND_RENDER', True):
+        return
+    transaction.on_commit(lambda: _enqueue(plan_id))
+
+
+def _enqueue(plan_id: int) -> None:
+    delay = render_delay()
+    with _pending_lock:
+        scheduled = plan_id in _pending
+        _pending[plan_id] = time.monotonic() + delay
+    if not scheduled:
+        _schedule(plan_id, delay)
+
+
+def _schedule(plan_id: int, delay: float) -> None:
+    if delay <= 0:
+        _submit(_render_in_background, plan_id)
+        return
+    timer = threading.Timer(delay, _due, args=(plan_id,))
+    timer.daemon = True
+    timer.start()
+
+
+def _due(plan_id: int) -> None:
+    # Alterações entretanto empurraram o prazo: espera o que falta.
+    with _pending_lock:
+        remaining = _pending.get(plan_id, 0.0) - time.monotonic()
+    if remaining > 0:
+        _schedule(plan_id, remaining)
+    else:
+        _submit(_render_in_background, plan_id)
+
+
+def _submit(fn, *args) -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pit-pdf')
+    _executor.submit(fn, *args)
+
+
+def _render_in_background(plan_id: int) -> None:
+    # Sai de _pending antes de ler o plano: uma alteração durante a renderização volta a agendá-lo.
+    with _pending_lock:
+        _pending.pop(plan_id, None)
+    try:
+        plan = (
+            IndividualPlan.objects.select_related('student', 'student_class', 'template')
+            .filter(pk=plan_id)
+            .first()
+        )
+        if plan is not None:
+            cached_plan_pdf(plan)
+    except Exception:  # pragma: no cover - só registado, o download volta a tentar
+        logger.exception('Falha a renderizar o PDF do PIT %s em segundo plano', plan_id)
+    finally:
+        connections.close_all()
+
+
+def prune_pdf_cache(max_age_days: Optional[int] = None) -> int:
+    """Apaga PDFs mais antigos que ``max_age_days``, de planos apagados e temporários perdidos.
+
+    As exportações por turma (``exports/``) com mais de ``max_age_days`` também são apagadas.
+    """
+    if max_age_days is None:
+        max_age_days = getattr(settings, 'PIT_PDF_CACHE_MAX_AGE_DAYS', DEFAULT_PDF_CACHE_MAX_AGE_DAYS)
+    root = cache_dir()
+    if not root.is_dir():
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    plan_dirs = {int(entry.name): entry for entry in root.iterdir() if entry.is_dir() and entry.name.isdigit()}
+    live = set(IndividualPlan.objects.filter(pk__in=list(plan_dirs)).values_list('pk', flat=True))
+
+    removed = 0
+    for plan_id, directory in plan_dirs.items():
+        for path in directory.iterdir():
+            if plan_id not in live or path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+        if not any(directory.iterdir()):
+            directory.rmdir()
+
+    exports = root / 'exports'
+    if exports.is_dir():
+        for path in exports.iterdir():
+            if path.stat().st_mtime >= cutoff:
+                continue
+            if path.is_file():
+                path.unlink(missing_ok=True)
+                removed += 1
+            elif path.is_dir():
+                # Pasta de trabalho de uma exportação interrompida.
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+    return removed
@@ -13,7 +13,15 @@ from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib.units import cm
-from reportlab.platypus import ListFlowable, ListItem, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from reportlab.platypus import (
+    ListFlowable,
+    ListItem,
+    Paragraph,
+    SimpleDocTemplate,
+    Spacer,
+    Table,
+    TableStyle,
+)
 
 from pit.models import (
     IndividualPlan,
@@ -26,6 +34,13 @@ from pit.models import (
     TemplateSuggestion,
 )
 from council.models import CouncilDecision
+from checklists.services import NextObjectiveRecommender
+
+# Quantos próximos objetivos das listas de verificação entram em cada PIT.
+CHECKLIST_OBJECTIVES_PER_PLAN = 3
+# Decisões do Conselho ainda abertas dos últimos N dias entram como sugestões (no máximo M).
+COUNCIL_WINDOW_DAYS = 30
+COUNCIL_SUGGESTIONS_PER_PLAN = 5
 
 
 @dataclass
@@ -35,6 +50,7 @@ class GenerationResult:
     created_suggestions: int
     created_pendings: int
     created_council: int
+    created_objectives: int = 0
 
 
 def _week_bounds(reference: date) -> tuple[date, date]:
@@ -61,6 +77,11 @@ def _build_period_label(start: date, end: date) -> str:
     return f"Semana {start.strftime('%d/%m')} – {end.strftime('%d/%m')}"
 
 
+def weekly_period_label(target_date: date) -> str:
+    """Período (``period_label``) do PIT semanal que contém ``target_date``."""
+    return _build_period_label(*_week_bounds(target_date))
+
+
 @transaction.atomic
 def generate_weekly_plan(
     *,
@@ -113,8 +134,9 @@ def generate_weekly_plan(
     created_suggestions = _import_template_suggestions(plan, template)
     created_pendings = _import_pending_tasks(plan, origin_plan)
     created_council = _import_council_suggestions(plan)
+    created_objectives = _import_checklist_objectives(plan)
 
-    plan.suggestions_imported = created_suggestions > 0
+    plan.suggestions_imported = (created_suggestions + created_objectives) > 0
     plan.pendings_imported = created_pendings > 0
     plan.save(update_fields=['suggestions_imported', 'pendings_imported', 'updated_at'])
 
@@ -125,6 +147,7 @@ def generate_weekly_plan(
         created_suggestions,
         created_pendings,
         created_council,
+        created_objectives,
     )
 
     return GenerationResult(
@@ -133,6 +156,7 @@ def generate_weekly_plan(
         created_suggestions=created_suggestions,
         created_pendings=created_pendings,
         created_council=created_council,
+        created_objectives=created_objectives,
     )
 
 
@@ -185,46 +209,77 @@ def _import_pending_tasks(plan: IndividualPlan, origin_plan: Optional[Individual
     bulk: list[PlanSuggestion] = []
     start_order = plan.suggestions.count() + 1
     for offset, task in enumerate(pending_tasks, start=start_order):
-        bulk.append(
-            PlanSuggestion(
-                plan=plan,
-                text=f"Rever tarefa pendente: {task.description}",
-                origin=PlanSuggestion.SuggestionSource.PENDING,
-                from_task=task,
-                order=offset,
-                is_pending=True,
-            )
-        )
+        bulk.append(_pending_suggestion(plan, task, offset))
     if not bulk:
         return 0
     PlanSuggestion.objects.bulk_create(bulk)
     return len(bulk)
 
 
-def _import_council_suggestions(plan: IndividualPlan) -> int:
-    recent_window = plan.start_date - timedelta(days=30) if plan.start_date else date.today() - timedelta(days=30)
-    decisions = (
-        CouncilDecision.objects.filter(
-            student_class=plan.student_class,
-            date__gte=recent_window,
-        )
+def _pending_suggestion(plan: IndividualPlan, task: PlanTask, order: int) -> PlanSuggestion:
+    return PlanSuggestion(
+        plan=plan,
+        text=f"Rever tarefa pendente: {task.description}",
+        origin=PlanSuggestion.SuggestionSource.PENDING,
+        from_task=task,
+        order=order,
+        is_pending=True,
+    )
+
+
+def _open_council_decisions(week_start: Optional[date]):
+    recent_window = (week_start or date.today()) - timedelta(days=COUNCIL_WINDOW_DAYS)
+    return (
+        CouncilDecision.objects.filter(date__gte=recent_window)
         .exclude(status=CouncilDecision.Status.DONE)
-        .order_by('-date', '-created_at')[:5]
+        .order_by('-date', '-created_at')
+    )
+
+
+def _council_suggestion(plan: IndividualPlan, decision: CouncilDecision, order: int) -> PlanSuggestion:
+    return PlanSuggestion(
+        plan=plan,
+        text=f"Decisão do Conselho: {decision.description}",
+        origin=PlanSuggestion.SuggestionSource.COUNCIL,
+        order=order,
+        is_pending=True,
+    )
+
+
+def _objective_suggestion(plan: IndividualPlan, objective: dict, order: int) -> PlanSuggestion:
+    label = f"{objective['code']} – {objective['text']}" if objective['code'] else objective['text']
+    return PlanSuggestion(
+        plan=plan,
+        text=f"Próximo objetivo ({objective['template']}): {label}"[:255],
+        origin=PlanSuggestion.SuggestionSource.CHECKLIST,
+        order=order,
     )
+
+
+def _import_council_suggestions(plan: IndividualPlan) -> int:
+    decisions = _open_council_decisions(plan.start_date).filter(
+        student_class=plan.student_class,
+    )[:COUNCIL_SUGGESTIONS_PER_PLAN]
     if not decisions:
         return 0
 
     start_order = plan.suggestions.count() + 1
-    bulk = [
-        PlanSuggestion(
-            plan=plan,
-            text=f"Decisão do Conselho: {decision.description}",
-            origin=PlanSuggestion.SuggestionSource.COUNCIL,
-            order=start_order + idx,
-            is_pending=True,
-        )
-        for idx, decision in enumerate(decisions)
-    ]
+    bulk = [_council_suggestion(plan, decision, start_order + idx) for idx, decision in enumerate(decisions)]
+    PlanSuggestion.objects.bulk_create(bulk)
+    return len(bulk)
+
+
+def _import_checklist_objectives(plan: IndividualPlan) -> int:
+    objectives = NextObjectiveRecommender().recommend(
+        plan.student,
+        student_class=plan.student_class,
+        limit=CHECKLIST_OBJECTIVES_PER_PLAN,
+    )
+    if not objectives:
+        return 0
+
+    start_order = plan.suggestions.count() + 1
+    bulk = [_objective_suggestion(plan, objective, start_order + idx) for idx, objective in enumerate(objectives)]
     PlanSuggestion.objects.bulk_create(bulk)
     return len(bulk)
 
@@ -236,9 +291,31 @@ def _log_generation(
     created_suggestions: int,
     created_pendings: int,
     created_council: int,
+    created_objectives: int = 0,
 ) -> None:
-    PlanLogEntry.objects.create(
+    _generation_log_entry(
+        plan,
+        template,
+        created_sections,
+        created_suggestions,
+        created_pendings,
+        created_council,
+        created_objectives,
+    ).save()
+
+
+def _generation_log_entry(
+    plan: IndividualPlan,
+    template: PitTemplate,
+    created_sections: int,
+    created_suggestions: int,
+    created_pendings: int,
+    created_council: int,
+    created_objectives: int = 0,
+) -> PlanLogEntry:
+    return PlanLogEntry(
         plan=plan,
+        student_id=plan.student_id,
         action=PlanLogEntry.Action.GENERATED,
         message='Plano gerado a partir do modelo.',
         payload={
@@ -248,6 +325,7 @@ def _log_generation(
             'suggestions_from_template': created_suggestions,
             'pending_transported': created_pendings,
             'suggestions_from_council': created_council,
+            'suggestions_from_checklists': created_objectives,
         },
     )
 
@@ -380,7 +458,8 @@ def render_plan_pdf(plan: IndividualPlan) -> bytes:
             if section.area_code and task.subject == section.area_code or not section.area_code
         ]
 
-    remaining_tasks = [task for task in tasks if not any(task in grouped for grouped in tasks_by_section.values())]
+    grouped_ids = {task.id for grouped in tasks_by_section.values() for task in grouped}
+    remaining_tasks = [task for task in tasks if task.id not in grouped_ids]
 
     if sections:
         elements.append(Paragraph('Áreas e tarefas', section_heading_style))
@@ -463,23 +542,3 @@ def render_plan_pdf(plan: IndividualPlan) -> bytes:
     document.build(elements)
     buffer.seek(0)
     return buffer.getvalue()
-
-
-def log_plan_event(
-    *,
-    plan: IndividualPlan,
-    action: PlanLogEntry.Action,
-    actor=None,
-    message: str = '',
-    payload: Optional[dict] = None,
-) -> PlanLogEntry:
-    """Cria um registo de auditoria para o plano."""
-
-    entry = PlanLogEntry.objects.create(
-        plan=plan,
-        action=action,
-        message=message,
-        payload=payload or {},
-        actor=actor,
-    )
-    return entry
@@ -0,0 +1,189 @@
+"""Cronologia dos PIT de um aluno: planos e registos (tarefas, estados, avaliações) num só fluxo.
+
+A paginação é por chave (``keyset``) sobre ``(instante, origem, id)``, do mais
+recente para o mais antigo. Cada página faz uma consulta limitada por fonte,
+servida pelos índices ``(student, -created_at, -id)`` de ``IndividualPlan`` e
+``PlanLogEntry``, e só os planos que ficam na página carregam as tarefas; o
+custo não depende de quantos anos de histórico o aluno tem.
+"""
+from __future__ import annotations
+
+import base64
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db.models import Prefetch, Q, prefetch_related_objects
+from django.utils.dateparse import parse_datetime
+
+from pit.models import IndividualPlan, PlanLogEntry, PlanTask
+
+DEFAULT_TIMELINE_LIMIT = 20
+MAX_TIMELINE_LIMIT = 100
+
+# Ordem de desempate entre fontes com o mesmo instante (maior aparece primeiro).
+PLAN_SOURCE = 0
+LOG_SOURCE = 1
+
+Cursor = Tuple[datetime, int, int]
+
+
+@dataclass
+class TimelinePage:
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(key: Cursor) -> str:
+    moment, source, pk = key
+    raw = f'{moment.isoformat()}|{source}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(value: str) -> Cursor:
+    """Inverso de ``encode_cursor``; ``ValueError`` se o cursor não for válido."""
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode('utf-8')
+        moment_raw, source, pk = raw.split('|')
+        moment = parse_datetime(moment_raw)
+        source, pk = int(source), int(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError('Cursor inválido.') from exc
+    if moment is None or source not in (PLAN_SOURCE, LOG_SOURCE):
+        raise ValueError('Cursor inválido.')
+    return moment, source, pk
+
+
+def _before(cursor: Optional[Cursor], source: int) -> Q:
+    """Condição ``(created_at, origem, id) < cursor`` para uma fonte (origem fixa)."""
+    if cursor is None:
+        return Q()
+    moment, cursor_source, pk = cursor
+    if source < cursor_source:
+        return Q(created_at__lte=moment)
+    if source > cursor_source:
+        return Q(created_at__lt=moment)
+    return Q(created_at__lt=moment) | Q(created_at=moment, id__lt=pk)
+
+
+def _log_kind(entry: PlanLogEntry) -> str:
+    payload = entry.payload or {}
+    if entry.action == PlanLogEntry.Action.STATUS_CHANGE:
+        if payload.get('status') in {IndividualPlan.PlanStatus.CONCLUDED, IndividualPlan.PlanStatus.EVALUATED}:
+            return 'evaluation'
+        return 'status_change'
+    if entry.action == PlanLogEntry.Action.UPDATED and 'state' in (payload.get('changes') or {}):
+        return 'task_state'
+    return entry.action
+
+
+def _person(user) -> Optional[Dict[str, Any]]:
+    if user is None:
+        return None
+    return {'id': user.id, 'name': user.get_full_name() or user.username}
+
+
+def _plan_item(plan: IndividualPlan) -> Dict[str, Any]:
+    tasks = list(plan.tasks.all())
+    return {
+        'type': 'plan',
+        'kind': 'plan',
+        'timestamp': plan.created_at,
+        'id': plan.id,
+        'plan': {
+            'id': plan.id,
+            'period_label': plan.period_label,
+            'status': plan.status,
+            'start_date': plan.start_date,
+            'end_date': plan.end_date,
+            'student_class': {'id': plan.student_class_id, 'name': plan.student_class.name},
+            'origin_plan_id': plan.origin_plan_id,
+        },
+        'tasks': [
+            {'id': task.id, 'description': task.description, 'subject': task.subject, 'state': task.state}
+            for task in tasks
+        ],
+    }
+
+
+def _log_item(entry: PlanLogEntry) -> Dict[str, Any]:
+    return {
+        'type': 'log',
+        'kind': _log_kind(entry),
+        'timestamp': entry.created_at,
+        'id': entry.id,
+        'plan': {'id': entry.plan_id, 'period_label': entry.plan.period_label},
+        'actor': _person(entry.actor),
+        'message': entry.message,
+        'payload': entry.payload or {},
+    }
+
+
+def student_timeline(student, *, cursor: Optional[str] = None, limit: int = DEFAULT_TIMELINE_LIMIT) -> TimelinePage:
+    """Uma página da cronologia do aluno, a seguir a ``cursor`` (ou a partir da mais recente).
+
+    Os registos de geração ficam de fora: o próprio plano já aparece no fluxo.
+    """
+    limit = min(max(limit, 1), MAX_TIMELINE_LIMIT)
+    position = decode_cursor(cursor) if cursor else None
+
+    plans = list(
+        IndividualPlan.objects.filter(student=student)
+        .filter(_before(position, PLAN_SOURCE))
+        .select_related('student_class')
+        .only(
+            'id',
+            'period_label',
+            'status',
+            'start_date',
+            'end_date',
+            'origin_plan',
+            'created_at',
+            'student_class',
+            'student_class__id',
+            'student_class__name',
+        )
+        .order_by('-created_at', '-id')[: limit + 1]
+    )
+    entries = list(
+        PlanLogEntry.objects.filter(student=student)
+        .filter(_before(position, LOG_SOURCE))
+        .exclude(action=PlanLogEntry.Action.GENERATED)
+        .select_related('plan', 'actor')
+        .only(
+            'id',
+            'action',
+            'message',
+            'payload',
+            'created_at',
+            'plan',
+            'plan__id',
+            'plan__period_label',
+            'actor',
+            'actor__id',
+            'actor__username',
+            'actor__first_name',
+            'actor__last_name',
+        )
+        .order_by('-created_at', '-id')[: limit + 1]
+    )
+
+    merged = sorted(
+        [((plan.created_at, PLAN_SOURCE, plan.id), plan) for plan in plans]
+        + [((entry.created_at, LOG_SOURCE, entry.id), entry) for entry in entries],
+        key=lambda pair: pair[0],
+        reverse=True,
+    )
+    visible = merged[:limit]
+    page_plans = [obj for key, obj in visible if key[1] == PLAN_SOURCE]
+    prefetch_related_objects(
+        page_plans,
+        Prefetch('tasks', queryset=PlanTask.objects.only('id', 'plan', 'description', 'subject', 'state', 'order')),
+    )
+
+    page = TimelinePage(
+        results=[_plan_item(obj) if key[1] == PLAN_SOURCE else _log_item(obj) for key, obj in visible]
+    )
+    if len(merged) > limit:
+        page.next_cursor = encode_cursor(visible[-1][0])
+    return page
@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from pit.models import IndividualPlan, PlanSection, PlanSuggestion, PlanTask
+from pit.services import bump_dashboard_versions, schedule_plan_render
+
+
+@receiver(post_save, sender=IndividualPlan)
+def plan_saved(sender, instance, **kwargs):
+    """O PDF do plano passa a estar desatualizado: renderiza a nova versão em segundo plano."""
+    schedule_plan_render(instance.pk)
+
+
+@receiver(post_save, sender=PlanTask)
+@receiver(post_save, sender=PlanSection)
+@receiver(post_save, sender=PlanSuggestion)
+def plan_content_saved(sender, instance, **kwargs):
+    schedule_plan_render(instance.plan_id)
+
+
+def _bump_dashboard(class_id):
+    # Depois do commit: um painel lido entretanto não pode ficar guardado com o carimbo novo.
+    if class_id:
+        transaction.on_commit(lambda: bump_dashboard_versions([class_id]))
+
+
+@receiver(post_save, sender=IndividualPlan)
+@receiver(post_delete, sender=IndividualPlan)
+def plan_changed_for_dashboard(sender, instance, **kwargs):
+    _bump_dashboard(instance.student_class_id)
+
+
+@receiver(post_save, sender=PlanTask)
+@receiver(post_delete, sender=PlanTask)
+def task_changed_for_dashboard(sender, instance, **kwargs):
+    if PlanTask._meta.get_field('plan').is_cached(instance):
+        class_id = instance.plan.student_class_id
+    else:
+        class_id = (
+            IndividualPlan.objects.filter(pk=instance.plan_id).values_list('student_class_id', flat=True).first()
+        )
+    _bump_dashboard(class_id)
@@ -1,3 +1,4 @@
+import tempfile
 from datetime import date, timedelta
 
 from django.test import TestCase
@@ -17,14 +18,40 @@ from .models import (
     TemplateSuggestion,
     PlanSuggestion,
     PlanLogEntry,
+    PlanExportJob,
 )
-from .services import generate_weekly_plan
+from .services import generate_weekly_plan, generate_weekly_plans
 from council.models import CouncilDecision
 
 
 User = get_user_model()
 
 
+_pdf_cache_dir = None
+_pdf_cache_override = None
+
+
+def setUpModule():
+    # Os PDFs renderizados (incluindo os de segundo plano) nunca vão para backend/var.
+    global _pdf_cache_dir, _pdf_cache_override
+    _pdf_cache_dir = tempfile.TemporaryDirectory()
+    _pdf_cache_override = override_settings(PIT_PDF_CACHE_DIR=_pdf_cache_dir.name)
+    _pdf_cache_override.enable()
+
+
+def tearDownModule():
+    _pdf_cache_override.disable()
+    _pdf_cache_dir.cleanup()
+
+
+def run_inline(fn, *args):
+    """Corre uma tarefa de segundo plano no próprio teste, sem fechar a ligação do TestCase."""
+    from unittest.mock import patch
+
+    with patch('django.db.connections.close_all'):
+        fn(*args)
+
+
 class PitFlowTests(TestCase):
     def setUp(self):
         self.teacher = User.objects.create_user(username='prof', email='prof@escola.pt', password='x', role='professor', status='ativo')
@@ -441,3 +468,699 @@ class PitGenerationServiceTests(TestCase):
         self.assertTrue(
             plan.suggestions.filter(origin=PlanSuggestion.SuggestionSource.COUNCIL).exists()
         )
+
+    def test_service_suggests_next_checklist_objectives(self):
+        from checklists.models import ChecklistItem, ChecklistStatus, ChecklistTemplate
+
+        checklist = ChecklistTemplate.objects.create(name='Português 7')
+        ChecklistItem.objects.create(template=checklist, code='P1', text='Ler um conto', order=1)
+        ChecklistStatus.objects.create(template=checklist, student=self.student, student_class=self.turma)
+
+        result = generate_weekly_plan(student=self.student, student_class=self.turma)
+        self.assertEqual(result.created_objectives, 1)
+        suggestion = result.plan.suggestions.get(origin=PlanSuggestion.SuggestionSource.CHECKLIST)
+        self.assertIn('P1', suggestion.text)
+
+
+class PitBatchGenerationTests(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.admin = User.objects.create_user(
+            username='admin-batch', email='admin-batch@example.com', password='x', role='admin', status='ativo'
+        )
+        self.teacher = User.objects.create_user(
+            username='prof-batch', email='prof-batch@example.com', password='x', role='professor', status='ativo'
+        )
+        self.classes = []
+        for index in range(2):
+            turma = Class.objects.create(name=f'8.º{index}', year=8)
+            turma.teachers.add(self.teacher)
+            self.classes.append(turma)
+        self.template = PitTemplate.objects.create(name='Modelo Geral', version=1, created_by=self.teacher)
+        for order in (1, 2):
+            section = TemplateSection.objects.create(template=self.template, title=f'Área {order}', order=order)
+            TemplateSuggestion.objects.create(template=self.template, section=section, text=f'Sugestão {order}', order=order)
+        CouncilDecision.objects.create(
+            student_class=self.classes[0],
+            date=date.today() - timedelta(days=2),
+            description='Rever regras da sala',
+            category=CouncilDecision.Category.ACTIVITY,
+            status=CouncilDecision.Status.PENDING,
+            responsible=self.teacher,
+        )
+        self.counter = 0
+
+    def _add_students(self, turma, count):
+        students = []
+        for _ in range(count):
+            self.counter += 1
+            students.append(User.objects.create_user(
+                username=f'al-batch{self.counter}', email=f'al-batch{self.counter}@example.com',
+                password='x', role='aluno', status='ativo',
+            ))
+        turma.students.add(*students)
+        return students
+
+    def _suggestions(self, plan):
+        return list(plan.suggestions.order_by('order', 'id').values_list('origin', 'text', 'order', 'is_pending'))
+
+    def test_batch_matches_single_generation(self):
+        single, batched = self._add_students(self.classes[0], 2)
+        for student in (single, batched):
+            origin = IndividualPlan.objects.create(
+                student=student, student_class=self.classes[0], period_label='Anterior',
+                start_date=date.today() - timedelta(days=10),
+            )
+            PlanTask.objects.create(plan=origin, description='Por acabar', state='pending', order=1)
+        expected = generate_weekly_plan(student=single, student_class=self.classes[0]).plan
+
+        result = generate_weekly_plans(student_class=self.classes[0])
+        self.assertEqual((result.created, result.skipped_existing), (1, 1))
+        plan = result.plans[0]
+        self.assertEqual(plan.student, batched)
+        self.assertEqual(self._suggestions(plan), self._suggestions(expected))
+        self.assertEqual(plan.sections.count(), 2)
+        self.assertEqual(plan.origin_plan.period_label, 'Anterior')
+        self.assertEqual((plan.pendings_imported, plan.suggestions_imported), (True, True))
+        self.assertEqual(plan.log_entries.get().payload['pending_transported'], 1)
+
+    def test_query_count_is_independent_of_school_size(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self._add_students(self.classes[0], 2)
+        with CaptureQueriesContext(connection) as small:
+            generate_weekly_plans()
+        IndividualPlan.objects.all().delete()
+        self._add_students(self.classes[0], 10)
+        self._add_students(self.classes[1], 15)
+        with CaptureQueriesContext(connection) as large:
+            result = generate_weekly_plans()
+        self.assertEqual(result.created, 27)
+        self.assertEqual(len(small), len(large))
+
+        again = generate_weekly_plans()
+        self.assertEqual((again.created, again.skipped_existing), (0, 27))
+
+    def test_api_permissions_and_summary(self):
+        self._add_students(self.classes[1], 3)
+        url = reverse('pit-plan-generate-batch')
+        self.client.force_authenticate(self.teacher)
+        self.assertEqual(self.client.post(url, {'year': 8}, format='json').status_code, 403)
+        response = self.client.post(url, {'student_class_id': self.classes[1].id}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(IndividualPlan.objects.filter(log_entries__actor=self.teacher).count(), 3)
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(url, {'year': 8}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['skipped_existing'], 3)
+
+    def test_management_command(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        self._add_students(self.classes[0], 2)
+        out = StringIO()
+        call_command('generate_weekly_plans', '--year', '8', stdout=out)
+        self.assertIn('2 PIT criados', out.getvalue())
+
+
+class PitPdfCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='pdf-prof', email='pdf-prof@test.com', password='x', role='professor', status='ativo'
+        )
+        cls.student = User.objects.create_user(
+            username='pdf-aluno', email='pdf-aluno@test.com', password='x', role='aluno', status='ativo'
+        )
+        cls.turma = Class.objects.create(name='PDF 5ºA', year=2026)
+        cls.turma.teachers.add(cls.teacher)
+        cls.turma.students.add(cls.student)
+        cls.plan = IndividualPlan.objects.create(
+            student=cls.student, student_class=cls.turma, period_label='Semana PDF', start_date=date(2026, 3, 2)
+        )
+        for order in range(1, 4):
+            PlanTask.objects.create(plan=cls.plan, description=f'Tarefa {order}', subject='Matemática', order=order)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(PIT_PDF_CACHE_DIR=tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.cache_dir = tmp.name
+        self.url = reverse('pit-plan-export-pdf', args=[self.plan.id])
+        self.client.force_authenticate(user=self.teacher)
+
+    def _cached_files(self):
+        from pathlib import Path
+
+        return sorted(path.name for path in Path(self.cache_dir).glob('*/*.pdf'))
+
+    def test_unchanged_plan_is_rendered_once_and_revalidated_by_etag(self):
+        from unittest.mock import patch
+
+        from pit.services import plans
+
+        with patch('pit.services.pdf.render_plan_pdf', wraps=plans.render_plan_pdf) as render:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertTrue(first.content.startswith(b'%PDF'))
+        self.assertIn('Last-Modified', first)
+        self.assertEqual(not_modified.status_code, 304)
+
+        PlanTask.objects.filter(plan=self.plan, order=1).update(state='done')
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+        self.assertEqual(len(self._cached_files()), 1)
+
+    @override_settings(PIT_PDF_RENDER_DELAY=0)
+    def test_changes_schedule_a_background_render(self):
+        from unittest.mock import patch
+
+        with patch('pit.services.pdf._submit', side_effect=run_inline):
+            with self.captureOnCommitCallbacks(execute=True):
+                PlanTask.objects.create(plan=self.plan, description='Nova tarefa', order=4)
+        self.assertEqual(len(self._cached_files()), 1)
+
+        with patch('pit.services.pdf.render_plan_pdf') as render:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        render.assert_not_called()
+
+    @override_settings(PIT_PDF_RENDER_DELAY=0.5)
+    def test_burst_of_changes_renders_once_after_it_settles(self):
+        import time
+        from unittest.mock import patch
+
+        from pit.services import pdf
+
+        self.addCleanup(pdf._pending.pop, self.plan.pk, None)
+        with patch('pit.services.pdf._submit') as submit:
+            for order in (4, 5, 6):
+                with self.captureOnCommitCallbacks(execute=True):
+                    PlanTask.objects.create(plan=self.plan, description=f'Tarefa {order}', order=order)
+                time.sleep(0.1)
+            submit.assert_not_called()
+            deadline = time.monotonic() + 2
+            while not submit.called and time.monotonic() < deadline:
+                time.sleep(0.05)
+        submit.assert_called_once_with(pdf._render_in_background, self.plan.pk)
+
+    def test_prune_removes_renders_of_deleted_and_old_plans(self):
+        import os
+        import time
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from pit.services import cached_plan_pdf
+
+        other = IndividualPlan.objects.create(student=self.student, student_class=self.turma, period_label='Outra')
+        kept = cached_plan_pdf(self.plan)
+        gone = cached_plan_pdf(other)
+        other.delete()
+        call_command('prune_pit_pdfs', stdout=StringIO())
+        self.assertTrue(kept.path.exists())
+        self.assertFalse(gone.path.exists())
+
+        old = time.time() - 90 * 86400
+        os.utime(kept.path, (old, old))
+        call_command('prune_pit_pdfs', '--max-age-days', '30', stdout=StringIO())
+        self.assertFalse(kept.path.exists())
+
+
+class PitClassExportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='exp-prof', email='exp-prof@test.com', password='x', role='professor', status='ativo'
+        )
+        cls.other_teacher = User.objects.create_user(
+            username='exp-prof2', email='exp-prof2@test.com', password='x', role='professor', status='ativo'
+        )
+        cls.turma = Class.objects.create(name='Export 6ºB', year=2026)
+        cls.turma.teachers.add(cls.teacher)
+        cls.plans = []
+        for index in range(3):
+            student = User.objects.create_user(
+                username=f'exp-aluno{index}',
+                email=f'exp-aluno{index}@test.com',
+                password='x',
+                role='aluno',
+                status='ativo',
+                first_name=f'Aluno{index}',
+            )
+            cls.turma.students.add(student)
+            plan = IndividualPlan.objects.create(
+                student=student, student_class=cls.turma, period_label='Semana 02/03 – 08/03', start_date=date(2026, 3, 2)
+            )
+            PlanTask.objects.create(plan=plan, description=f'Tarefa {index}', subject='Português', order=1)
+            cls.plans.append(plan)
+
+    def setUp(self):
+        from unittest.mock import patch
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(PIT_PDF_CACHE_DIR=tmp.name, PIT_EXPORT_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        submit = patch('pit.services.exports._submit', side_effect=run_inline)
+        submit.start()
+        self.addCleanup(submit.stop)
+        self.client.force_authenticate(user=self.teacher)
+        self.url = reverse('pit-export-list')
+
+    def _request(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.url,
+                {'student_class_id': self.turma.id, 'period_label': 'Semana 02/03 – 08/03', **data},
+                format='json',
+            )
+        return response
+
+    def test_zip_export_reuses_cached_renders(self):
+        import zipfile
+        from io import BytesIO
+        from unittest.mock import patch
+
+        from pit.services import cached_plan_pdf
+        from pit.services import plans as plan_services
+
+        cached_plan_pdf(self.plans[0])
+        with patch('pit.services.pdf.render_plan_pdf', wraps=plan_services.render_plan_pdf) as render:
+            response = self._request()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(render.call_count, 2)
+
+        job = self.client.get(reverse('pit-export-detail', args=[response.data['id']])).data
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual((job['completed'], job['total'], job['reused']), (3, 3, 1))
+        self.assertEqual(job['progress'], 1.0)
+
+        download = self.client.get(job['download_url'])
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(download['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(BytesIO(b''.join(download.streaming_content)))
+        names = archive.namelist()
+        self.assertEqual(len(names), 3)
+        self.assertTrue(all(archive.read(name).startswith(b'%PDF') for name in names))
+
+    def test_export_survives_cached_pdf_replaced_mid_job(self):
+        from unittest.mock import patch
+
+        from pit.services import cached_plan_pdf, exports
+
+        cached = cached_plan_pdf(self.plans[0])
+        render_missing = exports._render_missing
+
+        def edit_during_render(missing, hashes):
+            # A background re-render of an edited plan removes the version the job collected.
+            cached.path.unlink()
+            yield from render_missing(missing, hashes)
+
+        for export_format in ('zip', 'pdf'):
+            with patch('pit.services.exports._render_missing', side_effect=edit_during_render):
+                cached_plan_pdf(self.plans[0])
+                response = self._request(format=export_format)
+            job = PlanExportJob.objects.get(pk=response.data['id'])
+            self.assertEqual(job.status, PlanExportJob.Status.DONE, job.error)
+            self.assertEqual(job.completed, 3)
+
+    def test_merged_pdf_export(self):
+        response = self._request(format='pdf')
+        self.assertEqual(response.status_code, 202)
+        job = PlanExportJob.objects.get(pk=response.data['id'])
+        self.assertEqual(job.status, PlanExportJob.Status.DONE)
+        download = self.client.get(reverse('pit-export-download', args=[job.pk]))
+        self.assertEqual(download['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(download.streaming_content).startswith(b'%PDF'))
+
+    def test_request_returns_before_the_job_runs(self):
+        response = self.client.post(
+            self.url, {'student_class_id': self.turma.id, 'period_label': 'Semana 02/03 – 08/03'}, format='json'
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'queued')
+        self.assertEqual(response.data['total'], 3)
+        self.assertIsNone(response.data['download_url'])
+        pending = self.client.get(reverse('pit-export-download', args=[response.data['id']]))
+        self.assertEqual(pending.status_code, 409)
+
+    def test_orphaned_jobs_are_marked_failed(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        long_ago = timezone.now() - timedelta(hours=2)
+        queued = PlanExportJob.objects.create(student_class=self.turma, period_label='Semana 02/03 – 08/03')
+        running = PlanExportJob.objects.create(
+            student_class=self.turma,
+            period_label='Semana 02/03 – 08/03',
+            status=PlanExportJob.Status.RUNNING,
+            started_at=long_ago,
+        )
+        recent = PlanExportJob.objects.create(
+            student_class=self.turma,
+            period_label='Semana 02/03 – 08/03',
+            status=PlanExportJob.Status.RUNNING,
+            started_at=timezone.now(),
+        )
+        PlanExportJob.objects.filter(pk=queued.pk).update(created_at=long_ago)
+
+        job = self.client.get(reverse('pit-export-detail', args=[running.pk])).data
+        self.assertEqual(job['status'], 'failed')
+        self.assertTrue(job['error'])
+        queued.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertEqual(queued.status, PlanExportJob.Status.FAILED)
+        self.assertEqual(recent.status, PlanExportJob.Status.RUNNING)
+
+    def test_only_class_teachers_can_export(self):
+        self.client.force_authenticate(user=self.other_teacher)
+        self.assertEqual(self._request().status_code, 403)
+        self.assertEqual(self._request(student_class_id=999999).status_code, 400)
+        self.client.force_authenticate(user=self.teacher)
+        self.assertEqual(self._request(period_label='Semana inexistente').status_code, 400)
+        job_id = self._request().data['id']
+        self.client.force_authenticate(user=self.other_teacher)
+        self.assertEqual(self.client.get(reverse('pit-export-detail', args=[job_id])).status_code, 404)
+
+    def test_command_exports_by_date(self):
+        import os
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'turma.zip')
+            out = StringIO()
+            call_command(
+                'export_class_plans', '--class-id', str(self.turma.id), '--date', '2026-03-04', '--output', output,
+                stdout=out,
+            )
+            self.assertIn('3 PIT exportados', out.getvalue())
+            self.assertTrue(os.path.getsize(output) > 0)
+
+
+class PlanLogBatchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='log-prof', email='log-prof@test.com', password='x', role='professor', status='ativo'
+        )
+        cls.student = User.objects.create_user(
+            username='log-aluno', email='log-aluno@test.com', password='x', role='aluno', status='ativo'
+        )
+        cls.turma = Class.objects.create(name='Log 4ºA', year=2026)
+        cls.turma.teachers.add(cls.teacher)
+        cls.turma.students.add(cls.student)
+        cls.plan = IndividualPlan.objects.create(student=cls.student, student_class=cls.turma, period_label='Semana log')
+        cls.task = PlanTask.objects.create(plan=cls.plan, description='Ler', subject='Português', order=1)
+
+    def _patch_task(self, user, **data):
+        self.client.force_authenticate(user=user)
+        response = self.client.patch(reverse('pit-task-detail', args=[self.task.id]), data, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def _entries(self):
+        return list(PlanLogEntry.objects.filter(plan=self.plan).order_by('created_at', 'id'))
+
+    def test_repeated_edits_of_the_same_field_are_coalesced(self):
+        for description in ('Ler um', 'Ler um livro', 'Ler um livro inteiro'):
+            self._patch_task(self.student, description=description)
+        entries = self._entries()
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0].actor, self.student)
+        self.assertEqual(
+            entries[0].payload['changes'], {'description': {'from': 'Ler', 'to': 'Ler um livro inteiro'}}
+        )
+        self.assertEqual(entries[0].payload['coalesced'], 3)
+        self.assertIn('last_at', entries[0].payload)
+
+    def test_other_fields_actors_and_old_entries_are_kept_apart(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        self._patch_task(self.student, description='Ler mais')
+        self._patch_task(self.student, state=PlanTask.TaskState.IN_PROGRESS)
+        self._patch_task(self.teacher, state=PlanTask.TaskState.DONE)
+        self._patch_task(self.student, state=PlanTask.TaskState.IN_PROGRESS)
+        self.assertEqual(len(self._entries()), 4)
+
+        PlanLogEntry.objects.filter(plan=self.plan).update(created_at=timezone.now() - timedelta(minutes=10))
+        self._patch_task(self.student, state=PlanTask.TaskState.DONE)
+        self.assertEqual(len(self._entries()), 5)
+
+    def test_batch_writes_entries_together_and_only_on_success(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from pit.services import log_plan_event, plan_log_batch
+
+        with CaptureQueriesContext(connection) as queries:
+            with plan_log_batch():
+                for index in range(5):
+                    log_plan_event(plan=self.plan, action=PlanLogEntry.Action.COMMENT, message=f'Nota {index}')
+                self.assertFalse(PlanLogEntry.objects.filter(plan=self.plan).exists())
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(len(self._entries()), 5)
+
+        with self.assertRaises(RuntimeError):
+            with plan_log_batch():
+                log_plan_event(plan=self.plan, action=PlanLogEntry.Action.COMMENT, message='Perdida')
+                raise RuntimeError
+        self.assertEqual(len(self._entries()), 5)
+
+
+class PitTimelineTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='tl-prof', email='tl-prof@test.com', password='x', role='professor', status='ativo'
+        )
+        cls.student = User.objects.create_user(
+            username='tl-aluno', email='tl-aluno@test.com', password='x', role='aluno', status='ativo'
+        )
+        cls.other_student = User.objects.create_user(
+            username='tl-outro', email='tl-outro@test.com', password='x', role='aluno', status='ativo'
+        )
+        cls.turma = Class.objects.create(name='Timeline 7ºA', year=2026)
+        cls.turma.teachers.add(cls.teacher)
+        cls.turma.students.add(cls.student, cls.other_student)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.teacher)
+        self.url = reverse('student-pit-timeline', args=[self.student.id])
+
+    def _add_weeks(self, count, student=None):
+        from pit.services import log_plan_event
+
+        student = student or self.student
+        offset = IndividualPlan.objects.filter(student=student).count()
+        for week in range(offset, offset + count):
+            plan = IndividualPlan.objects.create(
+                student=student, student_class=self.turma, period_label=f'Semana {student.id}-{week}'
+            )
+            task = PlanTask.objects.create(plan=plan, description=f'Tarefa {week}', order=1)
+            log_plan_event(
+                plan=plan,
+                action=PlanLogEntry.Action.UPDATED,
+                actor=student,
+                message='Tarefa atualizada.',
+                payload={'task_id': task.id, 'changes': {'state': {'from': 'pending', 'to': 'done'}}},
+            )
+            log_plan_event(
+                plan=plan,
+                action=PlanLogEntry.Action.STATUS_CHANGE,
+                actor=self.teacher,
+                message='Professor registou devolução e avaliou o PIT.',
+                payload={'status': IndividualPlan.PlanStatus.EVALUATED},
+            )
+
+    def _walk(self, limit):
+        items, cursor = [], None
+        while True:
+            params = {'limit': limit, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 200)
+            items += response.data['results']
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                return items
+
+    def test_pages_merge_plans_and_events_newest_first(self):
+        self._add_weeks(3)
+        self._add_weeks(2, student=self.other_student)
+        first = self.client.get(self.url, {'limit': 4}).data
+        self.assertEqual(len(first['results']), 4)
+        self.assertEqual(first['results'][0]['kind'], 'evaluation')
+        self.assertEqual(first['results'][1]['kind'], 'task_state')
+        self.assertEqual(first['results'][2]['kind'], 'plan')
+        self.assertEqual(first['results'][2]['tasks'][0]['description'], 'Tarefa 2')
+
+        items = self._walk(4)
+        self.assertEqual(len(items), 9)
+        self.assertEqual(len({(item['type'], item['id']) for item in items}), 9)
+        timestamps = [item['timestamp'] for item in items]
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+
+    def test_ties_on_timestamp_are_paginated_without_gaps(self):
+        from django.utils import timezone
+
+        self._add_weeks(3)
+        moment = timezone.now()
+        IndividualPlan.objects.filter(student=self.student).update(created_at=moment)
+        PlanLogEntry.objects.filter(student=self.student).update(created_at=moment)
+        items = self._walk(2)
+        self.assertEqual(len({(item['type'], item['id']) for item in items}), 9)
+        self.assertEqual(len(items), 9)
+
+    def test_query_count_does_not_grow_with_history(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self._add_weeks(2)
+        with CaptureQueriesContext(connection) as short:
+            self.client.get(self.url, {'limit': 3})
+        self._add_weeks(20)
+        with CaptureQueriesContext(connection) as long:
+            self.client.get(self.url, {'limit': 3})
+        self.assertEqual(len(long), len(short))
+
+    def test_access_and_invalid_cursor(self):
+        self.client.force_authenticate(user=self.other_student)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_authenticate(user=self.student)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.client.get(self.url, {'cursor': 'nope'}).status_code, 400)
+
+
+class PitDashboardTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='dash-prof', email='dash-prof@test.com', password='x', role='professor', status='ativo'
+        )
+        cls.other_teacher = User.objects.create_user(
+            username='dash-prof2', email='dash-prof2@test.com', password='x', role='professor', status='ativo'
+        )
+        cls.classes = [Class.objects.create(name=f'Painel {index}', year=2026) for index in range(3)]
+        for turma in cls.classes:
+            turma.teachers.add(cls.teacher)
+        cls.turma = cls.classes[0]
+        statuses = [
+            IndividualPlan.PlanStatus.DRAFT,
+            IndividualPlan.PlanStatus.SUBMITTED,
+            IndividualPlan.PlanStatus.APPROVED,
+            IndividualPlan.PlanStatus.CONCLUDED,
+        ]
+        cls.students = []
+        for index, plan_status in enumerate(statuses):
+            student = User.objects.create_user(
+                username=f'dash-aluno{index}',
+                email=f'dash-aluno{index}@test.com',
+                password='x',
+                role='aluno',
+                status='ativo',
+                first_name=f'Aluno{index}',
+            )
+            cls.turma.students.add(student)
+            cls.students.append(student)
+            plan = IndividualPlan.objects.create(
+                student=student,
+                student_class=cls.turma,
+                period_label='Semana painel',
+                status=plan_status,
+                self_evaluation='Correu bem' if plan_status == IndividualPlan.PlanStatus.CONCLUDED else '',
+            )
+            for order in range(4):
+                PlanTask.objects.create(
+                    plan=plan,
+                    description=f'Tarefa {order}',
+                    order=order,
+                    state=PlanTask.TaskState.DONE if order < index else PlanTask.TaskState.PENDING,
+                )
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client.force_authenticate(user=self.teacher)
+        self.url = reverse('pit-plan-dashboard')
+
+    def test_counts_per_class_and_completion_per_student(self):
+        response = self.client.get(self.url, {'class_id': self.turma.id, 'period_label': 'Semana painel'})
+        self.assertEqual(response.status_code, 200)
+        [rollup] = response.data['classes']
+        self.assertEqual(rollup['plans'], 4)
+        self.assertEqual(rollup['awaiting_submission'], 1)
+        self.assertEqual(rollup['awaiting_decision'], 1)
+        self.assertEqual(rollup['missing_self_evaluation'], 1)
+        self.assertEqual(rollup['awaiting_evaluation'], 1)
+        self.assertEqual((rollup['tasks'], rollup['tasks_done']), (16, 6))
+        ratios = {entry['student_id']: entry['completion_ratio'] for entry in rollup['students']}
+        self.assertEqual(ratios, {student.id: index / 4 for index, student in enumerate(self.students)})
+
+        other_period = self.client.get(self.url, {'class_id': self.turma.id, 'period_label': 'Outra semana'})
+        self.assertEqual(other_period.data['classes'][0]['plans'], 0)
+
+    def test_defaults_to_the_current_week(self):
+        from pit.services import weekly_period_label
+
+        current = weekly_period_label(date.today())
+        IndividualPlan.objects.create(student=self.students[0], student_class=self.turma, period_label=current)
+
+        response = self.client.get(self.url, {'class_id': self.turma.id})
+        self.assertEqual(response.data['period_label'], current)
+        self.assertEqual(response.data['classes'][0]['plans'], 1)
+        self.assertEqual(response.data['classes'][0]['awaiting_submission'], 1)
+
+        history = self.client.get(self.url, {'class_id': self.turma.id, 'period_label': 'all'})
+        self.assertIsNone(history.data['period_label'])
+        self.assertEqual(history.data['classes'][0]['plans'], 5)
+
+    @override_settings(PIT_PDF_BACKGROUND_RENDER=False)
+    def test_query_count_is_fixed_and_cached_until_a_write(self):
+        from pit.services import class_rollups
+
+        with self.assertNumQueries(2):
+            class_rollups([self.turma])
+        with self.assertNumQueries(2):
+            rollups = class_rollups(self.classes)
+        self.assertEqual([rollup['class_id'] for rollup in rollups], [turma.id for turma in self.classes])
+        with self.assertNumQueries(0):
+            class_rollups(self.classes)
+
+        task = PlanTask.objects.filter(plan__student=self.students[0]).first()
+        task.state = PlanTask.TaskState.DONE
+        with self.captureOnCommitCallbacks(execute=True):
+            task.save()
+        with self.assertNumQueries(2):
+            [rollup] = class_rollups([self.turma])
+        self.assertEqual(rollup['tasks_done'], 7)
+        with self.assertNumQueries(0):
+            class_rollups(self.classes[1:])
+
+    def test_only_teachers_of_the_class_and_admins(self):
+        self.client.force_authenticate(user=self.students[0])
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_authenticate(user=self.other_teacher)
+        self.assertEqual(self.client.get(self.url, {'class_id': self.turma.id}).status_code, 403)
+        self.assertEqual(self.client.get(self.url).data['classes'], [])
+        self.client.force_authenticate(user=self.teacher)
+        self.assertEqual(len(self.client.get(self.url).data['classes']), 3)
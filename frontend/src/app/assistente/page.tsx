@@ -84,6 +84,8 @@ function AssistantContent() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          // Repetições (duplo toque, retry de rede) devolvem a mesma resposta sem novo custo.
+          'Idempotency-Key': userMessage.id,
         },
         body: JSON.stringify({
           message: content,
@@ -0,0 +1,85 @@
+'use client';
+
+import { useMemo, useState } from 'react';
+
+import { checklistGridRows, useChecklistGrid, useChecklistTemplates } from '@/hooks/use-checklists';
+import { MARK_STATUS_BADGE_CLASSES, MARK_STATUS_LABELS } from './status-card';
+
+interface ChecklistClassGridProps {
+  classId: number;
+}
+
+export function ChecklistClassGrid({ classId }: ChecklistClassGridProps) {
+  const { data: templatesData } = useChecklistTemplates();
+  const templates = useMemo(
+    () => (templatesData ?? []).filter((template) => template.classes?.some((cls) => cls.id === classId)),
+    [templatesData, classId],
+  );
+  const [selectedTemplateId, setSelectedTemplateId] = useState<number | null>(null);
+  const templateId = selectedTemplateId ?? templates[0]?.id ?? null;
+
+  const { data: grid, isLoading, error } = useChecklistGrid(classId, templateId);
+  const rows = useMemo(() => (grid ? checklistGridRows(grid) : []), [grid]);
+
+  if (!templates.length) return null;
+
+  return (
+    <section className="mb-6 rounded-3xl border border-slate-200 bg-white/90 p-6 shadow-sm">
+      <div className="mb-4 flex flex-col gap-2 sm:flex-row sm:items-center sm:justify-between">
+        <h2 className="text-base font-semibold text-slate-800">Matriz da turma</h2>
+        <select
+          value={templateId ?? ''}
+          onChange={(event) => setSelectedTemplateId(Number(event.target.value))}
+          className="rounded-lg border border-slate-300 bg-white px-3 py-2 text-sm focus:border-sky-500 focus:outline-none focus:ring-2 focus:ring-sky-200"
+        >
+          {templates.map((template) => (
+            <option key={template.id} value={template.id}>
+              {template.name}
+            </option>
+          ))}
+        </select>
+      </div>
+      {error ? (
+        <p className="text-sm text-rose-700">{(error as Error).message}</p>
+      ) : isLoading || !grid ? (
+        <p className="text-sm text-slate-500">A carregar matriz…</p>
+      ) : (
+        <div className="overflow-x-auto">
+          <table className="min-w-full border-separate border-spacing-1 text-xs">
+            <thead>
+              <tr>
+                <th className="sticky left-0 bg-white px-2 text-left font-medium text-slate-600">Aluno</th>
+                {grid.items.map((item) => (
+                  <th key={item.id} title={item.text} className="px-1 font-medium text-slate-600">
+                    {item.code}
+                  </th>
+                ))}
+                <th className="px-2 text-right font-medium text-slate-600">%</th>
+              </tr>
+            </thead>
+            <tbody>
+              {grid.students.map((student, index) => (
+                <tr key={student.id}>
+                  <td className="sticky left-0 whitespace-nowrap bg-white px-2 text-slate-700">{student.name}</td>
+                  {rows[index].map((code, column) => {
+                    const state = grid.states[code];
+                    return (
+                      <td
+                        key={grid.items[column].id}
+                        title={`${grid.items[column].code}: ${MARK_STATUS_LABELS[state]}`}
+                        className={`h-5 w-5 rounded ${MARK_STATUS_BADGE_CLASSES[state]}`}
+                      />
+                    );
+                  })}
+                  <td className="px-2 text-right font-semibold text-slate-700">
+                    {Math.round(student.percent_complete)}%
+                  </td>
+                </tr>
+              ))}
+            </tbody>
+          </table>
+        </div>
+      )}
+    </section>
+  );
+}
@@ -9,6 +9,7 @@ import { AppShell } from '@/components/layout/app-shell';
 import { useAuth } from '@/providers/auth-provider';
 import { extractResults } from '@/lib/utils';
 import type { AppUser, ChecklistStatus } from '@/types/api';
+import { ChecklistClassGrid } from './_components/class-grid';
 
 function studentName(student?: AppUser | null) {
   if (!student) return 'Aluno desconhecido';
@@ -31,14 +32,15 @@ function formatDateTime(value?: string | null) {
 }
 
 function ChecklistsContent() {
-  const { fetchWithAuth, isAuthenticated, loading } = useAuth();
+  const { fetchWithAuth, isAuthenticated, loading, user } = useAuth();
   const searchParams = useSearchParams();
   const classIdParam = searchParams.get('class_id');
+  const isProfessor = Boolean(user && (user.role === 'professor' || user.role === 'admin' || user.is_superuser));
 
   const { data, isLoading, error } = useQuery({
     queryKey: ['checklists-statuses'],
     queryFn: async () => {
-      const res = await fetchWithAuth('/checklists/statuses');
+      const res = await fetchWithAuth('/checklists/statuses?expand=template,student,student_class');
       if (!res.ok) {
         throw new Error('Não foi possível obter as checklists.');
       }
@@ -145,6 +147,7 @@ function ChecklistsContent() {
           A mostrar o progresso dos alunos da turma <span className="font-semibold">#{classIdParam}</span>.
         </p>
       ) : null}
+      {classIdParam && isProfessor ? <ChecklistClassGrid classId={Number(classIdParam)} /> : null}
       {error ? (
         <div className="rounded-2xl border border-rose-200 bg-rose-50 p-6 text-sm text-rose-700">
           {(error as Error).message}
@@ -31,6 +31,7 @@ const suggestionOriginLabels: Record<string, string> = {
   template: 'Modelo',
   council: 'Conselho',
   pending: 'Pendência',
+  checklist: 'Lista de verificação',
   manual: 'Manual',
 };
 
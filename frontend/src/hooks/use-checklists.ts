@@ -4,11 +4,14 @@ import { useCallback } from 'react';
 import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
 
 import { useAuth } from '@/providers/auth-provider';
-import type { ChecklistStatus, ChecklistMark, ChecklistTemplate } from '@/types/api';
+import type { ChecklistGrid, ChecklistStatus, ChecklistMark, ChecklistTemplate } from '@/types/api';
 import { extractResults } from '@/lib/utils';
 
 type LVState = ChecklistStatus['state'];
 
+// Statuses are slim by default (related objects as ids); these are the relations the checklist screens render.
+export const CHECKLIST_STATUS_EXPAND = 'template,student,student_class,marks.item';
+
 interface CreateChecklistPayload {
   templateId: number;
   classId: number;
@@ -46,8 +49,9 @@ export function useChecklistStatuses(classId?: number | null) {
   return useQuery({
     queryKey: ['checklist-statuses', classId ?? null],
     queryFn: async () => {
-      const query = classId ? `?student_class=${classId}` : '';
-      const res = await fetchWithAuth(`/checklists/statuses${query}`);
+      const params = new URLSearchParams({ expand: CHECKLIST_STATUS_EXPAND });
+      if (classId) params.set('student_class', String(classId));
+      const res = await fetchWithAuth(`/checklists/statuses?${params.toString()}`);
       if (!res.ok) {
         throw new Error('Não foi possível obter as listas de verificação.');
       }
@@ -58,6 +62,35 @@ export function useChecklistStatuses(classId?: number | null) {
   });
 }
 
+export function useChecklistGrid(classId?: number | null, templateId?: number | null) {
+  const { fetchWithAuth, isAuthenticated } = useAuth();
+  return useQuery({
+    queryKey: ['checklist-grid', classId ?? null, templateId ?? null],
+    queryFn: async () => {
+      const res = await fetchWithAuth(`/classes/${classId}/checklists/${templateId}/grid`);
+      if (!res.ok) {
+        throw new Error('Não foi possível obter a grelha da turma.');
+      }
+      return (await res.json()) as ChecklistGrid;
+    },
+    enabled: isAuthenticated && Boolean(classId && templateId),
+  });
+}
+
+/** State codes per student (same order as `grid.items`), whatever the grid encoding. */
+export function checklistGridRows(grid: ChecklistGrid): number[][] {
+  if (grid.encoding === 'rle') {
+    return grid.cells.map((runs) => {
+      const row: number[] = [];
+      for (let index = 0; index < runs.length; index += 2) {
+        for (let count = 0; count < runs[index + 1]; count += 1) row.push(runs[index]);
+      }
+      return row;
+    });
+  }
+  return grid.cells.map((row) => Array.from(row, Number));
+}
+
 export function useCreateChecklistStatus() {
   const { fetchWithAuth } = useAuth();
   const queryClient = useQueryClient();
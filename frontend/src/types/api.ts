@@ -15,6 +15,31 @@ export type ChecklistMark = components['schemas']['ChecklistMark'];
 export type ChecklistTemplate = components['schemas']['ChecklistTemplate'] & {
   classes?: { id: number; name: string }[];
 };
+export type ChecklistGridState = 'NOT_STARTED' | 'IN_PROGRESS' | 'COMPLETED' | 'VALIDATED';
+
+interface ChecklistGridBase {
+  class_id: number;
+  template_id: number;
+  template_version: number;
+  /** Position in this list is the code used in `cells`. */
+  states: ChecklistGridState[];
+  items: { id: number; code: string; text: string; order: number }[];
+  students: { id: number; name: string; percent_complete: number }[];
+}
+
+export type ChecklistGrid = ChecklistGridBase &
+  (
+    | {
+        encoding: 'dense';
+        /** One string per student, one digit per item (same order as `items`). */
+        cells: string[];
+      }
+    | {
+        encoding: 'rle';
+        /** One array per student: `[state, count, state, count, ...]` over `items`. */
+        cells: number[][];
+      }
+  );
 export type IndividualPlan = components['schemas']['IndividualPlan'] & {
   student_class?: ClassSummary;
 };
@@ -35,7 +60,7 @@ export interface PlanSection {
 export interface PlanSuggestion {
   id: number;
   text: string;
-  origin: 'template' | 'council' | 'pending' | 'manual';
+  origin: 'template' | 'council' | 'pending' | 'checklist' | 'manual';
   is_pending: boolean;
   order: number;
   template_suggestion_id: number | null;